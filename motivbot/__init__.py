@@ -0,0 +1,8 @@
+"""Cliente Python para las RPC motivbot_* de Supabase"""
+from ._base import MotivBotError
+from .aio import AsyncMotivBotClient
+from .cache import ResponseCache
+from .client import MotivBotClient
+from .timing import RpcTimings
+
+__all__ = ['AsyncMotivBotClient', 'MotivBotClient', 'MotivBotError', 'ResponseCache', 'RpcTimings']
@@ -0,0 +1,146 @@
+"""Piezas compartidas por el cliente síncrono y el asíncrono"""
+import os
+import time as _time
+from datetime import date, time
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import httpx
+
+from .cache import ResponseCache
+
+# Respuestas del gateway de Supabase que garantizan que la RPC no llegó a ejecutarse: límite de peticiones
+# y servicio no disponible. Un 502/504 puede llegar con la RPC ya ejecutada (o aún en curso) y reintentarlo
+# duplicaría una escritura, así que se devuelve como error. Los fallos de conexión antes de enviar la
+# petición los reintenta el transporte de httpx (`retries`).
+RETRY_STATUS = frozenset({429, 503})
+
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+DEFAULT_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0)
+
+# Filas por llamada a motivbot_create_tasks; mantiene cada petición por debajo de ~1 MB
+DEFAULT_CHUNK_SIZE = 1000
+
+# on_rpc(rpc, duration_ms, error): se llama tras cada RPC con la duración total, reintentos incluidos
+RpcHook = Callable[[str, float, bool], None]
+
+# Elementos por página al recorrer tareas/conversaciones con los iteradores del cliente
+DEFAULT_PAGE_SIZE = 100
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Partir un iterable (posiblemente un generador) en listas de como mucho `size` elementos"""
+    if size < 1:
+        raise ValueError('chunk_size debe ser mayor que 0')
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class MotivBotError(Exception):
+    """Error HTTP devuelto por PostgREST al llamar a una RPC"""
+
+    def __init__(self, status_code: int, rpc: str, payload: Any):
+        self.status_code = status_code
+        self.rpc = rpc
+        self.payload = payload
+        message = payload.get('message') if isinstance(payload, dict) else payload
+        super().__init__(f"{rpc}: HTTP {status_code} - {message}")
+
+    @property
+    def code(self) -> Optional[str]:
+        return self.payload.get('code') if isinstance(self.payload, dict) else None
+
+
+class _ClientConfig:
+    """Configuración común: URL base, cabeceras y política de reintentos"""
+
+    def __init__(
+        self,
+        url: str,
+        anon_key: str,
+        *,
+        retries: int = 3,
+        backoff: float = 0.2,
+        timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+        limits: httpx.Limits = DEFAULT_LIMITS,
+        http2: bool = True,
+        cache: Optional[ResponseCache] = None,
+        on_rpc: Optional[RpcHook] = None,
+    ):
+        if not url or not anon_key:
+            raise ValueError('url y anon_key son obligatorios')
+
+        self.base_url = url.rstrip('/') + '/rest/v1/rpc/'
+        self.headers = {
+            'apikey': anon_key,
+            'Authorization': f"Bearer {anon_key}",
+            'Content-Type': 'application/json',
+        }
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limits = limits
+        self.http2 = http2
+        self.cache = cache
+        self.on_rpc = on_rpc
+
+    @classmethod
+    def env_settings(cls) -> Dict[str, Optional[str]]:
+        """Leer URL y clave de las mismas variables que usan el front y los tests"""
+        return {
+            'url': os.getenv('VITE_SUPABASE_URL') or os.getenv('SUPABASE_URL'),
+            'anon_key': os.getenv('VITE_SUPABASE_ANON_KEY') or os.getenv('SUPABASE_ANON_KEY'),
+        }
+
+    def delay(self, attempt: int) -> float:
+        return self.backoff * (2 ** attempt)
+
+    def should_retry(self, attempt: int, status_code: int) -> bool:
+        return attempt < self.retries and status_code in RETRY_STATUS
+
+    def report(self, rpc: str, started: float, result: Any = None, failed: bool = False) -> None:
+        """
+        Pasar la duración al hook on_rpc. Cuenta como error tanto una excepción como una respuesta
+        {'success': false} (los errores que las RPC capturan).
+        """
+        if self.on_rpc is None:
+            return
+        error = failed or (isinstance(result, dict) and result.get('success') is False)
+        self.on_rpc(rpc, 1000 * (_time.perf_counter() - started), error)
+
+    @staticmethod
+    def payload(params: Dict[str, Any]) -> Dict[str, Any]:
+        """Omitir los argumentos a None para que PostgREST use los DEFAULT de la función"""
+        return {
+            key: value.isoformat() if isinstance(value, (date, time)) else value
+            for key, value in params.items()
+            if value is not None
+        }
+
+    @staticmethod
+    def cursor_params(after: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Traducir el next_cursor de una página a los argumentos p_after_* de la RPC"""
+        if after is None:
+            return {}
+        return {'p_after_created_at': after['created_at'], 'p_after_id': after['id']}
+
+    @staticmethod
+    def parse(rpc: str, response: httpx.Response) -> Any:
+        try:
+            body = response.json() if response.content else None
+        except ValueError:
+            body = response.text
+        if response.status_code >= 400:
+            raise MotivBotError(response.status_code, rpc, body)
+        return body
+
+    @classmethod
+    def bulk_ids(cls, rpc: str, result: Dict[str, Any], key: str = 'ids') -> List[Any]:
+        """Extraer los ids (o la lista `key`) de una RPC en bloque o lanzar el error que devolvió"""
+        if not result.get('success'):
+            raise MotivBotError(400, rpc, result)
+        return result[key]
@@ -0,0 +1,75 @@
+"""Caché en memoria (TTL + LRU) de las RPC de lectura que cambian poco"""
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+# RPC cacheables -> tablas de las que dependen (claves de motivbot_get_data_version)
+CACHED_RPCS: Dict[str, Tuple[str, ...]] = {
+    'motivbot_get_popular_tags': ('task',),
+    'motivbot_get_related_tags': ('task',),
+    'motivbot_get_motivational_messages': ('task', 'chibi_messages'),
+    'motivbot_get_dashboard': ('task', 'conversation'),
+    'motivbot_get_calendar': ('task',),
+}
+
+
+class ResponseCache:
+    """
+    Respuestas por (RPC, argumentos) con caducidad y un máximo de entradas.
+
+    Cada entrada guarda las versiones de las tablas de las que depende (motivbot_get_data_version):
+    si alguna ha cambiado la entrada ya no vale aunque no haya caducado. El TTL acota además la
+    edad de cualquier respuesta y el tamaño máximo descarta la usada hace más tiempo.
+
+        client = MotivBotClient.from_env(cache=ResponseCache(maxsize=256, ttl=300))
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        if maxsize < 1 or ttl <= 0:
+            raise ValueError('maxsize y ttl deben ser mayores que 0')
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Tuple[int, ...], Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(rpc: str, payload: Dict[str, Any]) -> Hashable:
+        return rpc, json.dumps(payload, sort_keys=True, default=str)
+
+    def get(self, key: Hashable, versions: Tuple[int, ...]) -> Any:
+        """Copia de la respuesta guardada o None si no hay, ha caducado o las versiones no coinciden"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self.clock() or entry[1] != versions:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[2])
+
+    def set(self, key: Hashable, versions: Tuple[int, ...], value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, versions, copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def cached_versions(rpc: str, versions: Dict[str, int]) -> Tuple[int, ...]:
+    """Versiones de las tablas de las que depende `rpc`, en el orden de CACHED_RPCS"""
+    return tuple(versions.get(scope, 0) for scope in CACHED_RPCS[rpc])
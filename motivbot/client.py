@@ -0,0 +1,463 @@
+"""Cliente síncrono para las RPC motivbot_* expuestas por PostgREST/Supabase"""
+import time as _time
+from datetime import date, time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import httpx
+
+from ._base import DEFAULT_CHUNK_SIZE, DEFAULT_PAGE_SIZE, _ClientConfig, chunked
+from .cache import cached_versions
+from .types import (
+    Analytics,
+    Calendar,
+    Conversation,
+    ConversationPage,
+    ConversationWindow,
+    CounterCheck,
+    CreateTaskResult,
+    Cursor,
+    Dashboard,
+    ExportChunk,
+    ExternalTaskLink,
+    MotivationalMessage,
+    Result,
+    Rollover,
+    RollupCheck,
+    ServerRpcStat,
+    SyncCheckpoint,
+    TagCount,
+    Task,
+    TaskPage,
+)
+
+
+class MotivBotClient:
+    """
+    Cliente con un pool de conexiones keep-alive (HTTP/2 si el servidor lo negocia).
+
+    Reutilizar una única instancia evita pagar el handshake TCP+TLS en cada llamada:
+
+        with MotivBotClient.from_env() as client:
+            task = client.create_task('Revisar PR', tags=['trabajo'])
+    """
+
+    def __init__(self, url: str, anon_key: str, **options: Any):
+        self._config = _ClientConfig(url, anon_key, **options)
+        self._http = httpx.Client(
+            base_url=self._config.base_url,
+            headers=self._config.headers,
+            timeout=self._config.timeout,
+            transport=httpx.HTTPTransport(
+                http2=self._config.http2,
+                limits=self._config.limits,
+                retries=self._config.retries,
+            ),
+        )
+
+    @classmethod
+    def from_env(cls, **options: Any) -> 'MotivBotClient':
+        return cls(**_ClientConfig.env_settings(), **options)
+
+    def close(self) -> None:
+        self._http.close()
+
+    def __enter__(self) -> 'MotivBotClient':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def rpc(self, name: str, **params: Any) -> Any:
+        """Llamar a /rest/v1/rpc/<name> reintentando los fallos transitorios"""
+        payload = self._config.payload(params)
+        started = _time.perf_counter()
+        attempt = 0
+        try:
+            while True:
+                response = self._http.post(name, json=payload)
+                if not self._config.should_retry(attempt, response.status_code):
+                    result = self._config.parse(name, response)
+                    break
+                _time.sleep(self._config.delay(attempt))
+                attempt += 1
+        except Exception:
+            self._config.report(name, started, failed=True)
+            raise
+        self._config.report(name, started, result)
+        return result
+
+    def cached_rpc(self, name: str, **params: Any) -> Any:
+        """
+        rpc() a través de la caché del cliente (opción `cache`) para las RPC de CACHED_RPCS.
+
+        Cada llamada consulta antes motivbot_get_data_version (una lectura por clave primaria): la
+        respuesta guardada solo se devuelve si las tablas de las que depende no han cambiado.
+        """
+        cache = self._config.cache
+        if cache is None:
+            return self.rpc(name, **params)
+        versions = cached_versions(name, self.get_data_version())
+        key = cache.key(name, self._config.payload(params))
+        value = cache.get(key, versions)
+        if value is None:
+            value = self.rpc(name, **params)
+            cache.set(key, versions, value)
+        return value
+
+    # TAREAS
+
+    def get_tasks(
+        self,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Task]:
+        return self.rpc('motivbot_get_tasks', p_status=status, p_priority=priority, p_tags=tags, p_limit=limit)
+
+    def get_tasks_page(
+        self,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        after: Optional[Cursor] = None,
+    ) -> TaskPage:
+        return self.rpc(
+            'motivbot_get_tasks_page',
+            p_status=status,
+            p_priority=priority,
+            p_tags=tags,
+            p_limit=limit,
+            **self._config.cursor_params(after),
+        )
+
+    def iter_tasks(
+        self,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> Iterator[Task]:
+        """Recorrer todas las tareas (más recientes primero) pidiendo las páginas a medida que se consumen"""
+        after = None
+        while True:
+            page = self.get_tasks_page(status, priority, tags, limit=page_size, after=after)
+            yield from page['items']
+            after = page['next_cursor']
+            if after is None:
+                return
+
+    def create_task(
+        self,
+        title: str,
+        description: Optional[str] = None,
+        priority: Optional[str] = None,
+        due_date: Optional[date] = None,
+        due_time: Optional[time] = None,
+        tags: Optional[List[str]] = None,
+    ) -> CreateTaskResult:
+        return self.rpc(
+            'motivbot_create_task',
+            p_title=title,
+            p_description=description,
+            p_priority=priority,
+            p_due_date=due_date,
+            p_due_time=due_time,
+            p_tags=tags,
+        )
+
+    def create_tasks(self, tasks: Iterable[Dict[str, Any]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[int]:
+        """
+        Crear tareas en bloque con motivbot_create_tasks, `chunk_size` filas por petición.
+
+        Acepta cualquier iterable (p. ej. un generador que lee un fichero) y devuelve los ids
+        en el orden de entrada. Cada bloque es atómico; si uno falla se lanza MotivBotError
+        y los bloques anteriores quedan ya insertados.
+
+        Cada tarea lleva los campos de create_task y, opcionalmente, `created_at` (ISO 8601) para
+        conservar la fecha original de una importación; sin él se usa la hora del servidor.
+        """
+        ids: List[int] = []
+        for chunk in chunked(tasks, chunk_size):
+            rows = [self._config.payload(task) for task in chunk]
+            result = self.rpc('motivbot_create_tasks', p_tasks=rows)
+            ids.extend(self._config.bulk_ids('motivbot_create_tasks', result))
+        return ids
+
+    def upsert_external_tasks(
+        self,
+        source: str,
+        tasks: Iterable[Dict[str, Any]],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> List[ExternalTaskLink]:
+        """
+        Crear o actualizar tareas enlazadas a issues externos con motivbot_upsert_external_tasks.
+
+        Cada tarea lleva `repo` y `external_id` además de los campos de create_tasks; la clave
+        (source, repo, external_id) identifica el issue aunque cambie el título. Devuelve por cada
+        elemento de entrada su id y si se insertó, actualizó o no cambió.
+        """
+        links: List[ExternalTaskLink] = []
+        for chunk in chunked(tasks, chunk_size):
+            rows = [self._config.payload(task) for task in chunk]
+            result = self.rpc('motivbot_upsert_external_tasks', p_source=source, p_tasks=rows)
+            links.extend(self._config.bulk_ids('motivbot_upsert_external_tasks', result, key='tasks'))
+        return links
+
+    def get_sync_checkpoints(self, source: str) -> List[SyncCheckpoint]:
+        """Puntos de control por repositorio de la sincronización de `source` (since y ETag)"""
+        return self.rpc('motivbot_get_sync_checkpoints', p_source=source)
+
+    def save_sync_checkpoints(self, source: str, checkpoints: List[Dict[str, Any]]) -> Result:
+        """Guardar {repo, since, etag} por repositorio; since nunca retrocede"""
+        return self.rpc('motivbot_save_sync_checkpoints', p_source=source, p_checkpoints=checkpoints)
+
+    def update_task(
+        self,
+        task_id: int,
+        title: Optional[str] = None,
+        description: Optional[str] = None,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        due_date: Optional[date] = None,
+        due_time: Optional[time] = None,
+        tags: Optional[List[str]] = None,
+    ) -> Result:
+        return self.rpc(
+            'motivbot_update_task',
+            p_task_id=task_id,
+            p_title=title,
+            p_description=description,
+            p_status=status,
+            p_priority=priority,
+            p_due_date=due_date,
+            p_due_time=due_time,
+            p_tags=tags,
+        )
+
+    def delete_task(self, task_id: int) -> Result:
+        return self.rpc('motivbot_delete_task', p_task_id=task_id)
+
+    def search_tasks(self, search: str, search_tags: Optional[bool] = None, limit: Optional[int] = None) -> List[Task]:
+        return self.rpc('motivbot_search_tasks', p_search=search, p_search_tags=search_tags, p_limit=limit)
+
+    def get_calendar(self, start: date, end: date, limit_per_day: Optional[int] = None) -> Calendar:
+        """
+        Un día por fecha entre `start` y `end` (incluidos) con total, recuento por estado y sus primeras
+        `limit_per_day` tareas por hora (por defecto 50), en una sola llamada para las vistas de semana y mes.
+        """
+        return self.cached_rpc('motivbot_get_calendar', p_start=start, p_end=end, p_limit_per_day=limit_per_day)
+
+    def rollover_overdue_tasks(self, today: Optional[date] = None) -> Rollover:
+        """
+        Mover a `today` (por defecto la fecha del servidor) las tareas abiertas ya vencidas y devolver sus
+        ids. Solo hace algo la primera llamada de cada día; las siguientes devuelven already_run.
+        """
+        return self.rpc('motivbot_rollover_overdue_tasks', p_today=today)
+
+    # CONVERSACIONES
+
+    def create_conversation(
+        self,
+        task_id: int,
+        role: str,
+        message: str,
+        emotional_state: Optional[str] = None,
+        model_used: Optional[str] = None,
+        tokens_used: Optional[int] = None,
+    ) -> Result:
+        return self.rpc(
+            'motivbot_create_conversation',
+            p_task_id=task_id,
+            p_role=role,
+            p_message=message,
+            p_emotional_state=emotional_state,
+            p_model_used=model_used,
+            p_tokens_used=tokens_used,
+        )
+
+    def create_conversations(
+        self,
+        conversations: Iterable[Dict[str, Any]],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> List[int]:
+        """
+        Crear conversaciones en bloque con motivbot_create_conversations, `chunk_size` filas por petición.
+
+        Igual que create_tasks: acepta generadores, devuelve los ids en el orden de entrada y cada
+        bloque es atómico.
+        """
+        ids: List[int] = []
+        for chunk in chunked(conversations, chunk_size):
+            rows = [self._config.payload(conversation) for conversation in chunk]
+            result = self.rpc('motivbot_create_conversations', p_conversations=rows)
+            ids.extend(self._config.bulk_ids('motivbot_create_conversations', result))
+        return ids
+
+    def get_conversations(
+        self,
+        task_id: Optional[int] = None,
+        role: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Conversation]:
+        return self.rpc('motivbot_get_conversations', p_task_id=task_id, p_role=role, p_limit=limit)
+
+    def get_conversations_page(
+        self,
+        task_id: Optional[int] = None,
+        role: Optional[str] = None,
+        limit: Optional[int] = None,
+        after: Optional[Cursor] = None,
+    ) -> ConversationPage:
+        return self.rpc(
+            'motivbot_get_conversations_page',
+            p_task_id=task_id,
+            p_role=role,
+            p_limit=limit,
+            **self._config.cursor_params(after),
+        )
+
+    def iter_conversations(
+        self,
+        task_id: Optional[int] = None,
+        role: Optional[str] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> Iterator[Conversation]:
+        """Recorrer las conversaciones (más recientes primero) página a página"""
+        after = None
+        while True:
+            page = self.get_conversations_page(task_id, role, limit=page_size, after=after)
+            yield from page['items']
+            after = page['next_cursor']
+            if after is None:
+                return
+
+    def update_conversation_feedback(
+        self,
+        conversation_id: int,
+        user_is_grateful: Optional[bool] = None,
+        user_is_useful: Optional[bool] = None,
+        assistant_is_useful: Optional[bool] = None,
+        assistant_is_precise: Optional[bool] = None,
+        assistant_is_grateful: Optional[bool] = None,
+        emotional_state: Optional[str] = None,
+    ) -> Result:
+        return self.rpc(
+            'motivbot_update_conversation_feedback',
+            p_conversation_id=conversation_id,
+            p_user_is_grateful=user_is_grateful,
+            p_user_is_useful=user_is_useful,
+            p_assistant_is_useful=assistant_is_useful,
+            p_assistant_is_precise=assistant_is_precise,
+            p_assistant_is_grateful=assistant_is_grateful,
+            p_emotional_state=emotional_state,
+        )
+
+    def delete_conversation(self, conversation_id: int) -> Result:
+        return self.rpc('motivbot_delete_conversation', p_conversation_id=conversation_id)
+
+    def get_conversation_window(
+        self,
+        task_id: int,
+        token_budget: Optional[int] = None,
+        max_messages: Optional[int] = None,
+    ) -> ConversationWindow:
+        """Últimos mensajes de la tarea que caben en `token_budget` más el resumen de los anteriores"""
+        return self.rpc(
+            'motivbot_get_conversation_window',
+            p_task_id=task_id,
+            p_token_budget=token_budget,
+            p_max_messages=max_messages,
+        )
+
+    def get_unsummarized_turns(
+        self,
+        task_id: int,
+        before_id: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[Conversation]:
+        """Turnos más antiguos que el resumen aún no cubre (cronológicos), anteriores a la conversación `before_id`"""
+        return self.rpc(
+            'motivbot_get_unsummarized_turns',
+            p_task_id=task_id,
+            p_before_id=before_id,
+            p_limit=limit,
+        )
+
+    def save_conversation_summary(self, task_id: int, summary: str, until_id: int) -> Result:
+        """Guardar el resumen de los turnos de la tarea hasta la conversación `until_id` (incluida)"""
+        return self.rpc(
+            'motivbot_save_conversation_summary',
+            p_task_id=task_id,
+            p_summary=summary,
+            p_until_id=until_id,
+        )
+
+    # EXPORTACIÓN
+
+    def export_tasks_chunk(self, after_id: int = 0, limit: Optional[int] = None) -> ExportChunk:
+        """Tareas con id mayor que `after_id`, por id ascendente (bloques de 1000 por defecto, hasta 5000)"""
+        return self.rpc('motivbot_export_tasks', p_after_id=after_id, p_limit=limit)
+
+    def export_conversations_chunk(self, after_id: int = 0, limit: Optional[int] = None) -> ExportChunk:
+        """Conversaciones con id mayor que `after_id`, por id ascendente"""
+        return self.rpc('motivbot_export_conversations', p_after_id=after_id, p_limit=limit)
+
+    # TAGS, MENSAJES Y ANALÍTICAS
+
+    def get_popular_tags(self, limit: Optional[int] = None) -> List[TagCount]:
+        return self.cached_rpc('motivbot_get_popular_tags', p_limit=limit)
+
+    def get_related_tags(self, tags: List[str], limit: Optional[int] = None) -> List[TagCount]:
+        """Tags que más aparecen junto a `tags` (count: tareas que los comparten)"""
+        return self.cached_rpc('motivbot_get_related_tags', p_tags=tags, p_limit=limit)
+
+    def get_motivational_messages(
+        self,
+        task_id: Optional[int] = None,
+        tags: Optional[List[str]] = None,
+        estado: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[MotivationalMessage]:
+        return self.cached_rpc(
+            'motivbot_get_motivational_messages',
+            p_task_id=task_id,
+            p_tags=tags,
+            p_estado=estado,
+            p_limit=limit,
+        )
+
+    def get_dashboard(self) -> Dashboard:
+        return self.cached_rpc('motivbot_get_dashboard')
+
+    def get_data_version(self) -> Dict[str, int]:
+        """Versión de task, conversation y chibi_messages; cambia con cada sentencia que las modifica"""
+        return self.rpc('motivbot_get_data_version')
+
+    def check_dashboard_counters(self) -> CounterCheck:
+        """Comparar los contadores del dashboard con un recálculo (recorre las tablas; clave service_role)"""
+        return self.rpc('motivbot_check_dashboard_counters')
+
+    def check_tag_index(self) -> CounterCheck:
+        """Comparar task_tag y los recuentos de tags con task.tags (recorre la tabla; clave service_role)"""
+        return self.rpc('motivbot_check_tag_index')
+
+    def get_analytics(
+        self,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        bucket: Optional[str] = None,
+    ) -> Analytics:
+        """Métricas por día, semana o mes entre `start` y `end` (por defecto los últimos 30 días)"""
+        return self.rpc('motivbot_get_analytics', p_from=start, p_to=end, p_bucket=bucket)
+
+    def check_daily_rollups(self) -> RollupCheck:
+        """Comparar los rollups ya consolidados con un recálculo (recorre las tablas; clave service_role)"""
+        return self.rpc('motivbot_check_daily_rollups')
+
+    # INSTRUMENTACIÓN
+
+    def get_rpc_stats(self) -> List[ServerRpcStat]:
+        """Llamadas y duración por RPC según pg_stat_statements en Postgres, desde su último reset"""
+        return self.rpc('motivbot_get_rpc_stats')
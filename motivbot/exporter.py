@@ -0,0 +1,193 @@
+"""
+Exportador de tareas y conversaciones a NDJSON o CSV.
+
+Pide bloques por id ascendente a motivbot_export_tasks / motivbot_export_conversations y escribe cada
+uno antes de pedir el siguiente, así que la memoria no depende del tamaño de la tabla. Tras cada bloque
+guarda en `<fichero>.checkpoint` el último id escrito y el tamaño del fichero: si la exportación se
+interrumpe, la siguiente recorta lo que quedara a medias y sigue desde ese id. Volver a ejecutarla sobre
+una exportación terminada añade solo las filas nuevas.
+
+    python -m motivbot.exporter tasks tareas.ndjson
+    python -m motivbot.exporter conversations chats.csv --chunk-size 5000
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from ._base import DEFAULT_CHUNK_SIZE, MotivBotError, _ClientConfig
+from .client import MotivBotClient
+
+# Columnas del CSV, en el orden de motivbot_task_json y motivbot_conversation_json
+COLUMNS = {
+    'tasks': ['id', 'title', 'description', 'status', 'priority', 'tags', 'due_date', 'due_time',
+              'created_at', 'updated_at'],
+    'conversations': ['id', 'task_id', 'role', 'message', 'user_is_grateful', 'user_is_useful',
+                      'assistant_is_useful', 'assistant_is_precise', 'assistant_is_grateful', 'emotional_state',
+                      'tokens_used', 'model_used', 'response_time_ms', 'created_at'],
+}
+FORMATS = ('ndjson', 'csv')
+
+
+def iter_chunks(
+    client: MotivBotClient,
+    kind: str,
+    after_id: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[List[Dict[str, Any]]]:
+    """Bloques de filas de `kind` ('tasks' o 'conversations') con id mayor que `after_id`"""
+    export = {'tasks': client.export_tasks_chunk, 'conversations': client.export_conversations_chunk}[kind]
+    while True:
+        chunk = export(after_id, limit=chunk_size)
+        if chunk['items']:
+            yield chunk['items']
+        if chunk['next_after_id'] is None:
+            return
+        after_id = chunk['next_after_id']
+
+
+def encode_rows(rows: List[Dict[str, Any]], fmt: str, columns: List[str], header: bool = False) -> str:
+    """Texto de un bloque: una línea JSON por fila o filas CSV (listas como JSON, NULL como vacío)"""
+    if fmt == 'ndjson':
+        return ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if header:
+        writer.writerow(columns)
+    for row in rows:
+        writer.writerow([
+            json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict))
+            else '' if value is None else value
+            for value in (row.get(column) for column in columns)
+        ])
+    return buffer.getvalue()
+
+
+def checkpoint_path(path: str) -> str:
+    return path + '.checkpoint'
+
+
+def read_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    """{kind, format, last_id, bytes} de la última exportación a `path`, o None si no hay"""
+    try:
+        with open(checkpoint_path(path), encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(path: str, checkpoint: Dict[str, Any]) -> None:
+    """Guardar el punto de control de forma atómica: o queda el anterior o el nuevo completo"""
+    temporary = checkpoint_path(path) + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(checkpoint, file)
+    os.replace(temporary, checkpoint_path(path))
+
+
+def export_to_file(
+    client: MotivBotClient,
+    kind: str,
+    path: str,
+    fmt: str = 'ndjson',
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    restart: bool = False,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Exportar todas las filas de `kind` a `path` y devolver {rows, chunks, last_id, seconds, rows_per_second}.
+
+    Sin `restart` reanuda desde el punto de control de `path`; un fichero con contenido pero sin punto
+    de control (o de otra exportación) no se toca y se lanza ValueError. `rows` cuenta solo lo escrito
+    en esta ejecución.
+    """
+    if kind not in COLUMNS:
+        raise ValueError(f"Exportación desconocida {kind!r}; opciones: {', '.join(COLUMNS)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato desconocido {fmt!r}; opciones: {', '.join(FORMATS)}")
+
+    checkpoint = None if restart else read_checkpoint(path)
+    if checkpoint is None:
+        if not restart and os.path.exists(path) and os.path.getsize(path) > 0:
+            raise ValueError(f"{path} ya existe y no tiene punto de control; usa restart para sobrescribirlo")
+        checkpoint = {'kind': kind, 'format': fmt, 'last_id': 0, 'bytes': 0}
+    elif (checkpoint['kind'], checkpoint['format']) != (kind, fmt):
+        raise ValueError(f"{path} es una exportación de {checkpoint['kind']} en {checkpoint['format']}")
+
+    report = {'rows': 0, 'chunks': 0, 'last_id': checkpoint['last_id'], 'seconds': 0.0, 'rows_per_second': 0.0}
+    start = time.perf_counter()
+    with open(path, 'a+b') as file:
+        # Lo escrito tras el último punto de control es un bloque a medias de una ejecución interrumpida
+        file.truncate(checkpoint['bytes'])
+        for rows in iter_chunks(client, kind, checkpoint['last_id'], chunk_size):
+            text = encode_rows(rows, fmt, COLUMNS[kind], header=fmt == 'csv' and checkpoint['bytes'] == 0)
+            file.write(text.encode('utf-8'))
+            file.flush()
+            os.fsync(file.fileno())
+            checkpoint.update(last_id=rows[-1]['id'], bytes=file.tell())
+            write_checkpoint(path, checkpoint)
+
+            report['rows'] += len(rows)
+            report['chunks'] += 1
+            report['last_id'] = checkpoint['last_id']
+            report['seconds'] = time.perf_counter() - start
+            report['rows_per_second'] = report['rows'] / report['seconds'] if report['seconds'] else 0.0
+            if progress is not None:
+                progress(dict(report))
+    if checkpoint['bytes'] == 0:
+        write_checkpoint(path, checkpoint)
+    return report
+
+
+def format_progress(report: Dict[str, Any]) -> str:
+    return (f"{report['rows']} filas en {report['chunks']} bloques hasta el id {report['last_id']}, "
+            f"{report['seconds']:.1f} s ({report['rows_per_second']:.0f} filas/s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Exportar tareas o conversaciones a NDJSON o CSV por bloques')
+    parser.add_argument('kind', choices=sorted(COLUMNS), help='Qué exportar')
+    parser.add_argument('path', help='Fichero de salida (.ndjson o .csv)')
+    parser.add_argument('--format', choices=FORMATS, help='Formato (por defecto según la extensión; si no, ndjson)')
+    parser.add_argument('--url', help='URL de Supabase/PostgREST (por defecto VITE_SUPABASE_URL)')
+    parser.add_argument('--anon-key', help='Clave anon (por defecto VITE_SUPABASE_ANON_KEY)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Filas por llamada (hasta 5000)')
+    parser.add_argument('--restart', action='store_true', help='Empezar de cero aunque haya un punto de control')
+    parser.add_argument('--quiet', action='store_true', help='Mostrar solo el resumen final')
+    args = parser.parse_args(argv)
+
+    settings = _ClientConfig.env_settings()
+    url = args.url or settings['url']
+    anon_key = args.anon_key or settings['anon_key']
+    if not url or not anon_key:
+        parser.error('Falta la URL o la clave (--url/--anon-key o variables de entorno)')
+    if not 1 <= args.chunk_size <= 5000:
+        parser.error('--chunk-size debe estar entre 1 y 5000')
+    fmt = args.format or ('csv' if args.path.lower().endswith('.csv') else 'ndjson')
+
+    def progress(report):
+        print(format_progress(report), file=sys.stderr)
+
+    with MotivBotClient(url, anon_key) as client:
+        try:
+            report = export_to_file(
+                client,
+                args.kind,
+                args.path,
+                fmt=fmt,
+                chunk_size=args.chunk_size,
+                restart=args.restart,
+                progress=None if args.quiet else progress,
+            )
+        except (MotivBotError, ValueError, OSError) as error:
+            print(f"❌ {error}", file=sys.stderr)
+            return 1
+    print(format_progress(report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+Sincronización incremental de issues de GitHub con tareas, la misma que hace
+`proxy/api/motivBotLinkIssuesFromGithub.js`.
+
+Por repositorio se guarda en motivbot_sync_checkpoint el updated_at del último issue visto y solo se piden
+a GitHub los cambiados desde entonces (`since=`, en orden de actualización). La primera página va con
+`If-None-Match`: si el repositorio no ha cambiado GitHub responde 304, que no gasta cuota. Los
+repositorios se recorren con una concurrencia acotada y cada página se enlaza con
+motivbot_upsert_external_tasks.
+
+    python -m motivbot.github_sync --username octocat --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from ._base import MotivBotError, _ClientConfig
+from .aio import AsyncMotivBotClient
+
+SOURCE = 'github'
+GITHUB_API = 'https://api.github.com'
+
+# Máximo por página que admite GitHub
+PER_PAGE = 100
+
+# Repositorios sincronizados a la vez; GitHub penaliza ráfagas de peticiones concurrentes
+DEFAULT_CONCURRENCY = 4
+
+# Vencimiento de los issues abiertos según prioridad: (días, hora)
+DUE_BY_PRIORITY = {'high': (0, '18:00'), 'medium': (3, '17:00'), 'low': (7, '16:00')}
+
+
+def parse_time(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value.replace('Z', '+00:00')) if value else None
+
+
+def issue_priority(issue: Dict[str, Any]) -> str:
+    """Prioridad según las labels del issue"""
+    labels = [label['name'].lower() for label in issue.get('labels') or []]
+    if any(word in name for name in labels for word in ('high', 'urgent', 'critical')):
+        return 'high'
+    if any(word in name for name in labels for word in ('low', 'minor')):
+        return 'low'
+    return 'medium'
+
+
+def issue_to_task(repo: Dict[str, Any], issue: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Fila para motivbot_upsert_external_tasks; las fechas y la prioridad solo se usan al crear la tarea"""
+    now = now or datetime.now(timezone.utc)
+    priority = issue_priority(issue)
+    if issue['state'] == 'open':
+        days, due_time = DUE_BY_PRIORITY[priority]
+        due = now + timedelta(days=days)
+    else:
+        due = parse_time(issue.get('closed_at') or issue['created_at'])
+        due_time = due.strftime('%H:%M')
+    labels = ', '.join(label['name'] for label in issue.get('labels') or []) or 'None'
+    closed = f"🔒 **GitHub Closed:** {parse_time(issue['closed_at']).date()}" if issue.get('closed_at') else ''
+
+    return {
+        'repo': repo['full_name'],
+        'external_id': str(issue['id']),
+        'title': f"[{repo['name']}] {issue['title']}",
+        'description': (
+            f"{issue.get('body') or 'No description provided'}\n\n"
+            f"🔗 **GitHub Issue:** {issue['html_url']}\n"
+            f"📁 **Repository:** {repo['full_name']}\n"
+            f"🔢 **Issue #:** {issue['number']}\n"
+            f"🏷️ **Labels:** {labels}\n"
+            f"👤 **Created by:** {(issue.get('user') or {}).get('login', 'Unknown')}\n"
+            f"📊 **State:** {issue['state']}\n"
+            f"🆔 **GitHub ID:** {issue['id']}\n"
+            f"📅 **GitHub Created:** {parse_time(issue['created_at']).date()}\n"
+            f"{closed}\n\n"
+            f"---\n*Sincronizado automáticamente desde GitHub*"
+        ),
+        'tags': ['motivBotLinkIssuesFromGithub'],
+        'status': 'pending' if issue['state'] == 'open' else 'completed',
+        'priority': priority,
+        'due_date': due.date().isoformat(),
+        'due_time': due_time,
+    }
+
+
+class GitHubSync:
+    """
+    Una ejecución de la sincronización. `report` cuenta peticiones a GitHub (las 304 aparte, porque
+    no gastan cuota), issues enlazados por acción y repositorios que fallaron.
+    """
+
+    def __init__(self, client: AsyncMotivBotClient, github: httpx.AsyncClient, concurrency: int = DEFAULT_CONCURRENCY):
+        if concurrency < 1:
+            raise ValueError('concurrency debe ser mayor que 0')
+        self.client = client
+        self.github = github
+        self.concurrency = concurrency
+        self.report: Dict[str, Any] = {
+            'repositories': 0, 'requests': 0, 'not_modified': 0, 'issues': 0,
+            'inserted': 0, 'updated': 0, 'unchanged': 0, 'errors': [], 'seconds': 0.0,
+        }
+
+    async def _get(self, path: str, params: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        response = await self.github.get(path, params=params, headers=headers)
+        self.report['requests'] += 1
+        if response.status_code == 304:
+            self.report['not_modified'] += 1
+        elif response.status_code >= 400:
+            response.raise_for_status()
+        return response
+
+    async def repositories(self, username: str) -> List[Dict[str, Any]]:
+        repos: List[Dict[str, Any]] = []
+        page = 1
+        while True:
+            response = await self._get(f"/users/{username}/repos", {
+                'per_page': PER_PAGE, 'page': page, 'sort': 'updated', 'direction': 'desc', 'type': 'all',
+            })
+            items = response.json()
+            repos.extend(items)
+            if len(items) < PER_PAGE:
+                return repos
+            page += 1
+
+    async def sync_repository(self, repo: Dict[str, Any], checkpoint: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Enlazar los issues cambiados desde el punto de control y devolver el nuevo, o None si
+        GitHub respondió 304. El ETag solo vale para la misma URL: se guarda si since no avanza.
+        """
+        since = parse_time((checkpoint or {}).get('since'))
+        params: Dict[str, Any] = {'state': 'all', 'per_page': PER_PAGE, 'sort': 'updated', 'direction': 'asc'}
+        if since is not None:
+            params['since'] = since.isoformat().replace('+00:00', 'Z')
+        etag = (checkpoint or {}).get('etag')
+
+        latest, first_etag, page = since, None, 1
+        while True:
+            headers = {'If-None-Match': etag} if page == 1 and etag else None
+            response = await self._get(f"/repos/{repo['full_name']}/issues", {**params, 'page': page}, headers)
+            if response.status_code == 304:
+                return None
+            if page == 1:
+                first_etag = response.headers.get('ETag')
+
+            items = response.json()
+            issues = [item for item in items if 'pull_request' not in item]
+            if issues:
+                links = await self.client.upsert_external_tasks(SOURCE, [issue_to_task(repo, issue) for issue in issues])
+                self.report['issues'] += len(links)
+                for link in links:
+                    self.report[link['action']] += 1
+            # Los pull requests también avanzan since: si no, se volverían a pedir en cada ejecución
+            for item in items:
+                updated = parse_time(item['updated_at'])
+                latest = updated if latest is None or updated > latest else latest
+            if len(items) < PER_PAGE:
+                break
+            page += 1
+
+        return {
+            'repo': repo['full_name'],
+            'since': latest.isoformat() if latest else None,
+            'etag': first_etag if latest == since else None,
+        }
+
+    async def run(self, username: str) -> Dict[str, Any]:
+        start = time.perf_counter()
+        repos = await self.repositories(username)
+        checkpoints = {c['repo']: c for c in await self.client.get_sync_checkpoints(SOURCE)}
+        self.report['repositories'] = len(repos)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def sync(repo):
+            async with semaphore:
+                try:
+                    checkpoint = await self.sync_repository(repo, checkpoints.get(repo['full_name']))
+                    # Se guarda por repositorio: si la ejecución se corta, los ya terminados no se repiten
+                    if checkpoint is not None:
+                        result = await self.client.save_sync_checkpoints(SOURCE, [checkpoint])
+                        if not result.get('success'):
+                            raise MotivBotError(400, 'motivbot_save_sync_checkpoints', result)
+                except (httpx.HTTPError, MotivBotError) as error:
+                    self.report['errors'].append(f"{repo['full_name']}: {error}")
+
+        await asyncio.gather(*(sync(repo) for repo in repos))
+        self.report['seconds'] = time.perf_counter() - start
+        return self.report
+
+
+def github_client(token: Optional[str], api_url: str = GITHUB_API) -> httpx.AsyncClient:
+    headers = {'Accept': 'application/vnd.github.v3+json', 'User-Agent': 'motivBot-LinkIssues'}
+    if token:
+        headers['Authorization'] = f"token {token}"
+    return httpx.AsyncClient(base_url=api_url, headers=headers, timeout=httpx.Timeout(30.0, connect=5.0))
+
+
+async def sync_github(
+    client: AsyncMotivBotClient,
+    username: str,
+    token: Optional[str] = None,
+    api_url: str = GITHUB_API,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> Dict[str, Any]:
+    """Sincronizar los repositorios de `username` y devolver el informe de GitHubSync"""
+    async with github_client(token, api_url) as github:
+        return await GitHubSync(client, github, concurrency).run(username)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sincronizar issues de GitHub con tareas del MotivBot')
+    parser.add_argument('--username', default=os.getenv('GITHUB_USERNAME'), help='Usuario de GitHub (GITHUB_USERNAME)')
+    parser.add_argument('--token', default=os.getenv('GITHUB_TOKEN'), help='Token de GitHub (GITHUB_TOKEN)')
+    parser.add_argument('--api-url', default=GITHUB_API, help='URL de la API de GitHub')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Repositorios a la vez')
+    args = parser.parse_args(argv)
+
+    settings = _ClientConfig.env_settings()
+    if not settings['url'] or not settings['anon_key']:
+        parser.error('Faltan VITE_SUPABASE_URL / VITE_SUPABASE_ANON_KEY')
+    if not args.username:
+        parser.error('Falta --username o GITHUB_USERNAME')
+    if args.concurrency < 1:
+        parser.error('--concurrency debe ser mayor que 0')
+
+    async def run():
+        async with AsyncMotivBotClient(**settings) as client:
+            return await sync_github(client, args.username, args.token, args.api_url, args.concurrency)
+
+    report = asyncio.run(run())
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
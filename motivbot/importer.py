@@ -0,0 +1,102 @@
+"""
+Importador de conversaciones desde ficheros NDJSON (un objeto JSON por línea).
+
+Lee el fichero línea a línea, así que la memoria no depende de su tamaño, y envía bloques de
+`batch_size` filas a motivbot_create_conversations: cada bloque es una transacción. Cada línea
+tiene la forma de un elemento de la RPC ({task_id, role, message, emotional_state, model_used,
+tokens_used, response_time_ms, created_at}).
+
+    python -m motivbot.importer chats.ndjson --batch-size 1000
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from ._base import DEFAULT_CHUNK_SIZE, MotivBotError, _ClientConfig, chunked
+from .client import MotivBotClient
+
+
+def read_ndjson(path: str) -> Iterator[Dict[str, Any]]:
+    """Objetos de un fichero NDJSON; las líneas en blanco se ignoran"""
+    with open(path, encoding='utf-8') as file:
+        for number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as error:
+                raise ValueError(f"{path}:{number}: JSON no válido ({error})") from None
+            if not isinstance(row, dict):
+                raise ValueError(f"{path}:{number}: se esperaba un objeto JSON")
+            yield row
+
+
+def import_conversations(
+    client: MotivBotClient,
+    rows: Iterable[Dict[str, Any]],
+    batch_size: int = DEFAULT_CHUNK_SIZE,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Insertar `rows` por bloques y devolver {rows, batches, seconds, rows_per_second}.
+
+    `progress` recibe ese mismo resumen tras cada bloque. Si un bloque falla se lanza MotivBotError
+    y los anteriores quedan ya guardados; `rows` del último resumen dice desde dónde reanudar.
+    """
+    report = {'rows': 0, 'batches': 0, 'seconds': 0.0, 'rows_per_second': 0.0}
+    start = time.perf_counter()
+    for batch in chunked(rows, batch_size):
+        client.create_conversations(batch, chunk_size=len(batch))
+        report['rows'] += len(batch)
+        report['batches'] += 1
+        report['seconds'] = time.perf_counter() - start
+        report['rows_per_second'] = report['rows'] / report['seconds'] if report['seconds'] else 0.0
+        if progress is not None:
+            progress(dict(report))
+    return report
+
+
+def format_progress(report: Dict[str, Any]) -> str:
+    return (f"{report['rows']} filas en {report['batches']} bloques, "
+            f"{report['seconds']:.1f} s ({report['rows_per_second']:.0f} filas/s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Importar conversaciones desde NDJSON con motivbot_create_conversations')
+    parser.add_argument('path', help='Fichero NDJSON con una conversación por línea')
+    parser.add_argument('--url', help='URL de Supabase/PostgREST (por defecto VITE_SUPABASE_URL)')
+    parser.add_argument('--anon-key', help='Clave anon (por defecto VITE_SUPABASE_ANON_KEY)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Filas por transacción')
+    parser.add_argument('--quiet', action='store_true', help='Mostrar solo el resumen final')
+    args = parser.parse_args(argv)
+
+    settings = _ClientConfig.env_settings()
+    url = args.url or settings['url']
+    anon_key = args.anon_key or settings['anon_key']
+    if not url or not anon_key:
+        parser.error('Falta la URL o la clave (--url/--anon-key o variables de entorno)')
+    if args.batch_size < 1:
+        parser.error('--batch-size debe ser mayor que 0')
+
+    def progress(report):
+        print(format_progress(report), file=sys.stderr)
+
+    with MotivBotClient(url, anon_key) as client:
+        try:
+            report = import_conversations(
+                client,
+                read_ndjson(args.path),
+                batch_size=args.batch_size,
+                progress=None if args.quiet else progress,
+            )
+        except (MotivBotError, ValueError) as error:
+            print(f"❌ {error}", file=sys.stderr)
+            return 1
+    print(format_progress(report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
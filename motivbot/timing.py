@@ -0,0 +1,71 @@
+"""Tiempos de las RPC medidos en el cliente (hook on_rpc): llamadas, errores y percentiles por RPC"""
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+from .types import RpcStat
+
+
+class RpcTimings:
+    """
+    Hook on_rpc que acumula llamadas, errores y duraciones por RPC.
+
+    Guarda las últimas `samples` duraciones de cada RPC para los percentiles; llamadas, errores, total
+    y máximo cuentan todas. Incluye la red y los reintentos, así que comparado con
+    motivbot_get_rpc_stats (pg_stat_statements) separa el tiempo de Postgres del resto:
+
+        timings = RpcTimings()
+        client = MotivBotClient.from_env(on_rpc=timings)
+        ...
+        timings.summary()  # [{'rpc': 'motivbot_get_tasks', 'calls': 12, 'p95_ms': 41.2, ...}, ...]
+    """
+
+    def __init__(self, samples: int = 1000):
+        if samples < 1:
+            raise ValueError('samples debe ser mayor que 0')
+        self.samples = samples
+        self._totals: Dict[str, List[float]] = {}
+        self._durations: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, rpc: str, duration_ms: float, error: bool) -> None:
+        with self._lock:
+            totals = self._totals.setdefault(rpc, [0, 0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += int(error)
+            totals[2] += duration_ms
+            totals[3] = max(totals[3], duration_ms)
+            self._durations.setdefault(rpc, deque(maxlen=self.samples)).append(duration_ms)
+
+    @staticmethod
+    def percentile(durations: List[float], quantile: float) -> float:
+        """Percentil por rango más cercano de una lista ordenada"""
+        return durations[max(0, math.ceil(quantile * len(durations)) - 1)]
+
+    def summary(self) -> List[RpcStat]:
+        """Una entrada por RPC, ordenadas por tiempo total como motivbot_get_rpc_stats"""
+        with self._lock:
+            items: List[Tuple[str, List[float], List[float]]] = [
+                (rpc, list(totals), sorted(self._durations[rpc])) for rpc, totals in self._totals.items()
+            ]
+        stats = [
+            RpcStat(
+                rpc=rpc,
+                calls=int(calls),
+                errors=int(errors),
+                total_ms=round(total_ms, 3),
+                mean_ms=round(total_ms / calls, 3),
+                p50_ms=round(self.percentile(durations, 0.5), 3),
+                p95_ms=round(self.percentile(durations, 0.95), 3),
+                p99_ms=round(self.percentile(durations, 0.99), 3),
+                max_ms=round(max_ms, 3),
+            )
+            for rpc, (calls, errors, total_ms, max_ms), durations in items
+        ]
+        return sorted(stats, key=lambda stat: (-stat['total_ms'], stat['rpc']))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._totals.clear()
+            self._durations.clear()
@@ -0,0 +1,218 @@
+"""Tipos de las respuestas JSON de las RPC motivbot_*"""
+from typing import List, Optional, TypedDict
+
+
+class Task(TypedDict, total=False):
+    id: int
+    title: str
+    description: Optional[str]
+    status: str
+    priority: str
+    tags: Optional[List[str]]
+    due_date: Optional[str]
+    due_time: Optional[str]
+    created_at: Optional[str]
+    updated_at: Optional[str]
+
+
+class CalendarDay(TypedDict):
+    """Un día de motivbot_get_calendar: by_status es estado -> tareas, tasks las primeras por hora"""
+    date: str
+    total: int
+    by_status: dict
+    tasks: List[Task]
+
+
+class Calendar(TypedDict, total=False):
+    """Respuesta de motivbot_get_calendar"""
+    success: bool
+    start: str
+    end: str
+    total: int
+    days: List[CalendarDay]
+    message: str
+
+
+class Rollover(TypedDict, total=False):
+    """Respuesta de motivbot_rollover_overdue_tasks: task_ids son las tareas movidas a `date`"""
+    success: bool
+    already_run: bool
+    date: str
+    task_ids: List[int]
+    count: int
+    message: str
+
+
+class ExternalTaskLink(TypedDict):
+    """Tarea enlazada a un issue externo (motivbot_upsert_external_tasks)"""
+    id: int
+    repo: str
+    external_id: str
+    action: str
+
+
+class SyncCheckpoint(TypedDict):
+    """Hasta dónde llegó la última sincronización de un repositorio (motivbot_get_sync_checkpoints)"""
+    repo: str
+    since: Optional[str]
+    etag: Optional[str]
+    synced_at: str
+
+
+class Conversation(TypedDict, total=False):
+    id: int
+    task_id: int
+    role: str
+    message: str
+    emotional_state: Optional[str]
+    user_is_grateful: bool
+    user_is_useful: bool
+    assistant_is_useful: bool
+    assistant_is_precise: bool
+    assistant_is_grateful: bool
+    tokens_used: int
+    model_used: str
+    response_time_ms: int
+    created_at: Optional[str]
+
+
+class Cursor(TypedDict):
+    """Posición (created_at, id) del último elemento de una página"""
+    created_at: str
+    id: int
+
+
+class TaskPage(TypedDict):
+    items: List[Task]
+    next_cursor: Optional[Cursor]
+
+
+class ExportChunk(TypedDict):
+    """Bloque de motivbot_export_tasks / motivbot_export_conversations, por id ascendente"""
+    items: List[dict]
+    next_after_id: Optional[int]
+
+
+class ConversationPage(TypedDict):
+    items: List[Conversation]
+    next_cursor: Optional[Cursor]
+
+
+class ConversationSummary(TypedDict):
+    """Resumen acumulado de los turnos hasta (until_created_at, until_id)"""
+    summary: str
+    until_created_at: str
+    until_id: int
+    updated_at: str
+
+
+class ConversationWindow(TypedDict, total=False):
+    """Mensajes recientes que caben en el presupuesto de tokens, en orden cronológico"""
+    success: bool
+    message: str
+    task_id: int
+    messages: List[Conversation]
+    tokens: int
+    token_budget: int
+    summary: Optional[ConversationSummary]
+    needs_summary: bool
+
+
+class MotivationalMessage(TypedDict, total=False):
+    id: int
+    mensaje: str
+    estado: str
+    tags: List[str]
+    created_at: Optional[str]
+
+
+class TagCount(TypedDict):
+    tag: str
+    count: int
+
+
+class Result(TypedDict, total=False):
+    """Respuesta {'success', 'message', 'id'} de las RPC de escritura"""
+    success: bool
+    message: str
+    id: int
+
+
+class CreateTaskResult(Result, total=False):
+    tags_generated: bool
+    generated_tags: List[str]
+
+
+class Dashboard(TypedDict, total=False):
+    tasks: dict
+    conversations: dict
+    tags: dict
+    completion_rate: float
+    active_tasks: int
+
+
+class CounterMismatch(TypedDict):
+    scope: str
+    key: str
+    expected: int
+    actual: int
+
+
+class CounterCheck(TypedDict):
+    consistent: bool
+    mismatches: List[CounterMismatch]
+
+
+class RpcStat(TypedDict):
+    """Llamadas y latencias de una RPC medidas en el cliente (RpcTimings.summary)"""
+    rpc: str
+    calls: int
+    errors: int
+    total_ms: float
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+class ServerRpcStat(TypedDict):
+    """Llamadas, errores capturados y duración de una RPC según el servidor (motivbot_get_rpc_stats)"""
+    rpc: str
+    calls: int
+    errors: int
+    total_ms: float
+    mean_ms: float
+    stddev_ms: float
+    min_ms: float
+    max_ms: float
+
+
+class RollupMismatch(TypedDict):
+    day: str
+    scope: str
+    key: str
+    expected: int
+    actual: int
+
+
+class RollupCheck(TypedDict):
+    consistent: bool
+    mismatches: List[RollupMismatch]
+
+
+class AnalyticsStats(TypedDict, total=False):
+    """Métricas de un intervalo (o del rango completo en 'totals')"""
+    start: str
+    conversations: dict
+    tasks: dict
+
+
+# Respuesta de motivbot_get_analytics ('from' es palabra reservada: sintaxis funcional)
+Analytics = TypedDict('Analytics', {
+    'from': str,
+    'to': str,
+    'bucket': str,
+    'buckets': List[AnalyticsStats],
+    'totals': AnalyticsStats,
+}, total=False)
@@ -1,3 +1,81 @@
+// Issues por llamada a motivbot_upsert_external_tasks
+const UPSERT_PAGE_SIZE = 500;
+
+// Repositorios sincronizados a la vez; GitHub penaliza ráfagas de peticiones concurrentes
+const SYNC_CONCURRENCY = 4;
+
+// Aplicar fn a cada elemento con como mucho `limit` llamadas en curso; conserva el orden
+async function mapWithConcurrency(items, limit, fn) {
+  const results = new Array(items.length);
+  let next = 0;
+  const workers = Array.from({ length: Math.min(limit, items.length) }, async () => {
+    while (next < items.length) {
+      const index = next++;
+      results[index] = await fn(items[index], index);
+    }
+  });
+  await Promise.all(workers);
+  return results;
+}
+
+// Prioridad según las labels del issue
+function issuePriority(issue) {
+  const labels = issue.labels?.map(label => label.name.toLowerCase()) || [];
+  if (labels.some(name => name.includes('high') || name.includes('urgent') || name.includes('critical'))) {
+    return 'high';
+  }
+  if (labels.some(name => name.includes('low') || name.includes('minor'))) {
+    return 'low';
+  }
+  return 'medium';
+}
+
+// Fila para motivbot_upsert_external_tasks: las fechas y la prioridad solo se usan al crear la tarea
+function issueToTask(repo, issue) {
+  const priority = issuePriority(issue);
+  const now = new Date();
+  let dueDate, dueTime;
+
+  if (issue.state === 'open') {
+    // Issues abiertos: alta vence hoy, media en 3 días y baja en 7
+    const days = { high: 0, medium: 3, low: 7 }[priority];
+    const due = new Date(now);
+    due.setDate(due.getDate() + days);
+    dueDate = due.toISOString().split('T')[0];
+    dueTime = { high: '18:00', medium: '17:00', low: '16:00' }[priority];
+  } else {
+    // Issues cerrados: fecha de cierre o, si no hay, de creación
+    const closedDate = new Date(issue.closed_at || issue.created_at);
+    dueDate = closedDate.toISOString().split('T')[0];
+    dueTime = closedDate.toTimeString().slice(0, 5); // HH:MM
+  }
+
+  return {
+    repo: repo.full_name,
+    external_id: String(issue.id),
+    title: `[${repo.name}] ${issue.title}`,
+    description: `${issue.body || 'No description provided'}
+
+🔗 **GitHub Issue:** ${issue.html_url}
+📁 **Repository:** ${repo.full_name}
+🔢 **Issue #:** ${issue.number}
+🏷️ **Labels:** ${issue.labels?.map(l => l.name).join(', ') || 'None'}
+👤 **Created by:** ${issue.user?.login || 'Unknown'}
+📊 **State:** ${issue.state}
+🆔 **GitHub ID:** ${issue.id}
+📅 **GitHub Created:** ${new Date(issue.created_at).toLocaleDateString()}
+${issue.closed_at ? `🔒 **GitHub Closed:** ${new Date(issue.closed_at).toLocaleDateString()}` : ''}
+
+---
+*Sincronizado automáticamente desde GitHub*`,
+    tags: ['motivBotLinkIssuesFromGithub'],
+    status: issue.state === 'open' ? 'pending' : 'completed',
+    priority,
+    due_date: dueDate,
+    due_time: dueTime
+  };
+}
+
 export default async function handler(req, res) {
   // CORS headers
   res.setHeader('Access-Control-Allow-Origin', '*');
@@ -62,32 +140,8 @@ export default async function handler(req, res) {
     const { createClient } = await import('@supabase/supabase-js');
     const supabase = createClient(supabaseUrl, supabaseServiceKey);
 
-    // Paso 1: filtrar las tareas con tag "motivBotLinkIssuesFromGithub"
-    let tasks = [];
-    // paso 2: obtener las tareas con tag "motivBotLinkIssuesFromGithub"
-    try {
-      // Cambiar la consulta para buscar en arrays
-      const { data, error } = await supabase
-        .from('task')
-        .select('*')
-        .contains('tags', ['motivBotLinkIssuesFromGithub']);
-
-      if (error) {
-        console.error('Error fetching tasks:', error);
-        return res.status(500).json({
-          error: 'Database error',
-          message: 'Failed to fetch tasks from Supabase'
-        });
-      }
-      tasks = data || [];
-      console.log(`📋 Found ${tasks.length} existing tasks with motivBotLinkIssuesFromGithub tag`);
-    } catch (error) {
-      console.error('Error fetching tasks:', error);
-      return res.status(500).json({
-        error: 'Database error',
-        message: 'Failed to fetch tasks from Supabase'
-      });
-    }
+    // Paso 1-2: ya no se cargan todas las tareas; cada issue se enlaza con su tarea por la clave
+    // (external_source, external_repo, external_id) dentro de motivbot_upsert_external_tasks
 
     // Paso 3: recuperar los issues de GitHub
     let issues = [];
@@ -213,33 +267,65 @@ export default async function handler(req, res) {
       let totalNewTasks = 0;
       let totalExistingTasks = 0;
       let processedRepos = 0;
+      let notModifiedRepos = 0;
+      let githubRequests = 0;
       let repositoriesProcessed = [];
 
-      // Paso 3.2: Iterar por cada repositorio
-      for (const [index, repo] of repositories.entries()) {
+      // Paso 3.2: Puntos de control por repositorio (updated_at del último issue visto y ETag)
+      const { data: savedCheckpoints, error: checkpointsError } = await supabase.rpc('motivbot_get_sync_checkpoints', {
+        p_source: 'github'
+      });
+      if (checkpointsError) {
+        console.error('⚠️ Could not load sync checkpoints, doing a full sync:', checkpointsError.message);
+      }
+      const checkpoints = new Map((savedCheckpoints || []).map(checkpoint => [checkpoint.repo, checkpoint]));
+
+      // Paso 3.3: Sincronizar los repositorios de SYNC_CONCURRENCY en SYNC_CONCURRENCY
+      await mapWithConcurrency(repositories, SYNC_CONCURRENCY, async (repo, index) => {
         try {
           console.log(`🔍 Processing repository ${index + 1}/${repositories.length}: ${repo.full_name}...`);
 
-          // Obtener issues del repositorio (abiertos y cerrados) con paginación
+          // Solo los issues cambiados desde el punto de control, en orden de actualización. since es
+          // inclusivo y el ETag de la primera página solo vale si since no avanza: entonces GitHub
+          // responde 304 sin gastar cuota
+          const checkpoint = checkpoints.get(repo.full_name);
+          const since = checkpoint?.since ? new Date(checkpoint.since) : null;
+          const sinceParam = since ? `&since=${since.toISOString().replace('.000Z', 'Z')}` : '';
+          let latest = since;
+          let firstEtag = null;
           let allIssues = [];
           let issuePage = 1;
           const issuesPerPage = 100;
 
           while (true) {
+            const headers = {
+              'Authorization': `token ${githubToken}`,
+              'Accept': 'application/vnd.github.v3+json',
+              'User-Agent': 'motivBot-LinkIssues'
+            };
+            if (issuePage === 1 && checkpoint?.etag) {
+              headers['If-None-Match'] = checkpoint.etag;
+            }
+
             const issuesResponse = await fetch(
-              `https://api.github.com/repos/${repo.full_name}/issues?state=all&per_page=${issuesPerPage}&page=${issuePage}`,
-              {
-                headers: {
-                  'Authorization': `token ${githubToken}`,
-                  'Accept': 'application/vnd.github.v3+json',
-                  'User-Agent': 'motivBot-LinkIssues'
-                }
-              }
+              `https://api.github.com/repos/${repo.full_name}/issues?state=all&per_page=${issuesPerPage}&page=${issuePage}&sort=updated&direction=asc${sinceParam}`,
+              { headers }
             );
+            githubRequests++;
+
+            if (issuesResponse.status === 304) {
+              console.log(`⏭️  ${repo.full_name} not modified since last sync`);
+              notModifiedRepos++;
+              return;
+            }
 
             if (!issuesResponse.ok) {
-              console.error(`❌ Failed to fetch issues from ${repo.full_name}: ${issuesResponse.status}`);
-              break;
+              // Sin guardar el punto de control: la próxima ejecución repite este repositorio
+              throw new Error(`Failed to fetch issues: ${issuesResponse.status}`);
+            }
+
+            if (issuePage === 1) {
+              firstEtag = issuesResponse.headers.get('etag');
             }
 
             const pageIssues = await issuesResponse.json();
@@ -257,189 +343,100 @@ export default async function handler(req, res) {
             issuePage++;
           }
 
+          // Los pull requests también avanzan since: si no, se volverían a pedir en cada ejecución
+          for (const item of allIssues) {
+            const updated = new Date(item.updated_at);
+            if (!latest || updated > latest) {
+              latest = updated;
+            }
+          }
+
           // Filtrar solo issues (no pull requests)
           const filteredIssues = allIssues.filter(issue => !issue.pull_request);
 
-          console.log(`📝 Found ${filteredIssues.length} issues in ${repo.full_name} (${allIssues.length} total items, ${allIssues.length - filteredIssues.length} pull requests filtered out)`);
+          console.log(`📝 Found ${filteredIssues.length} changed issues in ${repo.full_name} (${allIssues.length} total items, ${allIssues.length - filteredIssues.length} pull requests filtered out)`);
 
-          if (filteredIssues.length === 0) {
-            console.log(`⏭️  No issues found in ${repo.full_name}, skipping...`);
-            continue;
-          }
+          let linkFailed = false;
 
-          processedRepos++;
-          let repoNewTasks = 0;
-          let repoExistingTasks = 0;
-
-          // Paso 3.3: Procesar cada issue del repositorio
-          for (const issue of filteredIssues) {
-            // Verificar si ya existe una tarea para este issue
-            // ✅ Simplificar detección de duplicados
-            const existingTask = tasks.find(task => {
-              // Buscar por título que contenga el patrón [repo] título
-              const taskTitle = task.title?.toLowerCase() || '';
-              const searchPattern = `[${repo.name.toLowerCase()}] ${issue.title.toLowerCase()}`;
-
-              if (taskTitle === searchPattern) {
-                return true;
-              }
+          if (filteredIssues.length > 0) {
+            processedRepos++;
+            let repoNewTasks = 0;
+            let repoExistingTasks = 0;
 
-              // Buscar en la descripción si contiene el GitHub ID
-              if (task.description?.includes(`🆔 **GitHub ID:** ${issue.id}`)) {
-                return true;
-              }
+            // Paso 3.4: Enlazar los issues del repositorio en páginas de UPSERT_PAGE_SIZE (un INSERT ... ON CONFLICT por página)
+            const rows = filteredIssues.map(issue => issueToTask(repo, issue));
 
-              return false;
-            });
-
-            if (!existingTask) {
-              // Determinar prioridad basada en labels
-              let priority = 'medium';
-              if (issue.labels?.some(label =>
-                label.name.toLowerCase().includes('high') ||
-                label.name.toLowerCase().includes('urgent') ||
-                label.name.toLowerCase().includes('critical')
-              )) {
-                priority = 'high';
-              } else if (issue.labels?.some(label =>
-                label.name.toLowerCase().includes('low') ||
-                label.name.toLowerCase().includes('minor')
-              )) {
-                priority = 'low';
-              }
+            for (let offset = 0; offset < rows.length; offset += UPSERT_PAGE_SIZE) {
+              const page = rows.slice(offset, offset + UPSERT_PAGE_SIZE);
+              const { data: result, error: upsertError } = await supabase.rpc('motivbot_upsert_external_tasks', {
+                p_source: 'github',
+                p_tasks: page
+              });
 
-              // ✅ Calcular fechas basadas en prioridad y estado
-              const now = new Date();
-              let dueDate, dueTime;
-
-              if (issue.state === 'open') {
-                // Para issues abiertos, asignar fecha según prioridad
-                switch (priority) {
-                  case 'high':
-                    // Alta prioridad: vence hoy
-                    dueDate = now.toISOString().split('T')[0];
-                    dueTime = '18:00'; // 6 PM
-                    break;
-                  case 'medium':
-                    // Prioridad media: vence en 3 días
-                    const mediumDue = new Date(now);
-                    mediumDue.setDate(mediumDue.getDate() + 3);
-                    dueDate = mediumDue.toISOString().split('T')[0];
-                    dueTime = '17:00'; // 5 PM
-                    break;
-                  case 'low':
-                    // Prioridad baja: vence en 7 días
-                    const lowDue = new Date(now);
-                    lowDue.setDate(lowDue.getDate() + 7);
-                    dueDate = lowDue.toISOString().split('T')[0];
-                    dueTime = '16:00'; // 4 PM
-                    break;
-                }
-              } else {
-                // Para issues cerrados, usar la fecha de cierre si está disponible
-                if (issue.closed_at) {
-                  const closedDate = new Date(issue.closed_at);
-                  dueDate = closedDate.toISOString().split('T')[0];
-                  dueTime = closedDate.toTimeString().slice(0, 5); // HH:MM
-                } else {
-                  // Si no hay fecha de cierre, usar fecha de creación
-                  const createdDate = new Date(issue.created_at);
-                  dueDate = createdDate.toISOString().split('T')[0];
-                  dueTime = createdDate.toTimeString().slice(0, 5);
-                }
+              if (upsertError || !result?.success) {
+                console.error(`❌ Error linking issues ${offset + 1}-${offset + page.length} of ${repo.full_name}:`, upsertError || result?.message);
+                linkFailed = true;
+                continue;
               }
 
-              // Crear nueva tarea con fechas
-              const newTask = {
-                title: `[${repo.name}] ${issue.title}`,
-                description: `${issue.body || 'No description provided'}
+              result.tasks.forEach((link, index) => {
+                const issue = filteredIssues[offset + index];
+                const row = page[index];
+                const created = link.action === 'inserted';
 
-🔗 **GitHub Issue:** ${issue.html_url}
-📁 **Repository:** ${repo.full_name}
-🔢 **Issue #:** ${issue.number}
-🏷️ **Labels:** ${issue.labels?.map(l => l.name).join(', ') || 'None'}
-👤 **Created by:** ${issue.user?.login || 'Unknown'}
-📊 **State:** ${issue.state}
-🆔 **GitHub ID:** ${issue.id}
-📅 **GitHub Created:** ${new Date(issue.created_at).toLocaleDateString()}
-${issue.closed_at ? `🔒 **GitHub Closed:** ${new Date(issue.closed_at).toLocaleDateString()}` : ''}
-
----
-*Sincronizado automáticamente desde GitHub*`,
-                tags: ['motivBotLinkIssuesFromGithub'],
-                status: issue.state === 'open' ? 'pending' : 'completed',
-                priority: priority,
-                // ✅ Añadir fechas calculadas
-                due_date: dueDate,
-                due_time: dueTime,
-                created_at: new Date().toISOString(),
-                updated_at: new Date().toISOString()
-              };
-
-              try {
-                const { data: insertedTask, error: insertError } = await supabase
-                  .from('task')
-                  .insert([newTask])
-                  .select();
-
-                if (insertError) {
-                  console.error(`❌ Error creating task for issue ${issue.number} in ${repo.full_name}:`, insertError);
-                  continue;
+                if (created) {
+                  totalNewTasks++;
+                  repoNewTasks++;
+                } else {
+                  totalExistingTasks++;
+                  repoExistingTasks++;
                 }
 
-                console.log(`✅ Created task for issue #${issue.number} in ${repo.full_name}: ${issue.title} (Due: ${dueDate} ${dueTime})`);
-                totalNewTasks++;
-                repoNewTasks++;
-
                 issues.push({
                   repo: repo.full_name,
                   issue_number: issue.number,
                   issue_title: issue.title,
                   issue_url: issue.html_url,
                   issue_state: issue.state,
-                  task_created: true,
-                  task_id: insertedTask[0]?.id,
-                  priority: priority,
-                  due_date: dueDate,
-                  due_time: dueTime
+                  task_created: created,
+                  task_updated: link.action === 'updated',
+                  ...(created
+                    ? { task_id: link.id, priority: row.priority, due_date: row.due_date, due_time: row.due_time }
+                    : { existing_task_id: link.id })
                 });
+              });
+            }
 
-                // Añadir la nueva tarea al array local para evitar duplicados en la misma ejecución
-                tasks.push(insertedTask[0]);
+            console.log(`🔗 ${repo.full_name}: ${repoNewTasks} new tasks, ${repoExistingTasks} already linked`);
 
-              } catch (insertError) {
-                console.error(`❌ Error inserting task for issue ${issue.number} in ${repo.full_name}:`, insertError);
-              }
-            } else {
-              console.log(`⏭️ Task already exists for issue #${issue.number} in ${repo.full_name}: ${issue.title}`);
-              totalExistingTasks++;
-              repoExistingTasks++;
+            repositoriesProcessed.push({
+              name: repo.full_name,
+              total_issues: filteredIssues.length,
+              new_tasks: repoNewTasks,
+              existing_tasks: repoExistingTasks,
+              last_updated: repo.updated_at
+            });
+          }
 
-              issues.push({
+          // Paso 3.5: Guardar el punto de control del repositorio (si falló algún enlace, se repite la próxima vez)
+          if (!linkFailed) {
+            const { error: saveError } = await supabase.rpc('motivbot_save_sync_checkpoints', {
+              p_source: 'github',
+              p_checkpoints: [{
                 repo: repo.full_name,
-                issue_number: issue.number,
-                issue_title: issue.title,
-                issue_url: issue.html_url,
-                issue_state: issue.state,
-                task_created: false,
-                existing_task_id: existingTask.id
-              });
+                since: latest ? latest.toISOString() : null,
+                etag: latest?.getTime() === since?.getTime() ? firstEtag : null
+              }]
+            });
+            if (saveError) {
+              console.error(`⚠️ Could not save sync checkpoint for ${repo.full_name}:`, saveError.message);
             }
           }
 
-          repositoriesProcessed.push({
-            name: repo.full_name,
-            total_issues: filteredIssues.length,
-            new_tasks: repoNewTasks,
-            existing_tasks: repoExistingTasks,
-            last_updated: repo.updated_at
-          });
-
         } catch (error) {
           console.error(`❌ Error processing repository ${repo.full_name}:`, error);
-          continue;
         }
-      }
+      });
 
       // Paso 4: Respuesta final con estadísticas detalladas
       console.log(`🎉 Processing completed!`);
@@ -457,6 +454,8 @@ ${issue.closed_at ? `🔒 **GitHub Closed:** ${new Date(issue.closed_at).toLocal
           total_issues_found: issues.length,
           new_tasks_created: totalNewTasks,
           existing_tasks_found: totalExistingTasks,
+          not_modified_repositories: notModifiedRepos,
+          github_issue_requests: githubRequests,
           processing_summary: {
             repositories_processed: repositoriesProcessed,
             new_tasks_by_repo: repositoriesProcessed
@@ -1,3 +1,9 @@
+// Presupuesto de tokens del historial que se manda a OpenAI y turnos que se resumen de una vez
+const HISTORY_TOKEN_BUDGET = 1500;
+const SUMMARY_BATCH_MESSAGES = 40;
+// Sin task_id solo queda el historial del cliente: últimos N mensajes
+const HISTORY_FALLBACK_MESSAGES = 10;
+
 export default async function handler(req, res) {
   // CORS headers
   res.setHeader('Access-Control-Allow-Origin', '*');
@@ -165,12 +171,18 @@ export default async function handler(req, res) {
     }
 
     // 🔄 PASO 4: Generar mensaje en tiempo real si no hay tags o falla la BD
+    // Con task_id el historial sale de la BD con tamaño acotado; si no, se usa el que envía el cliente
+    let history = { summary: null, messages: Array.isArray(conversationHistory) ? conversationHistory.slice(-HISTORY_FALLBACK_MESSAGES) : [] };
+    if (task_id && typeof task_id === 'number') {
+      history = await loadConversationWindow(supabase, task_id, openaiApiKey) || history;
+    }
+
     if (!message || typeof message !== 'string' || message.trim().length === 0) {
       // Si no hay mensaje pero sí taskData, crear un mensaje contextual
       if (currentTaskData) {
         const contextualMessage = `Dame un mensaje motivacional para mi tarea: "${currentTaskData.title}"`;
         console.log('🤖 Generating contextual message from task data...');
-        const realtimeMessage = await generateRealtimeMessage(contextualMessage, context, currentTaskData, conversationHistory, openaiApiKey);
+        const realtimeMessage = await generateRealtimeMessage(contextualMessage, context, currentTaskData, history, openaiApiKey);
 
         return res.status(200).json({
           success: true,
@@ -188,7 +200,7 @@ export default async function handler(req, res) {
     }
 
     console.log('🤖 Generating real-time message...');
-    const realtimeMessage = await generateRealtimeMessage(message, context, currentTaskData || taskData, conversationHistory, openaiApiKey);
+    const realtimeMessage = await generateRealtimeMessage(message, context, currentTaskData || taskData, history, openaiApiKey);
 
     return res.status(200).json({
       success: true,
@@ -358,7 +370,7 @@ REGLAS:
 }
 
 // 🔧 FUNCIÓN: Generar mensaje en tiempo real
-async function generateRealtimeMessage(message, context, taskData, conversationHistory, openaiApiKey) {
+async function generateRealtimeMessage(message, context, taskData, history, openaiApiKey) {
   const systemPrompt = `Eres MotivBot 🤖💙, asistente emocional especializado en tareas y bienestar.
 
 IMPORTANTE: Responde ÚNICAMENTE con este JSON:
@@ -389,6 +401,17 @@ REGLAS: Máximo 150 caracteres, siempre positivo, 2-4 tags relevantes.`;
     userPrompt += `\n\nContexto: ${context.trim().substring(0, 200)}`;
   }
 
+  if (history?.summary?.summary) {
+    userPrompt += `\n\nResumen de la conversación anterior: ${history.summary.summary}`;
+  }
+
+  if (history?.messages?.length > 0) {
+    const historyText = history.messages.map(conv =>
+      `${conv.role === 'user' ? 'Usuario' : 'MotivBot'}: ${conv.message}`
+    ).join('\n');
+    userPrompt += `\n\n--- Historial reciente de la conversación ---\n${historyText}\n--- Fin del historial ---`;
+  }
+
   try {
     const response = await fetch('https://api.openai.com/v1/chat/completions', {
       method: 'POST',
@@ -434,3 +457,86 @@ REGLAS: Máximo 150 caracteres, siempre positivo, 2-4 tags relevantes.`;
     tags: fallbackTags.slice(0, 3)
   };
 }
+
+// 🔧 FUNCIÓN: Historial de la tarea acotado por tokens (ventana reciente + resumen de los turnos anteriores)
+async function loadConversationWindow(supabase, taskId, openaiApiKey) {
+  try {
+    const { data: window, error } = await supabase.rpc('motivbot_get_conversation_window', {
+      p_task_id: taskId,
+      p_token_budget: HISTORY_TOKEN_BUDGET
+    });
+
+    if (error || !window?.success) {
+      console.error('❌ Error loading conversation window:', error || window?.message);
+      return null;
+    }
+
+    console.log(`🧵 History window for task ${taskId}: ${window.messages.length} messages, ${window.tokens} tokens`);
+
+    if (window.needs_summary) {
+      window.summary = await refreshConversationSummary(supabase, taskId, window, openaiApiKey) || window.summary;
+    }
+
+    return window;
+  } catch (windowError) {
+    console.error('❌ Error loading conversation window:', windowError);
+    return null;
+  }
+}
+
+// 🔧 FUNCIÓN: Añadir al resumen guardado los turnos entre el resumen y la ventana
+async function refreshConversationSummary(supabase, taskId, window, openaiApiKey) {
+  const oldest = window.messages[0];
+  if (!oldest) return null;
+
+  // Los SUMMARY_BATCH_MESSAGES turnos más antiguos que el resumen no cubre, en orden cronológico. El resumen
+  // avanza solo hasta el último de ellos: si quedan más, la siguiente petición sigue desde ahí
+  const { data: pending, error } = await supabase.rpc('motivbot_get_unsummarized_turns', {
+    p_task_id: taskId,
+    p_before_id: oldest.id,
+    p_limit: SUMMARY_BATCH_MESSAGES
+  });
+  if (error || !Array.isArray(pending) || pending.length === 0) return null;
+
+  const until = window.summary;
+  const last = pending[pending.length - 1];
+
+  const turns = pending.map(conv =>
+    `${conv.role === 'user' ? 'Usuario' : 'MotivBot'}: ${conv.message.substring(0, 300)}`
+  ).join('\n');
+
+  try {
+    const response = await fetch('https://api.openai.com/v1/chat/completions', {
+      method: 'POST',
+      headers: {
+        'Authorization': `Bearer ${openaiApiKey}`,
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        model: 'gpt-3.5-turbo',
+        messages: [
+          { role: 'system', content: 'Resume en español, en un máximo de 500 caracteres, la conversación entre el usuario y MotivBot sobre su tarea. Conserva objetivos, bloqueos y estado de ánimo. Responde solo con el resumen.' },
+          { role: 'user', content: `${until ? `Resumen anterior: ${until.summary}\n\n` : ''}Nuevos turnos:\n${turns}` }
+        ],
+        max_tokens: 250,
+        temperature: 0.3
+      })
+    });
+
+    if (!response.ok) return null;
+
+    const data = await response.json();
+    const summary = data.choices[0].message.content.trim().substring(0, 1000);
+    const { data: saved } = await supabase.rpc('motivbot_save_conversation_summary', {
+      p_task_id: taskId,
+      p_summary: summary,
+      p_until_id: last.id
+    });
+
+    console.log(`📝 Conversation summary for task ${taskId}:`, saved?.message);
+    return { summary, until_created_at: last.created_at, until_id: last.id };
+  } catch (summaryError) {
+    console.error('❌ Error summarizing conversation:', summaryError);
+    return null;
+  }
+}
@@ -1,3 +1,6 @@
+// Tags existentes que se ofrecen a OpenAI como vocabulario (motivbot_get_related_tags / motivbot_get_popular_tags)
+const TAG_SUGGESTIONS_LIMIT = 15;
+
 export default async function handler(req, res) {
   // CORS headers
   res.setHeader('Access-Control-Allow-Origin', '*');
@@ -142,6 +145,13 @@ Título: "${taskData.title}"`;
       userPrompt += `\nEstado: ${taskData.status}`;
     }
 
+    // Tags ya usados en otras tareas: relacionados con los que tenga la tarea o, si no tiene, los más usados
+    const suggestedTags = await loadTagSuggestions(supabase, taskData.tags);
+
+    if (suggestedTags.length > 0) {
+      userPrompt += `\nTags ya usados en otras tareas (reutilízalos si encajan): ${suggestedTags.join(', ')}`;
+    }
+
     userPrompt += `\n\nGenera tags relevantes en formato JSON.`;
 
     // 5. Make request to OpenAI
@@ -279,3 +289,24 @@ Título: "${taskData.title}"`;
     });
   }
 }
+
+// 🔧 FUNCIÓN: Sugerencias locales desde el índice de tags (una lectura por índice, sin llamar a OpenAI)
+async function loadTagSuggestions(supabase, tags) {
+  const existingTags = (Array.isArray(tags) ? tags : [tags]).filter(tag => typeof tag === 'string' && tag.length > 0);
+
+  try {
+    const { data, error } = existingTags.length > 0
+      ? await supabase.rpc('motivbot_get_related_tags', { p_tags: existingTags, p_limit: TAG_SUGGESTIONS_LIMIT })
+      : await supabase.rpc('motivbot_get_popular_tags', { p_limit: TAG_SUGGESTIONS_LIMIT });
+
+    if (error || !Array.isArray(data)) {
+      console.error('❌ Error loading tag suggestions:', error);
+      return [];
+    }
+
+    return data.map(item => item.tag);
+  } catch (suggestionError) {
+    console.error('❌ Error loading tag suggestions:', suggestionError);
+    return [];
+  }
+}
@@ -50,6 +50,12 @@ END$$;
 CREATE INDEX IF NOT EXISTS idx_conversation_task_id ON public.Conversation(task_id);
 CREATE INDEX IF NOT EXISTS idx_conversation_created_at ON public.Conversation(created_at);
 CREATE INDEX IF NOT EXISTS idx_conversation_role ON public.Conversation(role);
+-- Paginación por cursor (created_at DESC, id DESC), global y por tarea
+CREATE INDEX IF NOT EXISTS idx_conversation_created_at_id ON public.Conversation(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_conversation_task_created_at_id ON public.Conversation(task_id, created_at DESC, id DESC);
+-- Analíticas por estado emocional: últimos mensajes de cada estado y conversaciones por emoción
+CREATE INDEX IF NOT EXISTS idx_conversation_emotional_state_created_at
+    ON public.Conversation((COALESCE(emotional_state, 'neutral')), created_at DESC);
 
 -- 4. Crear la función para actualizar `updated_at`
 DROP FUNCTION IF EXISTS update_conversation_updated_at() CASCADE;
@@ -178,9 +184,15 @@ BEGIN
                 'total_tokens', COALESCE(SUM(tokens_used), 0),
                 'grateful_responses', COUNT(*) FILTER (WHERE user_is_grateful = true),
                 'useful_responses', COUNT(*) FILTER (WHERE user_is_useful = true),
-                'emotional_states', json_object_agg(
-                    COALESCE(emotional_state, 'neutral'), 
-                    COUNT(*) FILTER (WHERE emotional_state IS NOT NULL)
+                'emotional_states', (
+                    SELECT json_object_agg(emotional_state, count)
+                    FROM (
+                        SELECT COALESCE(emotional_state, 'neutral') AS emotional_state,
+                               COUNT(*) FILTER (WHERE emotional_state IS NOT NULL) AS count
+                        FROM public.Conversation
+                        WHERE task_id = p_task_id
+                        GROUP BY COALESCE(emotional_state, 'neutral')
+                    ) emotion_counts
                 )
             )
             FROM public.Conversation WHERE task_id = p_task_id
@@ -395,82 +407,8 @@ BEGIN
 END;
 $$;
 
--- Función para obtener estadísticas de estados emocionales
-DROP FUNCTION IF EXISTS get_emotional_states_analytics(INTEGER) CASCADE;
-CREATE OR REPLACE FUNCTION get_emotional_states_analytics(
-    p_days_back INTEGER DEFAULT 30
-)
-RETURNS JSON
-LANGUAGE plpgsql
-SECURITY DEFINER
-AS $$
-DECLARE
-    result JSON;
-BEGIN
-    SELECT json_build_object(
-        'period_days', p_days_back,
-        'emotional_trends', (
-            SELECT json_object_agg(
-                COALESCE(emotional_state, 'neutral'),
-                json_build_object(
-                    'count', count,
-                    'percentage', ROUND((count * 100.0 / NULLIF(total_conversations, 0)), 2),
-                    'avg_tokens', ROUND(avg_tokens, 0),
-                    'recent_messages', (
-                        SELECT array_agg(LEFT(message, 50))
-                        FROM (
-                            SELECT message
-                            FROM public.Conversation 
-                            WHERE COALESCE(emotional_state, 'neutral') = emotion_analysis.emotional_state
-                            AND created_at >= (CURRENT_TIMESTAMP - INTERVAL '1 day' * p_days_back)
-                            ORDER BY created_at DESC 
-                            LIMIT 3
-                        ) recent
-                    )
-                )
-            )
-            FROM (
-                SELECT 
-                    COALESCE(c.emotional_state, 'neutral') as emotional_state,
-                    COUNT(*) as count,
-                    AVG(c.tokens_used) as avg_tokens,
-                    COUNT(*) OVER () as total_conversations
-                FROM public.Conversation c
-                WHERE c.created_at >= (CURRENT_TIMESTAMP - INTERVAL '1 day' * p_days_back)
-                GROUP BY COALESCE(c.emotional_state, 'neutral')
-            ) emotion_analysis
-        ),
-        'recommendations', (
-            SELECT json_build_object(
-                'most_used_emotion', most_used,
-                'least_used_emotion', least_used,
-                'balance_score', ROUND((1.0 - (GREATEST(max_count - min_count, 0) * 1.0 / NULLIF(total_count, 0))) * 100, 2),
-                'total_conversations', total_count,
-                'unique_emotions', emotion_variety
-            )
-            FROM (
-                SELECT 
-                    MAX(count) as max_count,
-                    MIN(count) as min_count,
-                    SUM(count) as total_count,
-                    COUNT(DISTINCT emotional_state) as emotion_variety,
-                    (array_agg(emotional_state ORDER BY count DESC))[1] as most_used,
-                    (array_agg(emotional_state ORDER BY count ASC))[1] as least_used
-                FROM (
-                    SELECT 
-                        COALESCE(emotional_state, 'neutral') as emotional_state,
-                        COUNT(*) as count
-                    FROM public.Conversation
-                    WHERE created_at >= (CURRENT_TIMESTAMP - INTERVAL '1 day' * p_days_back)
-                    GROUP BY COALESCE(emotional_state, 'neutral')
-                ) emotion_counts
-            ) balance_analysis
-        )
-    ) INTO result;
-    
-    RETURN result;
-END;
-$$;
+-- get_emotional_states_analytics lee los rollups diarios: se define en motivbot_rpc.sql (sección 15), después
+-- de motivbot_rollup_range y motivbot_rollup_conversation_keys
 
 -- Función para obtener conversaciones con filtro de estado emocional
 DROP FUNCTION IF EXISTS get_conversations_by_emotion(VARCHAR(50), INTEGER) CASCADE;
@@ -521,318 +459,14 @@ BEGIN
 END;
 $$;
 
--- CREAR CONVERSACIÓN (FORMATO COMPATIBLE CON TESTS)
-DROP FUNCTION IF EXISTS motivbot_create_conversation;
-CREATE FUNCTION motivbot_create_conversation(
-    p_task_id BIGINT,
-    p_role TEXT,
-    p_message TEXT,
-    p_emotional_state TEXT DEFAULT NULL,
-    p_model_used TEXT DEFAULT 'gpt-4',
-    p_tokens_used INTEGER DEFAULT 0
-)
-RETURNS JSON
-LANGUAGE plpgsql
-SECURITY DEFINER
-AS $$
-DECLARE
-    new_conversation_id BIGINT;
-    result JSON;
-    insert_query TEXT;
-    has_tokens_used BOOLEAN := FALSE;
-    has_model_used BOOLEAN := FALSE;
-    has_emotional_state BOOLEAN := FALSE;
-BEGIN
-    -- Verificar que la tarea existe
-    IF NOT EXISTS (SELECT 1 FROM public.task WHERE id = p_task_id) THEN
-        RETURN json_build_object(
-            'success', false,
-            'message', 'Task not found'
-        );
-    END IF;
-    
-    -- Validar parámetros
-    IF p_role IS NULL OR p_role NOT IN ('user', 'assistant') THEN
-        RETURN json_build_object(
-            'success', false,
-            'message', 'Role must be user or assistant'
-        );
-    END IF;
-    
-    IF p_message IS NULL OR trim(p_message) = '' THEN
-        RETURN json_build_object(
-            'success', false,
-            'message', 'Message is required'
-        );
-    END IF;
-    
-    -- Verificar qué columnas existen
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'conversation' AND column_name = 'tokens_used'
-    ) INTO has_tokens_used;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'conversation' AND column_name = 'model_used'
-    ) INTO has_model_used;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'conversation' AND column_name = 'emotional_state'
-    ) INTO has_emotional_state;
-    
-    -- Construir query de inserción dinámicamente con CAST para role
-    insert_query := 'INSERT INTO public.conversation (task_id, role, message';
-    
-    IF has_emotional_state THEN
-        insert_query := insert_query || ', emotional_state';
-    END IF;
-    
-    IF has_tokens_used THEN
-        insert_query := insert_query || ', tokens_used';
-    END IF;
-    
-    IF has_model_used THEN
-        insert_query := insert_query || ', model_used';
-    END IF;
-    
-    insert_query := insert_query || ') VALUES ($1, $2::conversation_role, $3';
-    
-    IF has_emotional_state THEN
-        insert_query := insert_query || ', $4';
-    END IF;
-    
-    IF has_tokens_used THEN
-        IF has_emotional_state THEN
-            insert_query := insert_query || ', $5';
-        ELSE
-            insert_query := insert_query || ', $4';    
-        END IF;
-    END IF;
-    
-    IF has_model_used THEN
-        IF has_emotional_state AND has_tokens_used THEN
-            insert_query := insert_query || ', $6';
-        ELSIF has_emotional_state OR has_tokens_used THEN
-            insert_query := insert_query || ', $5';
-        ELSE
-            insert_query := insert_query || ', $4';
-        END IF;
-    END IF;
-    
-    insert_query := insert_query || ') RETURNING id';
-    
-    -- Ejecutar inserción según columnas disponibles
-    IF has_emotional_state AND has_tokens_used AND has_model_used THEN
-        EXECUTE insert_query USING p_task_id, p_role, trim(p_message), p_emotional_state, p_tokens_used, p_model_used INTO new_conversation_id;
-    ELSIF has_emotional_state AND has_tokens_used THEN
-        EXECUTE insert_query USING p_task_id, p_role, trim(p_message), p_emotional_state, p_tokens_used INTO new_conversation_id;
-    ELSIF has_emotional_state AND has_model_used THEN
-        EXECUTE insert_query USING p_task_id, p_role, trim(p_message), p_emotional_state, p_model_used INTO new_conversation_id;
-    ELSIF has_tokens_used AND has_model_used THEN
-        EXECUTE insert_query USING p_task_id, p_role, trim(p_message), p_tokens_used, p_model_used INTO new_conversation_id;
-    ELSIF has_emotional_state THEN
-        EXECUTE insert_query USING p_task_id, p_role, trim(p_message), p_emotional_state INTO new_conversation_id;
-    ELSIF has_tokens_used THEN
-        EXECUTE insert_query USING p_task_id, p_role, trim(p_message), p_tokens_used INTO new_conversation_id;
-    ELSIF has_model_used THEN
-        EXECUTE insert_query USING p_task_id, p_role, trim(p_message), p_model_used INTO new_conversation_id;
-    ELSE
-        EXECUTE insert_query USING p_task_id, p_role, trim(p_message) INTO new_conversation_id;
-    END IF;
-    
-    -- ✅ FORMATO COMPATIBLE CON TESTS PYTHON
-    SELECT json_build_object(
-        'success', true,
-        'id', new_conversation_id,
-        'message', 'Conversation created successfully'
-    ) INTO result;
-    
-    RETURN result;
-END;
-$$;
-
--- OBTENER CONVERSACIONES (FORMATO COMPATIBLE CON TESTS)
-DROP FUNCTION IF EXISTS motivbot_get_conversations;
-CREATE FUNCTION motivbot_get_conversations(
-    p_task_id BIGINT DEFAULT NULL,
-    p_role TEXT DEFAULT NULL,
-    p_limit INTEGER DEFAULT 100
-)
-RETURNS JSON
-LANGUAGE plpgsql
-SECURITY DEFINER
-AS $$
-DECLARE
-    result JSON;
-    has_created_at BOOLEAN := FALSE;
-    has_tokens_used BOOLEAN := FALSE;
-    has_model_used BOOLEAN := FALSE;
-    has_response_time_ms BOOLEAN := FALSE;
-    has_emotional_state BOOLEAN := FALSE;
-BEGIN
-    -- Verificar qué columnas existen en la tabla conversation
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'conversation' AND column_name = 'created_at'
-    ) INTO has_created_at;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'conversation' AND column_name = 'tokens_used'
-    ) INTO has_tokens_used;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'conversation' AND column_name = 'model_used'
-    ) INTO has_model_used;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'conversation' AND column_name = 'response_time_ms'
-    ) INTO has_response_time_ms;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'conversation' AND column_name = 'emotional_state'
-    ) INTO has_emotional_state;
-
-    -- ✅ DEVOLVER ARRAY DIRECTO (SIN WRAPPER)
-    -- Construir query dinámico
-    IF p_task_id IS NOT NULL AND p_role IS NOT NULL THEN
-        -- Filtrar por task_id y role
-        EXECUTE format('
-            SELECT COALESCE(json_agg(conv_json), ''[]''::json)
-            FROM (
-                SELECT json_build_object(
-                    ''id'', id,
-                    ''task_id'', task_id,
-                    ''role'', role,
-                    ''message'', message,
-                    ''user_is_grateful'', user_is_grateful,
-                    ''user_is_useful'', user_is_useful,
-                    ''assistant_is_useful'', assistant_is_useful,
-                    ''assistant_is_precise'', assistant_is_precise,
-                    ''assistant_is_grateful'', assistant_is_grateful%s%s%s%s%s
-                ) as conv_json
-                FROM public.conversation 
-                WHERE task_id = $1 AND role = $2::conversation_role
-                ORDER BY %s
-                LIMIT $3
-            ) conversations',
-            CASE WHEN has_emotional_state THEN ', ''emotional_state'', emotional_state' ELSE '' END,
-            CASE WHEN has_tokens_used THEN ', ''tokens_used'', tokens_used' ELSE '' END,
-            CASE WHEN has_model_used THEN ', ''model_used'', model_used' ELSE '' END,
-            CASE WHEN has_response_time_ms THEN ', ''response_time_ms'', response_time_ms' ELSE '' END,
-            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
-            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
-        ) USING p_task_id, p_role, p_limit INTO result;
-        
-    ELSIF p_task_id IS NOT NULL THEN
-        -- Filtrar solo por task_id
-        EXECUTE format('
-            SELECT COALESCE(json_agg(conv_json), ''[]''::json)
-            FROM (
-                SELECT json_build_object(
-                    ''id'', id,
-                    ''task_id'', task_id,
-                    ''role'', role,
-                    ''message'', message,
-                    ''user_is_grateful'', user_is_grateful,
-                    ''user_is_useful'', user_is_useful,
-                    ''assistant_is_useful'', assistant_is_useful,
-                    ''assistant_is_precise'', assistant_is_precise,
-                    ''assistant_is_grateful'', assistant_is_grateful%s%s%s%s%s
-                ) as conv_json
-                FROM public.conversation 
-                WHERE task_id = $1
-                ORDER BY %s
-                LIMIT $2
-            ) conversations',
-            CASE WHEN has_emotional_state THEN ', ''emotional_state'', emotional_state' ELSE '' END,
-            CASE WHEN has_tokens_used THEN ', ''tokens_used'', tokens_used' ELSE '' END,
-            CASE WHEN has_model_used THEN ', ''model_used'', model_used' ELSE '' END,
-            CASE WHEN has_response_time_ms THEN ', ''response_time_ms'', response_time_ms' ELSE '' END,
-            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
-            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
-        ) USING p_task_id, p_limit INTO result;
-        
-    ELSIF p_role IS NOT NULL THEN
-        -- Filtrar solo por role
-        EXECUTE format('
-            SELECT COALESCE(json_agg(conv_json), ''[]''::json)
-            FROM (
-                SELECT json_build_object(
-                    ''id'', id,
-                    ''task_id'', task_id,
-                    ''role'', role,
-                    ''message'', message,
-                    ''user_is_grateful'', user_is_grateful,
-                    ''user_is_useful'', user_is_useful,
-                    ''assistant_is_useful'', assistant_is_useful,
-                    ''assistant_is_precise'', assistant_is_precise,
-                    ''assistant_is_grateful'', assistant_is_grateful%s%s%s%s%s
-                ) as conv_json
-                FROM public.conversation 
-                WHERE role = $1::conversation_role
-                ORDER BY %s
-                LIMIT $2
-            ) conversations',
-            CASE WHEN has_emotional_state THEN ', ''emotional_state'', emotional_state' ELSE '' END,
-            CASE WHEN has_tokens_used THEN ', ''tokens_used'', tokens_used' ELSE '' END,
-            CASE WHEN has_model_used THEN ', ''model_used'', model_used' ELSE '' END,
-            CASE WHEN has_response_time_ms THEN ', ''response_time_ms'', response_time_ms' ELSE '' END,
-            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
-            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
-        ) USING p_role, p_limit INTO result;
-        
-    ELSE
-        -- Sin filtros
-        EXECUTE format('
-            SELECT COALESCE(json_agg(conv_json), ''[]''::json)
-            FROM (
-                SELECT json_build_object(
-                    ''id'', id,
-                    ''task_id'', task_id,
-                    ''role'', role,
-                    ''message'', message,
-                    ''user_is_grateful'', user_is_grateful,
-                    ''user_is_useful'', user_is_useful,
-                    ''assistant_is_useful'', assistant_is_useful,
-                    ''assistant_is_precise'', assistant_is_precise,
-                    ''assistant_is_grateful'', assistant_is_grateful%s%s%s%s%s
-                ) as conv_json
-                FROM public.conversation 
-                ORDER BY %s
-                LIMIT $1
-            ) conversations',
-            CASE WHEN has_emotional_state THEN ', ''emotional_state'', emotional_state' ELSE '' END,
-            CASE WHEN has_tokens_used THEN ', ''tokens_used'', tokens_used' ELSE '' END,
-            CASE WHEN has_model_used THEN ', ''model_used'', model_used' ELSE '' END,
-            CASE WHEN has_response_time_ms THEN ', ''response_time_ms'', response_time_ms' ELSE '' END,
-            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
-            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
-        ) USING p_limit INTO result;
-    END IF;
-    
-    RETURN result;
-END;
-$$;
-
--- Otorgar permisos
-GRANT EXECUTE ON FUNCTION motivbot_get_conversations TO anon, authenticated;
+-- motivbot_create_conversation y motivbot_get_conversations se definen (con SQL estático)
+-- y se otorgan en motivbot_rpc.sql, que se aplica después de este fichero
 
 -- 10. Otorgar permisos para todas las funciones RPC
 GRANT EXECUTE ON FUNCTION get_task_conversation_history(BIGINT) TO anon, authenticated;
 GRANT EXECUTE ON FUNCTION add_gpt_conversation(BIGINT, conversation_role, TEXT, VARCHAR(50), VARCHAR(50), VARCHAR(50), INTEGER) TO anon, authenticated;
 GRANT EXECUTE ON FUNCTION update_conversation_feedback(BIGINT, BOOLEAN, BOOLEAN, BOOLEAN, BOOLEAN, BOOLEAN, VARCHAR(50)) TO anon, authenticated;
 GRANT EXECUTE ON FUNCTION get_conversation_summary(BIGINT[], INTEGER) TO anon, authenticated;
-GRANT EXECUTE ON FUNCTION get_emotional_states_analytics(INTEGER) TO anon, authenticated;
 GRANT EXECUTE ON FUNCTION get_conversations_by_emotion(VARCHAR(50), INTEGER) TO anon, authenticated;
 GRANT EXECUTE ON FUNCTION update_conversation_updated_at() TO anon, authenticated;
-GRANT EXECUTE ON FUNCTION motivbot_create_conversation(BIGINT, conversation_role, TEXT, VARCHAR(50), VARCHAR(50), INTEGER) TO anon, authenticated;
-GRANT EXECUTE ON FUNCTION motivbot_get_conversations(BIGINT, conversation_role, INTEGER) TO anon, authenticated;
-GRANT EXECUTE ON FUNCTION motivbot_update_conversation_feedback(BIGINT, BOOLEAN, BOOLEAN, BOOLEAN, BOOLEAN, BOOLEAN) TO anon, authenticated;
-GRANT EXECUTE ON FUNCTION motivbot_delete_conversation(BIGINT) TO anon, authenticated;
-GRANT EXECUTE ON FUNCTION motivbot_create_conversation(BIGINT, TEXT, TEXT, TEXT, TEXT, INTEGER) TO anon, authenticated;
\ No newline at end of file
+-- Las funciones motivbot_* de conversaciones se otorgan en motivbot_rpc.sql
\ No newline at end of file
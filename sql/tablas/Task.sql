@@ -131,3 +131,112 @@ ADD COLUMN IF NOT EXISTS tags TEXT[] DEFAULT '{}';
 
 -- Crear índice para búsquedas en tags
 CREATE INDEX IF NOT EXISTS idx_task_tags ON public.task USING GIN(tags);
+
+-- Búsqueda de texto completo para motivbot_search_tasks
+-- Normalizar minúsculas y tildes (unaccent no está disponible en todas las instancias)
+CREATE OR REPLACE FUNCTION motivbot_search_text(p_text TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+PARALLEL SAFE
+AS $$
+    SELECT translate(lower(COALESCE(p_text, '')), 'áàäâéèëêíìïîóòöôúùüûñç', 'aaaaeeeeiiiioooouuuunc')
+$$;
+
+-- Vector en español: el título pesa más (A) que la descripción (B)
+ALTER TABLE public.task
+ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('spanish'::regconfig, motivbot_search_text(title)), 'A') ||
+    setweight(to_tsvector('spanish'::regconfig, motivbot_search_text(description)), 'B')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_task_search_vector ON public.task USING GIN(search_vector);
+
+-- Índices para recorrer las tareas de más reciente a más antigua (paginación por cursor)
+CREATE INDEX IF NOT EXISTS idx_task_created_at_id ON public.task (created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_task_status_created_at_id ON public.task (status, created_at DESC, id DESC);
+
+-- Calendario (motivbot_get_calendar): tareas de cada día por hora y recuentos por estado sin leer la tabla
+CREATE INDEX IF NOT EXISTS idx_task_due_date_time ON public.task (due_date, due_time, id) INCLUDE (status);
+
+-- Arrastre diario (motivbot_rollover_overdue_tasks): solo las tareas abiertas, que son las que se mueven
+CREATE INDEX IF NOT EXISTS idx_task_open_due_date ON public.task (due_date)
+WHERE status IN ('pending', 'in-progress', 'on-hold');
+
+-- Fecha de finalización para las analíticas diarias: se fija al pasar a 'completed' y se borra al reabrir
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'completed_at'
+    ) THEN
+        ALTER TABLE public.task ADD COLUMN completed_at TIMESTAMPTZ;
+
+        -- Las tareas ya completadas toman su última modificación (sin disparar los triggers de updated_at)
+        ALTER TABLE public.task DISABLE TRIGGER USER;
+        UPDATE public.task SET completed_at = updated_at WHERE status = 'completed';
+        ALTER TABLE public.task ENABLE TRIGGER USER;
+    END IF;
+END$$;
+
+CREATE OR REPLACE FUNCTION set_task_completed_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.status <> 'completed' THEN
+        NEW.completed_at = NULL;
+    ELSIF TG_OP = 'INSERT' THEN
+        -- Una tarea que se crea ya completada se completó al crearse
+        NEW.completed_at = COALESCE(NEW.completed_at, NEW.created_at, NOW());
+    ELSIF OLD.status <> 'completed' THEN
+        NEW.completed_at = NOW();
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS set_task_completed_at_trigger ON public.task;
+CREATE TRIGGER set_task_completed_at_trigger
+    BEFORE INSERT OR UPDATE ON public.task
+    FOR EACH ROW
+    EXECUTE FUNCTION set_task_completed_at();
+
+CREATE INDEX IF NOT EXISTS idx_task_completed_at ON public.task (completed_at) WHERE completed_at IS NOT NULL;
+
+-- Origen externo de las tareas sincronizadas (p. ej. issues de GitHub): fuente, repositorio e id del issue.
+-- La clave única permite enlazar cada issue con su tarea aunque cambie el título
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'external_id'
+    ) THEN
+        ALTER TABLE public.task
+        ADD COLUMN external_source TEXT,
+        ADD COLUMN external_repo TEXT,
+        ADD COLUMN external_id TEXT;
+
+        -- Las tareas que ya creó la sincronización de GitHub llevan el repositorio y el id en la descripción;
+        -- si un issue se sincronizó varias veces solo la primera tarea toma la clave
+        ALTER TABLE public.task DISABLE TRIGGER USER;
+        UPDATE public.task t
+        SET external_source = 'github', external_repo = linked.repo, external_id = linked.issue_id
+        FROM (
+            SELECT DISTINCT ON (repo, issue_id) id, repo, issue_id
+            FROM (
+                SELECT id,
+                       substring(description FROM '📁 \*\*Repository:\*\* (\S+)') AS repo,
+                       substring(description FROM '🆔 \*\*GitHub ID:\*\* (\d+)') AS issue_id
+                FROM public.task
+                WHERE 'motivBotLinkIssuesFromGithub' = ANY(tags)
+            ) parsed
+            WHERE repo IS NOT NULL AND issue_id IS NOT NULL
+            ORDER BY repo, issue_id, id
+        ) linked
+        WHERE t.id = linked.id;
+        ALTER TABLE public.task ENABLE TRIGGER USER;
+    END IF;
+END$$;
+
+-- NULL no choca con NULL: las tareas sin origen externo no se ven afectadas
+CREATE UNIQUE INDEX IF NOT EXISTS idx_task_external_key
+ON public.task (external_source, external_repo, external_id);
@@ -72,8 +72,328 @@ GRANT DELETE ON chibi_messages TO anon;
 -- Grant para usar la secuencia del ID
 GRANT USAGE ON SEQUENCE chibi_messages_id_seq TO anon;
 
--- Crear función para obtener mensajes aleatorios
-CREATE OR REPLACE FUNCTION get_random_chibi_messages(limit_count INTEGER DEFAULT 20)
+-- Muestreo aleatorio en O(limit): claves densas 1..N (globales y por estado) en una tabla aparte,
+-- mantenidas por triggers, para elegir mensajes con sondas por índice en lugar de ORDER BY RANDOM()
+CREATE TABLE IF NOT EXISTS chibi_messages_sample (
+    message_id INTEGER PRIMARY KEY,
+    sample_key INTEGER NOT NULL,
+    estado VARCHAR(50) NOT NULL,
+    estado_key INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_chibi_messages_sample_key ON chibi_messages_sample(sample_key);
+CREATE INDEX IF NOT EXISTS idx_chibi_messages_sample_estado_key ON chibi_messages_sample(estado, estado_key);
+
+-- Tabla interna: solo la leen las funciones SECURITY DEFINER
+ALTER TABLE chibi_messages_sample ENABLE ROW LEVEL SECURITY;
+
+-- Añadir mensajes al final de la numeración global y de la de su estado
+CREATE OR REPLACE FUNCTION chibi_messages_sample_add(p_ids INTEGER[])
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    INSERT INTO chibi_messages_sample (message_id, sample_key, estado, estado_key)
+    SELECT cm.id,
+           (SELECT COALESCE(max(sample_key), 0) FROM chibi_messages_sample) + row_number() OVER (ORDER BY cm.id),
+           cm.estado,
+           last.estado_key + row_number() OVER (PARTITION BY cm.estado ORDER BY cm.id)
+    FROM chibi_messages cm
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(max(s.estado_key), 0) AS estado_key
+        FROM chibi_messages_sample s
+        WHERE s.estado = cm.estado
+    ) last
+    WHERE cm.id = ANY(p_ids);
+END;
+$$;
+
+-- Quitar mensajes y rellenar los huecos con los últimos de cada numeración para que siga siendo densa.
+-- El total anterior es el mayor entre lo que queda y lo borrado (la numeración era 1..N)
+CREATE OR REPLACE FUNCTION chibi_messages_sample_remove(p_ids INTEGER[])
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    removed chibi_messages_sample[];
+    total INTEGER;
+BEGIN
+    WITH deleted AS (
+        DELETE FROM chibi_messages_sample
+        WHERE message_id = ANY(p_ids)
+        RETURNING *
+    )
+    SELECT array_agg(deleted::chibi_messages_sample) INTO removed FROM deleted;
+
+    IF removed IS NULL THEN
+        RETURN;
+    END IF;
+
+    -- Numeración global: los mensajes por encima del nuevo total pasan a los huecos
+    SELECT GREATEST(COALESCE(max(s.sample_key), 0), (SELECT max(r.sample_key) FROM unnest(removed) r)) - cardinality(removed)
+    INTO total
+    FROM chibi_messages_sample s;
+
+    UPDATE chibi_messages_sample s
+    SET sample_key = holes.sample_key
+    FROM (
+        SELECT r.sample_key, row_number() OVER (ORDER BY r.sample_key) AS rn
+        FROM unnest(removed) r
+        WHERE r.sample_key <= total
+    ) holes
+    JOIN (
+        SELECT s2.message_id, row_number() OVER (ORDER BY s2.sample_key) AS rn
+        FROM chibi_messages_sample s2
+        WHERE s2.sample_key > total
+    ) tail USING (rn)
+    WHERE s.message_id = tail.message_id;
+
+    -- Lo mismo dentro de cada estado afectado
+    WITH groups AS (
+        SELECT r.estado,
+               GREATEST(
+                   max(r.estado_key),
+                   (SELECT COALESCE(max(s3.estado_key), 0) FROM chibi_messages_sample s3 WHERE s3.estado = r.estado)
+               ) - count(*) AS total
+        FROM unnest(removed) r
+        GROUP BY r.estado
+    )
+    UPDATE chibi_messages_sample s
+    SET estado_key = holes.estado_key
+    FROM (
+        SELECT g.estado, r.estado_key, row_number() OVER (PARTITION BY g.estado ORDER BY r.estado_key) AS rn
+        FROM groups g
+        JOIN unnest(removed) r ON r.estado = g.estado
+        WHERE r.estado_key <= g.total
+    ) holes
+    JOIN (
+        SELECT s2.message_id, g.estado, row_number() OVER (PARTITION BY g.estado ORDER BY s2.estado_key) AS rn
+        FROM groups g
+        JOIN chibi_messages_sample s2 ON s2.estado = g.estado AND s2.estado_key > g.total
+    ) tail USING (estado, rn)
+    WHERE s.message_id = tail.message_id;
+END;
+$$;
+
+-- Lo mismo por tag: cada par (mensaje, tag) tiene una clave densa 1..N dentro del tag y otra dentro de
+-- (tag, estado), para muestrear con tags por sondas en lugar de barajar lo que devuelve el índice GIN
+CREATE TABLE IF NOT EXISTS chibi_messages_tag_sample (
+    message_id INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    tag_key INTEGER NOT NULL,
+    estado VARCHAR(50) NOT NULL,
+    estado_key INTEGER NOT NULL,
+    PRIMARY KEY (message_id, tag)
+);
+
+CREATE INDEX IF NOT EXISTS idx_chibi_messages_tag_sample_key ON chibi_messages_tag_sample(tag, tag_key);
+CREATE INDEX IF NOT EXISTS idx_chibi_messages_tag_sample_estado_key ON chibi_messages_tag_sample(tag, estado, estado_key);
+
+ALTER TABLE chibi_messages_tag_sample ENABLE ROW LEVEL SECURITY;
+
+-- Añadir los tags de los mensajes al final de la numeración de cada tag y de cada (tag, estado).
+-- Los tags NULL no se numeran (nunca coinciden con un filtro) y los repetidos cuentan una vez
+CREATE OR REPLACE FUNCTION chibi_messages_tag_sample_add(p_ids INTEGER[])
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    INSERT INTO chibi_messages_tag_sample (message_id, tag, tag_key, estado, estado_key)
+    SELECT e.id,
+           e.tag,
+           last_tag.tag_key + row_number() OVER (PARTITION BY e.tag ORDER BY e.id),
+           e.estado,
+           last_estado.estado_key + row_number() OVER (PARTITION BY e.tag, e.estado ORDER BY e.id)
+    FROM (
+        SELECT DISTINCT cm.id, t.tag, cm.estado
+        FROM chibi_messages cm
+        CROSS JOIN LATERAL unnest(cm.tags) AS t(tag)
+        WHERE cm.id = ANY(p_ids) AND t.tag IS NOT NULL
+    ) e
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(max(s.tag_key), 0) AS tag_key
+        FROM chibi_messages_tag_sample s
+        WHERE s.tag = e.tag
+    ) last_tag
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(max(s.estado_key), 0) AS estado_key
+        FROM chibi_messages_tag_sample s
+        WHERE s.tag = e.tag AND s.estado = e.estado
+    ) last_estado;
+END;
+$$;
+
+-- Quitar los tags de los mensajes y rellenar los huecos de cada tag y de cada (tag, estado) afectados,
+-- igual que chibi_messages_sample_remove
+CREATE OR REPLACE FUNCTION chibi_messages_tag_sample_remove(p_ids INTEGER[])
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    removed chibi_messages_tag_sample[];
+BEGIN
+    WITH deleted AS (
+        DELETE FROM chibi_messages_tag_sample
+        WHERE message_id = ANY(p_ids)
+        RETURNING *
+    )
+    SELECT array_agg(deleted::chibi_messages_tag_sample) INTO removed FROM deleted;
+
+    IF removed IS NULL THEN
+        RETURN;
+    END IF;
+
+    WITH groups AS (
+        SELECT r.tag,
+               GREATEST(
+                   max(r.tag_key),
+                   (SELECT COALESCE(max(s3.tag_key), 0) FROM chibi_messages_tag_sample s3 WHERE s3.tag = r.tag)
+               ) - count(*) AS total
+        FROM unnest(removed) r
+        GROUP BY r.tag
+    )
+    UPDATE chibi_messages_tag_sample s
+    SET tag_key = holes.tag_key
+    FROM (
+        SELECT g.tag, r.tag_key, row_number() OVER (PARTITION BY g.tag ORDER BY r.tag_key) AS rn
+        FROM groups g
+        JOIN unnest(removed) r ON r.tag = g.tag
+        WHERE r.tag_key <= g.total
+    ) holes
+    JOIN (
+        SELECT s2.message_id, g.tag, row_number() OVER (PARTITION BY g.tag ORDER BY s2.tag_key) AS rn
+        FROM groups g
+        JOIN chibi_messages_tag_sample s2 ON s2.tag = g.tag AND s2.tag_key > g.total
+    ) tail USING (tag, rn)
+    WHERE s.message_id = tail.message_id AND s.tag = tail.tag;
+
+    WITH groups AS (
+        SELECT r.tag,
+               r.estado,
+               GREATEST(
+                   max(r.estado_key),
+                   (SELECT COALESCE(max(s3.estado_key), 0) FROM chibi_messages_tag_sample s3
+                    WHERE s3.tag = r.tag AND s3.estado = r.estado)
+               ) - count(*) AS total
+        FROM unnest(removed) r
+        GROUP BY r.tag, r.estado
+    )
+    UPDATE chibi_messages_tag_sample s
+    SET estado_key = holes.estado_key
+    FROM (
+        SELECT g.tag, g.estado, r.estado_key,
+               row_number() OVER (PARTITION BY g.tag, g.estado ORDER BY r.estado_key) AS rn
+        FROM groups g
+        JOIN unnest(removed) r ON r.tag = g.tag AND r.estado = g.estado
+        WHERE r.estado_key <= g.total
+    ) holes
+    JOIN (
+        SELECT s2.message_id, g.tag, g.estado,
+               row_number() OVER (PARTITION BY g.tag, g.estado ORDER BY s2.estado_key) AS rn
+        FROM groups g
+        JOIN chibi_messages_tag_sample s2 ON s2.tag = g.tag AND s2.estado = g.estado AND s2.estado_key > g.total
+    ) tail USING (tag, estado, rn)
+    WHERE s.message_id = tail.message_id AND s.tag = tail.tag;
+END;
+$$;
+
+-- Triggers por sentencia: una carga en bloque numera todas sus filas de una vez. El lock
+-- serializa a los escritores de chibi_messages (tabla de escritura poco frecuente)
+CREATE OR REPLACE FUNCTION chibi_messages_sample_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    moved INTEGER[];
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('chibi_messages_sample'));
+
+    IF TG_OP = 'INSERT' THEN
+        PERFORM chibi_messages_sample_add(ARRAY(SELECT id FROM new_rows));
+        PERFORM chibi_messages_tag_sample_add(ARRAY(SELECT id FROM new_rows));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM chibi_messages_sample_remove(ARRAY(SELECT id FROM old_rows));
+        PERFORM chibi_messages_tag_sample_remove(ARRAY(SELECT id FROM old_rows));
+    ELSE
+        -- Un cambio de estado mueve el mensaje al final de su nuevo grupo
+        moved := ARRAY(
+            SELECT n.id FROM new_rows n JOIN old_rows o ON o.id = n.id WHERE n.estado IS DISTINCT FROM o.estado
+        );
+        PERFORM chibi_messages_sample_remove(moved);
+        PERFORM chibi_messages_sample_add(moved);
+
+        -- En la numeración por tag también un cambio de tags
+        moved := ARRAY(
+            SELECT n.id FROM new_rows n JOIN old_rows o ON o.id = n.id
+            WHERE n.estado IS DISTINCT FROM o.estado OR n.tags IS DISTINCT FROM o.tags
+        );
+        PERFORM chibi_messages_tag_sample_remove(moved);
+        PERFORM chibi_messages_tag_sample_add(moved);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION chibi_messages_sample_truncate_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    TRUNCATE chibi_messages_sample, chibi_messages_tag_sample;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS chibi_messages_sample_insert ON chibi_messages;
+CREATE TRIGGER chibi_messages_sample_insert
+    AFTER INSERT ON chibi_messages
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION chibi_messages_sample_trigger();
+
+DROP TRIGGER IF EXISTS chibi_messages_sample_update ON chibi_messages;
+CREATE TRIGGER chibi_messages_sample_update
+    AFTER UPDATE ON chibi_messages
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION chibi_messages_sample_trigger();
+
+DROP TRIGGER IF EXISTS chibi_messages_sample_delete ON chibi_messages;
+CREATE TRIGGER chibi_messages_sample_delete
+    AFTER DELETE ON chibi_messages
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION chibi_messages_sample_trigger();
+
+DROP TRIGGER IF EXISTS chibi_messages_sample_truncate ON chibi_messages;
+CREATE TRIGGER chibi_messages_sample_truncate
+    AFTER TRUNCATE ON chibi_messages
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION chibi_messages_sample_truncate_trigger();
+
+-- Numerar los mensajes que ya existían
+TRUNCATE chibi_messages_sample, chibi_messages_tag_sample;
+SELECT chibi_messages_sample_add(ARRAY(SELECT id FROM chibi_messages));
+SELECT chibi_messages_tag_sample_add(ARRAY(SELECT id FROM chibi_messages));
+
+-- Crear función para obtener mensajes aleatorios (uniforme, opcionalmente por estado y tags)
+-- Sin tags: limit_count claves distintas al azar en 1..N -> O(limit) sondas por índice.
+-- Con tags: las claves de cada tag buscado se ponen una detrás de otra y se sondean posiciones al azar de
+-- ese rango; un mensaje con varios de los tags solo cuenta en el primero (en orden alfabético), así que
+-- todos salen con la misma probabilidad. Hasta 4 rondas acotadas de sondas; solo si el rango es pequeño
+-- se baraja entero.
+DROP FUNCTION IF EXISTS get_random_chibi_messages(INTEGER);
+CREATE OR REPLACE FUNCTION get_random_chibi_messages(
+    limit_count INTEGER DEFAULT 20,
+    p_estado TEXT DEFAULT NULL,
+    p_tags TEXT[] DEFAULT NULL
+)
 RETURNS TABLE (
     id INTEGER,
     mensaje TEXT,
@@ -81,18 +401,171 @@ RETURNS TABLE (
     tags TEXT[],
     created_at TIMESTAMPTZ,
     updated_at TIMESTAMPTZ
-) AS $$
+)
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    filter_tags BOOLEAN := p_tags IS NOT NULL AND cardinality(p_tags) > 0;
+    tag_list TEXT[] := '{}';
+    tag_starts INTEGER[] := '{}';
+    total INTEGER;
+    draws INTEGER;
+    rounds INTEGER := 0;
+    probes INTEGER[];
+    ids INTEGER[] := '{}';
 BEGIN
+    IF limit_count IS NULL OR limit_count <= 0 THEN
+        RETURN;
+    END IF;
+
+    -- ORDER BY ... LIMIT 1 en lugar de max(): lee la última entrada del índice aunque las estadísticas
+    -- de la tabla estén desfasadas tras una carga en bloque
+    IF filter_tags THEN
+        -- Tamaño de la numeración de cada tag (o de tag y estado) y dónde empieza en el rango conjunto;
+        -- los tags sin mensajes (y los NULL) no ocupan posiciones
+        SELECT COALESCE(array_agg(sized.tag ORDER BY sized.tag), '{}'),
+               COALESCE(array_agg((sized.running - sized.size)::INTEGER ORDER BY sized.tag), '{}'),
+               COALESCE(sum(sized.size), 0)
+        INTO tag_list, tag_starts, total
+        FROM (
+            SELECT t.tag, t.size, sum(t.size) OVER (ORDER BY t.tag) AS running
+            FROM (
+                SELECT searched.tag,
+                       CASE WHEN p_estado IS NULL THEN
+                           (SELECT ts.tag_key FROM chibi_messages_tag_sample ts
+                            WHERE ts.tag = searched.tag ORDER BY ts.tag_key DESC LIMIT 1)
+                       ELSE
+                           (SELECT ts.estado_key FROM chibi_messages_tag_sample ts
+                            WHERE ts.tag = searched.tag AND ts.estado = p_estado ORDER BY ts.estado_key DESC LIMIT 1)
+                       END AS size
+                FROM (SELECT DISTINCT requested.tag FROM unnest(p_tags) AS requested(tag) WHERE requested.tag IS NOT NULL) searched
+            ) t
+            WHERE t.size IS NOT NULL
+        ) sized;
+    ELSIF p_estado IS NULL THEN
+        SELECT s.sample_key INTO total FROM chibi_messages_sample s ORDER BY s.sample_key DESC LIMIT 1;
+    ELSE
+        SELECT s.estado_key INTO total FROM chibi_messages_sample s WHERE s.estado = p_estado ORDER BY s.estado_key DESC LIMIT 1;
+    END IF;
+    total := COALESCE(total, 0);
+
+    IF total = 0 THEN
+        RETURN;
+    END IF;
+
+    -- Con n tags buscados al menos 1 de cada n posiciones es la primera de su mensaje
+    draws := limit_count * GREATEST(cardinality(tag_list), 1);
+
+    WHILE draws * 2 < total AND cardinality(ids) < limit_count AND rounds < 4 LOOP
+        rounds := rounds + 1;
+
+        -- Claves distintas en orden aleatorio (con total > 2 * draws sobran candidatos)
+        probes := ARRAY(
+            SELECT d.k
+            FROM (SELECT DISTINCT 1 + floor(random() * total)::INTEGER AS k FROM generate_series(1, draws * 2 + 10)) d
+            ORDER BY random()
+            LIMIT draws
+        );
+
+        IF NOT filter_tags AND p_estado IS NULL THEN
+            ids := ids || ARRAY(
+                SELECT s.message_id
+                FROM unnest(probes) WITH ORDINALITY AS p(k, ord)
+                JOIN chibi_messages_sample s ON s.sample_key = p.k
+                WHERE s.message_id <> ALL(ids)
+                ORDER BY p.ord
+                LIMIT limit_count - cardinality(ids)
+            );
+        ELSIF NOT filter_tags THEN
+            ids := ids || ARRAY(
+                SELECT s.message_id
+                FROM unnest(probes) WITH ORDINALITY AS p(k, ord)
+                JOIN chibi_messages_sample s ON s.estado = p_estado AND s.estado_key = p.k
+                WHERE s.message_id <> ALL(ids)
+                ORDER BY p.ord
+                LIMIT limit_count - cardinality(ids)
+            );
+        ELSIF p_estado IS NULL THEN
+            ids := ids || ARRAY(
+                SELECT ts.message_id
+                FROM unnest(probes) WITH ORDINALITY AS p(k, ord)
+                CROSS JOIN LATERAL (
+                    SELECT g.tag, g.pos::INTEGER AS pos, p.k - g.start AS k
+                    FROM unnest(tag_list, tag_starts) WITH ORDINALITY AS g(tag, start, pos)
+                    WHERE g.start < p.k
+                    ORDER BY g.start DESC
+                    LIMIT 1
+                ) slot
+                JOIN chibi_messages_tag_sample ts ON ts.tag = slot.tag AND ts.tag_key = slot.k
+                JOIN chibi_messages cm ON cm.id = ts.message_id
+                WHERE ts.message_id <> ALL(ids)
+                  AND NOT (cm.tags && tag_list[1:slot.pos - 1])
+                ORDER BY p.ord
+                LIMIT limit_count - cardinality(ids)
+            );
+        ELSE
+            ids := ids || ARRAY(
+                SELECT ts.message_id
+                FROM unnest(probes) WITH ORDINALITY AS p(k, ord)
+                CROSS JOIN LATERAL (
+                    SELECT g.tag, g.pos::INTEGER AS pos, p.k - g.start AS k
+                    FROM unnest(tag_list, tag_starts) WITH ORDINALITY AS g(tag, start, pos)
+                    WHERE g.start < p.k
+                    ORDER BY g.start DESC
+                    LIMIT 1
+                ) slot
+                JOIN chibi_messages_tag_sample ts ON ts.tag = slot.tag AND ts.estado = p_estado AND ts.estado_key = slot.k
+                JOIN chibi_messages cm ON cm.id = ts.message_id
+                WHERE ts.message_id <> ALL(ids)
+                  AND NOT (cm.tags && tag_list[1:slot.pos - 1])
+                ORDER BY p.ord
+                LIMIT limit_count - cardinality(ids)
+            );
+        END IF;
+    END LOOP;
+
+    -- Grupo pequeño (a lo sumo 2 * draws posiciones) o sondas insuficientes: barajar las filas que cumplen el filtro
+    IF cardinality(ids) < limit_count THEN
+        IF filter_tags THEN
+            ids := ARRAY(
+                SELECT m.id
+                FROM (
+                    SELECT DISTINCT ts.message_id AS id
+                    FROM chibi_messages_tag_sample ts
+                    WHERE ts.tag = ANY(tag_list)
+                      AND (p_estado IS NULL OR ts.estado = p_estado)
+                ) m
+                ORDER BY random()
+                LIMIT limit_count
+            );
+        ELSE
+            ids := ARRAY(
+                SELECT cm.id
+                FROM chibi_messages cm
+                WHERE p_estado IS NULL OR cm.estado = p_estado
+                ORDER BY random()
+                LIMIT limit_count
+            );
+        END IF;
+    END IF;
+
     RETURN QUERY
     SELECT cm.id, cm.mensaje, cm.estado, cm.tags, cm.created_at, cm.updated_at
-    FROM chibi_messages cm
-    ORDER BY RANDOM()
-    LIMIT limit_count;
+    FROM unnest(ids) WITH ORDINALITY AS picked(id, ord)
+    JOIN chibi_messages cm ON cm.id = picked.id
+    ORDER BY picked.ord;
 END;
-$$ LANGUAGE plpgsql;
+$$;
 
 -- Otorgar permisos de ejecución a usuarios anónimos
-GRANT EXECUTE ON FUNCTION get_random_chibi_messages(INTEGER) TO anon;
+GRANT EXECUTE ON FUNCTION get_random_chibi_messages(INTEGER, TEXT, TEXT[]) TO anon;
 
 -- También otorgar a usuarios autenticados por si acaso
-GRANT EXECUTE ON FUNCTION get_random_chibi_messages(INTEGER) TO authenticated;
+GRANT EXECUTE ON FUNCTION get_random_chibi_messages(INTEGER, TEXT, TEXT[]) TO authenticated;
+
+-- Las funciones de mantenimiento solo se ejecutan desde los triggers
+REVOKE EXECUTE ON FUNCTION chibi_messages_sample_add(INTEGER[]) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION chibi_messages_sample_remove(INTEGER[]) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION chibi_messages_tag_sample_add(INTEGER[]) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION chibi_messages_tag_sample_remove(INTEGER[]) FROM PUBLIC, anon, authenticated;
@@ -15,6 +15,7 @@ DROP FUNCTION IF EXISTS motivbot_get_tasks(TEXT);
 DROP FUNCTION IF EXISTS motivbot_get_tasks(TEXT, TEXT);
 DROP FUNCTION IF EXISTS motivbot_get_tasks(TEXT, TEXT, INTEGER);
 DROP FUNCTION IF EXISTS motivbot_get_tasks(TEXT, TEXT, TEXT[], INTEGER);
+DROP FUNCTION IF EXISTS motivbot_get_tasks_page(TEXT, TEXT, TEXT[], INTEGER, TIMESTAMPTZ, BIGINT);
 
 DROP FUNCTION IF EXISTS motivbot_create_task(TEXT);
 DROP FUNCTION IF EXISTS motivbot_create_task(TEXT, TEXT);
@@ -31,218 +32,202 @@ DROP FUNCTION IF EXISTS motivbot_update_task(BIGINT, TEXT, TEXT, TEXT, TEXT, DAT
 DROP FUNCTION IF EXISTS motivbot_get_conversations(BIGINT);
 DROP FUNCTION IF EXISTS motivbot_get_conversations(BIGINT, TEXT);
 DROP FUNCTION IF EXISTS motivbot_get_conversations(BIGINT, TEXT, INTEGER);
+DROP FUNCTION IF EXISTS motivbot_get_conversations_page(BIGINT, TEXT, INTEGER, TIMESTAMPTZ, BIGINT);
 
 -- =====================================================
 -- FUNCIONES RPC DEFINITIVAS SIN DUPLICADOS
 -- =====================================================
 
+-- 0. ESQUEMA REQUERIDO Y SERIALIZACIÓN COMÚN
+-- Las RPC usan SQL estático (planes cacheables por sesión) en lugar de consultar
+-- information_schema en cada llamada. Las columnas se comprueban una sola vez, al
+-- aplicar este fichero: si falta alguna hay que aplicar antes Task.sql y Conversation.sql.
+DO $$
+DECLARE
+    missing TEXT;
+BEGIN
+    SELECT string_agg(required.table_name || '.' || required.column_name, ', ')
+    INTO missing
+    FROM (VALUES
+        ('task', 'priority'), ('task', 'due_date'), ('task', 'due_time'), ('task', 'tags'),
+        ('task', 'created_at'), ('task', 'updated_at'), ('task', 'search_vector'), ('task', 'completed_at'),
+        ('task', 'external_source'), ('task', 'external_repo'), ('task', 'external_id'),
+        ('conversation', 'emotional_state'), ('conversation', 'tokens_used'), ('conversation', 'model_used'),
+        ('conversation', 'response_time_ms'), ('conversation', 'created_at'), ('conversation', 'updated_at')
+    ) AS required(table_name, column_name)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM information_schema.columns c
+        WHERE c.table_schema = 'public'
+          AND c.table_name = required.table_name
+          AND c.column_name = required.column_name
+    );
+
+    IF missing IS NOT NULL THEN
+        RAISE EXCEPTION 'Faltan columnas requeridas por las RPC de MotivBot: %', missing
+            USING HINT = 'Aplica Task.sql y Conversation.sql antes que motivbot_rpc.sql';
+    END IF;
+END;
+$$;
+
+-- Representación JSON de una tarea (misma forma en todas las RPC de lectura)
+CREATE OR REPLACE FUNCTION motivbot_task_json(t public.task)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT json_build_object(
+        'id', t.id,
+        'title', t.title,
+        'description', t.description,
+        'status', t.status,
+        'priority', t.priority,
+        'tags', t.tags,
+        'due_date', t.due_date,
+        'due_time', t.due_time,
+        'created_at', t.created_at,
+        'updated_at', t.updated_at
+    )
+$$;
+
+-- Representación JSON de un mensaje de conversación
+CREATE OR REPLACE FUNCTION motivbot_conversation_json(c public.conversation)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT json_build_object(
+        'id', c.id,
+        'task_id', c.task_id,
+        'role', c.role,
+        'message', c.message,
+        'user_is_grateful', c.user_is_grateful,
+        'user_is_useful', c.user_is_useful,
+        'assistant_is_useful', c.assistant_is_useful,
+        'assistant_is_precise', c.assistant_is_precise,
+        'assistant_is_grateful', c.assistant_is_grateful,
+        'emotional_state', c.emotional_state,
+        'tokens_used', c.tokens_used,
+        'model_used', c.model_used,
+        'response_time_ms', c.response_time_ms,
+        'created_at', c.created_at
+    )
+$$;
+
+-- Errores que las RPC capturan en sus EXCEPTION WHEN OTHERS y devuelven como {success: false}: para
+-- pg_stat_statements son llamadas correctas, así que cada manejador suma uno aquí (una fila por RPC y solo
+-- cuando falla). motivbot_get_rpc_stats los devuelve como errors junto a las llamadas y duraciones.
+CREATE TABLE IF NOT EXISTS public.motivbot_rpc_error (
+    rpc TEXT PRIMARY KEY,
+    errors BIGINT NOT NULL DEFAULT 0,
+    last_error_at TIMESTAMPTZ,
+    last_message TEXT
+);
+
+ALTER TABLE public.motivbot_rpc_error ENABLE ROW LEVEL SECURITY;
+
+-- En una transacción de solo lectura (PostgREST ejecuta así las RPC STABLE) no se puede escribir: el error
+-- queda sin anotar en el servidor y solo lo ve el hook on_rpc del cliente
+CREATE OR REPLACE FUNCTION motivbot_count_rpc_error(p_rpc TEXT, p_message TEXT DEFAULT NULL)
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    INSERT INTO public.motivbot_rpc_error AS e (rpc, errors, last_error_at, last_message)
+    VALUES (p_rpc, 1, CURRENT_TIMESTAMP, p_message)
+    ON CONFLICT (rpc) DO UPDATE
+    SET errors = e.errors + 1,
+        last_error_at = EXCLUDED.last_error_at,
+        last_message = EXCLUDED.last_message;
+EXCEPTION
+    WHEN read_only_sql_transaction THEN
+        NULL;
+END;
+$$;
+
 -- 1. OBTENER TAREAS (CON SOPORTE COMPLETO PARA TAGS)
 CREATE OR REPLACE FUNCTION motivbot_get_tasks(
     p_status TEXT DEFAULT NULL,
     p_priority TEXT DEFAULT NULL,
     p_tags TEXT[] DEFAULT NULL,
-    p_limit INTEGER DEFAULT 50
+    p_limit INTEGER DEFAULT 50,
+    p_after_created_at TIMESTAMPTZ DEFAULT NULL,
+    p_after_id BIGINT DEFAULT NULL
 )
 RETURNS JSON
 LANGUAGE plpgsql
+STABLE
 SECURITY DEFINER
+-- Tras 5 ejecuciones plpgsql puede quedarse con un plan genérico, que no sabe qué filtros son nulos y tiende a
+-- recorrer idx_task_created_at_id filtrando fila a fila: siempre se planifica con los valores reales
+SET plan_cache_mode = force_custom_plan
 AS $$
 DECLARE
     result JSON;
-    has_created_at BOOLEAN := FALSE;
-    has_updated_at BOOLEAN := FALSE;
-    has_due_date BOOLEAN := FALSE;
-    has_due_time BOOLEAN := FALSE;
-    has_priority BOOLEAN := FALSE;
-    has_tags BOOLEAN := FALSE;
 BEGIN
-    -- Verificar qué columnas existen
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'created_at'
-    ) INTO has_created_at;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'updated_at'
-    ) INTO has_updated_at;
+    -- ✅ DEVOLVER ARRAY DIRECTO (SIN WRAPPER)
+    -- Filtros como en la versión con EXECUTE: con p_tags solo se filtra además por status y priority si
+    -- vienen los dos; con uno solo de ellos manda el filtro por tags y el otro se ignora.
+    -- Los filtros nulos se descartan al planificar con los valores reales (custom plan, forzado arriba),
+    -- por lo que el filtro por tags sigue usando idx_task_tags
+    -- p_after_created_at/p_after_id: cursor de la página anterior (keyset sobre idx_task_created_at_id);
+    -- sin p_after_id (id 0) se devuelven las tareas estrictamente anteriores a p_after_created_at
+    SELECT COALESCE(json_agg(motivbot_task_json(t) ORDER BY t.created_at DESC, t.id DESC), '[]'::json)
+    INTO result
+    FROM (
+        SELECT *
+        FROM public.task
+        WHERE (p_status IS NULL OR (p_tags IS NOT NULL AND p_priority IS NULL) OR status = p_status::task_status)
+          AND (p_priority IS NULL OR (p_tags IS NOT NULL AND p_status IS NULL) OR priority = p_priority)
+          AND (p_tags IS NULL OR tags && p_tags)
+          AND (p_after_created_at IS NULL OR (created_at, id) < (p_after_created_at, COALESCE(p_after_id, 0)))
+        ORDER BY created_at DESC, id DESC
+        LIMIT p_limit
+    ) t;
+
+    RETURN result;
+END;
+$$;
+
+-- 2. CREAR TAREA (CON SOPORTE COMPLETO PARA TAGS)
+-- Generación simple de tags basada en palabras clave del título y la prioridad
+CREATE OR REPLACE FUNCTION motivbot_generate_tags(
+    p_title TEXT,
+    p_priority TEXT DEFAULT NULL
+)
+RETURNS TEXT[]
+LANGUAGE plpgsql
+IMMUTABLE
+AS $$
+DECLARE
+    generated_tags TEXT[] := ARRAY[]::TEXT[];
+BEGIN
+    -- Añadir tags basados en palabras clave
+    IF LOWER(p_title) LIKE '%urgent%' OR LOWER(p_title) LIKE '%urgente%' THEN
+        generated_tags := array_append(generated_tags, 'urgente');
+    END IF;
     
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'due_date'
-    ) INTO has_due_date;
+    IF LOWER(p_title) LIKE '%project%' OR LOWER(p_title) LIKE '%proyecto%' THEN
+        generated_tags := array_append(generated_tags, 'proyecto');
+    END IF;
     
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'due_time'
-    ) INTO has_due_time;
+    IF LOWER(p_title) LIKE '%test%' OR LOWER(p_title) LIKE '%prueba%' THEN
+        generated_tags := array_append(generated_tags, 'test');
+    END IF;
     
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'priority'
-    ) INTO has_priority;
+    IF p_priority = 'high' THEN
+        generated_tags := array_append(generated_tags, 'alta-prioridad');
+    END IF;
     
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'tags'
-    ) INTO has_tags;
-
-    -- ✅ DEVOLVER ARRAY DIRECTO (SIN WRAPPER)
-    IF p_status IS NOT NULL AND p_priority IS NOT NULL AND p_tags IS NOT NULL AND has_priority AND has_tags THEN
-        -- Filtrar por status, priority y tags
-        EXECUTE format('
-            SELECT COALESCE(json_agg(task_json), ''[]''::json)
-            FROM (
-                SELECT json_build_object(
-                    ''id'', id,
-                    ''title'', title,
-                    ''description'', description,
-                    ''status'', status%s%s%s%s%s%s
-                ) as task_json
-                FROM public.task 
-                WHERE status = $1::task_status AND priority = $2 AND tags && $3
-                ORDER BY %s
-                LIMIT $4
-            ) tasks',
-            CASE WHEN has_priority THEN ', ''priority'', priority' ELSE '' END,
-            CASE WHEN has_tags THEN ', ''tags'', tags' ELSE '' END,
-            CASE WHEN has_due_date THEN ', ''due_date'', due_date' ELSE '' END,
-            CASE WHEN has_due_time THEN ', ''due_time'', due_time' ELSE '' END,
-            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
-            CASE WHEN has_updated_at THEN ', ''updated_at'', updated_at' ELSE '' END,
-            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
-        ) USING p_status, p_priority, p_tags, p_limit INTO result;
-        
-    ELSIF p_tags IS NOT NULL AND has_tags THEN
-        -- Filtrar solo por tags
-        EXECUTE format('
-            SELECT COALESCE(json_agg(task_json), ''[]''::json)
-            FROM (
-                SELECT json_build_object(
-                    ''id'', id,
-                    ''title'', title,
-                    ''description'', description,
-                    ''status'', status%s%s%s%s%s%s
-                ) as task_json
-                FROM public.task 
-                WHERE tags && $1
-                ORDER BY %s
-                LIMIT $2
-            ) tasks',
-            CASE WHEN has_priority THEN ', ''priority'', priority' ELSE '' END,
-            CASE WHEN has_tags THEN ', ''tags'', tags' ELSE '' END,
-            CASE WHEN has_due_date THEN ', ''due_date'', due_date' ELSE '' END,
-            CASE WHEN has_due_time THEN ', ''due_time'', due_time' ELSE '' END,
-            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
-            CASE WHEN has_updated_at THEN ', ''updated_at'', updated_at' ELSE '' END,
-            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
-        ) USING p_tags, p_limit INTO result;
-        
-    ELSIF p_status IS NOT NULL AND p_priority IS NOT NULL AND has_priority THEN
-        -- Filtrar por status y priority (sin tags)
-        EXECUTE format('
-            SELECT COALESCE(json_agg(task_json), ''[]''::json)
-            FROM (
-                SELECT json_build_object(
-                    ''id'', id,
-                    ''title'', title,
-                    ''description'', description,
-                    ''status'', status%s%s%s%s%s%s
-                ) as task_json
-                FROM public.task 
-                WHERE status = $1::task_status AND priority = $2
-                ORDER BY %s
-                LIMIT $3
-            ) tasks',
-            CASE WHEN has_priority THEN ', ''priority'', priority' ELSE '' END,
-            CASE WHEN has_tags THEN ', ''tags'', tags' ELSE '' END,
-            CASE WHEN has_due_date THEN ', ''due_date'', due_date' ELSE '' END,
-            CASE WHEN has_due_time THEN ', ''due_time'', due_time' ELSE '' END,
-            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
-            CASE WHEN has_updated_at THEN ', ''updated_at'', updated_at' ELSE '' END,
-            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
-        ) USING p_status, p_priority, p_limit INTO result;
-        
-    ELSIF p_status IS NOT NULL THEN
-        -- Filtrar solo por status
-        EXECUTE format('
-            SELECT COALESCE(json_agg(task_json), ''[]''::json)
-            FROM (
-                SELECT json_build_object(
-                    ''id'', id,
-                    ''title'', title,
-                    ''description'', description,
-                    ''status'', status%s%s%s%s%s%s
-                ) as task_json
-                FROM public.task 
-                WHERE status = $1::task_status
-                ORDER BY %s
-                LIMIT $2
-            ) tasks',
-            CASE WHEN has_priority THEN ', ''priority'', priority' ELSE '' END,
-            CASE WHEN has_tags THEN ', ''tags'', tags' ELSE '' END,
-            CASE WHEN has_due_date THEN ', ''due_date'', due_date' ELSE '' END,
-            CASE WHEN has_due_time THEN ', ''due_time'', due_time' ELSE '' END,
-            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
-            CASE WHEN has_updated_at THEN ', ''updated_at'', updated_at' ELSE '' END,
-            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
-        ) USING p_status, p_limit INTO result;
-        
-    ELSIF p_priority IS NOT NULL AND has_priority THEN
-        -- Filtrar solo por priority
-        EXECUTE format('
-            SELECT COALESCE(json_agg(task_json), ''[]''::json)
-            FROM (
-                SELECT json_build_object(
-                    ''id'', id,
-                    ''title'', title,
-                    ''description'', description,
-                    ''status'', status%s%s%s%s%s%s
-                ) as task_json
-                FROM public.task 
-                WHERE priority = $1
-                ORDER BY %s
-                LIMIT $2
-            ) tasks',
-            CASE WHEN has_priority THEN ', ''priority'', priority' ELSE '' END,
-            CASE WHEN has_tags THEN ', ''tags'', tags' ELSE '' END,
-            CASE WHEN has_due_date THEN ', ''due_date'', due_date' ELSE '' END,
-            CASE WHEN has_due_time THEN ', ''due_time'', due_time' ELSE '' END,
-            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
-            CASE WHEN has_updated_at THEN ', ''updated_at'', updated_at' ELSE '' END,
-            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
-        ) USING p_priority, p_limit INTO result;
-        
-    ELSE
-        -- Sin filtros
-        EXECUTE format('
-            SELECT COALESCE(json_agg(task_json), ''[]''::json)
-            FROM (
-                SELECT json_build_object(
-                    ''id'', id,
-                    ''title'', title,
-                    ''description'', description,
-                    ''status'', status%s%s%s%s%s%s
-                ) as task_json
-                FROM public.task 
-                ORDER BY %s
-                LIMIT $1
-            ) tasks',
-            CASE WHEN has_priority THEN ', ''priority'', priority' ELSE '' END,
-            CASE WHEN has_tags THEN ', ''tags'', tags' ELSE '' END,
-            CASE WHEN has_due_date THEN ', ''due_date'', due_date' ELSE '' END,
-            CASE WHEN has_due_time THEN ', ''due_time'', due_time' ELSE '' END,
-            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
-            CASE WHEN has_updated_at THEN ', ''updated_at'', updated_at' ELSE '' END,
-            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
-        ) USING p_limit INTO result;
+    -- Si no se generaron tags, usar un tag por defecto
+    IF array_length(generated_tags, 1) IS NULL THEN
+        generated_tags := ARRAY['general'];
     END IF;
     
-    RETURN result;
+    RETURN generated_tags;
 END;
 $$;
 
--- 2. CREAR TAREA (CON SOPORTE COMPLETO PARA TAGS)
 CREATE OR REPLACE FUNCTION motivbot_create_task(
     p_title TEXT,
     p_description TEXT DEFAULT NULL,
@@ -257,14 +242,8 @@ SECURITY DEFINER
 AS $$
 DECLARE
     new_task_id BIGINT;
-    result JSON;
-    insert_query TEXT;
-    has_priority BOOLEAN := FALSE;
-    has_due_date BOOLEAN := FALSE;
-    has_due_time BOOLEAN := FALSE;
-    has_tags BOOLEAN := FALSE;
-    generated_tags TEXT[] := ARRAY[]::TEXT[];
-    tags_were_generated BOOLEAN := FALSE;
+    generated_tags TEXT[];
+    tags_were_generated BOOLEAN := p_tags IS NULL;
 BEGIN
     -- Validar título
     IF p_title IS NULL OR trim(p_title) = '' THEN
@@ -273,163 +252,36 @@ BEGIN
             'message', 'Title is required'
         );
     END IF;
-    
-    -- Verificar qué columnas existen
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'priority'
-    ) INTO has_priority;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'due_date'
-    ) INTO has_due_date;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'due_time'
-    ) INTO has_due_time;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'tags'
-    ) INTO has_tags;
-    
+
     -- Generar tags automáticamente si no se proporcionaron
-    IF p_tags IS NULL AND has_tags THEN
-        -- Lógica simple de generación de tags basada en título y descripción
-        generated_tags := ARRAY[]::TEXT[];
-        
-        -- Añadir tags basados en palabras clave
-        IF LOWER(p_title) LIKE '%urgent%' OR LOWER(p_title) LIKE '%urgente%' THEN
-            generated_tags := array_append(generated_tags, 'urgente');
-        END IF;
-        
-        IF LOWER(p_title) LIKE '%project%' OR LOWER(p_title) LIKE '%proyecto%' THEN
-            generated_tags := array_append(generated_tags, 'proyecto');
-        END IF;
-        
-        IF LOWER(p_title) LIKE '%test%' OR LOWER(p_title) LIKE '%prueba%' THEN
-            generated_tags := array_append(generated_tags, 'test');
-        END IF;
-        
-        IF p_priority = 'high' THEN
-            generated_tags := array_append(generated_tags, 'alta-prioridad');
-        END IF;
-        
-        -- Si no se generaron tags, usar un tag por defecto
-        IF array_length(generated_tags, 1) IS NULL THEN
-            generated_tags := ARRAY['general'];
-        END IF;
-        
-        tags_were_generated := TRUE;
+    IF tags_were_generated THEN
+        generated_tags := motivbot_generate_tags(p_title, p_priority);
     ELSE
-        generated_tags := COALESCE(p_tags, ARRAY[]::TEXT[]);
-        tags_were_generated := FALSE;
+        generated_tags := p_tags;
     END IF;
 
-    -- Construir query de inserción dinámicamente
-    insert_query := 'INSERT INTO public.task (title, description';
-    
-    IF has_priority THEN
-        insert_query := insert_query || ', priority';
-    END IF;
-    
-    IF has_due_date THEN
-        insert_query := insert_query || ', due_date';
-    END IF;
-    
-    IF has_due_time THEN
-        insert_query := insert_query || ', due_time';
-    END IF;
-    
-    IF has_tags THEN
-        insert_query := insert_query || ', tags';
-    END IF;
-    
-    insert_query := insert_query || ') VALUES ($1, $2';
-    
-    IF has_priority THEN
-        insert_query := insert_query || ', $3';
-    END IF;
-    
-    IF has_due_date THEN
-        IF has_priority THEN
-            insert_query := insert_query || ', $4';
-        ELSE
-            insert_query := insert_query || ', $3';
-        END IF;
-    END IF;
-    
-    IF has_due_time THEN
-        IF has_priority AND has_due_date THEN
-            insert_query := insert_query || ', $5';
-        ELSIF has_priority OR has_due_date THEN
-            insert_query := insert_query || ', $4';
-        ELSE
-            insert_query := insert_query || ', $3';
-        END IF;
-    END IF;
-    
-    IF has_tags THEN
-        IF has_priority AND has_due_date AND has_due_time THEN
-            insert_query := insert_query || ', $6';
-        ELSIF (has_priority AND has_due_date) OR (has_priority AND has_due_time) OR (has_due_date AND has_due_time) THEN
-            insert_query := insert_query || ', $5';
-        ELSIF has_priority OR has_due_date OR has_due_time THEN
-            insert_query := insert_query || ', $4';
-        ELSE
-            insert_query := insert_query || ', $3';
-        END IF;
-    END IF;
-    
-    insert_query := insert_query || ') RETURNING id';
-    
-    -- Ejecutar inserción según columnas disponibles
-    IF has_priority AND has_due_date AND has_due_time AND has_tags THEN
-        EXECUTE insert_query USING trim(p_title), NULLIF(trim(p_description), ''), p_priority, p_due_date, p_due_time, generated_tags INTO new_task_id;
-    ELSIF has_priority AND has_due_date AND has_tags THEN
-        EXECUTE insert_query USING trim(p_title), NULLIF(trim(p_description), ''), p_priority, p_due_date, generated_tags INTO new_task_id;
-    ELSIF has_priority AND has_due_time AND has_tags THEN
-        EXECUTE insert_query USING trim(p_title), NULLIF(trim(p_description), ''), p_priority, p_due_time, generated_tags INTO new_task_id;
-    ELSIF has_due_date AND has_due_time AND has_tags THEN
-        EXECUTE insert_query USING trim(p_title), NULLIF(trim(p_description), ''), p_due_date, p_due_time, generated_tags INTO new_task_id;
-    ELSIF has_priority AND has_tags THEN
-        EXECUTE insert_query USING trim(p_title), NULLIF(trim(p_description), ''), p_priority, generated_tags INTO new_task_id;
-    ELSIF has_due_date AND has_tags THEN
-        EXECUTE insert_query USING trim(p_title), NULLIF(trim(p_description), ''), p_due_date, generated_tags INTO new_task_id;
-    ELSIF has_due_time AND has_tags THEN
-        EXECUTE insert_query USING trim(p_title), NULLIF(trim(p_description), ''), p_due_time, generated_tags INTO new_task_id;
-    ELSIF has_tags THEN
-        EXECUTE insert_query USING trim(p_title), NULLIF(trim(p_description), ''), generated_tags INTO new_task_id;
-    ELSIF has_priority AND has_due_date AND has_due_time THEN
-        EXECUTE insert_query USING trim(p_title), NULLIF(trim(p_description), ''), p_priority, p_due_date, p_due_time INTO new_task_id;
-    ELSIF has_priority AND has_due_date THEN
-        EXECUTE insert_query USING trim(p_title), NULLIF(trim(p_description), ''), p_priority, p_due_date INTO new_task_id;
-    ELSIF has_priority AND has_due_time THEN
-        EXECUTE insert_query USING trim(p_title), NULLIF(trim(p_description), ''), p_priority, p_due_time INTO new_task_id;
-    ELSIF has_priority THEN
-        EXECUTE insert_query USING trim(p_title), NULLIF(trim(p_description), ''), p_priority INTO new_task_id;
-    ELSIF has_due_date AND has_due_time THEN
-        EXECUTE insert_query USING trim(p_title), NULLIF(trim(p_description), ''), p_due_date, p_due_time INTO new_task_id;
-    ELSIF has_due_date THEN
-        EXECUTE insert_query USING trim(p_title), NULLIF(trim(p_description), ''), p_due_date INTO new_task_id;
-    ELSIF has_due_time THEN
-        EXECUTE insert_query USING trim(p_title), NULLIF(trim(p_description), ''), p_due_time INTO new_task_id;
-    ELSE
-        EXECUTE insert_query USING trim(p_title), NULLIF(trim(p_description), '') INTO new_task_id;
-    END IF;
-    
+    INSERT INTO public.task (title, description, priority, due_date, due_time, tags)
+    VALUES (trim(p_title), NULLIF(trim(p_description), ''), p_priority, p_due_date, p_due_time, generated_tags)
+    RETURNING id INTO new_task_id;
+
     -- ✅ FORMATO COMPATIBLE CON TESTS PYTHON
-    SELECT json_build_object(
+    RETURN json_build_object(
         'success', true,
         'id', new_task_id,
         'message', 'Task created successfully',
         'tags_generated', tags_were_generated,
         'generated_tags', generated_tags
-    ) INTO result;
-    
-    RETURN result;
+    );
+
+-- Un valor que la tabla rechaza (p. ej. una prioridad fuera del CHECK) se devuelve como
+-- {success: false}, igual que en motivbot_update_task y motivbot_create_tasks
+EXCEPTION
+    WHEN OTHERS THEN
+        PERFORM motivbot_count_rpc_error('motivbot_create_task', SQLERRM);
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Error creating task: ' || SQLERRM
+        );
 END;
 $$;
 
@@ -448,11 +300,6 @@ SECURITY DEFINER
 AS $$
 DECLARE
     new_conversation_id BIGINT;
-    result JSON;
-    insert_query TEXT;
-    has_tokens_used BOOLEAN := FALSE;
-    has_model_used BOOLEAN := FALSE;
-    has_emotional_state BOOLEAN := FALSE;
 BEGIN
     -- Verificar que la tarea existe
     IF NOT EXISTS (SELECT 1 FROM public.task WHERE id = p_task_id) THEN
@@ -461,7 +308,7 @@ BEGIN
             'message', 'Task not found'
         );
     END IF;
-    
+
     -- Validar parámetros
     IF p_role IS NULL OR p_role NOT IN ('user', 'assistant') THEN
         RETURN json_build_object(
@@ -469,98 +316,24 @@ BEGIN
             'message', 'Role must be user or assistant'
         );
     END IF;
-    
+
     IF p_message IS NULL OR trim(p_message) = '' THEN
         RETURN json_build_object(
             'success', false,
             'message', 'Message is required'
         );
     END IF;
-    
-    -- Verificar qué columnas existen
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'conversation' AND column_name = 'tokens_used'
-    ) INTO has_tokens_used;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'conversation' AND column_name = 'model_used'
-    ) INTO has_model_used;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'conversation' AND column_name = 'emotional_state'
-    ) INTO has_emotional_state;
-    
-    -- Construir query de inserción dinámicamente con CAST para role
-    insert_query := 'INSERT INTO public.conversation (task_id, role, message';
-    
-    IF has_emotional_state THEN
-        insert_query := insert_query || ', emotional_state';
-    END IF;
-    
-    IF has_tokens_used THEN
-        insert_query := insert_query || ', tokens_used';
-    END IF;
-    
-    IF has_model_used THEN
-        insert_query := insert_query || ', model_used';
-    END IF;
-    
-    insert_query := insert_query || ') VALUES ($1, $2::conversation_role, $3';
-    
-    IF has_emotional_state THEN
-        insert_query := insert_query || ', $4';
-    END IF;
-    
-    IF has_tokens_used THEN
-        IF has_emotional_state THEN
-            insert_query := insert_query || ', $5';
-        ELSE
-            insert_query := insert_query || ', $4';    
-        END IF;
-    END IF;
-    
-    IF has_model_used THEN
-        IF has_emotional_state AND has_tokens_used THEN
-            insert_query := insert_query || ', $6';
-        ELSIF has_emotional_state OR has_tokens_used THEN
-            insert_query := insert_query || ', $5';
-        ELSE
-            insert_query := insert_query || ', $4';
-        END IF;
-    END IF;
-    
-    insert_query := insert_query || ') RETURNING id';
-    
-    -- Ejecutar inserción según columnas disponibles
-    IF has_emotional_state AND has_tokens_used AND has_model_used THEN
-        EXECUTE insert_query USING p_task_id, p_role, trim(p_message), p_emotional_state, p_tokens_used, p_model_used INTO new_conversation_id;
-    ELSIF has_emotional_state AND has_tokens_used THEN
-        EXECUTE insert_query USING p_task_id, p_role, trim(p_message), p_emotional_state, p_tokens_used INTO new_conversation_id;
-    ELSIF has_emotional_state AND has_model_used THEN
-        EXECUTE insert_query USING p_task_id, p_role, trim(p_message), p_emotional_state, p_model_used INTO new_conversation_id;
-    ELSIF has_tokens_used AND has_model_used THEN
-        EXECUTE insert_query USING p_task_id, p_role, trim(p_message), p_tokens_used, p_model_used INTO new_conversation_id;
-    ELSIF has_emotional_state THEN
-        EXECUTE insert_query USING p_task_id, p_role, trim(p_message), p_emotional_state INTO new_conversation_id;
-    ELSIF has_tokens_used THEN
-        EXECUTE insert_query USING p_task_id, p_role, trim(p_message), p_tokens_used INTO new_conversation_id;
-    ELSIF has_model_used THEN
-        EXECUTE insert_query USING p_task_id, p_role, trim(p_message), p_model_used INTO new_conversation_id;
-    ELSE
-        EXECUTE insert_query USING p_task_id, p_role, trim(p_message) INTO new_conversation_id;
-    END IF;
-    
+
+    INSERT INTO public.conversation (task_id, role, message, emotional_state, tokens_used, model_used)
+    VALUES (p_task_id, p_role::conversation_role, trim(p_message), p_emotional_state, p_tokens_used, p_model_used)
+    RETURNING id INTO new_conversation_id;
+
     -- ✅ FORMATO COMPATIBLE CON TESTS PYTHON
-    SELECT json_build_object(
+    RETURN json_build_object(
         'success', true,
         'id', new_conversation_id,
         'message', 'Conversation created successfully'
-    ) INTO result;
-    
-    RETURN result;
+    );
 END;
 $$;
 
@@ -568,163 +341,34 @@ $$;
 CREATE OR REPLACE FUNCTION motivbot_get_conversations(
     p_task_id BIGINT DEFAULT NULL,
     p_role TEXT DEFAULT NULL,
-    p_limit INTEGER DEFAULT 100
+    p_limit INTEGER DEFAULT 100,
+    p_after_created_at TIMESTAMPTZ DEFAULT NULL,
+    p_after_id BIGINT DEFAULT NULL
 )
 RETURNS JSON
 LANGUAGE plpgsql
+STABLE
 SECURITY DEFINER
+-- Como en motivbot_get_tasks: con p_task_id o sin él el índice es otro, así que nada de plan genérico
+SET plan_cache_mode = force_custom_plan
 AS $$
 DECLARE
     result JSON;
-    has_created_at BOOLEAN := FALSE;
-    has_tokens_used BOOLEAN := FALSE;
-    has_model_used BOOLEAN := FALSE;
-    has_response_time_ms BOOLEAN := FALSE;
-    has_emotional_state BOOLEAN := FALSE;
 BEGIN
-    -- Verificar qué columnas existen en la tabla conversation
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'conversation' AND column_name = 'created_at'
-    ) INTO has_created_at;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'conversation' AND column_name = 'tokens_used'
-    ) INTO has_tokens_used;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'conversation' AND column_name = 'model_used'
-    ) INTO has_model_used;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'conversation' AND column_name = 'response_time_ms'
-    ) INTO has_response_time_ms;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'conversation' AND column_name = 'emotional_state'
-    ) INTO has_emotional_state;
-
     -- ✅ DEVOLVER ARRAY DIRECTO (SIN WRAPPER)
-    IF p_task_id IS NOT NULL AND p_role IS NOT NULL THEN
-        -- Filtrar por task_id y role
-        EXECUTE format('
-            SELECT COALESCE(json_agg(conv_json), ''[]''::json)
-            FROM (
-                SELECT json_build_object(
-                    ''id'', id,
-                    ''task_id'', task_id,
-                    ''role'', role,
-                    ''message'', message,
-                    ''user_is_grateful'', user_is_grateful,
-                    ''user_is_useful'', user_is_useful,
-                    ''assistant_is_useful'', assistant_is_useful,
-                    ''assistant_is_precise'', assistant_is_precise,
-                    ''assistant_is_grateful'', assistant_is_grateful%s%s%s%s%s
-                ) as conv_json
-                FROM public.conversation 
-                WHERE task_id = $1 AND role = $2::conversation_role
-                ORDER BY %s
-                LIMIT $3
-            ) conversations',
-            CASE WHEN has_emotional_state THEN ', ''emotional_state'', emotional_state' ELSE '' END,
-            CASE WHEN has_tokens_used THEN ', ''tokens_used'', tokens_used' ELSE '' END,
-            CASE WHEN has_model_used THEN ', ''model_used'', model_used' ELSE '' END,
-            CASE WHEN has_response_time_ms THEN ', ''response_time_ms'', response_time_ms' ELSE '' END,
-            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
-            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
-        ) USING p_task_id, p_role, p_limit INTO result;
-        
-    ELSIF p_task_id IS NOT NULL THEN
-        -- Filtrar solo por task_id
-        EXECUTE format('
-            SELECT COALESCE(json_agg(conv_json), ''[]''::json)
-            FROM (
-                SELECT json_build_object(
-                    ''id'', id,
-                    ''task_id'', task_id,
-                    ''role'', role,
-                    ''message'', message,
-                    ''user_is_grateful'', user_is_grateful,
-                    ''user_is_useful'', user_is_useful,
-                    ''assistant_is_useful'', assistant_is_useful,
-                    ''assistant_is_precise'', assistant_is_precise,
-                    ''assistant_is_grateful'', assistant_is_grateful%s%s%s%s%s
-                ) as conv_json
-                FROM public.conversation 
-                WHERE task_id = $1
-                ORDER BY %s
-                LIMIT $2
-            ) conversations',
-            CASE WHEN has_emotional_state THEN ', ''emotional_state'', emotional_state' ELSE '' END,
-            CASE WHEN has_tokens_used THEN ', ''tokens_used'', tokens_used' ELSE '' END,
-            CASE WHEN has_model_used THEN ', ''model_used'', model_used' ELSE '' END,
-            CASE WHEN has_response_time_ms THEN ', ''response_time_ms'', response_time_ms' ELSE '' END,
-            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
-            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
-        ) USING p_task_id, p_limit INTO result;
-        
-    ELSIF p_role IS NOT NULL THEN
-        -- Filtrar solo por role
-        EXECUTE format('
-            SELECT COALESCE(json_agg(conv_json), ''[]''::json)
-            FROM (
-                SELECT json_build_object(
-                    ''id'', id,
-                    ''task_id'', task_id,
-                    ''role'', role,
-                    ''message'', message,
-                    ''user_is_grateful'', user_is_grateful,
-                    ''user_is_useful'', user_is_useful,
-                    ''assistant_is_useful'', assistant_is_useful,
-                    ''assistant_is_precise'', assistant_is_precise,
-                    ''assistant_is_grateful'', assistant_is_grateful%s%s%s%s%s
-                ) as conv_json
-                FROM public.conversation 
-                WHERE role = $1::conversation_role
-                ORDER BY %s
-                LIMIT $2
-            ) conversations',
-            CASE WHEN has_emotional_state THEN ', ''emotional_state'', emotional_state' ELSE '' END,
-            CASE WHEN has_tokens_used THEN ', ''tokens_used'', tokens_used' ELSE '' END,
-            CASE WHEN has_model_used THEN ', ''model_used'', model_used' ELSE '' END,
-            CASE WHEN has_response_time_ms THEN ', ''response_time_ms'', response_time_ms' ELSE '' END,
-            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
-            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
-        ) USING p_role, p_limit INTO result;
-        
-    ELSE
-        -- Sin filtros
-        EXECUTE format('
-            SELECT COALESCE(json_agg(conv_json), ''[]''::json)
-            FROM (
-                SELECT json_build_object(
-                    ''id'', id,
-                    ''task_id'', task_id,
-                    ''role'', role,
-                    ''message'', message,
-                    ''user_is_grateful'', user_is_grateful,
-                    ''user_is_useful'', user_is_useful,
-                    ''assistant_is_useful'', assistant_is_useful,
-                    ''assistant_is_precise'', assistant_is_precise,
-                    ''assistant_is_grateful'', assistant_is_grateful%s%s%s%s%s
-                ) as conv_json
-                FROM public.conversation 
-                ORDER BY %s
-                LIMIT $1
-            ) conversations',
-            CASE WHEN has_emotional_state THEN ', ''emotional_state'', emotional_state' ELSE '' END,
-            CASE WHEN has_tokens_used THEN ', ''tokens_used'', tokens_used' ELSE '' END,
-            CASE WHEN has_model_used THEN ', ''model_used'', model_used' ELSE '' END,
-            CASE WHEN has_response_time_ms THEN ', ''response_time_ms'', response_time_ms' ELSE '' END,
-            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
-            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
-        ) USING p_limit INTO result;
-    END IF;
-    
+    -- Cursor igual que en motivbot_get_tasks (idx_conversation_task_created_at_id / idx_conversation_created_at_id)
+    SELECT COALESCE(json_agg(motivbot_conversation_json(c) ORDER BY c.created_at DESC, c.id DESC), '[]'::json)
+    INTO result
+    FROM (
+        SELECT *
+        FROM public.conversation
+        WHERE (p_task_id IS NULL OR task_id = p_task_id)
+          AND (p_role IS NULL OR role = p_role::conversation_role)
+          AND (p_after_created_at IS NULL OR (created_at, id) < (p_after_created_at, COALESCE(p_after_id, 0)))
+        ORDER BY created_at DESC, id DESC
+        LIMIT p_limit
+    ) c;
+
     RETURN result;
 END;
 $$;
@@ -744,17 +388,6 @@ RETURNS JSON
 LANGUAGE plpgsql
 SECURITY DEFINER
 AS $$
-DECLARE
-    result JSON;
-    update_query TEXT;
-    set_clauses TEXT[] := ARRAY[]::TEXT[];
-    param_values TEXT[] := ARRAY[]::TEXT[];
-    param_count INTEGER := 1;
-    has_priority BOOLEAN := FALSE;
-    has_due_date BOOLEAN := FALSE;
-    has_due_time BOOLEAN := FALSE;
-    has_tags BOOLEAN := FALSE;
-    has_updated_at BOOLEAN := FALSE;
 BEGIN
     -- Verificar que la tarea existe
     IF NOT EXISTS (SELECT 1 FROM public.task WHERE id = p_task_id) THEN
@@ -763,136 +396,79 @@ BEGIN
             'message', 'Task not found'
         );
     END IF;
-    
-    -- Verificar qué columnas existen
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'priority'
-    ) INTO has_priority;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'due_date'
-    ) INTO has_due_date;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'due_time'
-    ) INTO has_due_time;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'tags'
-    ) INTO has_tags;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'updated_at'
-    ) INTO has_updated_at;
-    
-    -- Construir cláusulas SET dinámicamente
-    IF p_title IS NOT NULL THEN
-        param_count := param_count + 1;
-        set_clauses := array_append(set_clauses, format('title = $%s', param_count));
-        param_values := array_append(param_values, trim(p_title));
-    END IF;
-    
-    IF p_description IS NOT NULL THEN
-        param_count := param_count + 1;
-        set_clauses := array_append(set_clauses, format('description = $%s', param_count));
-        param_values := array_append(param_values, NULLIF(trim(p_description), ''));
-    END IF;
-    
-    IF p_status IS NOT NULL THEN
-        param_count := param_count + 1;
-        set_clauses := array_append(set_clauses, format('status = $%s::task_status', param_count));
-        param_values := array_append(param_values, p_status);
-    END IF;
-    
-    IF p_priority IS NOT NULL AND has_priority THEN
-        param_count := param_count + 1;
-        set_clauses := array_append(set_clauses, format('priority = $%s', param_count));
-        param_values := array_append(param_values, p_priority);
-    END IF;
-    
-    IF p_due_date IS NOT NULL AND has_due_date THEN
-        param_count := param_count + 1;
-        set_clauses := array_append(set_clauses, format('due_date = $%s', param_count));
-        param_values := array_append(param_values, p_due_date::TEXT);
-    END IF;
-    
-    IF p_due_time IS NOT NULL AND has_due_time THEN
-        param_count := param_count + 1;
-        set_clauses := array_append(set_clauses, format('due_time = $%s', param_count));
-        param_values := array_append(param_values, p_due_time::TEXT);
-    END IF;
-    
-    IF p_tags IS NOT NULL AND has_tags THEN
-        param_count := param_count + 1;
-        set_clauses := array_append(set_clauses, format('tags = $%s', param_count));
-        param_values := array_append(param_values, array_to_string(p_tags, ','));
-    END IF;
-    
-    IF has_updated_at THEN
-        set_clauses := array_append(set_clauses, 'updated_at = CURRENT_TIMESTAMP');
-    END IF;
-    
-    -- Si no hay nada que actualizar
-    IF array_length(set_clauses, 1) IS NULL OR array_length(set_clauses, 1) = 0 THEN
-        RETURN json_build_object(
-            'success', false,
-            'message', 'No fields to update'
-        );
-    END IF;
-    
-    -- Construir query completo
-    update_query := format('UPDATE public.task SET %s WHERE id = $1', array_to_string(set_clauses, ', '));
-    
-    -- Ejecutar update con manejo simplificado
+
+    -- Un único UPDATE estático con la semántica de la versión dinámica: un parámetro a NULL conserva el
+    -- valor actual (PostgREST no distingue un argumento omitido de uno a null) y una descripción vacía
+    -- la borra. Ningún otro campo se podía ni se puede poner a NULL desde esta RPC.
     BEGIN
-        IF p_title IS NOT NULL AND p_description IS NOT NULL AND p_status IS NOT NULL THEN
-            EXECUTE update_query USING p_task_id, trim(p_title), NULLIF(trim(p_description), ''), p_status;
-        ELSIF p_title IS NOT NULL AND p_status IS NOT NULL THEN
-            EXECUTE update_query USING p_task_id, trim(p_title), p_status;
-        ELSIF p_title IS NOT NULL AND p_tags IS NOT NULL AND has_tags THEN
-            EXECUTE update_query USING p_task_id, trim(p_title), p_tags;
-        ELSIF p_tags IS NOT NULL AND has_tags THEN
-            EXECUTE update_query USING p_task_id, p_tags;
-        ELSIF p_title IS NOT NULL THEN
-            EXECUTE update_query USING p_task_id, trim(p_title);
-        ELSIF p_status IS NOT NULL THEN
-            EXECUTE update_query USING p_task_id, p_status;
-        ELSIF p_due_date IS NOT NULL AND p_due_time IS NOT NULL THEN
-            EXECUTE update_query USING p_task_id, p_due_date, p_due_time;
-        ELSIF p_due_date IS NOT NULL THEN
-            EXECUTE update_query USING p_task_id, p_due_date;
-        ELSIF p_due_time IS NOT NULL THEN
-            EXECUTE update_query USING p_task_id, p_due_time;
-        ELSE
-            -- Fallback genérico para otros casos
-            EXECUTE format('UPDATE public.task SET %s WHERE id = %s', 
-                          array_to_string(set_clauses, ', '), p_task_id);
-        END IF;
-        
+        UPDATE public.task SET
+            title = COALESCE(trim(p_title), title),
+            description = CASE WHEN p_description IS NULL THEN description ELSE NULLIF(trim(p_description), '') END,
+            status = COALESCE(p_status::task_status, status),
+            priority = COALESCE(p_priority, priority),
+            due_date = COALESCE(p_due_date, due_date),
+            due_time = COALESCE(p_due_time, due_time),
+            tags = COALESCE(p_tags, tags),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = p_task_id;
+
         EXCEPTION WHEN OTHERS THEN
+            PERFORM motivbot_count_rpc_error('motivbot_update_task', SQLERRM);
             RETURN json_build_object(
                 'success', false,
                 'message', 'Error updating task: ' || SQLERRM
             );
     END;
-    
+
     -- ✅ FORMATO COMPATIBLE CON TESTS PYTHON
-    SELECT json_build_object(
+    RETURN json_build_object(
         'success', true,
         'message', 'Task updated successfully',
         'id', p_task_id
-    ) INTO result;
-    
-    RETURN result;
+    );
 END;
 $$;
 
--- 5. BUSCAR TAREAS (FUNCIÓN FALTANTE)
+-- 5. BUSCAR TAREAS (TEXTO COMPLETO EN ESPAÑOL, ORDENADAS POR RELEVANCIA)
+-- Convierte lo que escribe el usuario en una tsquery: palabras completas salvo la última,
+-- que se busca por prefijo ('revisar inf' -> 'revis' & 'inf':*)
+CREATE OR REPLACE FUNCTION motivbot_search_query(p_search TEXT)
+RETURNS TSQUERY
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT to_tsquery('spanish'::regconfig, string_agg(
+        quote_literal(w.word) || CASE WHEN w.position = cardinality(words) THEN ':*' ELSE '' END,
+        ' & ' ORDER BY w.position
+    ))
+    FROM regexp_split_to_array(btrim(regexp_replace(motivbot_search_text(p_search), '[^[:alnum:]]+', ' ', 'g')), ' ') AS words,
+         unnest(words) WITH ORDINALITY AS w(word, position)
+    WHERE w.word <> ''
+$$;
+
+-- La misma tsquery limitada a unas partes del vector: con 'A' las palabras solo coinciden en el título
+CREATE OR REPLACE FUNCTION motivbot_search_query(p_search TEXT, p_weights TEXT)
+RETURNS TSQUERY
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT to_tsquery('spanish'::regconfig, string_agg(
+        quote_literal(w.word) || ':' || CASE WHEN w.position = cardinality(words) THEN '*' ELSE '' END || p_weights,
+        ' & ' ORDER BY w.position
+    ))
+    FROM regexp_split_to_array(btrim(regexp_replace(motivbot_search_text(p_search), '[^[:alnum:]]+', ' ', 'g')), ' ') AS words,
+         unnest(words) WITH ORDINALITY AS w(word, position)
+    WHERE w.word <> ''
+$$;
+
+-- Ordena por relevancia un conjunto acotado de candidatos: las p_limit * 5 tareas más recientes que coinciden
+-- en el título, las que coinciden en título o descripción y, con p_search_tags, las que tienen un tag que
+-- coincide. Cada grupo es un LIMIT sobre idx_task_search_vector/idx_task_tags o un recorrido de
+-- idx_task_created_at_id que para al llenarse, así que un término que aparece en cientos de miles de tareas
+-- no obliga a puntuarlas todas. Una coincidencia en el título gana a cualquier número de coincidencias más
+-- recientes en la descripción; entre muchas de igual relevancia van primero las más recientes.
+-- Con p_search_tags un tag coincide si contiene el texto (literal: % y _ no son comodines), sin distinguir
+-- mayúsculas; los tags se buscan en motivbot_tag_count (uno por tag distinto, no por tarea).
 CREATE OR REPLACE FUNCTION motivbot_search_tasks(
     p_search TEXT,
     p_search_tags BOOLEAN DEFAULT false,
@@ -900,103 +476,50 @@ CREATE OR REPLACE FUNCTION motivbot_search_tasks(
 )
 RETURNS JSON
 LANGUAGE plpgsql
+STABLE
 SECURITY DEFINER
+-- Recorrer el índice del término o idx_task_created_at_id depende de lo frecuente que sea: plan con los valores
+SET plan_cache_mode = force_custom_plan
 AS $$
 DECLARE
     result JSON;
-    has_tags BOOLEAN := FALSE;
-    has_created_at BOOLEAN := FALSE;
-    has_updated_at BOOLEAN := FALSE;
-    has_due_date BOOLEAN := FALSE;
-    has_due_time BOOLEAN := FALSE;
-    has_priority BOOLEAN := FALSE;
+    search_query TSQUERY := motivbot_search_query(p_search);
+    title_query TSQUERY := motivbot_search_query(p_search, 'A');
+    search_tags TEXT[] := '{}';
+    candidates INTEGER := p_limit * 5;
 BEGIN
-    -- Verificar qué columnas existen
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'tags'
-    ) INTO has_tags;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'created_at'
-    ) INTO has_created_at;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'updated_at'
-    ) INTO has_updated_at;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'due_date'
-    ) INTO has_due_date;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'due_time'
-    ) INTO has_due_time;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'priority'
-    ) INTO has_priority;
-
-    -- Buscar en título, descripción y opcionalmente en tags
-    IF p_search_tags AND has_tags THEN
-        EXECUTE format('
-            SELECT COALESCE(json_agg(task_json), ''[]''::json)
-            FROM (
-                SELECT json_build_object(
-                    ''id'', id,
-                    ''title'', title,
-                    ''description'', description,
-                    ''status'', status%s%s%s%s%s%s
-                ) as task_json
-                FROM public.task 
-                WHERE LOWER(title) LIKE LOWER($1) 
-                   OR LOWER(description) LIKE LOWER($1)
-                   OR EXISTS (
-                       SELECT 1 FROM unnest(tags) as tag 
-                       WHERE LOWER(tag) LIKE LOWER($1)
-                   )
-                ORDER BY %s
-                LIMIT $2
-            ) tasks',
-            CASE WHEN has_priority THEN ', ''priority'', priority' ELSE '' END,
-            CASE WHEN has_tags THEN ', ''tags'', tags' ELSE '' END,
-            CASE WHEN has_due_date THEN ', ''due_date'', due_date' ELSE '' END,
-            CASE WHEN has_due_time THEN ', ''due_time'', due_time' ELSE '' END,
-            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
-            CASE WHEN has_updated_at THEN ', ''updated_at'', updated_at' ELSE '' END,
-            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
-        ) USING '%' || p_search || '%', p_limit INTO result;
-    ELSE
-        EXECUTE format('
-            SELECT COALESCE(json_agg(task_json), ''[]''::json)
-            FROM (
-                SELECT json_build_object(
-                    ''id'', id,
-                    ''title'', title,
-                    ''description'', description,
-                    ''status'', status%s%s%s%s%s%s
-                ) as task_json
-                FROM public.task 
-                WHERE LOWER(title) LIKE LOWER($1) 
-                   OR LOWER(description) LIKE LOWER($1)
-                ORDER BY %s
-                LIMIT $2
-            ) tasks',
-            CASE WHEN has_priority THEN ', ''priority'', priority' ELSE '' END,
-            CASE WHEN has_tags THEN ', ''tags'', tags' ELSE '' END,
-            CASE WHEN has_due_date THEN ', ''due_date'', due_date' ELSE '' END,
-            CASE WHEN has_due_time THEN ', ''due_time'', due_time' ELSE '' END,
-            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
-            CASE WHEN has_updated_at THEN ', ''updated_at'', updated_at' ELSE '' END,
-            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
-        ) USING '%' || p_search || '%', p_limit INTO result;
+    IF p_search_tags THEN
+        search_tags := ARRAY(
+            SELECT c.tag FROM public.motivbot_tag_count c
+            WHERE lower(c.tag) LIKE '%' || replace(replace(replace(lower(p_search), '\', '\\'), '%', '\%'), '_', '\_') || '%'
+        );
     END IF;
-    
+
+    -- El título pesa más que la descripción; un tag que coincide pone la tarea por delante
+    SELECT COALESCE(json_agg(motivbot_task_json(ranked.task) ORDER BY ranked.rank DESC, (ranked.task).created_at DESC), '[]'::json)
+    INTO result
+    FROM (
+        SELECT t AS task,
+               COALESCE(ts_rank_cd(t.search_vector, search_query), 0)
+                   + CASE WHEN t.tags && search_tags THEN 1 ELSE 0 END AS rank
+        FROM public.task t
+        WHERE t.id IN (
+            (SELECT c.id FROM public.task c
+             WHERE c.search_vector @@ title_query
+             ORDER BY c.created_at DESC, c.id DESC LIMIT candidates)
+            UNION
+            (SELECT c.id FROM public.task c
+             WHERE c.search_vector @@ search_query
+             ORDER BY c.created_at DESC, c.id DESC LIMIT candidates)
+            UNION
+            (SELECT c.id FROM public.task c
+             WHERE cardinality(search_tags) > 0 AND c.tags && search_tags
+             ORDER BY c.created_at DESC, c.id DESC LIMIT candidates)
+        )
+        ORDER BY rank DESC, t.created_at DESC
+        LIMIT p_limit
+    ) ranked;
+
     RETURN result;
 END;
 $$;
@@ -1015,12 +538,6 @@ RETURNS JSON
 LANGUAGE plpgsql
 SECURITY DEFINER
 AS $$
-DECLARE
-    result JSON;
-    update_query TEXT;
-    set_clauses TEXT[] := ARRAY[]::TEXT[];
-    has_emotional_state BOOLEAN := FALSE;
-    has_updated_at BOOLEAN := FALSE;
 BEGIN
     -- Verificar que la conversación existe
     IF NOT EXISTS (SELECT 1 FROM public.conversation WHERE id = p_conversation_id) THEN
@@ -1029,78 +546,33 @@ BEGIN
             'message', 'Conversation not found'
         );
     END IF;
-    
-    -- Verificar qué columnas existen
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'conversation' AND column_name = 'emotional_state'
-    ) INTO has_emotional_state;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'conversation' AND column_name = 'updated_at'
-    ) INTO has_updated_at;
-    
-    -- Construir cláusulas SET dinámicamente (CORREGIDO)
-    IF p_user_is_grateful IS NOT NULL THEN
-        set_clauses := array_append(set_clauses, 'user_is_grateful = ' || p_user_is_grateful::TEXT);
-    END IF;
-    
-    IF p_user_is_useful IS NOT NULL THEN
-        set_clauses := array_append(set_clauses, 'user_is_useful = ' || p_user_is_useful::TEXT);
-    END IF;
-    
-    IF p_assistant_is_useful IS NOT NULL THEN
-        set_clauses := array_append(set_clauses, 'assistant_is_useful = ' || p_assistant_is_useful::TEXT);
-    END IF;
-    
-    IF p_assistant_is_precise IS NOT NULL THEN
-        set_clauses := array_append(set_clauses, 'assistant_is_precise = ' || p_assistant_is_precise::TEXT);
-    END IF;
-    
-    IF p_assistant_is_grateful IS NOT NULL THEN
-        set_clauses := array_append(set_clauses, 'assistant_is_grateful = ' || p_assistant_is_grateful::TEXT);
-    END IF;
-    
-    IF p_emotional_state IS NOT NULL AND has_emotional_state THEN
-        set_clauses := array_append(set_clauses, 'emotional_state = ''' || p_emotional_state || '''');
-    END IF;
-    
-    IF has_updated_at THEN
-        set_clauses := array_append(set_clauses, 'updated_at = CURRENT_TIMESTAMP');
-    END IF;
-    
-    -- Si no hay nada que actualizar
-    IF array_length(set_clauses, 1) IS NULL OR array_length(set_clauses, 1) = 0 THEN
-        RETURN json_build_object(
-            'success', false,
-            'message', 'No fields to update'
-        );
-    END IF;
-    
-    -- Construir y ejecutar query (CORREGIDO)
-    update_query := 'UPDATE public.conversation SET ' || 
-                   array_to_string(set_clauses, ', ') || 
-                   ' WHERE id = ' || p_conversation_id::TEXT;
-    
+
+    -- UPDATE estático con parámetros (sin concatenar valores en el SQL)
     BEGIN
-        EXECUTE update_query;
-        
+        UPDATE public.conversation SET
+            user_is_grateful = COALESCE(p_user_is_grateful, user_is_grateful),
+            user_is_useful = COALESCE(p_user_is_useful, user_is_useful),
+            assistant_is_useful = COALESCE(p_assistant_is_useful, assistant_is_useful),
+            assistant_is_precise = COALESCE(p_assistant_is_precise, assistant_is_precise),
+            assistant_is_grateful = COALESCE(p_assistant_is_grateful, assistant_is_grateful),
+            emotional_state = COALESCE(p_emotional_state, emotional_state),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = p_conversation_id;
+
         EXCEPTION WHEN OTHERS THEN
+            PERFORM motivbot_count_rpc_error('motivbot_update_conversation_feedback', SQLERRM);
             RETURN json_build_object(
                 'success', false,
                 'message', 'Error updating conversation feedback: ' || SQLERRM
             );
     END;
-    
+
     -- ✅ FORMATO COMPATIBLE CON TESTS PYTHON
-    SELECT json_build_object(
+    RETURN json_build_object(
         'success', true,
         'message', 'Conversation feedback updated successfully',
         'id', p_conversation_id
-    ) INTO result;
-    
-    RETURN result;
+    );
 END;
 $$;
 
@@ -1137,6 +609,7 @@ BEGIN
     
 EXCEPTION
     WHEN OTHERS THEN
+        PERFORM motivbot_count_rpc_error('motivbot_delete_conversation', SQLERRM);
         RETURN json_build_object(
             'success', false,
             'message', 'Error deleting conversation: ' || SQLERRM
@@ -1180,6 +653,7 @@ BEGIN
     
 EXCEPTION
     WHEN OTHERS THEN
+        PERFORM motivbot_count_rpc_error('motivbot_delete_task', SQLERRM);
         RETURN json_build_object(
             'success', false,
             'message', 'Error deleting task: ' || SQLERRM
@@ -1191,134 +665,2812 @@ $$;
 CREATE OR REPLACE FUNCTION motivbot_get_dashboard()
 RETURNS JSON
 LANGUAGE plpgsql
+STABLE
 SECURITY DEFINER
 AS $$
 DECLARE
-    result JSON;
     task_stats JSON;
     conversation_stats JSON;
     tag_stats JSON;
     completion_rate NUMERIC;
     active_tasks INTEGER;
-    has_tags BOOLEAN := FALSE;
-    has_priority BOOLEAN := FALSE;
-    has_due_date BOOLEAN := FALSE;
-    has_tokens_used BOOLEAN := FALSE;
 BEGIN
-    -- Verificar qué columnas existen
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'tags'
-    ) INTO has_tags;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'priority'
-    ) INTO has_priority;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'due_date'
-    ) INTO has_due_date;
-    
-    SELECT EXISTS (
-        SELECT 1 FROM information_schema.columns 
-        WHERE table_schema = 'public' AND table_name = 'conversation' AND column_name = 'tokens_used'
-    ) INTO has_tokens_used;
-    
-    -- Estadísticas de tareas (CORREGIDO: usar guiones en lugar de guiones bajos)
-    IF has_priority AND has_due_date THEN
-        SELECT json_build_object(
-            'total', COUNT(*),
-            'pending', COUNT(*) FILTER (WHERE status = 'pending'),
-            'in_progress', COUNT(*) FILTER (WHERE status = 'in-progress'),
-            'on_hold', COUNT(*) FILTER (WHERE status = 'on-hold'),
-            'completed', COUNT(*) FILTER (WHERE status = 'completed'),
-            'cancelled', COUNT(*) FILTER (WHERE status = 'cancelled'),
-            'high_priority', COUNT(*) FILTER (WHERE priority = 'high'),
-            'overdue', COUNT(*) FILTER (WHERE due_date < CURRENT_DATE AND status NOT IN ('completed', 'cancelled'))
-        ) INTO task_stats FROM public.task;
-    ELSE
-        SELECT json_build_object(
-            'total', COUNT(*),
-            'pending', COUNT(*) FILTER (WHERE status = 'pending'),
-            'in_progress', COUNT(*) FILTER (WHERE status = 'in-progress'),
-            'on_hold', COUNT(*) FILTER (WHERE status = 'on-hold'),
-            'completed', COUNT(*) FILTER (WHERE status = 'completed'),
-            'cancelled', COUNT(*) FILTER (WHERE status = 'cancelled'),
-            'high_priority', 0,
-            'overdue', 0
-        ) INTO task_stats FROM public.task;
-    END IF;
-    
-    -- Estadísticas de conversaciones
-    IF has_tokens_used THEN
-        SELECT json_build_object(
-            'total', COUNT(*),
-            'user_messages', COUNT(*) FILTER (WHERE role = 'user'),
-            'assistant_messages', COUNT(*) FILTER (WHERE role = 'assistant'),
-            'total_tokens', COALESCE(SUM(tokens_used), 0),
-            'grateful_responses', COUNT(*) FILTER (WHERE user_is_grateful = true)
-        ) INTO conversation_stats FROM public.conversation;
-    ELSE
-        SELECT json_build_object(
-            'total', COUNT(*),
-            'user_messages', COUNT(*) FILTER (WHERE role = 'user'),
-            'assistant_messages', COUNT(*) FILTER (WHERE role = 'assistant'),
-            'total_tokens', 0,
-            'grateful_responses', COUNT(*) FILTER (WHERE user_is_grateful = true)
-        ) INTO conversation_stats FROM public.conversation;
-    END IF;
+    -- Lectura de los contadores que mantienen los triggers (sección 14), sin recorrer task ni conversation
+    WITH counters AS (
+        SELECT
+            COALESCE(SUM(value) FILTER (WHERE scope = 'task'), 0) AS total,
+            COALESCE(SUM(value) FILTER (WHERE scope = 'status' AND key = 'pending'), 0) AS pending,
+            COALESCE(SUM(value) FILTER (WHERE scope = 'status' AND key = 'in-progress'), 0) AS in_progress,
+            COALESCE(SUM(value) FILTER (WHERE scope = 'status' AND key = 'on-hold'), 0) AS on_hold,
+            COALESCE(SUM(value) FILTER (WHERE scope = 'status' AND key = 'completed'), 0) AS completed,
+            COALESCE(SUM(value) FILTER (WHERE scope = 'status' AND key = 'cancelled'), 0) AS cancelled,
+            COALESCE(SUM(value) FILTER (WHERE scope = 'priority' AND key = 'high'), 0) AS high_priority,
+            COALESCE(SUM(value) FILTER (WHERE scope = 'open_due' AND key < to_char(CURRENT_DATE, 'YYYY-MM-DD')), 0) AS overdue,
+            COALESCE(SUM(value) FILTER (WHERE scope = 'conversation' AND key = 'total'), 0) AS conversations,
+            COALESCE(SUM(value) FILTER (WHERE scope = 'role' AND key = 'user'), 0) AS user_messages,
+            COALESCE(SUM(value) FILTER (WHERE scope = 'role' AND key = 'assistant'), 0) AS assistant_messages,
+            COALESCE(SUM(value) FILTER (WHERE scope = 'conversation' AND key = 'tokens'), 0) AS total_tokens,
+            COALESCE(SUM(value) FILTER (WHERE scope = 'conversation' AND key = 'grateful'), 0) AS grateful_responses
+        FROM public.motivbot_dashboard_counter
+        WHERE scope IN ('task', 'status', 'priority', 'open_due', 'conversation', 'role')
+    )
+    SELECT
+        json_build_object(
+            'total', total,
+            'pending', pending,
+            'in_progress', in_progress,
+            'on_hold', on_hold,
+            'completed', completed,
+            'cancelled', cancelled,
+            'high_priority', high_priority,
+            'overdue', overdue
+        ),
+        json_build_object(
+            'total', conversations,
+            'user_messages', user_messages,
+            'assistant_messages', assistant_messages,
+            'total_tokens', total_tokens,
+            'grateful_responses', grateful_responses
+        ),
+        CASE WHEN total = 0 THEN 0 ELSE ROUND((completed::NUMERIC / total) * 100, 2) END,
+        pending + in_progress + on_hold
+    INTO task_stats, conversation_stats, completion_rate, active_tasks
+    FROM counters;
+
+    -- Estadísticas de tags (top 10 leído de idx_motivbot_dashboard_counter_top)
+    WITH tag_counts AS (
+        SELECT key AS tag, value AS count
+        FROM public.motivbot_dashboard_counter
+        WHERE scope = 'tag'
+        ORDER BY value DESC, key
+        LIMIT 10
+    )
+    SELECT json_build_object(
+        'total_unique', COUNT(DISTINCT tag),
+        'most_used', COALESCE(json_agg(json_build_object('tag', tag, 'count', count)), '[]'::json)
+    ) INTO tag_stats FROM tag_counts;
+
+    -- Construir resultado final
+    RETURN json_build_object(
+        'tasks', task_stats,
+        'conversations', conversation_stats,
+        'tags', tag_stats,
+        'completion_rate', completion_rate,
+        'active_tasks', active_tasks
+    );
+
+EXCEPTION
+    WHEN OTHERS THEN
+        PERFORM motivbot_count_rpc_error('motivbot_get_dashboard', SQLERRM);
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Error retrieving dashboard: ' || SQLERRM
+        );
+END;
+$$;
+
+-- 10. OBTENER TAGS POPULARES
+CREATE OR REPLACE FUNCTION motivbot_get_popular_tags(
+    p_limit INTEGER DEFAULT 20
+)
+RETURNS JSON
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+AS $$
+DECLARE
+    result JSON;
+BEGIN
+    -- Top-N leído de idx_motivbot_tag_count_top (sección 19): número de tareas con cada tag
+    SELECT COALESCE(json_agg(json_build_object('tag', tag, 'count', task_count)), '[]'::json)
+    INTO result
+    FROM (
+        SELECT tag, task_count
+        FROM public.motivbot_tag_count
+        ORDER BY task_count DESC, tag
+        LIMIT p_limit
+    ) tag_counts;
+
+    RETURN result;
+END;
+$$;
+
+-- 11. OBTENER MENSAJES MOTIVACIONALES (POR TAREA, TAGS O ESTADO)
+CREATE OR REPLACE FUNCTION motivbot_get_motivational_messages(
+    p_task_id BIGINT DEFAULT NULL,
+    p_tags TEXT[] DEFAULT NULL,
+    p_estado TEXT DEFAULT NULL,
+    p_limit INTEGER DEFAULT 5
+)
+RETURNS JSON
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+AS $$
+DECLARE
+    result JSON;
+    search_tags TEXT[] := p_tags;
+    match_tags TEXT[];
+    match_ids INTEGER[] := '{}';
+BEGIN
+    -- Usar los tags de la tarea si se indica una
+    IF p_task_id IS NOT NULL THEN
+        SELECT tags INTO search_tags FROM public.task WHERE id = p_task_id;
+
+        IF NOT FOUND THEN
+            RETURN json_build_object(
+                'success', false,
+                'message', 'Task not found'
+            );
+        END IF;
+
+        -- Relevancia precalculada para los tags de la tarea (sección 20, al día por los triggers): los que
+        -- más tags comparten, al azar entre los de igual puntuación
+        match_tags := motivbot_tag_set(search_tags);
+
+        IF cardinality(match_tags) > 0 AND p_limit > 0 THEN
+            -- Primero los ids y después los mensajes por clave primaria, como get_random_chibi_messages
+            match_ids := ARRAY(
+                SELECT m.message_id
+                FROM public.motivbot_message_match m
+                WHERE m.tag_set = match_tags
+                  AND (p_estado IS NULL OR m.estado = p_estado)
+                ORDER BY m.score DESC, random()
+                LIMIT p_limit
+            );
+        END IF;
+    END IF;
+
+    -- Con menos candidatos que p_limit (o sin tarea) se completa con el muestreo por índice de
+    -- get_random_chibi_messages en lugar de ORDER BY RANDOM(). Devuelve p_limit mensajes distintos: quitando
+    -- los que ya están quedan al menos los que faltan
+    IF cardinality(match_ids) < p_limit THEN
+        match_ids := match_ids || ARRAY(
+            SELECT sampled.id
+            FROM get_random_chibi_messages(p_limit, p_estado, search_tags) AS sampled
+            WHERE sampled.id <> ALL (match_ids)
+            LIMIT p_limit - cardinality(match_ids)
+        );
+    END IF;
+
+    SELECT COALESCE(json_agg(json_build_object(
+        'id', cm.id,
+        'mensaje', cm.mensaje,
+        'estado', cm.estado,
+        'tags', cm.tags,
+        'created_at', cm.created_at
+    ) ORDER BY picked.ord), '[]'::json)
+    INTO result
+    FROM unnest(match_ids) WITH ORDINALITY AS picked(id, ord)
+    JOIN chibi_messages cm ON cm.id = picked.id;
+
+    RETURN result;
+END;
+$$;
+
+-- 12. CREAR TAREAS EN BLOQUE (UNA SOLA SENTENCIA PARA N FILAS)
+-- p_tasks: array JSON de objetos {title, description, status, priority, due_date, due_time, tags, created_at}
+-- (created_at opcional, como en motivbot_create_conversations, para conservar la fecha de una importación)
+CREATE OR REPLACE FUNCTION motivbot_create_tasks(
+    p_tasks JSONB
+)
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    new_task_ids BIGINT[];
+BEGIN
+    -- Validar entrada
+    IF p_tasks IS NULL OR jsonb_typeof(p_tasks) <> 'array' THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Tasks must be a JSON array'
+        );
+    END IF;
+    
+    IF EXISTS (
+        SELECT 1 FROM jsonb_array_elements(p_tasks) AS t(task)
+        WHERE COALESCE(trim(task->>'title'), '') = ''
+    ) THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Title is required for every task'
+        );
+    END IF;
+    
+    -- Insertar todas las filas en una sola sentencia. El id se toma de la secuencia junto a la posición de
+    -- entrada (RETURNING no puede devolver columnas de input), así ids[i] es siempre la fila i de p_tasks
+    -- aunque el INSERT no asigne los ids en ese orden
+    WITH input AS (
+        SELECT task, ord, nextval(pg_get_serial_sequence('public.task', 'id')) AS id
+        FROM jsonb_array_elements(p_tasks) WITH ORDINALITY AS t(task, ord)
+    ),
+    inserted AS (
+        INSERT INTO public.task (id, title, description, status, priority, due_date, due_time, tags, created_at)
+        SELECT
+            id,
+            trim(task->>'title'),
+            NULLIF(trim(task->>'description'), ''),
+            COALESCE(task->>'status', 'pending')::task_status,
+            COALESCE(task->>'priority', 'normal'),
+            (task->>'due_date')::DATE,
+            (task->>'due_time')::TIME,
+            CASE
+                WHEN jsonb_typeof(task->'tags') = 'array'
+                THEN ARRAY(SELECT jsonb_array_elements_text(task->'tags'))
+                ELSE motivbot_generate_tags(task->>'title', task->>'priority')
+            END,
+            COALESCE((task->>'created_at')::TIMESTAMPTZ, CURRENT_TIMESTAMP)
+        FROM input
+        RETURNING id
+    )
+    SELECT COALESCE(array_agg(input.id ORDER BY input.ord), ARRAY[]::BIGINT[]) INTO new_task_ids
+    FROM input
+    JOIN inserted USING (id);
+    
+    RETURN json_build_object(
+        'success', true,
+        'ids', new_task_ids,
+        'count', cardinality(new_task_ids),
+        'message', 'Tasks created successfully'
+    );
+    
+EXCEPTION
+    WHEN OTHERS THEN
+        PERFORM motivbot_count_rpc_error('motivbot_create_tasks', SQLERRM);
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Error creating tasks: ' || SQLERRM
+        );
+END;
+$$;
+
+-- 13. PAGINACIÓN POR CURSOR (KEYSET)
+-- Devuelven {items, next_cursor}. next_cursor es {created_at, id} del último elemento y se pasa
+-- como p_after_created_at / p_after_id para pedir la página siguiente; es NULL si la página no está llena
+CREATE OR REPLACE FUNCTION motivbot_page_json(p_items JSON, p_limit INTEGER)
+RETURNS JSON
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT json_build_object(
+        'items', p_items,
+        'next_cursor', CASE WHEN json_array_length(p_items) >= p_limit THEN
+            json_build_object('created_at', p_items -> -1 -> 'created_at', 'id', p_items -> -1 -> 'id')
+        END
+    )
+$$;
+
+CREATE OR REPLACE FUNCTION motivbot_get_tasks_page(
+    p_status TEXT DEFAULT NULL,
+    p_priority TEXT DEFAULT NULL,
+    p_tags TEXT[] DEFAULT NULL,
+    p_limit INTEGER DEFAULT 50,
+    p_after_created_at TIMESTAMPTZ DEFAULT NULL,
+    p_after_id BIGINT DEFAULT NULL
+)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    SELECT motivbot_page_json(
+        motivbot_get_tasks(p_status, p_priority, p_tags, p_limit, p_after_created_at, p_after_id),
+        p_limit
+    )
+$$;
+
+CREATE OR REPLACE FUNCTION motivbot_get_conversations_page(
+    p_task_id BIGINT DEFAULT NULL,
+    p_role TEXT DEFAULT NULL,
+    p_limit INTEGER DEFAULT 100,
+    p_after_created_at TIMESTAMPTZ DEFAULT NULL,
+    p_after_id BIGINT DEFAULT NULL
+)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    SELECT motivbot_page_json(
+        motivbot_get_conversations(p_task_id, p_role, p_limit, p_after_created_at, p_after_id),
+        p_limit
+    )
+$$;
+
+-- =====================================================
+-- 14. CONTADORES DEL DASHBOARD (MANTENIDOS POR TRIGGERS)
+-- =====================================================
+
+-- Una fila por métrica: (task,total), (status,<estado>), (priority,<prioridad>), (tag,<tag>),
+-- (open_due,<YYYY-MM-DD>) con las tareas abiertas por fecha límite, (conversation,total|tokens|grateful)
+-- y (role,<rol>). Los triggers son por sentencia: una carga en bloque actualiza cada fila una sola vez.
+CREATE TABLE IF NOT EXISTS public.motivbot_dashboard_counter (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_motivbot_dashboard_counter_top
+ON public.motivbot_dashboard_counter (scope, value DESC, key);
+
+-- Solo lectura desde la API; las escrituras llegan por los triggers (SECURITY DEFINER)
+ALTER TABLE public.motivbot_dashboard_counter ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "select_policy" ON public.motivbot_dashboard_counter;
+CREATE POLICY "select_policy"
+ON public.motivbot_dashboard_counter
+FOR SELECT
+TO anon, authenticated
+USING (true);
+
+-- Qué suma cada fila; lo comparten los triggers y el recálculo completo para que no puedan divergir
+CREATE OR REPLACE FUNCTION motivbot_dashboard_task_keys(t public.task)
+RETURNS SETOF public.motivbot_dashboard_counter
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT k.scope, k.key, 1::BIGINT
+    FROM (VALUES
+        ('task', 'total'),
+        ('status', t.status::TEXT),
+        ('priority', t.priority::TEXT),
+        ('open_due', CASE WHEN t.status NOT IN ('completed', 'cancelled') THEN to_char(t.due_date, 'YYYY-MM-DD') END)
+    ) AS k(scope, key)
+    WHERE k.key IS NOT NULL
+    UNION ALL
+    SELECT 'tag', tag, 1
+    FROM unnest(t.tags) AS tag
+    WHERE tag IS NOT NULL
+$$;
+
+CREATE OR REPLACE FUNCTION motivbot_dashboard_conversation_keys(c public.conversation)
+RETURNS SETOF public.motivbot_dashboard_counter
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT k.scope, k.key, k.value
+    FROM (VALUES
+        ('conversation', 'total', 1::BIGINT),
+        ('conversation', 'tokens', COALESCE(c.tokens_used, 0)::BIGINT),
+        ('conversation', 'grateful', CASE WHEN c.user_is_grateful THEN 1 ELSE 0 END),
+        ('role', c.role::TEXT, 1)
+    ) AS k(scope, key, value)
+$$;
+
+-- Valores esperados recorriendo task y conversation completas
+CREATE OR REPLACE FUNCTION motivbot_dashboard_counts()
+RETURNS SETOF public.motivbot_dashboard_counter
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT k.scope, k.key, SUM(k.value)::BIGINT
+    FROM (
+        SELECT k.* FROM public.task t, LATERAL motivbot_dashboard_task_keys(t) k
+        UNION ALL
+        SELECT k.* FROM public.conversation c, LATERAL motivbot_dashboard_conversation_keys(c) k
+    ) AS k
+    GROUP BY k.scope, k.key
+    HAVING SUM(k.value) <> 0
+$$;
+
+-- Sumar los deltas ya agregados por clave; en orden de clave para que dos transacciones no se bloqueen
+CREATE OR REPLACE FUNCTION motivbot_dashboard_apply(p_delta public.motivbot_dashboard_counter[])
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    empty_scopes TEXT[];
+    empty_keys TEXT[];
+BEGIN
+    WITH changed AS (
+        INSERT INTO public.motivbot_dashboard_counter AS counter (scope, key, value)
+        SELECT d.scope, d.key, d.value
+        FROM unnest(p_delta) AS d
+        WHERE d.value <> 0
+        ORDER BY d.scope, d.key
+        ON CONFLICT (scope, key) DO UPDATE SET value = counter.value + EXCLUDED.value
+        RETURNING counter.scope, counter.key, counter.value
+    )
+    SELECT array_agg(scope) FILTER (WHERE value = 0 AND scope IN ('tag', 'open_due')),
+           array_agg(key) FILTER (WHERE value = 0 AND scope IN ('tag', 'open_due'))
+    INTO empty_scopes, empty_keys
+    FROM changed;
+
+    -- Los tags y fechas sin tareas dejan de contar como únicos: solo las claves que esta sentencia ha dejado a
+    -- cero, por clave primaria, como en motivbot_task_tag_apply
+    IF empty_scopes IS NOT NULL THEN
+        DELETE FROM public.motivbot_dashboard_counter counter
+        USING unnest(empty_scopes, empty_keys) AS empty(scope, key)
+        WHERE counter.scope = empty.scope AND counter.key = empty.key AND counter.value = 0;
+    END IF;
+END;
+$$;
+
+-- Triggers por sentencia con tablas de transición: las filas antiguas restan y las nuevas suman,
+-- agregadas por clave antes de escribir (una carga de 1000 tareas toca cada contador una vez)
+CREATE OR REPLACE FUNCTION motivbot_dashboard_task_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    delta public.motivbot_dashboard_counter[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        delta := ARRAY(
+            SELECT ROW(k.scope, k.key, SUM(k.value))::public.motivbot_dashboard_counter
+            FROM new_rows t, LATERAL motivbot_dashboard_task_keys(t) k
+            GROUP BY k.scope, k.key
+        );
+    ELSIF TG_OP = 'DELETE' THEN
+        delta := ARRAY(
+            SELECT ROW(k.scope, k.key, -SUM(k.value))::public.motivbot_dashboard_counter
+            FROM old_rows t, LATERAL motivbot_dashboard_task_keys(t) k
+            GROUP BY k.scope, k.key
+        );
+    ELSE
+        delta := ARRAY(
+            SELECT ROW(k.scope, k.key, SUM(k.value))::public.motivbot_dashboard_counter
+            FROM (
+                SELECT k.scope, k.key, k.value FROM new_rows t, LATERAL motivbot_dashboard_task_keys(t) k
+                UNION ALL
+                SELECT k.scope, k.key, -k.value FROM old_rows t, LATERAL motivbot_dashboard_task_keys(t) k
+            ) AS k
+            GROUP BY k.scope, k.key
+        );
+    END IF;
+
+    PERFORM motivbot_dashboard_apply(delta);
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION motivbot_dashboard_conversation_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    delta public.motivbot_dashboard_counter[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        delta := ARRAY(
+            SELECT ROW(k.scope, k.key, SUM(k.value))::public.motivbot_dashboard_counter
+            FROM new_rows c, LATERAL motivbot_dashboard_conversation_keys(c) k
+            GROUP BY k.scope, k.key
+        );
+    ELSIF TG_OP = 'DELETE' THEN
+        delta := ARRAY(
+            SELECT ROW(k.scope, k.key, -SUM(k.value))::public.motivbot_dashboard_counter
+            FROM old_rows c, LATERAL motivbot_dashboard_conversation_keys(c) k
+            GROUP BY k.scope, k.key
+        );
+    ELSE
+        delta := ARRAY(
+            SELECT ROW(k.scope, k.key, SUM(k.value))::public.motivbot_dashboard_counter
+            FROM (
+                SELECT k.scope, k.key, k.value FROM new_rows c, LATERAL motivbot_dashboard_conversation_keys(c) k
+                UNION ALL
+                SELECT k.scope, k.key, -k.value FROM old_rows c, LATERAL motivbot_dashboard_conversation_keys(c) k
+            ) AS k
+            GROUP BY k.scope, k.key
+        );
+    END IF;
+
+    PERFORM motivbot_dashboard_apply(delta);
+    RETURN NULL;
+END;
+$$;
+
+-- TRUNCATE no tiene tablas de transición: se vacían los ámbitos de la tabla (TG_ARGV)
+CREATE OR REPLACE FUNCTION motivbot_dashboard_truncate_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    DELETE FROM public.motivbot_dashboard_counter WHERE scope = ANY(TG_ARGV);
+    RETURN NULL;
+END;
+$$;
+
+-- Las tablas de transición no admiten varios eventos en un mismo trigger
+DROP TRIGGER IF EXISTS motivbot_dashboard_task_insert ON public.task;
+CREATE TRIGGER motivbot_dashboard_task_insert
+    AFTER INSERT ON public.task
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_dashboard_task_trigger();
+
+DROP TRIGGER IF EXISTS motivbot_dashboard_task_update ON public.task;
+CREATE TRIGGER motivbot_dashboard_task_update
+    AFTER UPDATE ON public.task
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_dashboard_task_trigger();
+
+DROP TRIGGER IF EXISTS motivbot_dashboard_task_delete ON public.task;
+CREATE TRIGGER motivbot_dashboard_task_delete
+    AFTER DELETE ON public.task
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_dashboard_task_trigger();
+
+DROP TRIGGER IF EXISTS motivbot_dashboard_task_truncate ON public.task;
+CREATE TRIGGER motivbot_dashboard_task_truncate
+    AFTER TRUNCATE ON public.task
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_dashboard_truncate_trigger('task', 'status', 'priority', 'open_due', 'tag');
+
+DROP TRIGGER IF EXISTS motivbot_dashboard_conversation_insert ON public.conversation;
+CREATE TRIGGER motivbot_dashboard_conversation_insert
+    AFTER INSERT ON public.conversation
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_dashboard_conversation_trigger();
+
+DROP TRIGGER IF EXISTS motivbot_dashboard_conversation_update ON public.conversation;
+CREATE TRIGGER motivbot_dashboard_conversation_update
+    AFTER UPDATE ON public.conversation
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_dashboard_conversation_trigger();
+
+DROP TRIGGER IF EXISTS motivbot_dashboard_conversation_delete ON public.conversation;
+CREATE TRIGGER motivbot_dashboard_conversation_delete
+    AFTER DELETE ON public.conversation
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_dashboard_conversation_trigger();
+
+DROP TRIGGER IF EXISTS motivbot_dashboard_conversation_truncate ON public.conversation;
+CREATE TRIGGER motivbot_dashboard_conversation_truncate
+    AFTER TRUNCATE ON public.conversation
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_dashboard_truncate_trigger('conversation', 'role');
+
+-- Reconstruir los contadores desde cero (migración o reparación tras una inconsistencia)
+CREATE OR REPLACE FUNCTION motivbot_refresh_dashboard_counters()
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    counters_count INTEGER;
+BEGIN
+    -- Bloquea escrituras concurrentes hasta el commit para no perder deltas durante el recálculo
+    LOCK TABLE public.task, public.conversation IN SHARE MODE;
+
+    DELETE FROM public.motivbot_dashboard_counter;
+    INSERT INTO public.motivbot_dashboard_counter (scope, key, value)
+    SELECT * FROM motivbot_dashboard_counts();
+    GET DIAGNOSTICS counters_count = ROW_COUNT;
+
+    RETURN json_build_object('success', true, 'counters', counters_count);
+END;
+$$;
+
+-- Comparar los contadores con el recálculo completo (O(n): para comprobaciones, no para el dashboard)
+CREATE OR REPLACE FUNCTION motivbot_check_dashboard_counters()
+RETURNS JSON
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    WITH mismatches AS (
+        SELECT
+            COALESCE(expected.scope, actual.scope) AS scope,
+            COALESCE(expected.key, actual.key) AS key,
+            COALESCE(expected.value, 0) AS expected,
+            COALESCE(actual.value, 0) AS actual
+        FROM motivbot_dashboard_counts() AS expected
+        FULL JOIN public.motivbot_dashboard_counter AS actual
+            ON actual.scope = expected.scope AND actual.key = expected.key
+        WHERE COALESCE(expected.value, 0) <> COALESCE(actual.value, 0)
+    )
+    SELECT json_build_object(
+        'consistent', COUNT(*) = 0,
+        'mismatches', COALESCE(json_agg(mismatches ORDER BY scope, key), '[]'::json)
+    )
+    FROM mismatches
+$$;
+
+SELECT motivbot_refresh_dashboard_counters();
+
+-- Escribir contadores queda reservado a los triggers y al propietario
+REVOKE EXECUTE ON FUNCTION motivbot_dashboard_apply FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION motivbot_refresh_dashboard_counters FROM PUBLIC, anon, authenticated;
+
+-- =====================================================
+-- 15. ROLLUPS DIARIOS PARA LAS ANALÍTICAS
+-- =====================================================
+
+-- Una fila por día y métrica, con la misma forma (scope, key, value) que los contadores del dashboard:
+-- conversaciones (conversation,total), (role,<rol>), (emotional_state,<estado>), (emotional_tokens,<estado>),
+-- (tokens,total), (response_time_ms,total), (feedback,<campo>); tareas (task,created|completed),
+-- (tag_created,<tag>) y (tag_completed,<tag>). Los días son fechas en la zona horaria de la base (UTC en Supabase).
+-- Solo se consolidan días cerrados; el día en curso se lee siempre de las tablas.
+CREATE TABLE IF NOT EXISTS public.motivbot_daily_rollup (
+    day DATE NOT NULL,
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, scope, key)
+);
+
+-- Días con cambios sin consolidar; los marcan los triggers y los vacía motivbot_refresh_daily_rollups().
+-- Mientras un día está aquí, las lecturas lo cuentan en las tablas en lugar de usar su rollup.
+CREATE TABLE IF NOT EXISTS public.motivbot_rollup_pending (
+    day DATE PRIMARY KEY
+);
+
+ALTER TABLE public.motivbot_daily_rollup ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.motivbot_rollup_pending ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "select_policy" ON public.motivbot_daily_rollup;
+CREATE POLICY "select_policy"
+ON public.motivbot_daily_rollup
+FOR SELECT
+TO anon, authenticated
+USING (true);
+
+-- Qué suma cada fila en qué día; lo comparten la consolidación y la lectura del día en curso
+CREATE OR REPLACE FUNCTION motivbot_rollup_task_keys(t public.task)
+RETURNS SETOF public.motivbot_daily_rollup
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT k.day, k.scope, k.key, 1::BIGINT
+    FROM (VALUES
+        (t.created_at::DATE, 'task', 'created'),
+        (t.completed_at::DATE, 'task', 'completed')
+    ) AS k(day, scope, key)
+    WHERE k.day IS NOT NULL
+    UNION ALL
+    SELECT k.day, k.scope, tags.tag, 1
+    FROM (SELECT DISTINCT tag FROM unnest(t.tags) AS tag WHERE tag IS NOT NULL) AS tags
+    CROSS JOIN (VALUES
+        (t.created_at::DATE, 'tag_created'),
+        (t.completed_at::DATE, 'tag_completed')
+    ) AS k(day, scope)
+    WHERE k.day IS NOT NULL
+$$;
+
+CREATE OR REPLACE FUNCTION motivbot_rollup_conversation_keys(c public.conversation)
+RETURNS SETOF public.motivbot_daily_rollup
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT c.created_at::DATE, k.scope, k.key, k.value
+    FROM (VALUES
+        ('conversation', 'total', 1::BIGINT),
+        ('role', c.role::TEXT, 1),
+        ('emotional_state', COALESCE(c.emotional_state, 'neutral'), 1),
+        ('emotional_tokens', COALESCE(c.emotional_state, 'neutral'), COALESCE(c.tokens_used, 0)),
+        ('tokens', 'total', COALESCE(c.tokens_used, 0)),
+        ('response_time_ms', 'total', COALESCE(c.response_time_ms, 0)),
+        ('feedback', 'user_grateful', CASE WHEN c.user_is_grateful THEN 1 ELSE 0 END),
+        ('feedback', 'user_useful', CASE WHEN c.user_is_useful THEN 1 ELSE 0 END),
+        ('feedback', 'assistant_useful', CASE WHEN c.assistant_is_useful THEN 1 ELSE 0 END),
+        ('feedback', 'assistant_precise', CASE WHEN c.assistant_is_precise THEN 1 ELSE 0 END),
+        ('feedback', 'assistant_grateful', CASE WHEN c.assistant_is_grateful THEN 1 ELSE 0 END)
+    ) AS k(scope, key, value)
+    WHERE c.created_at IS NOT NULL
+$$;
+
+-- Agregar los días indicados desde las tablas, con rangos sobre created_at/completed_at que usan sus índices
+CREATE OR REPLACE FUNCTION motivbot_rollup_compute(p_days DATE[])
+RETURNS SETOF public.motivbot_daily_rollup
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT k.day, k.scope, k.key, SUM(k.value)::BIGINT
+    FROM (
+        SELECT k.*
+        FROM unnest(p_days) AS d(day)
+        JOIN public.conversation c ON c.created_at >= d.day AND c.created_at < d.day + 1
+        CROSS JOIN LATERAL motivbot_rollup_conversation_keys(c) k
+        UNION ALL
+        -- Cada tarea aporta su alta el día de creación y su finalización el día en que se completó
+        SELECT k.*
+        FROM unnest(p_days) AS d(day)
+        JOIN public.task t ON t.created_at >= d.day AND t.created_at < d.day + 1
+        CROSS JOIN LATERAL motivbot_rollup_task_keys(t) k
+        WHERE k.day = d.day AND ((k.scope = 'task' AND k.key = 'created') OR k.scope = 'tag_created')
+        UNION ALL
+        SELECT k.*
+        FROM unnest(p_days) AS d(day)
+        JOIN public.task t ON t.completed_at >= d.day AND t.completed_at < d.day + 1
+        CROSS JOIN LATERAL motivbot_rollup_task_keys(t) k
+        WHERE k.day = d.day AND ((k.scope = 'task' AND k.key = 'completed') OR k.scope = 'tag_completed')
+    ) AS k
+    GROUP BY k.day, k.scope, k.key
+    HAVING SUM(k.value) <> 0
+$$;
+
+-- Marcar días pendientes; en orden para que dos transacciones no se bloqueen
+CREATE OR REPLACE FUNCTION motivbot_rollup_mark(p_days DATE[])
+RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    INSERT INTO public.motivbot_rollup_pending (day)
+    SELECT DISTINCT d.day FROM unnest(p_days) AS d(day) WHERE d.day IS NOT NULL
+    ORDER BY d.day
+    ON CONFLICT (day) DO NOTHING
+$$;
+
+-- Triggers por sentencia: solo anotan qué días cambian (una fila por día y sentencia, sin tocar los rollups).
+-- En un UPDATE solo cuentan las filas que cambian algo que suman los rollups: editar el título o la
+-- descripción de una tarea, o resumir una conversación, no marca ningún día.
+CREATE OR REPLACE FUNCTION motivbot_rollup_task_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM motivbot_rollup_mark(ARRAY(
+            SELECT t.created_at::DATE FROM new_rows t UNION SELECT t.completed_at::DATE FROM new_rows t
+        ));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM motivbot_rollup_mark(ARRAY(
+            SELECT t.created_at::DATE FROM old_rows t UNION SELECT t.completed_at::DATE FROM old_rows t
+        ));
+    ELSE
+        -- El día de alta cambia con created_at o los tags; el de finalización, con completed_at o los tags
+        PERFORM motivbot_rollup_mark(ARRAY(
+            SELECT d.day
+            FROM old_rows o
+            JOIN new_rows n ON n.id = o.id
+            CROSS JOIN LATERAL (VALUES
+                (o.created_at::DATE, o.created_at::DATE IS DISTINCT FROM n.created_at::DATE),
+                (n.created_at::DATE, o.created_at::DATE IS DISTINCT FROM n.created_at::DATE),
+                (o.completed_at::DATE, o.completed_at::DATE IS DISTINCT FROM n.completed_at::DATE),
+                (n.completed_at::DATE, o.completed_at::DATE IS DISTINCT FROM n.completed_at::DATE),
+                (o.created_at::DATE, o.tags IS DISTINCT FROM n.tags),
+                (o.completed_at::DATE, o.tags IS DISTINCT FROM n.tags)
+            ) AS d(day, changed)
+            WHERE d.changed
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION motivbot_rollup_conversation_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM motivbot_rollup_mark(ARRAY(SELECT DISTINCT c.created_at::DATE FROM new_rows c));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM motivbot_rollup_mark(ARRAY(SELECT DISTINCT c.created_at::DATE FROM old_rows c));
+    ELSE
+        PERFORM motivbot_rollup_mark(ARRAY(
+            SELECT d.day
+            FROM old_rows o
+            JOIN new_rows n ON n.id = o.id
+            CROSS JOIN LATERAL (VALUES (o.created_at::DATE), (n.created_at::DATE)) AS d(day)
+            WHERE (o.created_at::DATE, o.role, o.emotional_state, o.tokens_used, o.response_time_ms,
+                   o.user_is_grateful, o.user_is_useful, o.assistant_is_useful, o.assistant_is_precise,
+                   o.assistant_is_grateful)
+                IS DISTINCT FROM
+                  (n.created_at::DATE, n.role, n.emotional_state, n.tokens_used, n.response_time_ms,
+                   n.user_is_grateful, n.user_is_useful, n.assistant_is_useful, n.assistant_is_precise,
+                   n.assistant_is_grateful)
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+-- TRUNCATE vacía los ámbitos de la tabla en todos los días (TG_ARGV)
+CREATE OR REPLACE FUNCTION motivbot_rollup_truncate_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    DELETE FROM public.motivbot_daily_rollup WHERE scope = ANY(TG_ARGV);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS motivbot_rollup_task_insert ON public.task;
+CREATE TRIGGER motivbot_rollup_task_insert
+    AFTER INSERT ON public.task
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_rollup_task_trigger();
+
+DROP TRIGGER IF EXISTS motivbot_rollup_task_update ON public.task;
+CREATE TRIGGER motivbot_rollup_task_update
+    AFTER UPDATE ON public.task
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_rollup_task_trigger();
+
+DROP TRIGGER IF EXISTS motivbot_rollup_task_delete ON public.task;
+CREATE TRIGGER motivbot_rollup_task_delete
+    AFTER DELETE ON public.task
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_rollup_task_trigger();
+
+DROP TRIGGER IF EXISTS motivbot_rollup_task_truncate ON public.task;
+CREATE TRIGGER motivbot_rollup_task_truncate
+    AFTER TRUNCATE ON public.task
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_rollup_truncate_trigger('task', 'tag_created', 'tag_completed');
+
+DROP TRIGGER IF EXISTS motivbot_rollup_conversation_insert ON public.conversation;
+CREATE TRIGGER motivbot_rollup_conversation_insert
+    AFTER INSERT ON public.conversation
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_rollup_conversation_trigger();
+
+DROP TRIGGER IF EXISTS motivbot_rollup_conversation_update ON public.conversation;
+CREATE TRIGGER motivbot_rollup_conversation_update
+    AFTER UPDATE ON public.conversation
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_rollup_conversation_trigger();
+
+DROP TRIGGER IF EXISTS motivbot_rollup_conversation_delete ON public.conversation;
+CREATE TRIGGER motivbot_rollup_conversation_delete
+    AFTER DELETE ON public.conversation
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_rollup_conversation_trigger();
+
+DROP TRIGGER IF EXISTS motivbot_rollup_conversation_truncate ON public.conversation;
+CREATE TRIGGER motivbot_rollup_conversation_truncate
+    AFTER TRUNCATE ON public.conversation
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_rollup_truncate_trigger(
+        'conversation', 'role', 'emotional_state', 'emotional_tokens', 'tokens', 'response_time_ms', 'feedback'
+    );
+
+-- Consolidar los días cerrados pendientes. Es un trabajo programado (pg_cron, más abajo), nunca parte de una
+-- lectura: hasta que pasa, las analíticas cuentan esos días en las tablas.
+CREATE OR REPLACE FUNCTION motivbot_refresh_daily_rollups()
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    days DATE[];
+BEGIN
+    -- Excluye a los escritores y a otros refrescos hasta el commit: ningún cambio de un día se pierde
+    -- entre recalcularlo y borrar su marca. Solo recalcula días cerrados con cambios, así que dura poco
+    LOCK TABLE public.task, public.conversation IN SHARE ROW EXCLUSIVE MODE;
+
+    days := ARRAY(SELECT p.day FROM public.motivbot_rollup_pending p WHERE p.day < CURRENT_DATE ORDER BY p.day);
+
+    IF cardinality(days) > 0 THEN
+        DELETE FROM public.motivbot_daily_rollup WHERE day = ANY(days);
+        INSERT INTO public.motivbot_daily_rollup (day, scope, key, value)
+        SELECT * FROM motivbot_rollup_compute(days);
+        DELETE FROM public.motivbot_rollup_pending WHERE day = ANY(days);
+    END IF;
+
+    RETURN json_build_object('success', true, 'days', cardinality(days));
+END;
+$$;
+
+-- Métricas de [p_from, p_to]: rollups para los días cerrados ya consolidados y las tablas para los pendientes
+-- y el día en curso. Solo lee: no bloquea a los escritores y funciona en transacciones de solo lectura.
+CREATE OR REPLACE FUNCTION motivbot_rollup_range(p_from DATE, p_to DATE)
+RETURNS SETOF public.motivbot_daily_rollup
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    SELECT r.*
+    FROM public.motivbot_daily_rollup r
+    WHERE r.day >= p_from AND r.day <= LEAST(p_to, CURRENT_DATE - 1)
+      AND NOT EXISTS (SELECT 1 FROM public.motivbot_rollup_pending p WHERE p.day = r.day)
+    UNION ALL
+    SELECT *
+    FROM motivbot_rollup_compute(ARRAY(
+        SELECT p.day FROM public.motivbot_rollup_pending p
+        WHERE p.day >= p_from AND p.day <= LEAST(p_to, CURRENT_DATE - 1)
+        UNION
+        SELECT CURRENT_DATE WHERE CURRENT_DATE BETWEEN p_from AND p_to
+    ))
+$$;
+
+-- Comparar los rollups de los días cerrados ya consolidados con un recálculo (O(n): para comprobaciones)
+CREATE OR REPLACE FUNCTION motivbot_check_daily_rollups()
+RETURNS JSON
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    WITH days AS (
+        SELECT ARRAY(
+            SELECT d.day
+            FROM (
+                SELECT created_at::DATE FROM public.conversation
+                UNION SELECT created_at::DATE FROM public.task
+                UNION SELECT completed_at::DATE FROM public.task
+                UNION SELECT day FROM public.motivbot_daily_rollup
+            ) AS d(day)
+            WHERE d.day < CURRENT_DATE
+              AND NOT EXISTS (SELECT 1 FROM public.motivbot_rollup_pending p WHERE p.day = d.day)
+        ) AS days
+    ),
+    mismatches AS (
+        SELECT
+            COALESCE(expected.day, actual.day) AS day,
+            COALESCE(expected.scope, actual.scope) AS scope,
+            COALESCE(expected.key, actual.key) AS key,
+            COALESCE(expected.value, 0) AS expected,
+            COALESCE(actual.value, 0) AS actual
+        FROM (SELECT c.* FROM days, LATERAL motivbot_rollup_compute(days.days) c) AS expected
+        FULL JOIN (
+            SELECT r.* FROM public.motivbot_daily_rollup r, days WHERE r.day = ANY(days.days)
+        ) AS actual
+            ON actual.day = expected.day AND actual.scope = expected.scope AND actual.key = expected.key
+        WHERE COALESCE(expected.value, 0) <> COALESCE(actual.value, 0)
+    )
+    SELECT json_build_object(
+        'consistent', COUNT(*) = 0,
+        'mismatches', COALESCE(json_agg(mismatches ORDER BY day, scope, key), '[]'::json)
+    )
+    FROM mismatches
+$$;
+
+-- Analíticas por intervalos (day, week o month) entre dos fechas, con los totales del rango.
+-- El coste depende del número de días, no del historial: solo el día en curso y los días con cambios aún
+-- sin consolidar se leen de las tablas.
+CREATE OR REPLACE FUNCTION motivbot_get_analytics(
+    p_from DATE DEFAULT NULL,
+    p_to DATE DEFAULT NULL,
+    p_bucket TEXT DEFAULT 'day'
+)
+RETURNS JSON
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+AS $$
+DECLARE
+    result JSON;
+    v_to DATE := COALESCE(p_to, CURRENT_DATE);
+    v_from DATE := COALESCE(p_from, COALESCE(p_to, CURRENT_DATE) - 29);
+BEGIN
+    IF p_bucket IS NULL OR p_bucket NOT IN ('day', 'week', 'month') THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Invalid bucket. Valid values are: day, week, month'
+        );
+    END IF;
+
+    IF v_from > v_to THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'from must be on or before to'
+        );
+    END IF;
+
+    WITH metrics AS (
+        SELECT date_trunc(p_bucket, r.day)::DATE AS bucket, r.scope, r.key, r.value
+        FROM motivbot_rollup_range(v_from, v_to) r
+    ),
+    -- Por intervalo y, con bucket NULL, el total del rango
+    grouped AS (
+        SELECT m.bucket, m.scope, m.key, SUM(m.value) AS value
+        FROM metrics m
+        GROUP BY GROUPING SETS ((m.bucket, m.scope, m.key), (m.scope, m.key))
+    ),
+    buckets AS (
+        SELECT g::DATE AS bucket
+        FROM generate_series(date_trunc(p_bucket, v_from), v_to, ('1 ' || p_bucket)::INTERVAL) AS g
+        UNION ALL
+        SELECT NULL
+    ),
+    stats AS (
+        SELECT
+            b.bucket,
+            COALESCE(SUM(g.value) FILTER (WHERE g.scope = 'conversation'), 0) AS conversations,
+            COALESCE(SUM(g.value) FILTER (WHERE g.scope = 'tokens'), 0) AS tokens,
+            COALESCE(SUM(g.value) FILTER (WHERE g.scope = 'response_time_ms'), 0) AS response_time_ms,
+            COALESCE(json_object_agg(g.key, g.value) FILTER (WHERE g.scope = 'role'), '{}'::json) AS by_role,
+            COALESCE(json_object_agg(g.key, g.value) FILTER (WHERE g.scope = 'emotional_state'), '{}'::json) AS emotional_states,
+            COALESCE(json_object_agg(g.key, g.value) FILTER (WHERE g.scope = 'feedback'), '{}'::json) AS feedback,
+            COALESCE(SUM(g.value) FILTER (WHERE g.scope = 'task' AND g.key = 'created'), 0) AS tasks_created,
+            COALESCE(SUM(g.value) FILTER (WHERE g.scope = 'task' AND g.key = 'completed'), 0) AS tasks_completed,
+            COALESCE(json_object_agg(g.key, g.value) FILTER (WHERE g.scope = 'tag_created'), '{}'::json) AS created_by_tag,
+            COALESCE(json_object_agg(g.key, g.value) FILTER (WHERE g.scope = 'tag_completed'), '{}'::json) AS completed_by_tag
+        FROM buckets b
+        LEFT JOIN grouped g ON g.bucket IS NOT DISTINCT FROM b.bucket
+        GROUP BY b.bucket
+    ),
+    stats_json AS (
+        SELECT
+            s.bucket,
+            jsonb_build_object(
+                'start', s.bucket,
+                'conversations', json_build_object(
+                    'total', s.conversations,
+                    'tokens_used', s.tokens,
+                    'avg_tokens', ROUND(s.tokens::NUMERIC / NULLIF(s.conversations, 0), 2),
+                    'avg_response_time_ms', ROUND(s.response_time_ms::NUMERIC / NULLIF(s.conversations, 0), 2),
+                    'by_role', s.by_role,
+                    'emotional_states', s.emotional_states,
+                    'feedback', s.feedback
+                ),
+                'tasks', json_build_object(
+                    'created', s.tasks_created,
+                    'completed', s.tasks_completed,
+                    'created_by_tag', s.created_by_tag,
+                    'completed_by_tag', s.completed_by_tag
+                )
+            ) AS stats
+        FROM stats s
+    )
+    SELECT json_build_object(
+        'from', v_from,
+        'to', v_to,
+        'bucket', p_bucket,
+        'buckets', (SELECT json_agg(sj.stats ORDER BY sj.bucket) FROM stats_json sj WHERE sj.bucket IS NOT NULL),
+        'totals', (SELECT sj.stats - 'start' FROM stats_json sj WHERE sj.bucket IS NULL)
+    )
+    INTO result;
+
+    RETURN result;
+END;
+$$;
+
+-- Estadísticas de estados emocionales (definida antes en Conversation.sql, con subconsultas correlacionadas).
+-- Los recuentos salen de los rollups diarios para los días completos y de la tabla para el primer día parcial
+-- y el día en curso; el CTE se materializa una vez y lo leen tendencias y recomendaciones. Los 3 últimos
+-- mensajes de cada estado salen de idx_conversation_emotional_state_created_at.
+-- avg_tokens divide los tokens del estado entre todas sus conversaciones: las de tokens_used NULL cuentan como
+-- 0 (como en el rollup emotional_tokens), no se excluyen como hacía AVG(tokens_used)
+DROP FUNCTION IF EXISTS get_emotional_states_analytics(INTEGER) CASCADE;
+CREATE OR REPLACE FUNCTION get_emotional_states_analytics(
+    p_days_back INTEGER DEFAULT 30
+)
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    result JSON;
+    since TIMESTAMPTZ := CURRENT_TIMESTAMP - INTERVAL '1 day' * p_days_back;
+BEGIN
+    WITH emotion_counts AS (
+        SELECT
+            m.key as emotional_state,
+            SUM(m.value) FILTER (WHERE m.scope = 'emotional_state') as count,
+            SUM(m.value) FILTER (WHERE m.scope = 'emotional_tokens') * 1.0
+                / SUM(m.value) FILTER (WHERE m.scope = 'emotional_state') as avg_tokens
+        FROM (
+            SELECT r.scope, r.key, r.value
+            FROM motivbot_rollup_range(since::DATE + 1, CURRENT_DATE - 1) r
+            UNION ALL
+            SELECT k.scope, k.key, k.value
+            FROM public.Conversation c
+            CROSS JOIN LATERAL motivbot_rollup_conversation_keys(c) k
+            WHERE c.created_at >= since AND c.created_at < since::DATE + 1
+            UNION ALL
+            -- Hoy solo hacen falta las conversaciones, no el recálculo completo de motivbot_rollup_range
+            SELECT k.scope, k.key, k.value
+            FROM public.Conversation c
+            CROSS JOIN LATERAL motivbot_rollup_conversation_keys(c) k
+            WHERE c.created_at >= GREATEST(CURRENT_DATE, since::DATE + 1)
+        ) m
+        WHERE m.scope IN ('emotional_state', 'emotional_tokens')
+        GROUP BY m.key
+        HAVING SUM(m.value) FILTER (WHERE m.scope = 'emotional_state') > 0
+    ),
+    emotion_analysis AS (
+        SELECT
+            e.*,
+            SUM(e.count) OVER () as total_conversations,
+            ROW_NUMBER() OVER (ORDER BY e.count DESC, e.emotional_state) as most_used_rank,
+            ROW_NUMBER() OVER (ORDER BY e.count ASC, e.emotional_state) as least_used_rank
+        FROM emotion_counts e
+    )
+    SELECT json_build_object(
+        'period_days', p_days_back,
+        'emotional_trends', (
+            SELECT json_object_agg(
+                a.emotional_state,
+                json_build_object(
+                    'count', a.count,
+                    'percentage', ROUND((a.count * 100.0 / NULLIF(a.total_conversations, 0)), 2),
+                    'avg_tokens', ROUND(a.avg_tokens, 0),
+                    'recent_messages', recent.messages
+                )
+            )
+            FROM emotion_analysis a
+            CROSS JOIN LATERAL (
+                SELECT array_agg(LEFT(r.message, 50) ORDER BY r.created_at DESC) as messages
+                FROM (
+                    SELECT c.message, c.created_at
+                    FROM public.Conversation c
+                    WHERE COALESCE(c.emotional_state, 'neutral') = a.emotional_state
+                    AND c.created_at >= since
+                    ORDER BY c.created_at DESC
+                    LIMIT 3
+                ) r
+            ) recent
+        ),
+        'recommendations', (
+            SELECT json_build_object(
+                'most_used_emotion', MAX(a.emotional_state) FILTER (WHERE a.most_used_rank = 1),
+                'least_used_emotion', MAX(a.emotional_state) FILTER (WHERE a.least_used_rank = 1),
+                'balance_score', ROUND((1.0 - (GREATEST(MAX(a.count) - MIN(a.count), 0) * 1.0 / NULLIF(SUM(a.count), 0))) * 100, 2),
+                'total_conversations', SUM(a.count),
+                'unique_emotions', COUNT(*)
+            )
+            FROM emotion_analysis a
+        )
+    ) INTO result;
     
-    -- Estadísticas de tags
-    IF has_tags THEN
-        WITH tag_counts AS (
-            SELECT unnest(tags) as tag, COUNT(*) as count
-            FROM public.task 
-            WHERE tags IS NOT NULL
-            GROUP BY unnest(tags)
-            ORDER BY count DESC
-            LIMIT 10
+    RETURN result;
+END;
+$$;
+
+-- Primera consolidación: todos los días con datos quedan pendientes y se agregan una vez
+SELECT motivbot_rollup_mark(ARRAY(
+    SELECT created_at::DATE FROM public.conversation
+    UNION SELECT created_at::DATE FROM public.task
+    UNION SELECT completed_at::DATE FROM public.task
+));
+SELECT motivbot_refresh_daily_rollups();
+
+-- Escribir rollups queda reservado a los triggers, a las lecturas (SECURITY DEFINER) y al propietario
+REVOKE EXECUTE ON FUNCTION motivbot_rollup_mark FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION motivbot_refresh_daily_rollups FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION motivbot_rollup_range FROM PUBLIC, anon, authenticated;
+
+-- Consolidar cada hora si la base tiene pg_cron (Supabase lo trae como extensión); sin él, programar
+-- motivbot_refresh_daily_rollups() desde fuera con la service key
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+        PERFORM cron.schedule('motivbot-refresh-daily-rollups', '5 * * * *', 'SELECT motivbot_refresh_daily_rollups()');
+    END IF;
+END $$;
+
+-- =====================================================
+-- 16. VENTANA DE HISTORIAL CON PRESUPUESTO DE TOKENS
+-- =====================================================
+
+-- Resumen acumulado de los turnos antiguos de cada tarea: cubre las conversaciones hasta
+-- (until_created_at, until_id) en el orden de idx_conversation_task_created_at_id. Lo genera quien
+-- construye el contexto de GPT (el proxy) y lo guarda con motivbot_save_conversation_summary().
+CREATE TABLE IF NOT EXISTS public.conversation_summary (
+    task_id BIGINT PRIMARY KEY REFERENCES public.task(id) ON DELETE CASCADE,
+    summary TEXT NOT NULL,
+    until_created_at TIMESTAMPTZ NOT NULL,
+    until_id BIGINT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE public.conversation_summary ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "select_policy" ON public.conversation_summary;
+CREATE POLICY "select_policy"
+ON public.conversation_summary
+FOR SELECT
+TO anon, authenticated
+USING (true);
+
+-- Tokens que ocupa un mensaje en el contexto: tokens_used si se registró y, si no, ~4 caracteres por token
+CREATE OR REPLACE FUNCTION motivbot_message_tokens(c public.conversation)
+RETURNS INTEGER
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT COALESCE(NULLIF(c.tokens_used, 0), ceil(length(c.message) / 4.0)::INTEGER)
+$$;
+
+-- Los mensajes más recientes cuyo total cabe en p_token_budget (en orden cronológico) y el resumen guardado.
+-- Se leen como mucho p_max_messages filas por idx_conversation_task_created_at_id, así que el coste no crece
+-- con la longitud de la conversación. needs_summary indica que hay turnos anteriores a la ventana que el
+-- resumen todavía no cubre.
+CREATE OR REPLACE FUNCTION motivbot_get_conversation_window(
+    p_task_id BIGINT,
+    p_token_budget INTEGER DEFAULT 2000,
+    p_max_messages INTEGER DEFAULT 50
+)
+RETURNS JSON
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+AS $$
+DECLARE
+    result JSON;
+    s public.conversation_summary;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM public.task WHERE id = p_task_id) THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Task not found'
+        );
+    END IF;
+
+    IF p_token_budget IS NULL OR p_token_budget <= 0 OR p_max_messages IS NULL OR p_max_messages <= 0 THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Token budget and max messages must be positive'
+        );
+    END IF;
+
+    SELECT * INTO s FROM public.conversation_summary WHERE task_id = p_task_id;
+
+    WITH recent AS (
+        -- La suma acumulada va en el mismo orden que el índice, así que LIMIT corta el recorrido
+        SELECT c AS conversation, c.created_at, c.id,
+               SUM(motivbot_message_tokens(c)) OVER (ORDER BY c.created_at DESC, c.id DESC ROWS UNBOUNDED PRECEDING) AS running
+        FROM public.conversation c
+        WHERE c.task_id = p_task_id
+        ORDER BY c.created_at DESC, c.id DESC
+        LIMIT p_max_messages
+    ),
+    fitting AS (
+        SELECT * FROM recent WHERE running <= p_token_budget
+    ),
+    oldest AS (
+        SELECT f.created_at, f.id FROM fitting f ORDER BY f.created_at, f.id LIMIT 1
+    )
+    SELECT json_build_object(
+        'success', true,
+        'task_id', p_task_id,
+        'messages', (SELECT COALESCE(json_agg(motivbot_conversation_json(f.conversation) ORDER BY f.created_at, f.id), '[]'::json) FROM fitting f),
+        'tokens', (SELECT COALESCE(max(f.running), 0) FROM fitting f),
+        'token_budget', p_token_budget,
+        'summary', CASE WHEN s.task_id IS NOT NULL THEN json_build_object(
+            'summary', s.summary,
+            'until_created_at', s.until_created_at,
+            'until_id', s.until_id,
+            'updated_at', s.updated_at
+        ) END,
+        'needs_summary', EXISTS (
+            SELECT 1
+            FROM public.conversation c
+            LEFT JOIN oldest o ON true
+            WHERE c.task_id = p_task_id
+              AND (c.created_at, c.id) < (COALESCE(o.created_at, 'infinity'), COALESCE(o.id, 0))
+              AND (s.task_id IS NULL OR (c.created_at, c.id) > (s.until_created_at, s.until_id))
         )
-        SELECT json_build_object(
-            'total_unique', COUNT(DISTINCT tag),
-            'most_used', COALESCE(json_agg(json_build_object('tag', tag, 'count', count)), '[]'::json)
-        ) INTO tag_stats FROM tag_counts;
+    )
+    INTO result;
+
+    RETURN result;
+END;
+$$;
+
+-- Guardar el resumen de los turnos hasta p_until_id (incluido). Solo avanza: un resumen que cubre menos que el
+-- guardado se rechaza, así dos peticiones concurrentes no pisan uno más reciente.
+CREATE OR REPLACE FUNCTION motivbot_save_conversation_summary(
+    p_task_id BIGINT,
+    p_summary TEXT,
+    p_until_id BIGINT
+)
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    until_at TIMESTAMPTZ;
+BEGIN
+    IF p_summary IS NULL OR trim(p_summary) = '' THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Summary is required'
+        );
+    END IF;
+
+    SELECT created_at INTO until_at
+    FROM public.conversation
+    WHERE id = p_until_id AND task_id = p_task_id;
+
+    IF NOT FOUND THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Conversation not found for this task'
+        );
+    END IF;
+
+    INSERT INTO public.conversation_summary AS cs (task_id, summary, until_created_at, until_id)
+    VALUES (p_task_id, trim(p_summary), until_at, p_until_id)
+    ON CONFLICT (task_id) DO UPDATE
+    SET summary = EXCLUDED.summary,
+        until_created_at = EXCLUDED.until_created_at,
+        until_id = EXCLUDED.until_id,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE (EXCLUDED.until_created_at, EXCLUDED.until_id) > (cs.until_created_at, cs.until_id);
+
+    IF NOT FOUND THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'A newer summary is already stored'
+        );
+    END IF;
+
+    RETURN json_build_object(
+        'success', true,
+        'message', 'Summary saved successfully'
+    );
+END;
+$$;
+
+-- Los p_limit turnos más antiguos que el resumen guardado todavía no cubre, en orden cronológico y anteriores a
+-- p_before_id (el primer mensaje de la ventana; sin él, hasta el final). Quien resume avanza el resumen hasta el
+-- último turno que recibe: si quedan más, needs_summary sigue activo y la siguiente llamada continúa desde ahí,
+-- sin saltarse ninguno. Lee por idx_conversation_task_created_at_id desde el punto del resumen.
+CREATE OR REPLACE FUNCTION motivbot_get_unsummarized_turns(
+    p_task_id BIGINT,
+    p_before_id BIGINT DEFAULT NULL,
+    p_limit INTEGER DEFAULT 40
+)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    SELECT COALESCE(json_agg(motivbot_conversation_json(c) ORDER BY c.created_at, c.id), '[]'::json)
+    FROM (
+        SELECT c.*
+        FROM public.conversation c
+        LEFT JOIN public.conversation_summary s ON s.task_id = p_task_id
+        LEFT JOIN public.conversation b ON b.id = p_before_id AND b.task_id = p_task_id
+        WHERE c.task_id = p_task_id
+          AND (s.task_id IS NULL OR (c.created_at, c.id) > (s.until_created_at, s.until_id))
+          AND (p_before_id IS NULL OR (c.created_at, c.id) < (b.created_at, b.id))
+        ORDER BY c.created_at, c.id
+        LIMIT p_limit
+    ) c
+$$;
+
+-- =====================================================
+-- 17. CREAR CONVERSACIONES EN BLOQUE
+-- =====================================================
+
+-- p_conversations: array JSON de objetos {task_id, role, message, emotional_state, model_used, tokens_used,
+-- response_time_ms, created_at}. Un intercambio usuario+asistente es una sola llamada y las importaciones
+-- (created_at opcional para conservar la fecha original) insertan cada bloque en una sola sentencia.
+-- Todo o nada: si una fila no es válida no se inserta ninguna.
+CREATE OR REPLACE FUNCTION motivbot_create_conversations(
+    p_conversations JSONB
+)
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    new_conversation_ids BIGINT[];
+    missing_tasks BIGINT[];
+BEGIN
+    -- Validar entrada
+    IF p_conversations IS NULL OR jsonb_typeof(p_conversations) <> 'array' THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Conversations must be a JSON array'
+        );
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM jsonb_array_elements(p_conversations) AS c(conversation)
+        WHERE COALESCE(conversation->>'role', '') NOT IN ('user', 'assistant')
+    ) THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Role must be user or assistant for every conversation'
+        );
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM jsonb_array_elements(p_conversations) AS c(conversation)
+        WHERE COALESCE(trim(conversation->>'message'), '') = ''
+    ) THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Message is required for every conversation'
+        );
+    END IF;
+
+    SELECT array_agg(DISTINCT (conversation->>'task_id')::BIGINT ORDER BY (conversation->>'task_id')::BIGINT)
+    INTO missing_tasks
+    FROM jsonb_array_elements(p_conversations) AS c(conversation)
+    WHERE NOT EXISTS (SELECT 1 FROM public.task t WHERE t.id = (conversation->>'task_id')::BIGINT);
+
+    IF missing_tasks IS NOT NULL THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Task not found: ' || array_to_string(missing_tasks, ', ', 'null')
+        );
+    END IF;
+
+    -- Insertar todas las filas en una sola sentencia; como en motivbot_create_tasks, el id se toma junto a
+    -- la posición de entrada para que ids[i] sea la conversación i de p_conversations
+    WITH input AS (
+        SELECT conversation, ord, nextval(pg_get_serial_sequence('public.conversation', 'id')) AS id
+        FROM jsonb_array_elements(p_conversations) WITH ORDINALITY AS c(conversation, ord)
+    ),
+    inserted AS (
+        INSERT INTO public.conversation (id, task_id, role, message, emotional_state, model_used, tokens_used,
+                                         response_time_ms, created_at)
+        SELECT
+            id,
+            (conversation->>'task_id')::BIGINT,
+            (conversation->>'role')::conversation_role,
+            trim(conversation->>'message'),
+            conversation->>'emotional_state',
+            COALESCE(conversation->>'model_used', 'gpt-4'),
+            COALESCE((conversation->>'tokens_used')::INTEGER, 0),
+            COALESCE((conversation->>'response_time_ms')::INTEGER, 0),
+            COALESCE((conversation->>'created_at')::TIMESTAMPTZ, CURRENT_TIMESTAMP)
+        FROM input
+        RETURNING id
+    )
+    SELECT COALESCE(array_agg(input.id ORDER BY input.ord), ARRAY[]::BIGINT[]) INTO new_conversation_ids
+    FROM input
+    JOIN inserted USING (id);
+
+    RETURN json_build_object(
+        'success', true,
+        'ids', new_conversation_ids,
+        'count', cardinality(new_conversation_ids),
+        'message', 'Conversations created successfully'
+    );
+
+EXCEPTION
+    WHEN OTHERS THEN
+        PERFORM motivbot_count_rpc_error('motivbot_create_conversations', SQLERRM);
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Error creating conversations: ' || SQLERRM
+        );
+END;
+$$;
+
+-- =====================================================
+-- 18. VERSIONES DE DATOS PARA LAS CACHÉS DE LOS CLIENTES
+-- =====================================================
+
+-- Una fila por tabla; cada sentencia que la modifica suma 1 a su versión. La actualización se hace visible
+-- en el mismo commit que los datos, así que un cliente que guardó una respuesta con la versión N sabe que
+-- sigue valiendo mientras lea N (caché de motivbot/cache.py)
+CREATE TABLE IF NOT EXISTS public.motivbot_data_version (
+    scope TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO public.motivbot_data_version (scope)
+VALUES ('task'), ('conversation'), ('chibi_messages')
+ON CONFLICT (scope) DO NOTHING;
+
+ALTER TABLE public.motivbot_data_version ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "select_policy" ON public.motivbot_data_version;
+CREATE POLICY "select_policy"
+ON public.motivbot_data_version
+FOR SELECT
+TO anon, authenticated
+USING (true);
+
+-- Por sentencia: una carga en bloque cuenta como un solo cambio
+CREATE OR REPLACE FUNCTION motivbot_bump_data_version()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    UPDATE public.motivbot_data_version
+    SET version = version + 1
+    WHERE scope = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS motivbot_data_version_task ON public.task;
+CREATE TRIGGER motivbot_data_version_task
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.task
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_bump_data_version();
+
+DROP TRIGGER IF EXISTS motivbot_data_version_conversation ON public.conversation;
+CREATE TRIGGER motivbot_data_version_conversation
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.conversation
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_bump_data_version();
+
+DROP TRIGGER IF EXISTS motivbot_data_version_chibi_messages ON public.chibi_messages;
+CREATE TRIGGER motivbot_data_version_chibi_messages
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.chibi_messages
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_bump_data_version();
+
+-- {task, conversation, chibi_messages} -> versión
+CREATE OR REPLACE FUNCTION motivbot_get_data_version()
+RETURNS JSON
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    SELECT COALESCE(json_object_agg(scope, version), '{}'::json) FROM public.motivbot_data_version
+$$;
+
+-- =====================================================
+-- 19. ÍNDICE DE TAGS Y CO-OCURRENCIAS (MANTENIDOS POR TRIGGERS)
+-- =====================================================
+
+-- task.tags normalizado: una fila por tarea y tag distinto. Los triggers lo mantienen desde el array,
+-- que sigue siendo la fuente de verdad (las RPC y el frontend escriben ahí).
+CREATE TABLE IF NOT EXISTS public.task_tag (
+    task_id BIGINT NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (task_id, tag)
+);
+
+CREATE INDEX IF NOT EXISTS idx_task_tag_tag ON public.task_tag (tag, task_id);
+
+-- Tareas por tag; el top-N se lee de idx_motivbot_tag_count_top sin recorrer task
+CREATE TABLE IF NOT EXISTS public.motivbot_tag_count (
+    tag TEXT PRIMARY KEY,
+    task_count BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_motivbot_tag_count_top
+ON public.motivbot_tag_count (task_count DESC, tag);
+
+-- Tareas que tienen a la vez tag y related_tag. Se guardan las dos direcciones para que los
+-- relacionados de un tag sean un rango de idx_motivbot_tag_pair_top ya ordenado por frecuencia.
+CREATE TABLE IF NOT EXISTS public.motivbot_tag_pair (
+    tag TEXT NOT NULL,
+    related_tag TEXT NOT NULL,
+    task_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (tag, related_tag)
+);
+
+CREATE INDEX IF NOT EXISTS idx_motivbot_tag_pair_top
+ON public.motivbot_tag_pair (tag, task_count DESC, related_tag);
+
+-- Solo lectura desde la API; las escrituras llegan por los triggers (SECURITY DEFINER)
+ALTER TABLE public.task_tag ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.motivbot_tag_count ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.motivbot_tag_pair ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "select_policy" ON public.task_tag;
+CREATE POLICY "select_policy"
+ON public.task_tag
+FOR SELECT
+TO anon, authenticated
+USING (true);
+
+DROP POLICY IF EXISTS "select_policy" ON public.motivbot_tag_count;
+CREATE POLICY "select_policy"
+ON public.motivbot_tag_count
+FOR SELECT
+TO anon, authenticated
+USING (true);
+
+DROP POLICY IF EXISTS "select_policy" ON public.motivbot_tag_pair;
+CREATE POLICY "select_policy"
+ON public.motivbot_tag_pair
+FOR SELECT
+TO anon, authenticated
+USING (true);
+
+-- Filas de task_tag de una tarea; lo comparten los triggers y el recálculo completo
+CREATE OR REPLACE FUNCTION motivbot_task_tag_rows(t public.task)
+RETURNS SETOF public.task_tag
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT DISTINCT t.id, tag
+    FROM unnest(t.tags) AS tag
+    WHERE tag IS NOT NULL
+$$;
+
+-- Pasar las tareas afectadas de sus tags antiguos (p_old) a los nuevos (p_new). Los contadores reciben
+-- deltas agregados por clave y se escriben en orden de clave para que dos transacciones no se bloqueen.
+CREATE OR REPLACE FUNCTION motivbot_task_tag_apply(p_old public.task_tag[], p_new public.task_tag[])
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    empty_tags TEXT[];
+    empty_pair_tags TEXT[];
+    empty_pair_related TEXT[];
+BEGIN
+    DELETE FROM public.task_tag tt
+    USING (SELECT * FROM unnest(p_old) EXCEPT SELECT * FROM unnest(p_new)) AS removed
+    WHERE tt.task_id = removed.task_id AND tt.tag = removed.tag;
+
+    INSERT INTO public.task_tag (task_id, tag)
+    SELECT * FROM (SELECT * FROM unnest(p_new) EXCEPT SELECT * FROM unnest(p_old)) AS added
+    ORDER BY task_id, tag
+    ON CONFLICT DO NOTHING;
+
+    -- RETURNING dice qué claves de esta sentencia han quedado a cero: solo esas se borran, por clave primaria
+    WITH changed AS (
+        INSERT INTO public.motivbot_tag_count AS counter (tag, task_count)
+        SELECT tag, SUM(value)
+    FROM (
+            SELECT tag, 1 AS value FROM unnest(p_new)
+            UNION ALL
+            SELECT tag, -1 FROM unnest(p_old)
+        ) AS d
+        GROUP BY tag
+        HAVING SUM(value) <> 0
+        ORDER BY tag
+        ON CONFLICT (tag) DO UPDATE SET task_count = counter.task_count + EXCLUDED.task_count
+        RETURNING counter.tag, counter.task_count
+    )
+    SELECT array_agg(tag) FILTER (WHERE task_count = 0) INTO empty_tags FROM changed;
+
+    WITH changed AS (
+        INSERT INTO public.motivbot_tag_pair AS pair (tag, related_tag, task_count)
+        SELECT tag, related_tag, SUM(value)
+        FROM (
+            SELECT a.tag, b.tag AS related_tag, 1 AS value
+            FROM unnest(p_new) AS a JOIN unnest(p_new) AS b ON b.task_id = a.task_id AND b.tag <> a.tag
+            UNION ALL
+            SELECT a.tag, b.tag, -1
+            FROM unnest(p_old) AS a JOIN unnest(p_old) AS b ON b.task_id = a.task_id AND b.tag <> a.tag
+        ) AS d
+        GROUP BY tag, related_tag
+        HAVING SUM(value) <> 0
+        ORDER BY tag, related_tag
+        ON CONFLICT (tag, related_tag) DO UPDATE SET task_count = pair.task_count + EXCLUDED.task_count
+        RETURNING pair.tag, pair.related_tag, pair.task_count
+    )
+    SELECT array_agg(tag) FILTER (WHERE task_count = 0), array_agg(related_tag) FILTER (WHERE task_count = 0)
+    INTO empty_pair_tags, empty_pair_related
+    FROM changed;
+
+    -- Los tags y parejas sin tareas dejan de existir
+    IF empty_tags IS NOT NULL THEN
+        DELETE FROM public.motivbot_tag_count WHERE tag = ANY(empty_tags) AND task_count = 0;
+    END IF;
+    IF empty_pair_tags IS NOT NULL THEN
+        DELETE FROM public.motivbot_tag_pair pair
+        USING unnest(empty_pair_tags, empty_pair_related) AS empty(tag, related_tag)
+        WHERE pair.tag = empty.tag AND pair.related_tag = empty.related_tag AND pair.task_count = 0;
+    END IF;
+END;
+$$;
+
+-- Triggers por sentencia con tablas de transición. En un UPDATE solo cuentan las tareas cuyo array
+-- de tags ha cambiado: cambiar el estado de 1000 tareas no toca el índice.
+CREATE OR REPLACE FUNCTION motivbot_task_tag_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    old_tags public.task_tag[] := '{}';
+    new_tags public.task_tag[] := '{}';
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        new_tags := ARRAY(SELECT k FROM new_rows t, LATERAL motivbot_task_tag_rows(t) k);
+    ELSIF TG_OP = 'DELETE' THEN
+        old_tags := ARRAY(SELECT k FROM old_rows t, LATERAL motivbot_task_tag_rows(t) k);
+    ELSE
+        old_tags := ARRAY(
+            SELECT k FROM old_rows t, LATERAL motivbot_task_tag_rows(t) k
+            WHERE NOT EXISTS (SELECT 1 FROM new_rows n WHERE n.id = t.id AND n.tags IS NOT DISTINCT FROM t.tags)
+        );
+        new_tags := ARRAY(
+            SELECT k FROM new_rows t, LATERAL motivbot_task_tag_rows(t) k
+            WHERE NOT EXISTS (SELECT 1 FROM old_rows o WHERE o.id = t.id AND o.tags IS NOT DISTINCT FROM t.tags)
+        );
+    END IF;
+
+    IF cardinality(old_tags) > 0 OR cardinality(new_tags) > 0 THEN
+        PERFORM motivbot_task_tag_apply(old_tags, new_tags);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION motivbot_task_tag_truncate_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    TRUNCATE public.task_tag, public.motivbot_tag_count, public.motivbot_tag_pair;
+    RETURN NULL;
+END;
+$$;
+
+-- Las tablas de transición no admiten varios eventos en un mismo trigger
+DROP TRIGGER IF EXISTS motivbot_task_tag_insert ON public.task;
+CREATE TRIGGER motivbot_task_tag_insert
+    AFTER INSERT ON public.task
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_task_tag_trigger();
+
+DROP TRIGGER IF EXISTS motivbot_task_tag_update ON public.task;
+CREATE TRIGGER motivbot_task_tag_update
+    AFTER UPDATE ON public.task
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_task_tag_trigger();
+
+DROP TRIGGER IF EXISTS motivbot_task_tag_delete ON public.task;
+CREATE TRIGGER motivbot_task_tag_delete
+    AFTER DELETE ON public.task
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_task_tag_trigger();
+
+DROP TRIGGER IF EXISTS motivbot_task_tag_truncate ON public.task;
+CREATE TRIGGER motivbot_task_tag_truncate
+    AFTER TRUNCATE ON public.task
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_task_tag_truncate_trigger();
+
+-- Reconstruir el índice desde task.tags (migración o reparación tras una inconsistencia)
+CREATE OR REPLACE FUNCTION motivbot_refresh_tag_index()
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    tags_count INTEGER;
+    pairs_count INTEGER;
+BEGIN
+    -- Bloquea escrituras concurrentes hasta el commit para no perder cambios durante el recálculo
+    LOCK TABLE public.task IN SHARE MODE;
+
+    TRUNCATE public.task_tag, public.motivbot_tag_count, public.motivbot_tag_pair;
+
+    INSERT INTO public.task_tag (task_id, tag)
+    SELECT k.task_id, k.tag FROM public.task t, LATERAL motivbot_task_tag_rows(t) k;
+
+    INSERT INTO public.motivbot_tag_count (tag, task_count)
+    SELECT tag, COUNT(*) FROM public.task_tag GROUP BY tag;
+    GET DIAGNOSTICS tags_count = ROW_COUNT;
+
+    INSERT INTO public.motivbot_tag_pair (tag, related_tag, task_count)
+    SELECT a.tag, b.tag, COUNT(*)
+    FROM public.task_tag a
+    JOIN public.task_tag b ON b.task_id = a.task_id AND b.tag <> a.tag
+    GROUP BY a.tag, b.tag;
+    GET DIAGNOSTICS pairs_count = ROW_COUNT;
+
+    RETURN json_build_object('success', true, 'tags', tags_count, 'pairs', pairs_count);
+END;
+$$;
+
+-- Comparar el índice con task.tags (O(n): para comprobaciones, no para las lecturas).
+-- mismatches: {scope: task_tag|tag|pair, key, expected, actual}
+CREATE OR REPLACE FUNCTION motivbot_check_tag_index()
+RETURNS JSON
+LANGUAGE sql
+SECURITY DEFINER
+AS $$
+    WITH expected_rows AS (
+        SELECT k.* FROM public.task t, LATERAL motivbot_task_tag_rows(t) k
+    ),
+    expected_counts AS (
+        SELECT tag, COUNT(*) AS task_count FROM expected_rows GROUP BY tag
+    ),
+    expected_pairs AS (
+        SELECT a.tag, b.tag AS related_tag, COUNT(*) AS task_count
+        FROM expected_rows a
+        JOIN expected_rows b ON b.task_id = a.task_id AND b.tag <> a.tag
+        GROUP BY a.tag, b.tag
+    ),
+    mismatches AS (
+        SELECT
+            'task_tag' AS scope,
+            COALESCE(expected.task_id, actual.task_id) || ':' || COALESCE(expected.tag, actual.tag) AS key,
+            (expected.tag IS NOT NULL)::INTEGER AS expected,
+            (actual.tag IS NOT NULL)::INTEGER AS actual
+        FROM expected_rows AS expected
+        FULL JOIN public.task_tag AS actual
+            ON actual.task_id = expected.task_id AND actual.tag = expected.tag
+        WHERE expected.tag IS NULL OR actual.tag IS NULL
+        UNION ALL
+        SELECT 'tag', COALESCE(expected.tag, actual.tag),
+               COALESCE(expected.task_count, 0), COALESCE(actual.task_count, 0)
+        FROM expected_counts AS expected
+        FULL JOIN public.motivbot_tag_count AS actual ON actual.tag = expected.tag
+        WHERE COALESCE(expected.task_count, 0) <> COALESCE(actual.task_count, 0)
+        UNION ALL
+        SELECT 'pair', COALESCE(expected.tag, actual.tag) || ' + ' || COALESCE(expected.related_tag, actual.related_tag),
+               COALESCE(expected.task_count, 0), COALESCE(actual.task_count, 0)
+        FROM expected_pairs AS expected
+        FULL JOIN public.motivbot_tag_pair AS actual
+            ON actual.tag = expected.tag AND actual.related_tag = expected.related_tag
+        WHERE COALESCE(expected.task_count, 0) <> COALESCE(actual.task_count, 0)
+    )
+    SELECT json_build_object(
+        'consistent', COUNT(*) = 0,
+        'mismatches', COALESCE(json_agg(mismatches ORDER BY scope, key), '[]'::json)
+    )
+    FROM mismatches
+$$;
+
+-- Tags que más aparecen junto a p_tags, ordenados por el número de tareas que los comparten.
+-- Con un tag es un rango de idx_motivbot_tag_pair_top (O(log n + p_limit)); con varios se suman
+-- las co-ocurrencias de cada uno. Los tags de p_tags no se sugieren.
+CREATE OR REPLACE FUNCTION motivbot_get_related_tags(
+    p_tags TEXT[],
+    p_limit INTEGER DEFAULT 10
+)
+RETURNS JSON
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+AS $$
+DECLARE
+    result JSON;
+BEGIN
+    IF cardinality(p_tags) = 1 THEN
+        SELECT COALESCE(json_agg(json_build_object('tag', related_tag, 'count', task_count)), '[]'::json)
+        INTO result
+        FROM (
+            SELECT related_tag, task_count
+            FROM public.motivbot_tag_pair
+            WHERE tag = p_tags[1]
+            ORDER BY task_count DESC, related_tag
+            LIMIT p_limit
+        ) related;
+    ELSE
+        SELECT COALESCE(json_agg(json_build_object('tag', related_tag, 'count', task_count)), '[]'::json)
+        INTO result
+        FROM (
+            SELECT related_tag, SUM(task_count)::BIGINT AS task_count
+            FROM public.motivbot_tag_pair
+            WHERE tag = ANY(p_tags) AND related_tag <> ALL(p_tags)
+            GROUP BY related_tag
+            ORDER BY task_count DESC, related_tag
+            LIMIT p_limit
+        ) related;
+    END IF;
+
+    RETURN result;
+END;
+$$;
+
+SELECT motivbot_refresh_tag_index();
+
+-- Escribir el índice queda reservado a los triggers y al propietario
+REVOKE EXECUTE ON FUNCTION motivbot_task_tag_apply FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION motivbot_refresh_tag_index FROM PUBLIC, anon, authenticated;
+
+-- =====================================================
+-- 20. MENSAJES MOTIVACIONALES PRECALCULADOS POR TAGS DE LA TAREA
+-- =====================================================
+
+-- chibi_messages.tags normalizado; (tag, message_id DESC) da los mensajes más recientes de cada tag
+CREATE TABLE IF NOT EXISTS public.chibi_message_tag (
+    tag TEXT NOT NULL,
+    message_id INTEGER NOT NULL,
+    PRIMARY KEY (tag, message_id)
+);
+
+-- Relevancia precalculada por conjunto de tags (los de una tarea, sin repetidos y ordenados): las tareas
+-- con los mismos tags comparten filas. score es el número de tags compartidos; se guardan los
+-- mejores de cada estado para que el filtro por estado también sea una lectura por índice.
+CREATE TABLE IF NOT EXISTS public.motivbot_message_match_set (
+    tag_set TEXT[] PRIMARY KEY,
+    computed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Conjuntos que contienen alguno de los tags de los mensajes que cambian
+CREATE INDEX IF NOT EXISTS idx_motivbot_message_match_set_tags
+ON public.motivbot_message_match_set USING GIN (tag_set);
+
+CREATE TABLE IF NOT EXISTS public.motivbot_message_match (
+    tag_set TEXT[] NOT NULL,
+    message_id INTEGER NOT NULL,
+    estado VARCHAR(50) NOT NULL,
+    score INTEGER NOT NULL,
+    PRIMARY KEY (tag_set, message_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_motivbot_message_match_top
+ON public.motivbot_message_match (tag_set, estado, score DESC);
+
+-- Tablas internas: solo las leen y escriben las funciones SECURITY DEFINER
+ALTER TABLE public.chibi_message_tag ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.motivbot_message_match_set ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.motivbot_message_match ENABLE ROW LEVEL SECURITY;
+
+-- Tags de una tarea como clave de motivbot_message_match: sin NULL, sin repetidos y ordenados
+CREATE OR REPLACE FUNCTION motivbot_tag_set(p_tags TEXT[])
+RETURNS TEXT[]
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT ARRAY(SELECT DISTINCT tag FROM unnest(p_tags) AS tag WHERE tag IS NOT NULL ORDER BY tag)
+$$;
+
+-- Relevancia de los mensajes para un conjunto de tags: todos los mensajes de las listas de
+-- chibi_message_tag de sus tags, puntuados por tags compartidos; se guardan los 10 mejores de cada estado
+-- y, a igualdad, los más recientes.
+CREATE OR REPLACE FUNCTION motivbot_message_match_compute(p_tag_set TEXT[])
+RETURNS SETOF public.motivbot_message_match
+LANGUAGE sql
+STABLE
+AS $$
+    WITH scored AS (
+        SELECT mt.message_id, count(*)::INTEGER AS score
+        FROM public.chibi_message_tag mt
+        WHERE mt.tag = ANY(p_tag_set)
+        GROUP BY mt.message_id
+    )
+    SELECT p_tag_set, id, estado, score
+    FROM (
+        SELECT cm.id, cm.estado, scored.score,
+               row_number() OVER (PARTITION BY cm.estado ORDER BY scored.score DESC, cm.id DESC) AS rn
+        FROM scored
+        JOIN chibi_messages cm ON cm.id = scored.message_id
+    ) AS ranked
+    WHERE rn <= 10
+$$;
+
+-- Recalcular los conjuntos guardados que contienen alguno de p_tags. El bloqueo espera a las tareas en curso
+-- que añaden conjuntos y hace esperar a las siguientes hasta el commit: ningún conjunto queda calculado con
+-- los mensajes de antes del cambio.
+CREATE OR REPLACE FUNCTION motivbot_message_match_recompute(p_tags TEXT[])
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    sets_count INTEGER;
+BEGIN
+    LOCK TABLE public.motivbot_message_match_set IN SHARE ROW EXCLUSIVE MODE;
+
+    DELETE FROM public.motivbot_message_match m
+    USING public.motivbot_message_match_set s
+    WHERE s.tag_set && p_tags AND m.tag_set = s.tag_set;
+
+    INSERT INTO public.motivbot_message_match
+    SELECT m.*
+    FROM public.motivbot_message_match_set s, LATERAL motivbot_message_match_compute(s.tag_set) m
+    WHERE s.tag_set && p_tags;
+
+    UPDATE public.motivbot_message_match_set SET computed_at = NOW() WHERE tag_set && p_tags;
+    GET DIAGNOSTICS sets_count = ROW_COUNT;
+    RETURN sets_count;
+END;
+$$;
+
+-- Triggers por sentencia sobre chibi_messages: mantienen chibi_message_tag y recalculan los conjuntos con
+-- tags de los mensajes insertados, borrados o con tags o estado cambiados (los mensajes cambian poco y las
+-- lecturas, mucho). Cambiar el texto de un mensaje no recalcula nada.
+CREATE OR REPLACE FUNCTION motivbot_chibi_message_tag_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    old_tags public.chibi_message_tag[] := '{}';
+    new_tags public.chibi_message_tag[] := '{}';
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        new_tags := ARRAY(
+            SELECT DISTINCT ROW(tag, n.id)::public.chibi_message_tag
+            FROM new_rows n, unnest(n.tags) AS tag
+            WHERE tag IS NOT NULL
+        );
+    ELSIF TG_OP = 'DELETE' THEN
+        old_tags := ARRAY(
+            SELECT DISTINCT ROW(tag, o.id)::public.chibi_message_tag
+            FROM old_rows o, unnest(o.tags) AS tag
+            WHERE tag IS NOT NULL
+        );
+    ELSE
+        old_tags := ARRAY(
+            SELECT DISTINCT ROW(tag, o.id)::public.chibi_message_tag
+            FROM old_rows o, unnest(o.tags) AS tag
+            WHERE tag IS NOT NULL
+              AND NOT EXISTS (
+                  SELECT 1 FROM new_rows n
+                  WHERE n.id = o.id AND n.tags IS NOT DISTINCT FROM o.tags AND n.estado IS NOT DISTINCT FROM o.estado
+              )
+        );
+        new_tags := ARRAY(
+            SELECT DISTINCT ROW(tag, n.id)::public.chibi_message_tag
+            FROM new_rows n, unnest(n.tags) AS tag
+            WHERE tag IS NOT NULL
+              AND NOT EXISTS (
+                  SELECT 1 FROM old_rows o
+                  WHERE o.id = n.id AND o.tags IS NOT DISTINCT FROM n.tags AND o.estado IS NOT DISTINCT FROM n.estado
+              )
+        );
+    END IF;
+
+    IF cardinality(old_tags) = 0 AND cardinality(new_tags) = 0 THEN
+        RETURN NULL;
+    END IF;
+
+    DELETE FROM public.chibi_message_tag mt
+    USING (SELECT * FROM unnest(old_tags) EXCEPT SELECT * FROM unnest(new_tags)) AS removed
+    WHERE mt.tag = removed.tag AND mt.message_id = removed.message_id;
+
+    INSERT INTO public.chibi_message_tag (tag, message_id)
+    SELECT * FROM (SELECT * FROM unnest(new_tags) EXCEPT SELECT * FROM unnest(old_tags)) AS added
+    ORDER BY tag, message_id
+    ON CONFLICT DO NOTHING;
+
+    PERFORM motivbot_message_match_recompute(ARRAY(
+        SELECT tag FROM unnest(old_tags) UNION SELECT tag FROM unnest(new_tags)
+    ));
+
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION motivbot_chibi_message_tag_truncate_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    -- Los conjuntos de las tareas se conservan: sin mensajes se quedan sin filas hasta que lleguen otros
+    TRUNCATE public.chibi_message_tag, public.motivbot_message_match;
+    RETURN NULL;
+END;
+$$;
+
+-- Las tablas de transición no admiten varios eventos en un mismo trigger
+DROP TRIGGER IF EXISTS motivbot_chibi_message_tag_insert ON chibi_messages;
+CREATE TRIGGER motivbot_chibi_message_tag_insert
+    AFTER INSERT ON chibi_messages
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_chibi_message_tag_trigger();
+
+DROP TRIGGER IF EXISTS motivbot_chibi_message_tag_update ON chibi_messages;
+CREATE TRIGGER motivbot_chibi_message_tag_update
+    AFTER UPDATE ON chibi_messages
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_chibi_message_tag_trigger();
+
+DROP TRIGGER IF EXISTS motivbot_chibi_message_tag_delete ON chibi_messages;
+CREATE TRIGGER motivbot_chibi_message_tag_delete
+    AFTER DELETE ON chibi_messages
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_chibi_message_tag_trigger();
+
+DROP TRIGGER IF EXISTS motivbot_chibi_message_tag_truncate ON chibi_messages;
+CREATE TRIGGER motivbot_chibi_message_tag_truncate
+    AFTER TRUNCATE ON chibi_messages
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_chibi_message_tag_truncate_trigger();
+
+-- Triggers por sentencia sobre task: una tarea con un conjunto de tags nuevo lo calcula al escribirse, así
+-- que la lectura nunca calcula nada. El LOCK (el mismo modo que toma el INSERT) espera a un recálculo en
+-- curso, y la sentencia siguiente calcula con los mensajes que ese recálculo deja.
+CREATE OR REPLACE FUNCTION motivbot_message_match_task_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    changed public.task[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        changed := ARRAY(SELECT n FROM new_rows n WHERE cardinality(n.tags) > 0);
     ELSE
-        tag_stats := json_build_object('total_unique', 0, 'most_used', '[]'::json);
+        changed := ARRAY(
+            SELECT n FROM new_rows n
+            WHERE cardinality(n.tags) > 0
+              AND NOT EXISTS (SELECT 1 FROM old_rows o WHERE o.id = n.id AND o.tags IS NOT DISTINCT FROM n.tags)
+        );
     END IF;
-    
-    -- Calcular tasa de completitud
-    SELECT CASE 
-        WHEN COUNT(*) = 0 THEN 0
-        ELSE ROUND((COUNT(*) FILTER (WHERE status = 'completed')::NUMERIC / COUNT(*)) * 100, 2)
-    END INTO completion_rate FROM public.task;
-    
-    -- Calcular tareas activas (CORREGIDO: usar guiones)
-    SELECT COUNT(*) INTO active_tasks 
-    FROM public.task 
-    WHERE status IN ('pending', 'in-progress', 'on-hold');
-    
-    -- Construir resultado final
+    IF cardinality(changed) = 0 THEN
+        RETURN NULL;
+    END IF;
+
+    LOCK TABLE public.motivbot_message_match_set IN ROW EXCLUSIVE MODE;
+
+    WITH inserted AS (
+        INSERT INTO public.motivbot_message_match_set (tag_set)
+        SELECT DISTINCT motivbot_tag_set(t.tags)
+        FROM unnest(changed) AS t
+        WHERE cardinality(motivbot_tag_set(t.tags)) > 0
+        ORDER BY 1
+        ON CONFLICT (tag_set) DO NOTHING
+        RETURNING tag_set
+    )
+    INSERT INTO public.motivbot_message_match
+    SELECT m.*
+    FROM inserted, LATERAL motivbot_message_match_compute(inserted.tag_set) m;
+
+    RETURN NULL;
+END;
+$$;
+
+-- Sin tareas no quedan conjuntos que mantener
+CREATE OR REPLACE FUNCTION motivbot_message_match_task_truncate_trigger()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+    TRUNCATE public.motivbot_message_match, public.motivbot_message_match_set;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS motivbot_message_match_task_insert ON public.task;
+CREATE TRIGGER motivbot_message_match_task_insert
+    AFTER INSERT ON public.task
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_message_match_task_trigger();
+
+DROP TRIGGER IF EXISTS motivbot_message_match_task_update ON public.task;
+CREATE TRIGGER motivbot_message_match_task_update
+    AFTER UPDATE ON public.task
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_message_match_task_trigger();
+
+DROP TRIGGER IF EXISTS motivbot_message_match_task_truncate ON public.task;
+CREATE TRIGGER motivbot_message_match_task_truncate
+    AFTER TRUNCATE ON public.task
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION motivbot_message_match_task_truncate_trigger();
+
+-- Reconstruir chibi_message_tag y precalcular los conjuntos de tags de todas las tareas (migración,
+-- reparación o tras una carga de mensajes); los conjuntos que ya no usa ninguna tarea se descartan
+CREATE OR REPLACE FUNCTION motivbot_refresh_message_matches()
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    sets_count INTEGER;
+    matches_count INTEGER;
+BEGIN
+    -- Bloquea escrituras concurrentes de mensajes hasta el commit para no calcular con datos a medias
+    LOCK TABLE chibi_messages IN SHARE MODE;
+
+    TRUNCATE public.chibi_message_tag, public.motivbot_message_match, public.motivbot_message_match_set;
+
+    INSERT INTO public.chibi_message_tag (tag, message_id)
+    SELECT DISTINCT tag, cm.id
+    FROM chibi_messages cm, unnest(cm.tags) AS tag
+    WHERE tag IS NOT NULL;
+
+    INSERT INTO public.motivbot_message_match_set (tag_set)
+    SELECT sets.tag_set
+    FROM (
+        SELECT DISTINCT motivbot_tag_set(t.tags) AS tag_set
+        FROM public.task t
+        WHERE cardinality(t.tags) > 0
+    ) AS sets
+    WHERE cardinality(sets.tag_set) > 0;
+    GET DIAGNOSTICS sets_count = ROW_COUNT;
+
+    INSERT INTO public.motivbot_message_match
+    SELECT m.*
+    FROM public.motivbot_message_match_set s, LATERAL motivbot_message_match_compute(s.tag_set) m;
+    GET DIAGNOSTICS matches_count = ROW_COUNT;
+
+    RETURN json_build_object('success', true, 'sets', sets_count, 'matches', matches_count);
+END;
+$$;
+
+SELECT motivbot_refresh_message_matches();
+
+-- Escribir el precálculo queda reservado a las funciones SECURITY DEFINER y al propietario
+REVOKE EXECUTE ON FUNCTION motivbot_message_match_recompute FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION motivbot_refresh_message_matches FROM PUBLIC, anon, authenticated;
+
+-- =====================================================
+-- 21. ESTADÍSTICAS DE LATENCIA POR RPC
+-- =====================================================
+
+-- Las RPC no escriben nada para medirse: las cifras salen de pg_stat_statements (activa por defecto en
+-- Supabase). Si la extensión no está disponible el esquema se carga igual y motivbot_get_rpc_stats lo dice.
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS pg_stat_statements;
+EXCEPTION WHEN OTHERS THEN
+    RAISE NOTICE 'pg_stat_statements no disponible: %', SQLERRM;
+END $$;
+
+-- Sentencias de pg_stat_statements de esta base que llaman a cada función motivbot_* (por nombre seguido de
+-- paréntesis, así motivbot_get_tasks no recoge a motivbot_get_tasks_page). Con el pg_stat_statements.track
+-- por defecto solo cuentan las de primer nivel: las de PostgREST o psql, no las llamadas anidadas.
+CREATE OR REPLACE FUNCTION motivbot_rpc_statements()
+RETURNS TABLE(rpc NAME, queryid BIGINT, calls BIGINT, total_ms FLOAT8, mean_ms FLOAT8, stddev_ms FLOAT8,
+              min_ms FLOAT8, max_ms FLOAT8)
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+AS $$
+DECLARE
+    stats_schema NAME;
+BEGIN
+    SELECT n.nspname INTO stats_schema
+    FROM pg_extension e
+    JOIN pg_namespace n ON n.oid = e.extnamespace
+    WHERE e.extname = 'pg_stat_statements';
+
+    IF stats_schema IS NULL THEN
+        RAISE EXCEPTION 'pg_stat_statements no está instalada' USING ERRCODE = 'undefined_object';
+    END IF;
+
+    RETURN QUERY EXECUTE format($query$
+        SELECT p.proname, s.queryid, s.calls, s.total_exec_time, s.mean_exec_time, s.stddev_exec_time,
+               s.min_exec_time, s.max_exec_time
+        FROM (
+            SELECT DISTINCT proname
+            FROM pg_proc
+            WHERE pronamespace = 'public'::regnamespace AND proname LIKE 'motivbot\_%%'
+        ) p
+        JOIN %I.pg_stat_statements s ON s.query ~ ('\m' || p.proname || '"?\s*\(')
+        WHERE s.dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+    $query$, stats_schema);
+END;
+$$;
+
+-- Llamadas, errores capturados (motivbot_rpc_error) y duración (total, media, desviación, mínima y máxima) de
+-- cada RPC desde el último reset, ordenadas por tiempo total. Sin la extensión cargada devuelve {success: false}.
+CREATE OR REPLACE FUNCTION motivbot_get_rpc_stats()
+RETURNS JSON
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+AS $$
+DECLARE
+    result JSON;
+BEGIN
+    WITH totals AS (
+        SELECT
+            rpc,
+            SUM(calls) AS calls,
+            SUM(total_ms) AS total_ms,
+            -- Varianza combinada de las sentencias de la misma RPC: E[x²] - E[x]²
+            SUM(calls * (stddev_ms ^ 2 + mean_ms ^ 2)) AS square_ms,
+            MIN(min_ms) AS min_ms,
+            MAX(max_ms) AS max_ms
+        FROM motivbot_rpc_statements()
+        WHERE calls > 0
+        GROUP BY rpc
+    )
+    SELECT COALESCE(json_agg(json_build_object(
+        'rpc', totals.rpc,
+        'calls', calls,
+        'errors', COALESCE(e.errors, 0),
+        'total_ms', round(total_ms::NUMERIC, 3),
+        'mean_ms', round((total_ms / calls)::NUMERIC, 3),
+        'stddev_ms', round(sqrt(GREATEST(square_ms / calls - (total_ms / calls) ^ 2, 0))::NUMERIC, 3),
+        'min_ms', round(min_ms::NUMERIC, 3),
+        'max_ms', round(max_ms::NUMERIC, 3)
+    ) ORDER BY total_ms DESC, totals.rpc), '[]'::json)
+    INTO result
+    FROM totals
+    LEFT JOIN public.motivbot_rpc_error e ON e.rpc = totals.rpc;
+
+    RETURN result;
+EXCEPTION
+    -- Instalada pero sin cargar en shared_preload_libraries
+    WHEN undefined_object OR object_not_in_prerequisite_state THEN
+        RETURN json_build_object('success', false, 'message', SQLERRM);
+END;
+$$;
+
+-- Poner a cero las sentencias de las RPC motivbot_* (las demás de pg_stat_statements se conservan) y sus errores
+CREATE OR REPLACE FUNCTION motivbot_reset_rpc_stats()
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    stats_schema NAME;
+    statement_id BIGINT;
+    rows_count INTEGER := 0;
+BEGIN
+    SELECT n.nspname INTO stats_schema
+    FROM pg_extension e
+    JOIN pg_namespace n ON n.oid = e.extnamespace
+    WHERE e.extname = 'pg_stat_statements';
+
+    FOR statement_id IN SELECT DISTINCT queryid FROM motivbot_rpc_statements() LOOP
+        EXECUTE format('SELECT %I.pg_stat_statements_reset(0, 0, $1)', stats_schema) USING statement_id;
+        rows_count := rows_count + 1;
+    END LOOP;
+    DELETE FROM public.motivbot_rpc_error;
+
+    RETURN json_build_object('success', true, 'reset', rows_count);
+EXCEPTION
+    WHEN undefined_object OR object_not_in_prerequisite_state THEN
+        RETURN json_build_object('success', false, 'message', SQLERRM);
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION motivbot_rpc_statements FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION motivbot_count_rpc_error FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION motivbot_reset_rpc_stats FROM PUBLIC, anon, authenticated;
+
+-- =====================================================
+-- 22. TAREAS ENLAZADAS A ISSUES EXTERNOS (SINCRONIZACIÓN DE GITHUB)
+-- =====================================================
+
+-- Upsert de una página de issues en una sola sentencia sobre idx_task_external_key.
+-- p_tasks: array JSON de {repo, external_id, title, description, status, priority, due_date, due_time, tags}.
+-- Un issue nuevo crea su tarea; uno ya enlazado actualiza título y descripción, pasa a 'completed' al
+-- cerrarse y vuelve a 'pending' si se reabre (el resto de estados y la prioridad, fechas y tags son del usuario).
+-- Devuelve por cada elemento de entrada {id, repo, external_id, action: inserted | updated | unchanged}
+CREATE OR REPLACE FUNCTION motivbot_upsert_external_tasks(
+    p_source TEXT,
+    p_tasks JSONB
+)
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    result JSON;
+BEGIN
+    IF COALESCE(trim(p_source), '') = '' THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Source is required'
+        );
+    END IF;
+
+    IF p_tasks IS NULL OR jsonb_typeof(p_tasks) <> 'array' THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Tasks must be a JSON array'
+        );
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM jsonb_array_elements(p_tasks) AS t(task)
+        WHERE COALESCE(trim(task->>'title'), '') = ''
+           OR COALESCE(task->>'repo', '') = ''
+           OR COALESCE(task->>'external_id', '') = ''
+    ) THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Title, repo and external_id are required for every task'
+        );
+    END IF;
+
+    -- ON CONFLICT no puede tocar dos veces la misma fila: de un issue repetido en la página vale el último
+    WITH input AS (
+        SELECT task, ord
+        FROM jsonb_array_elements(p_tasks) WITH ORDINALITY AS t(task, ord)
+    ),
+    latest AS (
+        SELECT DISTINCT ON (task->>'repo', task->>'external_id') task, ord
+        FROM input
+        ORDER BY task->>'repo', task->>'external_id', ord DESC
+    ),
+    upserted AS (
+        INSERT INTO public.task AS t (
+            title, description, status, priority, due_date, due_time, tags,
+            external_source, external_repo, external_id
+        )
+        SELECT
+            trim(task->>'title'),
+            NULLIF(trim(task->>'description'), ''),
+            COALESCE(task->>'status', 'pending')::task_status,
+            COALESCE(task->>'priority', 'normal'),
+            (task->>'due_date')::DATE,
+            (task->>'due_time')::TIME,
+            CASE
+                WHEN jsonb_typeof(task->'tags') = 'array'
+                THEN ARRAY(SELECT jsonb_array_elements_text(task->'tags'))
+                ELSE motivbot_generate_tags(task->>'title', task->>'priority')
+            END,
+            p_source,
+            task->>'repo',
+            task->>'external_id'
+        FROM latest
+        ORDER BY ord
+        ON CONFLICT (external_source, external_repo, external_id) DO UPDATE SET
+            title = EXCLUDED.title,
+            description = EXCLUDED.description,
+            status = CASE
+                WHEN EXCLUDED.status = 'completed' OR t.status = 'completed' THEN EXCLUDED.status
+                ELSE t.status
+            END
+        -- Sin cambios no se escribe: no se tocan updated_at, contadores ni versiones
+        WHERE (t.title, t.description) IS DISTINCT FROM (EXCLUDED.title, EXCLUDED.description)
+           OR (EXCLUDED.status = 'completed') <> (t.status = 'completed')
+        RETURNING t.id, t.external_repo, t.external_id, (t.xmax = 0) AS inserted
+    )
+    SELECT COALESCE(json_agg(json_build_object(
+        'id', COALESCE(u.id, existing.id),
+        'repo', input.task->>'repo',
+        'external_id', input.task->>'external_id',
+        'action', CASE WHEN u.id IS NULL THEN 'unchanged' WHEN u.inserted THEN 'inserted' ELSE 'updated' END
+    ) ORDER BY input.ord), '[]'::json)
+    INTO result
+    FROM input
+    LEFT JOIN upserted u
+        ON u.external_repo = input.task->>'repo' AND u.external_id = input.task->>'external_id'
+    -- Los issues sin cambios no salen en RETURNING: su id se lee del índice
+    LEFT JOIN public.task existing
+        ON u.id IS NULL
+       AND existing.external_source = p_source
+       AND existing.external_repo = input.task->>'repo'
+       AND existing.external_id = input.task->>'external_id';
+
+    RETURN json_build_object(
+        'success', true,
+        'tasks', result,
+        'message', 'External tasks synchronized successfully'
+    );
+
+EXCEPTION
+    WHEN OTHERS THEN
+        PERFORM motivbot_count_rpc_error('motivbot_upsert_external_tasks', SQLERRM);
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Error synchronizing external tasks: ' || SQLERRM
+        );
+END;
+$$;
+
+-- =====================================================
+-- 23. PUNTOS DE CONTROL DE LA SINCRONIZACIÓN INCREMENTAL
+-- =====================================================
+
+-- Por fuente y repositorio: updated_at del último issue sincronizado (se pide a GitHub con since=) y ETag
+-- de la primera página de esa petición (If-None-Match: un 304 no gasta cuota)
+CREATE TABLE IF NOT EXISTS public.motivbot_sync_checkpoint (
+    source TEXT NOT NULL,
+    repo TEXT NOT NULL,
+    since TIMESTAMPTZ,
+    etag TEXT,
+    synced_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (source, repo)
+);
+
+-- Solo lectura desde la API; se escriben con motivbot_save_sync_checkpoints
+ALTER TABLE public.motivbot_sync_checkpoint ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "select_policy" ON public.motivbot_sync_checkpoint;
+CREATE POLICY "select_policy"
+ON public.motivbot_sync_checkpoint
+FOR SELECT
+TO anon, authenticated
+USING (true);
+
+CREATE OR REPLACE FUNCTION motivbot_get_sync_checkpoints(p_source TEXT)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    SELECT COALESCE(json_agg(json_build_object(
+        'repo', c.repo,
+        'since', c.since,
+        'etag', c.etag,
+        'synced_at', c.synced_at
+    ) ORDER BY c.repo), '[]'::json)
+    FROM public.motivbot_sync_checkpoint c
+    WHERE c.source = p_source
+$$;
+
+-- p_checkpoints: array JSON de {repo, since, etag}. since nunca retrocede: una sincronización que
+-- termina tarde con datos más antiguos no hace volver a descargar lo ya enlazado
+CREATE OR REPLACE FUNCTION motivbot_save_sync_checkpoints(
+    p_source TEXT,
+    p_checkpoints JSONB
+)
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    rows_count INTEGER;
+BEGIN
+    IF COALESCE(trim(p_source), '') = '' OR p_checkpoints IS NULL OR jsonb_typeof(p_checkpoints) <> 'array' THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Source and a JSON array of checkpoints are required'
+        );
+    END IF;
+
+    IF EXISTS (
+        SELECT 1 FROM jsonb_array_elements(p_checkpoints) AS c(checkpoint)
+        WHERE COALESCE(checkpoint->>'repo', '') = ''
+    ) THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Repo is required for every checkpoint'
+        );
+    END IF;
+
+    INSERT INTO public.motivbot_sync_checkpoint AS c (source, repo, since, etag, synced_at)
+    SELECT DISTINCT ON (checkpoint->>'repo')
+        p_source,
+        checkpoint->>'repo',
+        (checkpoint->>'since')::TIMESTAMPTZ,
+        checkpoint->>'etag',
+        NOW()
+    FROM jsonb_array_elements(p_checkpoints) WITH ORDINALITY AS t(checkpoint, ord)
+    ORDER BY checkpoint->>'repo', ord DESC
+    ON CONFLICT (source, repo) DO UPDATE SET
+        since = GREATEST(c.since, EXCLUDED.since),
+        etag = CASE WHEN EXCLUDED.since < c.since THEN c.etag ELSE EXCLUDED.etag END,
+        synced_at = EXCLUDED.synced_at;
+    GET DIAGNOSTICS rows_count = ROW_COUNT;
+
+    RETURN json_build_object(
+        'success', true,
+        'count', rows_count,
+        'message', 'Checkpoints saved successfully'
+    );
+
+EXCEPTION
+    WHEN OTHERS THEN
+        PERFORM motivbot_count_rpc_error('motivbot_save_sync_checkpoints', SQLERRM);
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Error saving checkpoints: ' || SQLERRM
+        );
+END;
+$$;
+
+-- =====================================================
+-- 24. CALENDARIO POR RANGO DE FECHAS (VISTAS DE SEMANA Y MES)
+-- =====================================================
+
+-- Un elemento por día entre p_start y p_end (ambos incluidos, también los días vacíos) con el total, el
+-- recuento por estado y las primeras p_limit_per_day tareas por hora (NULL: todas). Los recuentos son un
+-- recorrido solo de índice de idx_task_due_date_time y las tareas de cada día, un recorrido ordenado del mismo
+CREATE OR REPLACE FUNCTION motivbot_get_calendar(
+    p_start DATE,
+    p_end DATE,
+    p_limit_per_day INTEGER DEFAULT 50
+)
+RETURNS JSON
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+AS $$
+DECLARE
+    result JSON;
+BEGIN
+    IF p_start IS NULL OR p_end IS NULL OR p_end < p_start THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Start and end dates are required and end cannot be before start'
+        );
+    END IF;
+
+    IF p_end - p_start >= 366 THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Date range cannot exceed 366 days'
+        );
+    END IF;
+
+    IF p_limit_per_day < 0 THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Limit per day cannot be negative'
+        );
+    END IF;
+
+    WITH counts AS (
+        SELECT due_date, sum(n)::INTEGER AS total, json_object_agg(status, n) AS by_status
+        FROM (
+            SELECT due_date, status::TEXT AS status, count(*)::INTEGER AS n
+            FROM public.task
+            WHERE due_date BETWEEN p_start AND p_end
+            GROUP BY due_date, status
+        ) s
+        GROUP BY due_date
+    )
     SELECT json_build_object(
-        'tasks', task_stats,
-        'conversations', conversation_stats,
-        'tags', tag_stats,
-        'completion_rate', completion_rate,
-        'active_tasks', active_tasks
-    ) INTO result;
-    
+        'success', true,
+        'start', p_start,
+        'end', p_end,
+        'total', COALESCE(sum(c.total), 0),
+        'days', json_agg(json_build_object(
+            'date', d.day,
+            'total', COALESCE(c.total, 0),
+            'by_status', COALESCE(c.by_status, '{}'::json),
+            'tasks', COALESCE(day_tasks.tasks, '[]'::json)
+        ) ORDER BY d.day)
+    )
+    INTO result
+    FROM (SELECT p_start + i AS day FROM generate_series(0, p_end - p_start) AS i) d
+    LEFT JOIN counts c ON c.due_date = d.day
+    -- Los días sin tareas no consultan la tabla
+    LEFT JOIN LATERAL (
+        SELECT json_agg(motivbot_task_json(t) ORDER BY t.due_time, t.id) AS tasks
+        FROM (
+            SELECT *
+            FROM public.task
+            WHERE due_date = d.day
+            ORDER BY due_time, id
+            LIMIT p_limit_per_day
+        ) t
+    ) day_tasks ON c.total IS NOT NULL;
+
     RETURN result;
-    
+END;
+$$;
+
+-- =====================================================
+-- 25. ARRASTRE DIARIO DE TAREAS VENCIDAS
+-- =====================================================
+
+-- Un registro por día: el primero que lo inserta mueve las tareas, los demás de ese día no escriben nada
+CREATE TABLE IF NOT EXISTS public.motivbot_rollover_run (
+    run_date DATE PRIMARY KEY,
+    rolled INTEGER NOT NULL DEFAULT 0,
+    ran_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Solo lectura desde la API; se escribe con motivbot_rollover_overdue_tasks
+ALTER TABLE public.motivbot_rollover_run ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "select_policy" ON public.motivbot_rollover_run;
+CREATE POLICY "select_policy"
+ON public.motivbot_rollover_run
+FOR SELECT
+TO anon, authenticated
+USING (true);
+
+-- Pasa a p_today las tareas abiertas (pending, in-progress, on-hold) con fecha límite anterior, sin tocar
+-- su hora, y devuelve sus ids. Las de hoy, las futuras y las que no tienen fecha no se reescriben, así que
+-- update_updated_at y los triggers de contadores solo se disparan para las vencidas. La segunda llamada
+-- del mismo día (también una concurrente, que espera a que la primera confirme) devuelve already_run
+CREATE OR REPLACE FUNCTION motivbot_rollover_overdue_tasks(p_today DATE DEFAULT CURRENT_DATE)
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    rolled_ids BIGINT[];
+BEGIN
+    -- Un día futuro movería todas las tareas abiertas hacia delante
+    IF p_today IS NULL OR p_today > CURRENT_DATE THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Rollover date is required and cannot be in the future'
+        );
+    END IF;
+
+    INSERT INTO public.motivbot_rollover_run (run_date)
+    VALUES (p_today)
+    ON CONFLICT (run_date) DO NOTHING;
+
+    IF NOT FOUND THEN
+        RETURN json_build_object(
+            'success', true,
+            'already_run', true,
+            'date', p_today,
+            'task_ids', '[]'::json,
+            'count', 0,
+            'message', 'Overdue tasks were already rolled over for this date'
+        );
+    END IF;
+
+    WITH rolled AS (
+        UPDATE public.task
+        SET due_date = p_today
+        WHERE status IN ('pending', 'in-progress', 'on-hold')
+          AND due_date < p_today
+        RETURNING id
+    )
+    SELECT COALESCE(array_agg(id ORDER BY id), '{}')
+    INTO rolled_ids
+    FROM rolled;
+
+    UPDATE public.motivbot_rollover_run
+    SET rolled = cardinality(rolled_ids)
+    WHERE run_date = p_today;
+
+    RETURN json_build_object(
+        'success', true,
+        'already_run', false,
+        'date', p_today,
+        'task_ids', to_json(rolled_ids),
+        'count', cardinality(rolled_ids),
+        'message', 'Overdue tasks rolled over successfully'
+    );
+
 EXCEPTION
     WHEN OTHERS THEN
+        PERFORM motivbot_count_rpc_error('motivbot_rollover_overdue_tasks', SQLERRM);
         RETURN json_build_object(
             'success', false,
-            'message', 'Error retrieving dashboard: ' || SQLERRM
+            'message', 'Error rolling over overdue tasks: ' || SQLERRM
         );
 END;
 $$;
 
+-- =====================================================
+-- 26. EXPORTACIÓN COMPLETA POR BLOQUES
+-- =====================================================
+
+-- Exportación de todas las filas por id ascendente: cada llamada devuelve un bloque de como mucho p_limit
+-- (hasta 5000) a partir de p_after_id como {items, next_after_id}; next_after_id es el id del último y es
+-- NULL en el bloque final. Recorre la clave primaria desde p_after_id, así que cada bloque cuesta lo mismo
+-- sin importar cuántos se hayan exportado, y el cliente puede reanudar desde el último id que guardó
+CREATE OR REPLACE FUNCTION motivbot_export_chunk_json(p_items JSON, p_limit INTEGER)
+RETURNS JSON
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT json_build_object(
+        'items', p_items,
+        'next_after_id', CASE WHEN json_array_length(p_items) >= p_limit THEN p_items -> -1 -> 'id' END
+    )
+$$;
+
+CREATE OR REPLACE FUNCTION motivbot_export_limit(p_limit INTEGER)
+RETURNS INTEGER
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT LEAST(GREATEST(COALESCE(p_limit, 1000), 1), 5000)
+$$;
+
+CREATE OR REPLACE FUNCTION motivbot_export_tasks(
+    p_after_id BIGINT DEFAULT 0,
+    p_limit INTEGER DEFAULT 1000
+)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    SELECT motivbot_export_chunk_json(
+        COALESCE(json_agg(motivbot_task_json(t) ORDER BY t.id), '[]'::json),
+        motivbot_export_limit(p_limit)
+    )
+    FROM (
+        SELECT *
+        FROM public.task t
+        WHERE t.id > COALESCE(p_after_id, 0)
+        ORDER BY t.id
+        LIMIT motivbot_export_limit(p_limit)
+    ) t
+$$;
+
+CREATE OR REPLACE FUNCTION motivbot_export_conversations(
+    p_after_id BIGINT DEFAULT 0,
+    p_limit INTEGER DEFAULT 1000
+)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+AS $$
+    SELECT motivbot_export_chunk_json(
+        COALESCE(json_agg(motivbot_conversation_json(c) ORDER BY c.id), '[]'::json),
+        motivbot_export_limit(p_limit)
+    )
+    FROM (
+        SELECT *
+        FROM public.conversation c
+        WHERE c.id > COALESCE(p_after_id, 0)
+        ORDER BY c.id
+        LIMIT motivbot_export_limit(p_limit)
+    ) c
+$$;
+
 -- Otorgar permisos para todas las funciones
 GRANT EXECUTE ON FUNCTION motivbot_get_tasks TO anon, authenticated;
 GRANT EXECUTE ON FUNCTION motivbot_create_task TO anon, authenticated;
@@ -1329,4 +3481,33 @@ GRANT EXECUTE ON FUNCTION motivbot_search_tasks TO anon, authenticated;
 GRANT EXECUTE ON FUNCTION motivbot_update_conversation_feedback TO anon, authenticated;
 GRANT EXECUTE ON FUNCTION motivbot_delete_conversation TO anon, authenticated;
 GRANT EXECUTE ON FUNCTION motivbot_delete_task TO anon, authenticated;
-GRANT EXECUTE ON FUNCTION motivbot_get_dashboard TO anon, authenticated;
\ No newline at end of file
+GRANT EXECUTE ON FUNCTION motivbot_get_dashboard TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_get_popular_tags TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_get_motivational_messages TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_create_tasks TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_get_tasks_page TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_get_conversations_page TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_get_analytics TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION get_emotional_states_analytics(INTEGER) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_get_conversation_window TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_save_conversation_summary TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_get_unsummarized_turns TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_create_conversations TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_get_data_version TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_get_related_tags TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_get_rpc_stats TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_upsert_external_tasks TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_get_sync_checkpoints TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_save_sync_checkpoints TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_get_calendar TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_rollover_overdue_tasks TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_export_tasks TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_export_conversations TO anon, authenticated;
+
+-- Las comprobaciones recorren tablas enteras: solo para la clave service_role (mantenimiento, tests)
+REVOKE EXECUTE ON FUNCTION motivbot_check_dashboard_counters FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION motivbot_check_daily_rollups FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION motivbot_check_tag_index FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION motivbot_check_dashboard_counters TO service_role;
+GRANT EXECUTE ON FUNCTION motivbot_check_daily_rollups TO service_role;
+GRANT EXECUTE ON FUNCTION motivbot_check_tag_index TO service_role;
\ No newline at end of file
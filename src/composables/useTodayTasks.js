@@ -7,7 +7,7 @@ const error = ref(null)
 
 export const useTodayTasks = () => {
 
-  // **GET** - Obtener tareas activas y actualizar su fecha
+  // **GET** - Obtener tareas activas tras mover a hoy las vencidas
   const getTodayTasks = async () => {
     isLoading.value = true
     error.value = null
@@ -15,29 +15,21 @@ export const useTodayTasks = () => {
     try {
       console.log('🔄 Iniciando actualización de fechas...')
 
-      // ✅ Calcular fechas para hoy
-      const today = new Date()
-      const todayDate = today.toISOString().split('T')[0] // YYYY-MM-DD
-      const currentTime = today.toTimeString().slice(0, 8) // HH:MM:SS
+      // 1. Arrastrar a hoy solo las tareas abiertas ya vencidas (una vez al día, en el servidor)
+      const { data: rollover, error: rolloverError } = await supabase
+        .rpc('motivbot_rollover_overdue_tasks')
 
-      // 1. Actualizar fechas de tareas activas
-      const { data: updateData, error: updateError, count } = await supabase
-        .from('task')
-        .update({
-          updated_at: new Date().toISOString(),
-          due_date: todayDate,    // ✅ Actualizar fecha de vencimiento a hoy
-          due_time: currentTime   // ✅ Actualizar hora de vencimiento a ahora
-        })
-        .in('status', ['pending', 'in-progress', 'on-hold'])
-        .select()
-
-      if (updateError) {
-        console.error('❌ Error actualizando fechas:', updateError)
-        throw new Error(`Error actualizando fechas: ${updateError.message}`)
+      if (rolloverError || !rollover?.success) {
+        const message = rolloverError?.message || rollover?.message
+        console.error('❌ Error actualizando fechas:', message)
+        throw new Error(`Error actualizando fechas: ${message}`)
       }
 
-      console.log(`✅ Fechas actualizadas en ${updateData?.length || 0} tareas`)
-      console.log(`📅 Nueva fecha de vencimiento: ${todayDate} ${currentTime}`)
+      if (rollover.already_run) {
+        console.log(`⏭️ Las tareas vencidas ya se movieron al ${rollover.date}`)
+      } else {
+        console.log(`✅ Fechas actualizadas en ${rollover.count} tareas vencidas:`, rollover.task_ids)
+      }
 
       // 2. Obtener las tareas actualizadas
       const { data, error: fetchError } = await supabase
@@ -194,18 +194,12 @@ export const useSupabase = () => {
     try {
       console.log('📅 Filtrando tareas por día:', date)
 
-      const { data, error: queryError } = await supabase
-        .from(tableName.value)
-        .select('*')
-        .eq('due_date', date)
-        .order('due_time', { ascending: true })
-
-      if (queryError) {
-        throw queryError
-      }
+      // Un solo día sin límite de tareas: el RPC ya las devuelve ordenadas por hora
+      const calendar = await getCalendar(date, date, null)
+      const data = calendar.days[0]?.tasks || []
 
       // Actualizar el estado de tareas con las tareas filtradas
-      tasks.value = data || []
+      tasks.value = data
 
       console.log(`✅ Tareas del día ${date} cargadas:`, tasks.value.length)
       return data
@@ -225,6 +219,46 @@ export const useSupabase = () => {
     await getTasks()
   }
 
+  // ✅ CALENDARIO: un elemento por día con total, recuento por estado y tareas por hora en una sola llamada
+  // limitPerDay acota las tareas de cada día (null: todas); los recuentos siempre son completos
+  const getCalendar = async (start, end, limitPerDay = 50) => {
+    console.log('🗓️ Obteniendo calendario:', { start, end, limitPerDay })
+
+    const { data, error: rpcError } = await supabase
+      .rpc('motivbot_get_calendar', { p_start: start, p_end: end, p_limit_per_day: limitPerDay })
+
+    if (rpcError) {
+      throw rpcError
+    }
+    if (!data?.success) {
+      throw new Error(data?.message || 'Error al cargar el calendario')
+    }
+
+    console.log(`✅ Calendario ${start} → ${end}:`, data.total, 'tareas')
+    return data
+  }
+
+  // Tareas de todos los días del calendario, en orden de fecha y hora
+  const flattenCalendar = (calendar) => calendar.days.flatMap(day => day.tasks)
+
+  // Todas las tareas del rango (sin el límite por día) con el mismo loading/error que getTasks;
+  // como las consultas por rango de getTasks, no cambia tasks.value
+  const getTasksInRange = async (start, end) => {
+    loading.value = true
+    error.value = null
+
+    try {
+      return flattenCalendar(await getCalendar(start, end, null))
+    } catch (err) {
+      const errorMessage = `Error al cargar tareas: ${err.message}`
+      error.value = errorMessage
+      console.error('❌ Error completo:', err)
+      throw err
+    } finally {
+      loading.value = false
+    }
+  }
+
   // ✅ MÉTODO PARA TAREAS DE UNA SEMANA ESPECÍFICA
   const getTasksForWeek = async (startDate) => {
     console.log('📅 Obteniendo tareas para la semana desde:', startDate)
@@ -236,11 +270,7 @@ export const useSupabase = () => {
     const startStr = start.toISOString().split('T')[0]
     const endStr = end.toISOString().split('T')[0]
 
-    return await getTasks({
-      dateRange: { start: startStr, end: endStr },
-      orderBy: 'due_date',
-      ascending: true
-    })
+    return await getTasksInRange(startStr, endStr)
   }
 
   // ✅ MÉTODO PARA TAREAS DE UN MES ESPECÍFICO
@@ -253,11 +283,7 @@ export const useSupabase = () => {
     const startStr = startDate.toISOString().split('T')[0]
     const endStr = endDate.toISOString().split('T')[0]
 
-    return await getTasks({
-      dateRange: { start: startStr, end: endStr },
-      orderBy: 'due_date',
-      ascending: true
-    })
+    return await getTasksInRange(startStr, endStr)
   }
 
   // Crear nueva tarea
@@ -712,6 +738,7 @@ export const useSupabase = () => {
     getTodaysTasks,
     getUpcomingTasks,
     getTasksByDate,
+    getCalendar,
     getTasksForWeek,
     getTasksForMonth,
     createTask,
@@ -0,0 +1,246 @@
+import asyncio
+import os
+import subprocess
+import uuid
+from pathlib import Path
+
+import pytest
+from dotenv import load_dotenv
+from pytest_postgresql import factories
+from pytest_postgresql.janitor import DatabaseJanitor
+
+from motivbot import AsyncMotivBotClient, MotivBotClient, MotivBotError
+
+from .local_postgrest import LocalPostgrest, apply_schema
+
+# Cargar variables de entorno
+load_dotenv()
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--local-supabase',
+        action='store_true',
+        default=os.getenv('MOTIVBOT_LOCAL_SUPABASE') == '1',
+        help='Ejecutar los tests contra un Postgres local desechable en lugar de Supabase',
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: mide latencias contra el Postgres local (requiere --local-supabase)')
+    config.addinivalue_line('markers', 'load: prueba de carga concurrente contra el Postgres local (requiere --local-supabase)')
+    config.addinivalue_line('markers', 'serial: depende de contadores o versiones globales; con pytest-xdist contra Supabase se salta')
+    config.addinivalue_line('markers', 'bulk: inserta decenas de miles de filas; en modo local se hace VACUUM al terminar')
+
+
+def pytest_collection_modifyitems(config, items):
+    # En modo local cada worker tiene su propio Postgres; contra Supabase todos comparten las tablas
+    if is_local_mode(config) or xdist_worker() is None:
+        return
+    skip = pytest.mark.skip(reason='Comparte estado global: ejecutar sin -n (pytest -m serial)')
+    for item in items:
+        if item.get_closest_marker('serial'):
+            item.add_marker(skip)
+
+
+def is_local_mode(config):
+    return config.getoption('--local-supabase')
+
+
+def xdist_worker():
+    """Nombre del worker de pytest-xdist ('gw0', 'gw1'...) o None si la suite corre en un solo proceso"""
+    return os.getenv('PYTEST_XDIST_WORKER')
+
+
+@pytest.fixture(scope='session')
+def local_supabase(request):
+    """Postgres local con el esquema aplicado y un stand-in de PostgREST (solo en modo local)"""
+    if not is_local_mode(request.config):
+        yield None
+        return
+
+    proc = request.getfixturevalue('motivbot_postgresql_proc')
+    janitor = DatabaseJanitor(
+        user=proc.user,
+        host=proc.host,
+        port=proc.port,
+        version=proc.version,
+        dbname=proc.dbname,
+        template_dbname=proc.template_dbname,
+        password=proc.password,
+    )
+    janitor.init()
+
+    conninfo = f"host={proc.host} port={proc.port} user={proc.user} dbname={proc.dbname}"
+    if proc.password:
+        conninfo += f" password={proc.password}"
+
+    stand_in = LocalPostgrest(conninfo).start()
+
+    # Los tests leen la URL y la clave del entorno, así que basta con redirigirlas
+    previous = {key: os.environ.get(key)
+                for key in ('VITE_SUPABASE_URL', 'VITE_SUPABASE_ANON_KEY', 'SUPABASE_SERVICE_ROLE_KEY')}
+    os.environ['VITE_SUPABASE_URL'] = stand_in.url
+    os.environ['VITE_SUPABASE_ANON_KEY'] = stand_in.anon_key
+    os.environ['SUPABASE_SERVICE_ROLE_KEY'] = stand_in.service_key
+
+    yield stand_in
+
+    stand_in.stop()
+    janitor.drop()
+    for key, value in previous.items():
+        if value is None:
+            os.environ.pop(key, None)
+        else:
+            os.environ[key] = value
+
+
+def stat_statements_options():
+    """Cargar pg_stat_statements (motivbot_get_rpc_stats) si el Postgres local la trae; si no, sus tests se saltan"""
+    try:
+        libdir = subprocess.run(['pg_config', '--pkglibdir'], capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+    if not (Path(libdir.strip()) / 'pg_stat_statements.so').exists():
+        return ''
+    return '-c shared_preload_libraries=pg_stat_statements'
+
+
+# Proceso de Postgres desechable con el esquema de sql/tablas cargado
+motivbot_postgresql_proc = factories.postgresql_proc(load=[apply_schema], postgres_options=stat_statements_options())
+
+
+@pytest.fixture(autouse=True)
+def _rollback_per_test(request, local_supabase):
+    """En modo local, cada test corre dentro de una transacción que se deshace al terminar"""
+    if local_supabase is None:
+        yield
+        return
+
+    with local_supabase.rollback_scope():
+        yield
+
+    # Los benchmarks insertan hasta 1M de filas: sin limpiar, los siguientes recorrerían las tuplas muertas
+    if request.node.get_closest_marker('benchmark') or request.node.get_closest_marker('bulk'):
+        local_supabase.vacuum()
+
+
+@pytest.fixture
+def load_supabase(request, local_supabase):
+    """Stand-in con pool de conexiones sobre una base propia: las pruebas de carga confirman sus escrituras"""
+    if local_supabase is None:
+        pytest.skip('Requiere --local-supabase')
+
+    proc = request.getfixturevalue('motivbot_postgresql_proc')
+    with DatabaseJanitor(
+        user=proc.user,
+        host=proc.host,
+        port=proc.port,
+        version=proc.version,
+        dbname=f"{proc.dbname}_load",
+        template_dbname=proc.template_dbname,
+        password=proc.password,
+    ):
+        conninfo = f"host={proc.host} port={proc.port} user={proc.user} dbname={proc.dbname}_load"
+        if proc.password:
+            conninfo += f" password={proc.password}"
+
+        stand_in = LocalPostgrest(conninfo, pool_size=10).start()
+        yield stand_in
+        stand_in.stop()
+
+
+@pytest.fixture(scope='session')
+def tag_namespace():
+    """Sufijo único por worker y ejecución para los tags con los que los tests filtran la tabla compartida"""
+    return f"{xdist_worker() or 'main'}-{uuid.uuid4().hex[:6]}"
+
+
+@pytest.fixture
+def worker_tag(tag_namespace):
+    """worker_tag('sdk-page') -> 'sdk-page-gw0-1a2b3c': otro worker u otra ejecución no ve las mismas tareas"""
+    return lambda name: f"{name}-{tag_namespace}"
+
+
+@pytest.fixture
+def local_db(local_supabase):
+    """Acceso SQL directo a la base local; los tests que lo usan se saltan contra Supabase"""
+    if local_supabase is None:
+        pytest.skip('Requiere --local-supabase')
+    return local_supabase
+
+
+@pytest.fixture
+def supabase_config():
+    """Configuración de Supabase"""
+    return {
+        'url': os.getenv('VITE_SUPABASE_URL'),
+        'anon_key': os.getenv('VITE_SUPABASE_ANON_KEY'),
+        'service_key': os.getenv('SUPABASE_SERVICE_ROLE_KEY'),
+    }
+
+@pytest.fixture
+def headers(supabase_config):
+    """Headers para las peticiones HTTP"""
+    return {
+        'apikey': supabase_config['anon_key'],
+        'Authorization': f"Bearer {supabase_config['anon_key']}",
+        'Content-Type': 'application/json',
+    }
+
+@pytest.fixture
+def motivbot_client(supabase_config):
+    """Cliente con pool keep-alive apuntando a la misma instancia que los tests HTTP"""
+    with MotivBotClient(supabase_config['url'], supabase_config['anon_key']) as client:
+        yield client
+
+@pytest.fixture
+def service_client(supabase_config):
+    """Cliente con la clave service_role, para las RPC de mantenimiento (motivbot_check_*)"""
+    if not supabase_config['service_key']:
+        pytest.skip('Requiere SUPABASE_SERVICE_ROLE_KEY')
+    with MotivBotClient(supabase_config['url'], supabase_config['service_key']) as client:
+        yield client
+
+@pytest.fixture
+def cleanup_tasks(local_supabase):
+    """Fixture para limpiar tareas creadas durante los tests"""
+    created_tasks = []
+
+    def add_task(task_id):
+        """Agregar tarea para cleanup"""
+        created_tasks.append(task_id)
+
+    yield add_task
+
+    # En modo local el rollback por test ya elimina todo lo creado
+    if local_supabase is not None:
+        return
+
+    # Cleanup después de cada test: borrados concurrentes sobre un solo pool
+    if created_tasks:
+        print(f"\n🧹 Cleaning up {len(created_tasks)} test tasks...")
+        asyncio.run(_delete_tasks(created_tasks))
+
+
+CLEANUP_CONCURRENCY = 8
+
+
+async def _delete_tasks(task_ids):
+    semaphore = asyncio.Semaphore(CLEANUP_CONCURRENCY)
+
+    async def delete(client, task_id):
+        async with semaphore:
+            try:
+                result = await client.delete_task(task_id)
+                if result.get('success'):
+                    print(f"✅ Deleted task {task_id}")
+                else:
+                    print(f"⚠️  Failed to delete task {task_id}: {result.get('message')}")
+            except MotivBotError as e:
+                print(f"❌ Error deleting task {task_id}: HTTP {e.status_code}")
+            except Exception as e:
+                print(f"❌ Exception deleting task {task_id}: {e}")
+
+    async with AsyncMotivBotClient.from_env() as client:
+        await asyncio.gather(*(delete(client, task_id) for task_id in task_ids))
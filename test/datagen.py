@@ -0,0 +1,106 @@
+"""
+Generador de datos sintéticos para los benchmarks del MotivBot.
+
+Rellena `task`, `conversation` y `chibi_messages` con volúmenes y distribuciones parecidas a las reales
+(pocos tags muy usados y una cola larga, la mayoría de tareas pendientes o completadas, `neutral` como
+estado emocional más frecuente...). Todo se genera en Postgres con `generate_series` y `setseed`, así que
+la misma semilla y escala producen siempre los mismos datos.
+"""
+
+# Escala -> número de tareas; las conversaciones son ~2 por tarea y los mensajes chibi una décima parte
+SCALES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+}
+
+# Vocabulario de tags ordenado de más a menos frecuente (la elección sigue una distribución sesgada)
+TAGS = [
+    'trabajo', 'urgente', 'casa', 'personal', 'proyecto', 'reunion', 'salud', 'estudio', 'compras', 'finanzas',
+    'deporte', 'familia', 'cliente', 'documentacion', 'viaje', 'lectura', 'codigo', 'revision', 'llamada', 'email',
+    'diseño', 'marketing', 'ventas', 'soporte', 'legal', 'factura', 'inventario', 'planificacion', 'formacion',
+    'bienestar', 'hogar', 'jardin', 'mascotas', 'coche', 'banco', 'medico', 'cumpleaños', 'eventos', 'ideas', 'otros',
+]
+
+EMOTIONAL_STATES = ['neutral', 'encouraging', 'supportive', 'happy', 'calm', 'focused', 'thoughtful', 'excited', 'energetic']
+CHIBI_STATES = ['happy', 'excited', 'calm', 'energetic', 'peaceful', 'focused', 'supportive', 'thoughtful']
+
+
+def generate(db, scale, seed=42):
+    """Insertar los datos de `scale` (clave de SCALES o número de tareas) y devolver un resumen con ids útiles"""
+    tasks = SCALES[scale] if isinstance(scale, str) else int(scale)
+    [[first_task]] = db.execute("SELECT COALESCE(max(id), 0) FROM public.task")
+    db.execute("SELECT setseed(%(seed)s)", {'seed': (seed % 1000) / 1000})
+
+    # power(random(), 3) concentra la elección en los primeros tags; el subquery depende de g para
+    # que se evalúe por fila
+    db.execute("""
+        INSERT INTO public.task (title, description, status, priority, due_date, due_time, tags, created_at)
+        SELECT (ARRAY['Revisar', 'Preparar', 'Enviar', 'Llamar', 'Documentar', 'Planificar', 'Actualizar', 'Organizar'])[1 + mod(g, 8)]
+                   || ' ' || (ARRAY['informe', 'presupuesto', 'reunión', 'factura', 'propuesta', 'contrato', 'campaña',
+                                    'inventario', 'diseño', 'migración', 'documentación'])[1 + mod(g * 7, 11)]
+                   || ' ' || g,
+               'Seguimiento del área ' || (ARRAY['ventas', 'soporte', 'finanzas', 'marketing', 'legal', 'operaciones'])[1 + mod(g, 6)],
+               (CASE WHEN r < 0.40 THEN 'pending' WHEN r < 0.55 THEN 'in-progress' WHEN r < 0.60 THEN 'on-hold'
+                     WHEN r < 0.95 THEN 'completed' ELSE 'cancelled' END)::task_status,
+               CASE WHEN r2 < 0.20 THEN 'low' WHEN r2 < 0.65 THEN 'normal' WHEN r2 < 0.85 THEN 'medium' ELSE 'high' END,
+               CASE WHEN random() < 0.70 THEN CURRENT_DATE + (floor(random() * 90) - 45)::INTEGER END,
+               CASE WHEN r < 0.30 THEN make_time(8 + mod(g, 11), mod(g, 4) * 15, 0) END,
+               ARRAY(
+                   SELECT (%(tags)s::TEXT[])[1 + floor(power(random(), 3) * %(tag_count)s)::INTEGER]
+                   FROM generate_series(1, mod(g * 13, 5)) AS k
+                   WHERE g > 0
+               ),
+               NOW() - random() * INTERVAL '365 days'
+        FROM (SELECT g, random() AS r, random() AS r2 FROM generate_series(1, %(tasks)s) AS g) AS s
+    """, {'tasks': tasks, 'tags': TAGS, 'tag_count': len(TAGS)})
+
+    # 0-4 mensajes por tarea alternando usuario y asistente; se cuenta desde first_task porque las
+    # secuencias no vuelven atrás con un rollback y los ids cambian entre ejecuciones
+    db.execute("""
+        INSERT INTO public.conversation (task_id, role, message, emotional_state, tokens_used, user_is_grateful, created_at)
+        SELECT t.id,
+               (CASE WHEN mod(k, 2) = 1 THEN 'user' ELSE 'assistant' END)::conversation_role,
+               'Mensaje ' || k || ' sobre ' || t.title,
+               (%(states)s::TEXT[])[1 + floor(power(random(), 2) * %(state_count)s)::INTEGER],
+               CASE WHEN mod(k, 2) = 0 THEN floor(random() * 800)::INTEGER ELSE 0 END,
+               random() < 0.2,
+               t.created_at + k * INTERVAL '1 minute'
+        FROM public.task t
+        CROSS JOIN LATERAL generate_series(1, mod(t.id - %(first_task)s, 5)::INTEGER) AS k
+        WHERE t.id > %(first_task)s
+    """, {'first_task': first_task, 'states': EMOTIONAL_STATES, 'state_count': len(EMOTIONAL_STATES)})
+
+    db.execute("""
+        INSERT INTO chibi_messages (mensaje, estado, tags, created_at)
+        SELECT 'Mensaje chibi ' || g,
+               (%(states)s::TEXT[])[1 + mod(g, %(state_count)s)],
+               ARRAY[(%(tags)s::TEXT[])[1 + floor(power(random(), 3) * %(tag_count)s)::INTEGER], 'motivacional'],
+               NOW() - random() * INTERVAL '365 days'
+        FROM generate_series(1, %(messages)s) AS g
+    """, {
+        'messages': max(tasks // 10, 100),
+        'states': CHIBI_STATES,
+        'state_count': len(CHIBI_STATES),
+        'tags': TAGS,
+        'tag_count': len(TAGS),
+    })
+
+    # Estado estable tras autovacuum y el trabajo programado: listas pendientes de los GIN volcadas, días
+    # cerrados consolidados y estadísticas al día
+    db.execute("SELECT motivbot_refresh_daily_rollups()")
+    db.execute("SELECT gin_clean_pending_list('idx_task_search_vector'), gin_clean_pending_list('idx_task_tags')")
+    db.execute("ANALYZE public.task")
+    db.execute("ANALYZE public.conversation")
+    db.execute("ANALYZE chibi_messages")
+    db.execute("ANALYZE chibi_messages_sample")
+    db.execute("ANALYZE chibi_messages_tag_sample")
+    # Tablas que mantienen los triggers: tras un VACUUM FULL sobre la base vacía quedarían marcadas como vacías
+    db.execute("ANALYZE public.task_tag, public.motivbot_tag_count, public.motivbot_tag_pair")
+
+    [[task_id, conversation_id]] = db.execute("""
+        SELECT c.task_id, c.id FROM public.conversation c
+        WHERE c.task_id > %(first_task)s AND mod(c.task_id - %(first_task)s, 5) = 4
+        ORDER BY c.task_id LIMIT 1
+    """, {'first_task': first_task})
+    return {'tasks': tasks, 'task_id': task_id, 'conversation_id': conversation_id}
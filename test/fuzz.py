@@ -0,0 +1,166 @@
+"""
+Operaciones aleatorias sobre task y conversation para los tests que comprueban que lo que mantienen los
+triggers (contadores del dashboard, índice de tags, rollups diarios) coincide con un recálculo.
+
+Cada operación recibe la base local y un `random.Random` con semilla, de forma que un fallo se reproduce con
+la misma semilla. `run_operations` las encadena y llama a la comprobación de cada test cada pocos pasos; cada
+test elige qué operaciones mezcla y con qué peso (repetirlas en la lista las hace más probables).
+"""
+from datetime import date, timedelta
+
+STATUSES = ['pending', 'in-progress', 'on-hold', 'completed', 'cancelled']
+PRIORITIES = ['low', 'normal', 'medium', 'high', None]
+TAGS = ['trabajo', 'casa', 'urgente', 'salud', 'estudio', 'fuzz']
+ROLES = ['user', 'assistant']
+
+
+def random_tags(rng):
+    # Incluye arrays vacíos, NULL, tags NULL y tags repetidos dentro de la misma tarea
+    if rng.random() < 0.1:
+        return None
+    return [rng.choice(TAGS + [None]) for _ in range(rng.randint(0, 5))]
+
+
+def random_due_date(rng):
+    if rng.random() < 0.3:
+        return None
+    return date.today() + timedelta(days=rng.randint(-5, 5))
+
+
+def random_task(rng):
+    return {
+        'title': f"Fuzz {rng.randint(0, 10 ** 6)}",
+        'status': rng.choice(STATUSES),
+        'priority': rng.choice(PRIORITIES),
+        'tags': random_tags(rng),
+        'due_date': random_due_date(rng),
+    }
+
+
+def task_ids(db):
+    return [row[0] for row in db.execute("SELECT id FROM public.task ORDER BY id")]
+
+
+def conversation_ids(db):
+    return [row[0] for row in db.execute("SELECT id FROM public.conversation ORDER BY id")]
+
+
+def sample_ids(rng, ids, most):
+    return rng.sample(ids, min(len(ids), rng.randint(1, most)))
+
+
+def insert_task(db, rng):
+    db.execute("""
+        INSERT INTO public.task (title, status, priority, tags, due_date)
+        VALUES (%(title)s, %(status)s::task_status, %(priority)s, %(tags)s, %(due_date)s)
+    """, random_task(rng))
+
+
+def insert_tasks(db, rng):
+    """Una sentencia con varias filas, como motivbot_create_tasks"""
+    tasks = [random_task(rng) for _ in range(rng.randint(1, 20))]
+    rows = ', '.join(['(%s, %s::task_status, %s, %s::TEXT[], %s::DATE)'] * len(tasks))
+    db.execute(
+        f"INSERT INTO public.task (title, status, priority, tags, due_date) VALUES {rows}",
+        [task[field] for task in tasks for field in ('title', 'status', 'priority', 'tags', 'due_date')],
+    )
+
+
+def bulk_insert_tasks(db, rng):
+    db.execute("""
+        INSERT INTO public.task (title, status, priority, tags, due_date)
+        SELECT 'Fuzz bulk ' || g, (%(statuses)s::task_status[])[1 + mod(g, 5)], 'normal',
+               ARRAY[%(tag)s, 'bulk-' || mod(g, 3)], CURRENT_DATE - mod(g, 4)
+        FROM generate_series(1, %(rows)s) AS g
+    """, {'statuses': STATUSES, 'tag': rng.choice(TAGS), 'rows': rng.randint(10, 200)})
+
+
+def update_task(db, rng):
+    """Una columna al azar (también las que no cuentan en ningún contador) en hasta 20 tareas"""
+    ids = task_ids(db)
+    if not ids:
+        return
+    column, value = rng.choice([
+        ('status', rng.choice(STATUSES)),
+        ('priority', rng.choice(PRIORITIES)),
+        ('tags', random_tags(rng)),
+        ('due_date', random_due_date(rng)),
+        ('title', 'Fuzz renamed'),
+    ])
+    cast = '::task_status' if column == 'status' else ''
+    db.execute(
+        f"UPDATE public.task SET {column} = %(value)s{cast} WHERE id = ANY(%(ids)s)",
+        {'value': value, 'ids': sample_ids(rng, ids, 20)},
+    )
+
+
+def update_tags(db, rng):
+    ids = task_ids(db)
+    if ids:
+        db.execute(
+            "UPDATE public.task SET tags = %(tags)s WHERE id = ANY(%(ids)s)",
+            {'tags': random_tags(rng), 'ids': sample_ids(rng, ids, 10)},
+        )
+
+
+def append_tag(db, rng):
+    ids = task_ids(db)
+    if ids:
+        db.execute(
+            "UPDATE public.task SET tags = array_append(tags, %(tag)s) WHERE id = ANY(%(ids)s)",
+            {'tag': rng.choice(TAGS), 'ids': sample_ids(rng, ids, 10)},
+        )
+
+
+def delete_tasks(db, rng):
+    # ON DELETE CASCADE también borra sus conversaciones
+    ids = task_ids(db)
+    if ids:
+        db.execute("DELETE FROM public.task WHERE id = ANY(%(ids)s)", {'ids': sample_ids(rng, ids, 10)})
+
+
+def insert_conversations(db, rng):
+    ids = task_ids(db)
+    if not ids:
+        return
+    for _ in range(rng.randint(1, 5)):
+        db.execute("""
+            INSERT INTO public.conversation (task_id, role, message, tokens_used, user_is_grateful)
+            VALUES (%(task_id)s, %(role)s::conversation_role, 'Fuzz', %(tokens)s, %(grateful)s)
+        """, {
+            'task_id': rng.choice(ids),
+            'role': rng.choice(ROLES),
+            'tokens': rng.choice([None, 0, rng.randint(1, 500)]),
+            'grateful': rng.choice([True, False, None]),
+        })
+
+
+def update_conversations(db, rng):
+    ids = conversation_ids(db)
+    if ids:
+        db.execute("""
+            UPDATE public.conversation
+            SET user_is_grateful = NOT COALESCE(user_is_grateful, false), tokens_used = %(tokens)s
+            WHERE id = ANY(%(ids)s)
+        """, {'tokens': rng.randint(0, 300), 'ids': sample_ids(rng, ids, 10)})
+
+
+def delete_conversations(db, rng):
+    ids = conversation_ids(db)
+    if ids:
+        db.execute("DELETE FROM public.conversation WHERE id = %(id)s", {'id': rng.choice(ids)})
+
+
+def run_operations(db, rng, operations, steps, check, every):
+    """Aplicar `steps` operaciones elegidas al azar y llamar a check(operación) tras cada bloque de `every`"""
+    for step in range(steps):
+        operation = rng.choice(operations)
+        operation(db, rng)
+        if step % every == every - 1:
+            check(operation)
+
+
+def check_rpc(db, rpc):
+    """Resultado de una RPC motivbot_check_* ({consistent, mismatches})"""
+    [[result]] = db.execute(f"SELECT {rpc}()")
+    return result
@@ -0,0 +1,252 @@
+"""
+API de GitHub falsa y arnés de repetición de la sincronización de issues.
+
+`FakeGitHub` sirve `/users/<usuario>/repos` y `/repos/<repo>/issues` con la paginación, `since=`,
+`sort=updated` y los ETag/304 de GitHub sobre issues generados (uno de cada PULL_EVERY es un pull
+request), y cuenta las peticiones que recibe. `replay` ejecuta `motivbot.github_sync` varias veces
+seguidas, tocando algunos issues entre ejecuciones, y resume cuántas peticiones gasta cada una.
+
+    python -m test.github_replay --repos 20 --issues 300 --runs 3 --touch 5
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from motivbot import AsyncMotivBotClient
+from motivbot._base import _ClientConfig
+from motivbot.github_sync import DEFAULT_CONCURRENCY, GitHubSync, github_client, parse_time
+
+# Uno de cada PULL_EVERY elementos de /issues es un pull request, como devuelve GitHub
+PULL_EVERY = 10
+
+LABELS = [[], [{'name': 'bug'}], [{'name': 'urgent'}], [{'name': 'minor'}]]
+
+
+def github_time(value):
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class FakeGitHub:
+    """
+    Servidor HTTP con `repos` repositorios de `issues` elementos cada uno. Cada issue tiene un
+    updated_at distinto y creciente; `touch()` edita issues y les da uno posterior a todos.
+    `latency` retrasa cada respuesta para que la concurrencia se note en las medidas.
+    """
+
+    def __init__(self, username='octocat', repos=5, issues=150, latency=0.0, host='127.0.0.1', port=0):
+        self.username = username
+        self.latency = latency
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._clock = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.repos = [
+            {'id': 1000 + r, 'name': f"repo-{r}", 'full_name': f"{username}/repo-{r}"}
+            for r in range(repos)
+        ]
+        self.issues = {repo['full_name']: [] for repo in self.repos}
+        for number in range(1, issues + 1):
+            for r, repo in enumerate(self.repos):
+                self.issues[repo['full_name']].append(self._issue(r, repo, number))
+        self._server = _Server((host, port), self._handler_class())
+        self._thread = None
+
+    def _tick(self):
+        self._clock += timedelta(seconds=1)
+        return github_time(self._clock)
+
+    def _issue(self, r, repo, number):
+        created = self._tick()
+        issue = {
+            'id': (r + 1) * 1_000_000 + number,
+            'number': number,
+            'title': f"Issue {number}",
+            'body': f"Cuerpo del issue {number} de {repo['name']}",
+            'html_url': f"https://github.com/{repo['full_name']}/issues/{number}",
+            'state': 'closed' if number % 7 == 0 else 'open',
+            'labels': LABELS[number % len(LABELS)],
+            'user': {'login': self.username},
+            'created_at': created,
+            'updated_at': created,
+            'closed_at': created if number % 7 == 0 else None,
+        }
+        if number % PULL_EVERY == 0:
+            issue['pull_request'] = {'url': f"https://api.github.com/repos/{repo['full_name']}/pulls/{number}"}
+        return issue
+
+    def touch(self, repo, count=1):
+        """Editar los `count` issues más antiguos de `repo`; devuelve sus ids"""
+        with self._lock:
+            touched = sorted(self.issues[repo], key=lambda issue: issue['updated_at'])[:count]
+            for issue in touched:
+                issue['title'] += ' (editado)'
+                issue['updated_at'] = self._tick()
+            return [issue['id'] for issue in touched]
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def counts(self):
+        """Peticiones recibidas: totales, 304 y las que gastan cuota"""
+        statuses = [status for _, status in self.requests]
+        not_modified = statuses.count(304)
+        return {'requests': len(statuses), 'not_modified': not_modified, 'billable': len(statuses) - not_modified}
+
+    def reset_counts(self):
+        with self._lock:
+            self.requests = []
+            self.max_in_flight = 0
+
+    def page(self, path, query):
+        """(status, cuerpo) de una petición GET"""
+        parts = path.strip('/').split('/')
+        per_page = min(int(query.get('per_page', 30)), 100)
+        page = int(query.get('page', 1))
+
+        if len(parts) == 3 and parts[0] == 'users' and parts[2] == 'repos':
+            items = self.repos if parts[1] == self.username else []
+        elif len(parts) == 4 and parts[0] == 'repos' and parts[3] == 'issues':
+            full_name = f"{parts[1]}/{parts[2]}"
+            if full_name not in self.issues:
+                return 404, {'message': 'Not Found'}
+            items = self.issues[full_name]
+            # GitHub: since incluye los actualizados en ese instante o después
+            if 'since' in query:
+                since = parse_time(query['since'])
+                items = [issue for issue in items if parse_time(issue['updated_at']) >= since]
+            if query.get('state', 'open') != 'all':
+                items = [issue for issue in items if issue['state'] == query.get('state', 'open')]
+            if query.get('sort') == 'updated':
+                items = sorted(items, key=lambda issue: issue['updated_at'], reverse=query.get('direction') != 'asc')
+        else:
+            return 404, {'message': 'Not Found'}
+
+        start = (page - 1) * per_page
+        return 200, items[start:start + per_page]
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                with fake._lock:
+                    fake.in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+                    status, body = fake.page(url.path, query)
+                try:
+                    if fake.latency:
+                        time.sleep(fake.latency)
+                    payload = json.dumps(body).encode()
+                    etag = f'W/"{hashlib.sha1(payload).hexdigest()}"'
+                    if status == 200 and self.headers.get('If-None-Match') == etag:
+                        status, payload = 304, b''
+                    self._reply(status, payload, etag)
+                finally:
+                    with fake._lock:
+                        fake.in_flight -= 1
+                        fake.requests.append((url.path, status))
+
+            def _reply(self, status, payload, etag):
+                self.send_response(status)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+async def replay(client, fake, runs=3, touch=0, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Ejecutar la sincronización `runs` veces contra `fake`. Antes de cada ejecución salvo la primera
+    se editan `touch` issues del primer repositorio. Devuelve el informe de cada ejecución con las
+    peticiones que contó el servidor.
+    """
+    reports = []
+    async with github_client(None, fake.url) as github:
+        for run in range(runs):
+            if run and touch:
+                fake.touch(fake.repos[0]['full_name'], touch)
+            fake.reset_counts()
+            report = await GitHubSync(client, github, concurrency).run(fake.username)
+            reports.append({'run': run + 1, **report, **fake.counts(), 'max_in_flight': fake.max_in_flight})
+    return reports
+
+
+def format_report(reports):
+    lines = [f"{'run':>3} {'requests':>8} {'304':>5} {'billable':>8} {'issues':>6} {'inserted':>8} "
+             f"{'updated':>7} {'unchanged':>9} {'seconds':>7}"]
+    for r in reports:
+        lines.append(f"{r['run']:>3} {r['requests']:>8} {r['not_modified']:>5} {r['billable']:>8} {r['issues']:>6} "
+                     f"{r['inserted']:>8} {r['updated']:>7} {r['unchanged']:>9} {r['seconds']:>7.2f}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Repetir la sincronización de GitHub contra una API falsa')
+    parser.add_argument('--url', help='URL de Supabase/PostgREST (por defecto VITE_SUPABASE_URL)')
+    parser.add_argument('--anon-key', help='Clave anon (por defecto VITE_SUPABASE_ANON_KEY)')
+    parser.add_argument('--repos', type=int, default=20)
+    parser.add_argument('--issues', type=int, default=300, help='Elementos por repositorio (issues y pull requests)')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--touch', type=int, default=5, help='Issues editados entre ejecuciones')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--latency', type=float, default=0.0, help='Segundos de espera por respuesta de GitHub')
+    parser.add_argument('--report', help='Fichero JSON donde guardar el informe')
+    args = parser.parse_args(argv)
+
+    settings = _ClientConfig.env_settings()
+    url = args.url or settings['url']
+    anon_key = args.anon_key or settings['anon_key']
+    if not url or not anon_key:
+        parser.error('Falta la URL o la clave (--url/--anon-key o variables de entorno)')
+
+    fake = FakeGitHub(repos=args.repos, issues=args.issues, latency=args.latency).start()
+
+    async def run():
+        async with AsyncMotivBotClient(url, anon_key) as client:
+            return await replay(client, fake, args.runs, args.touch, args.concurrency)
+
+    try:
+        reports = asyncio.run(run())
+    finally:
+        fake.stop()
+
+    print(format_report(reports))
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=2)
+    return 1 if any(r['errors'] for r in reports) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
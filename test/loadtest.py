@@ -0,0 +1,230 @@
+"""
+Prueba de carga de las RPC del MotivBot.
+
+Reproduce una mezcla realista de llamadas (crear/listar/buscar tareas, conversaciones y dashboard)
+a un ritmo fijo de peticiones por segundo con el cliente asyncio, y resume por RPC la latencia
+(p50/p95/p99), el throughput y la tasa de errores en un informe JSON comparable entre versiones.
+
+El ritmo es de bucle abierto: cada llamada tiene una hora de salida programada y la latencia se mide
+desde esa hora, así que si el servidor se atasca las esperas cuentan en lugar de esconderse.
+
+    python -m test.loadtest --rps 50 --duration 30 --report load.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from motivbot import AsyncMotivBotClient, MotivBotError
+from motivbot._base import _ClientConfig
+
+# RPC -> peso en la mezcla; lecturas frecuentes y escrituras de la GPT action
+DEFAULT_MIX = {
+    'motivbot_get_tasks': 30,
+    'motivbot_search_tasks': 20,
+    'motivbot_create_task': 20,
+    'motivbot_create_conversation': 15,
+    'motivbot_get_dashboard': 15,
+}
+
+PRIORITIES = ['low', 'normal', 'medium', 'high']
+TAGS = ['trabajo', 'casa', 'urgente', 'salud', 'estudio', 'proyecto']
+SEARCHES = ['informe', 'reunión', 'revisar', 'proyecto', 'llamada cliente', 'documentación']
+STATUSES = ['pending', 'in-progress', 'completed']
+
+# Tareas creadas antes de medir para que create_conversation tenga a qué colgarse
+WARMUP_TASKS = 10
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano (el valor observado, sin interpolar)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class Scenario:
+    """Genera los argumentos de cada RPC con un generador aleatorio con semilla"""
+
+    def __init__(self, rng, tag):
+        self.rng = rng
+        self.tag = tag
+        self.task_ids = []
+
+    async def call(self, client, rpc):
+        rng = self.rng
+        if rpc == 'motivbot_get_tasks':
+            return await client.get_tasks(
+                status=rng.choice([None, *STATUSES]),
+                tags=rng.choice([None, [rng.choice(TAGS)]]),
+                limit=20,
+            )
+        if rpc == 'motivbot_search_tasks':
+            return await client.search_tasks(rng.choice(SEARCHES), limit=20)
+        if rpc == 'motivbot_create_task':
+            result = await client.create_task(
+                f"Carga {rng.choice(SEARCHES)} {rng.randint(1, 10 ** 6)}",
+                description=f"Generada por la prueba de carga ({self.tag})",
+                priority=rng.choice(PRIORITIES),
+                tags=[self.tag, rng.choice(TAGS)],
+            )
+            if result.get('success'):
+                self.task_ids.append(result['id'])
+            return result
+        if rpc == 'motivbot_create_conversation':
+            return await client.create_conversation(
+                rng.choice(self.task_ids),
+                rng.choice(['user', 'assistant']),
+                'Mensaje de la prueba de carga',
+                tokens_used=rng.randint(0, 400),
+            )
+        if rpc == 'motivbot_get_dashboard':
+            return await client.get_dashboard()
+        raise ValueError(f"RPC sin escenario: {rpc}")
+
+
+async def _run(url, anon_key, rps, duration, mix, seed, concurrency, tag):
+    rng = random.Random(seed)
+    scenario = Scenario(rng, tag)
+    rpcs, weights = zip(*sorted(mix.items()))
+    samples = {rpc: [] for rpc in rpcs}
+    errors = {rpc: [] for rpc in rpcs}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with AsyncMotivBotClient(url, anon_key, retries=0, limits=limits) as client:
+        for _ in range(WARMUP_TASKS):
+            await scenario.call(client, 'motivbot_create_task')
+
+        async def one(rpc, scheduled):
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            try:
+                result = await scenario.call(client, rpc)
+                # Las RPC informan de sus errores con {'success': false} y HTTP 200
+                if isinstance(result, dict) and result.get('success') is False:
+                    errors[rpc].append(result.get('message'))
+            except (MotivBotError, httpx.HTTPError) as e:
+                errors[rpc].append(str(e) or type(e).__name__)
+            samples[rpc].append(time.perf_counter() - scheduled)
+
+        start = time.perf_counter()
+        calls = [
+            one(rng.choices(rpcs, weights)[0], start + i / rps)
+            for i in range(int(rps * duration))
+        ]
+        await asyncio.gather(*calls)
+        elapsed = time.perf_counter() - start
+
+    return samples, errors, elapsed
+
+
+def _summary(latencies, failed, elapsed):
+    count = len(latencies)
+    latencies_ms = [latency * 1000 for latency in latencies]
+    return {
+        'requests': count,
+        'errors': len(failed),
+        'error_rate': round(len(failed) / count, 4) if count else 0.0,
+        'throughput_rps': round(count / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {
+            'p50': _round(percentile(latencies_ms, 50)),
+            'p95': _round(percentile(latencies_ms, 95)),
+            'p99': _round(percentile(latencies_ms, 99)),
+            'max': _round(max(latencies_ms, default=None)),
+            'mean': _round(statistics.fmean(latencies_ms) if latencies_ms else None),
+        },
+        # Unos pocos mensajes distintos bastan para saber qué falló
+        'error_samples': sorted(set(failed))[:5],
+    }
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
+
+
+def run_load(url, anon_key, rps=20.0, duration=10.0, mix=None, seed=0, concurrency=20, tag='load-test'):
+    """Lanzar la carga y devolver el informe (dict serializable a JSON)"""
+    mix = dict(mix or DEFAULT_MIX)
+    samples, errors, elapsed = asyncio.run(_run(url, anon_key, rps, duration, mix, seed, concurrency, tag))
+
+    everything = [latency for rpc in samples for latency in samples[rpc]]
+    failed = [message for rpc in errors for message in errors[rpc]]
+    return {
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'config': {
+            'rps': rps,
+            'duration_s': duration,
+            'concurrency': concurrency,
+            'seed': seed,
+            'mix': mix,
+        },
+        'elapsed_s': round(elapsed, 3),
+        'total': _summary(everything, failed, elapsed),
+        'rpcs': {rpc: _summary(samples[rpc], errors[rpc], elapsed) for rpc in sorted(samples)},
+    }
+
+
+def write_report(report, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, sort_keys=True, ensure_ascii=False)
+        f.write('\n')
+
+
+def format_report(report):
+    """Tabla corta para la consola"""
+    lines = [f"{'rpc':32} {'req':>6} {'err%':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}"]
+    for name, stats in [*report['rpcs'].items(), ('TOTAL', report['total'])]:
+        latency = stats['latency_ms']
+        lines.append(
+            f"{name:32} {stats['requests']:>6} {stats['error_rate'] * 100:>5.1f}% {stats['throughput_rps']:>8.1f} "
+            + ' '.join(f"{latency[p] if latency[p] is not None else '-':>8}" for p in ('p50', 'p95', 'p99'))
+        )
+    return '\n'.join(lines)
+
+
+def parse_mix(value):
+    """'motivbot_get_tasks=3,motivbot_get_dashboard=1' -> dict"""
+    mix = {}
+    for item in value.split(','):
+        rpc, _, weight = item.partition('=')
+        mix[rpc.strip()] = float(weight or 1)
+    unknown = set(mix) - set(DEFAULT_MIX)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"RPC sin escenario: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Prueba de carga de las RPC motivbot_*')
+    parser.add_argument('--url', help='URL de Supabase/PostgREST (por defecto VITE_SUPABASE_URL)')
+    parser.add_argument('--anon-key', help='Clave anon (por defecto VITE_SUPABASE_ANON_KEY)')
+    parser.add_argument('--rps', type=float, default=20.0)
+    parser.add_argument('--duration', type=float, default=10.0, help='Segundos de carga')
+    parser.add_argument('--concurrency', type=int, default=20, help='Conexiones HTTP simultáneas')
+    parser.add_argument('--mix', type=parse_mix, default=None, help='rpc=peso,... (por defecto DEFAULT_MIX)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--report', help='Fichero JSON donde guardar el informe')
+    args = parser.parse_args(argv)
+
+    settings = _ClientConfig.env_settings()
+    url = args.url or settings['url']
+    anon_key = args.anon_key or settings['anon_key']
+    if not url or not anon_key:
+        parser.error('Falta la URL o la clave (--url/--anon-key o variables de entorno)')
+
+    report = run_load(url, anon_key, args.rps, args.duration, args.mix, args.seed, args.concurrency)
+    print(format_report(report))
+    if args.report:
+        write_report(report, args.report)
+    return 1 if report['total']['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""
+Stand-in local de Supabase para ejecutar los tests sin red.
+
+Aplica los ficheros de `sql/tablas` sobre un Postgres desechable y expone
+`/rest/v1/rpc/<nombre>` imitando a PostgREST, de forma que los tests usan
+exactamente las mismas URLs y payloads que contra Supabase.
+"""
+import json
+import queue
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import psycopg
+from psycopg import sql
+
+SQL_DIR = Path(__file__).resolve().parent.parent / 'sql' / 'tablas'
+
+# Orden en el que se aplican los ficheros del esquema
+SCHEMA_FILES = (
+    'Task.sql',
+    'Conversation.sql',
+    'chibi-motivbot.sql',
+    'motivbot_rpc.sql',
+)
+
+# Roles que Supabase crea por defecto y que usan las políticas RLS y los GRANT de las RPC
+SUPABASE_ROLES = ('anon', 'authenticated', 'service_role')
+
+# Estados SQL que PostgREST traduce a códigos HTTP concretos
+SQLSTATE_TO_HTTP = {
+    '42883': 404,  # undefined_function
+    '42P01': 404,  # undefined_table
+    '23505': 409,  # unique_violation
+    '23503': 409,  # foreign_key_violation
+}
+
+
+def apply_schema(host, port, user, dbname, password=None, **kwargs):
+    """Crear roles de Supabase y aplicar los ficheros SQL del proyecto"""
+    with psycopg.connect(
+        host=host, port=port, user=user, dbname=dbname, password=password, autocommit=True
+    ) as conn:
+        for role in SUPABASE_ROLES:
+            conn.execute(sql.SQL(
+                "DO $$ BEGIN CREATE ROLE {} NOLOGIN; "
+                "EXCEPTION WHEN duplicate_object THEN NULL; END $$"
+            ).format(sql.Identifier(role)))
+
+        for filename in SCHEMA_FILES:
+            conn.execute((SQL_DIR / filename).read_text(encoding='utf-8'))
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # El backlog por defecto (5) rechaza conexiones en las pruebas de carga
+    request_queue_size = 256
+
+
+class LocalPostgrest:
+    """Servidor HTTP mínimo que resuelve RPCs como PostgREST sobre una conexión
+
+    Con `pool_size` cada RPC usa una conexión propia en autocommit, como PostgREST, y las llamadas
+    concurrentes llegan en paralelo a Postgres (pruebas de carga). Sin él todas comparten una
+    conexión serializada para que `rollback_scope` pueda deshacer lo que hace cada test.
+
+    La clave decide el rol (`anon_key` -> anon, `service_key` -> service_role) y, como PostgREST, una
+    RPC sin EXECUTE para ese rol responde 401 a anon y 403 al resto.
+    """
+
+    def __init__(self, conninfo, anon_key='local-anon-key', service_key='local-service-key', host='127.0.0.1',
+                 port=0, pool_size=None):
+        self.anon_key = anon_key
+        self.service_key = service_key
+        self._conninfo = conninfo
+        self._conn = psycopg.connect(conninfo)
+        self._lock = threading.Lock()
+        self._pool = None
+        if pool_size:
+            self._pool = queue.Queue()
+            for _ in range(pool_size):
+                self._pool.put(psycopg.connect(conninfo, autocommit=True))
+        self._signatures = {}
+        self._server = _Server((host, port), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._conn.close()
+        while self._pool is not None and not self._pool.empty():
+            self._pool.get_nowait().close()
+
+    @contextmanager
+    def rollback_scope(self):
+        """Envolver un test en una transacción que siempre se deshace"""
+        with self._lock:
+            tx = self._conn.transaction(force_rollback=True)
+            tx.__enter__()
+        try:
+            yield
+        finally:
+            with self._lock:
+                tx.__exit__(None, None, None)
+
+    @contextmanager
+    def _connection(self):
+        """Conexión para una RPC: una del pool o la compartida bajo el lock"""
+        if self._pool is None:
+            with self._lock:
+                yield self._conn
+            return
+
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def vacuum(self):
+        """VACUUM FULL fuera de la transacción del test: las filas deshechas siguen ocupando tabla e índices"""
+        with psycopg.connect(self._conninfo, autocommit=True) as conn:
+            conn.execute('VACUUM (FULL, ANALYZE)')
+
+    def call(self, name, args, role='anon'):
+        """Ejecutar una RPC como `role` y devolver (status, cuerpo JSON)"""
+        with self._connection() as conn:
+            try:
+                signature = self._resolve(conn, name, args)
+                if signature is None:
+                    return 404, {
+                        'code': 'PGRST202',
+                        'message': f"Could not find the function public.{name} in the schema cache",
+                    }
+                with conn.transaction():
+                    [allowed] = conn.execute("SELECT has_function_privilege(%s, %s::oid, 'EXECUTE')",
+                                             [role, signature[0]]).fetchone()
+                if not allowed:
+                    return 401 if role == 'anon' else 403, {
+                        'code': '42501',
+                        'message': f"permission denied for function {name}",
+                    }
+                with conn.transaction():
+                    row = conn.execute(self._build_call(name, signature, args), [json.dumps(args)]).fetchone()
+                return 200, row[0]
+            except psycopg.Error as e:
+                diag = e.diag
+                return SQLSTATE_TO_HTTP.get(e.sqlstate, 400), {
+                    'code': e.sqlstate,
+                    'message': diag.message_primary or str(e),
+                    'details': diag.message_detail,
+                    'hint': diag.message_hint,
+                }
+
+    def execute(self, query, params=None):
+        """Ejecutar SQL directo dentro de la transacción del test (benchmarks, fixtures de datos)"""
+        with self._lock, self._conn.transaction():
+            cursor = self._conn.execute(query, params)
+            return cursor.fetchall() if cursor.description else []
+
+    def nested_plans(self, query, params=None):
+        """
+        Ejecutar `query` y devolver los planes con tiempos reales (JSON de auto_explain) de todas sus sentencias,
+        también las de dentro de las funciones: son los que plpgsql usa de verdad, custom o genéricos
+        """
+        plans = []
+
+        def on_notice(diag):
+            text = diag.message_primary or ''
+            if text.startswith('duration:') and 'plan:' in text:
+                plans.append(json.loads(text.split('plan:', 1)[1]))
+
+        with self._lock, self._conn.transaction():
+            self._conn.add_notice_handler(on_notice)
+            try:
+                self._conn.execute("LOAD 'auto_explain'")
+                self._conn.execute("""
+                    SET LOCAL auto_explain.log_min_duration = 0;
+                    SET LOCAL auto_explain.log_analyze = on;
+                    SET LOCAL auto_explain.log_nested_statements = on;
+                    SET LOCAL auto_explain.log_format = json;
+                    SET LOCAL auto_explain.log_level = notice;
+                    SET LOCAL client_min_messages = notice
+                """)
+                self._conn.execute(query, params)
+            finally:
+                self._conn.remove_notice_handler(on_notice)
+        return plans
+
+    def _resolve(self, conn, name, args):
+        """Elegir la sobrecarga cuyos argumentos encajan con las claves del body"""
+        if name not in self._signatures:
+            with conn.transaction():
+                self._signatures[name] = conn.execute("""
+                    SELECT p.oid,
+                           p.proretset,
+                           p.pronargs - p.pronargdefaults,
+                           COALESCE(p.proargnames, ARRAY[]::TEXT[]),
+                           COALESCE(p.proargmodes::TEXT[], ARRAY[]::TEXT[]),
+                           ARRAY(
+                               SELECT format_type(t.oid, NULL)
+                               FROM unnest(p.proargtypes::OID[]) WITH ORDINALITY AS a(oid, ord)
+                               JOIN pg_type t ON t.oid = a.oid
+                               ORDER BY a.ord
+                           )
+                    FROM pg_proc p
+                    JOIN pg_namespace n ON n.oid = p.pronamespace
+                    WHERE n.nspname = 'public' AND p.proname = %s
+                    ORDER BY p.pronargs
+                """, [name]).fetchall()
+
+        keys = set(args)
+        for oid, returns_set, required, names, modes, types in self._signatures[name]:
+            if modes:
+                names = [n for n, m in zip(names, modes) if m in ('i', 'b', 'v')]
+            if keys <= set(names) and set(names[:required]) <= keys:
+                return oid, returns_set, list(zip(names, types))
+        return None
+
+    @staticmethod
+    def _build_call(name, signature, args):
+        """Construir la llamada igual que PostgREST: json_to_record + argumentos nombrados"""
+        _, returns_set, params = signature
+        params = [(n, t) for n, t in params if n in args]
+        call = sql.SQL('public.{}({})').format(
+            sql.Identifier(name),
+            sql.SQL(', ').join(
+                sql.SQL('{} := _.{}').format(sql.Identifier(n), sql.Identifier(n)) for n, _ in params
+            ),
+        )
+        record = sql.SQL('json_to_record(%s::json) AS _({})').format(
+            sql.SQL(', ').join(
+                sql.SQL('{} {}').format(sql.Identifier(n), sql.SQL(t)) for n, t in params
+            ) if params else sql.SQL('_ int')
+        )
+        if returns_set:
+            return sql.SQL("SELECT COALESCE(json_agg(_r), '[]'::json) FROM {}, LATERAL {} AS _r").format(record, call)
+        return sql.SQL('SELECT to_json({}) FROM {}').format(call, record)
+
+    def _handler_class(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Cabeceras y cuerpo salen en dos escrituras; con Nagle cada respuesta keep-alive espera ~40 ms
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+
+                role = {stand_in.anon_key: 'anon', stand_in.service_key: 'service_role'}.get(self.headers.get('apikey'))
+                if role is None:
+                    return self._reply(401, {'message': 'No API key found in request'})
+
+                prefix = '/rest/v1/rpc/'
+                if not self.path.startswith(prefix):
+                    return self._reply(404, {'message': 'Not found'})
+
+                try:
+                    args = json.loads(body) if body else {}
+                except ValueError:
+                    return self._reply(400, {'code': 'PGRST102', 'message': 'Empty or invalid json'})
+
+                status, payload = stand_in.call(self.path[len(prefix):].split('?')[0], args, role)
+                self._reply(status, payload)
+
+            def _reply(self, status, payload):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,578 @@
+-- Copia de las RPC tal y como estaban antes de eliminar las consultas a information_schema
+-- en cada llamada. Solo la usan los tests como referencia de latencia y de resultados;
+-- se crea dentro de la transacción del test y se deshace al terminar.
+
+CREATE OR REPLACE FUNCTION legacy_motivbot_get_tasks(
+    p_status TEXT DEFAULT NULL,
+    p_priority TEXT DEFAULT NULL,
+    p_tags TEXT[] DEFAULT NULL,
+    p_limit INTEGER DEFAULT 50
+)
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    result JSON;
+    has_created_at BOOLEAN := FALSE;
+    has_updated_at BOOLEAN := FALSE;
+    has_due_date BOOLEAN := FALSE;
+    has_due_time BOOLEAN := FALSE;
+    has_priority BOOLEAN := FALSE;
+    has_tags BOOLEAN := FALSE;
+BEGIN
+    -- Verificar qué columnas existen
+    SELECT EXISTS (
+        SELECT 1 FROM information_schema.columns 
+        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'created_at'
+    ) INTO has_created_at;
+    
+    SELECT EXISTS (
+        SELECT 1 FROM information_schema.columns 
+        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'updated_at'
+    ) INTO has_updated_at;
+    
+    SELECT EXISTS (
+        SELECT 1 FROM information_schema.columns 
+        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'due_date'
+    ) INTO has_due_date;
+    
+    SELECT EXISTS (
+        SELECT 1 FROM information_schema.columns 
+        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'due_time'
+    ) INTO has_due_time;
+    
+    SELECT EXISTS (
+        SELECT 1 FROM information_schema.columns 
+        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'priority'
+    ) INTO has_priority;
+    
+    SELECT EXISTS (
+        SELECT 1 FROM information_schema.columns 
+        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'tags'
+    ) INTO has_tags;
+
+    -- ✅ DEVOLVER ARRAY DIRECTO (SIN WRAPPER)
+    IF p_status IS NOT NULL AND p_priority IS NOT NULL AND p_tags IS NOT NULL AND has_priority AND has_tags THEN
+        -- Filtrar por status, priority y tags
+        EXECUTE format('
+            SELECT COALESCE(json_agg(task_json), ''[]''::json)
+            FROM (
+                SELECT json_build_object(
+                    ''id'', id,
+                    ''title'', title,
+                    ''description'', description,
+                    ''status'', status%s%s%s%s%s%s
+                ) as task_json
+                FROM public.task 
+                WHERE status = $1::task_status AND priority = $2 AND tags && $3
+                ORDER BY %s
+                LIMIT $4
+            ) tasks',
+            CASE WHEN has_priority THEN ', ''priority'', priority' ELSE '' END,
+            CASE WHEN has_tags THEN ', ''tags'', tags' ELSE '' END,
+            CASE WHEN has_due_date THEN ', ''due_date'', due_date' ELSE '' END,
+            CASE WHEN has_due_time THEN ', ''due_time'', due_time' ELSE '' END,
+            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
+            CASE WHEN has_updated_at THEN ', ''updated_at'', updated_at' ELSE '' END,
+            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
+        ) USING p_status, p_priority, p_tags, p_limit INTO result;
+        
+    ELSIF p_tags IS NOT NULL AND has_tags THEN
+        -- Filtrar solo por tags
+        EXECUTE format('
+            SELECT COALESCE(json_agg(task_json), ''[]''::json)
+            FROM (
+                SELECT json_build_object(
+                    ''id'', id,
+                    ''title'', title,
+                    ''description'', description,
+                    ''status'', status%s%s%s%s%s%s
+                ) as task_json
+                FROM public.task 
+                WHERE tags && $1
+                ORDER BY %s
+                LIMIT $2
+            ) tasks',
+            CASE WHEN has_priority THEN ', ''priority'', priority' ELSE '' END,
+            CASE WHEN has_tags THEN ', ''tags'', tags' ELSE '' END,
+            CASE WHEN has_due_date THEN ', ''due_date'', due_date' ELSE '' END,
+            CASE WHEN has_due_time THEN ', ''due_time'', due_time' ELSE '' END,
+            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
+            CASE WHEN has_updated_at THEN ', ''updated_at'', updated_at' ELSE '' END,
+            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
+        ) USING p_tags, p_limit INTO result;
+        
+    ELSIF p_status IS NOT NULL AND p_priority IS NOT NULL AND has_priority THEN
+        -- Filtrar por status y priority (sin tags)
+        EXECUTE format('
+            SELECT COALESCE(json_agg(task_json), ''[]''::json)
+            FROM (
+                SELECT json_build_object(
+                    ''id'', id,
+                    ''title'', title,
+                    ''description'', description,
+                    ''status'', status%s%s%s%s%s%s
+                ) as task_json
+                FROM public.task 
+                WHERE status = $1::task_status AND priority = $2
+                ORDER BY %s
+                LIMIT $3
+            ) tasks',
+            CASE WHEN has_priority THEN ', ''priority'', priority' ELSE '' END,
+            CASE WHEN has_tags THEN ', ''tags'', tags' ELSE '' END,
+            CASE WHEN has_due_date THEN ', ''due_date'', due_date' ELSE '' END,
+            CASE WHEN has_due_time THEN ', ''due_time'', due_time' ELSE '' END,
+            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
+            CASE WHEN has_updated_at THEN ', ''updated_at'', updated_at' ELSE '' END,
+            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
+        ) USING p_status, p_priority, p_limit INTO result;
+        
+    ELSIF p_status IS NOT NULL THEN
+        -- Filtrar solo por status
+        EXECUTE format('
+            SELECT COALESCE(json_agg(task_json), ''[]''::json)
+            FROM (
+                SELECT json_build_object(
+                    ''id'', id,
+                    ''title'', title,
+                    ''description'', description,
+                    ''status'', status%s%s%s%s%s%s
+                ) as task_json
+                FROM public.task 
+                WHERE status = $1::task_status
+                ORDER BY %s
+                LIMIT $2
+            ) tasks',
+            CASE WHEN has_priority THEN ', ''priority'', priority' ELSE '' END,
+            CASE WHEN has_tags THEN ', ''tags'', tags' ELSE '' END,
+            CASE WHEN has_due_date THEN ', ''due_date'', due_date' ELSE '' END,
+            CASE WHEN has_due_time THEN ', ''due_time'', due_time' ELSE '' END,
+            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
+            CASE WHEN has_updated_at THEN ', ''updated_at'', updated_at' ELSE '' END,
+            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
+        ) USING p_status, p_limit INTO result;
+        
+    ELSIF p_priority IS NOT NULL AND has_priority THEN
+        -- Filtrar solo por priority
+        EXECUTE format('
+            SELECT COALESCE(json_agg(task_json), ''[]''::json)
+            FROM (
+                SELECT json_build_object(
+                    ''id'', id,
+                    ''title'', title,
+                    ''description'', description,
+                    ''status'', status%s%s%s%s%s%s
+                ) as task_json
+                FROM public.task 
+                WHERE priority = $1
+                ORDER BY %s
+                LIMIT $2
+            ) tasks',
+            CASE WHEN has_priority THEN ', ''priority'', priority' ELSE '' END,
+            CASE WHEN has_tags THEN ', ''tags'', tags' ELSE '' END,
+            CASE WHEN has_due_date THEN ', ''due_date'', due_date' ELSE '' END,
+            CASE WHEN has_due_time THEN ', ''due_time'', due_time' ELSE '' END,
+            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
+            CASE WHEN has_updated_at THEN ', ''updated_at'', updated_at' ELSE '' END,
+            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
+        ) USING p_priority, p_limit INTO result;
+        
+    ELSE
+        -- Sin filtros
+        EXECUTE format('
+            SELECT COALESCE(json_agg(task_json), ''[]''::json)
+            FROM (
+                SELECT json_build_object(
+                    ''id'', id,
+                    ''title'', title,
+                    ''description'', description,
+                    ''status'', status%s%s%s%s%s%s
+                ) as task_json
+                FROM public.task 
+                ORDER BY %s
+                LIMIT $1
+            ) tasks',
+            CASE WHEN has_priority THEN ', ''priority'', priority' ELSE '' END,
+            CASE WHEN has_tags THEN ', ''tags'', tags' ELSE '' END,
+            CASE WHEN has_due_date THEN ', ''due_date'', due_date' ELSE '' END,
+            CASE WHEN has_due_time THEN ', ''due_time'', due_time' ELSE '' END,
+            CASE WHEN has_created_at THEN ', ''created_at'', created_at' ELSE '' END,
+            CASE WHEN has_updated_at THEN ', ''updated_at'', updated_at' ELSE '' END,
+            CASE WHEN has_created_at THEN 'created_at DESC' ELSE 'id DESC' END
+        ) USING p_limit INTO result;
+    END IF;
+    
+    RETURN result;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION legacy_motivbot_update_task(
+    p_task_id BIGINT,
+    p_title TEXT DEFAULT NULL,
+    p_description TEXT DEFAULT NULL,
+    p_status TEXT DEFAULT NULL,
+    p_priority TEXT DEFAULT NULL,
+    p_due_date DATE DEFAULT NULL,
+    p_due_time TIME DEFAULT NULL,
+    p_tags TEXT[] DEFAULT NULL
+)
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    result JSON;
+    update_query TEXT;
+    set_clauses TEXT[] := ARRAY[]::TEXT[];
+    param_values TEXT[] := ARRAY[]::TEXT[];
+    param_count INTEGER := 1;
+    has_priority BOOLEAN := FALSE;
+    has_due_date BOOLEAN := FALSE;
+    has_due_time BOOLEAN := FALSE;
+    has_tags BOOLEAN := FALSE;
+    has_updated_at BOOLEAN := FALSE;
+BEGIN
+    -- Verificar que la tarea existe
+    IF NOT EXISTS (SELECT 1 FROM public.task WHERE id = p_task_id) THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Task not found'
+        );
+    END IF;
+    
+    -- Verificar qué columnas existen
+    SELECT EXISTS (
+        SELECT 1 FROM information_schema.columns 
+        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'priority'
+    ) INTO has_priority;
+    
+    SELECT EXISTS (
+        SELECT 1 FROM information_schema.columns 
+        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'due_date'
+    ) INTO has_due_date;
+    
+    SELECT EXISTS (
+        SELECT 1 FROM information_schema.columns 
+        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'due_time'
+    ) INTO has_due_time;
+    
+    SELECT EXISTS (
+        SELECT 1 FROM information_schema.columns 
+        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'tags'
+    ) INTO has_tags;
+    
+    SELECT EXISTS (
+        SELECT 1 FROM information_schema.columns 
+        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'updated_at'
+    ) INTO has_updated_at;
+    
+    -- Construir cláusulas SET dinámicamente
+    IF p_title IS NOT NULL THEN
+        param_count := param_count + 1;
+        set_clauses := array_append(set_clauses, format('title = $%s', param_count));
+        param_values := array_append(param_values, trim(p_title));
+    END IF;
+    
+    IF p_description IS NOT NULL THEN
+        param_count := param_count + 1;
+        set_clauses := array_append(set_clauses, format('description = $%s', param_count));
+        param_values := array_append(param_values, NULLIF(trim(p_description), ''));
+    END IF;
+    
+    IF p_status IS NOT NULL THEN
+        param_count := param_count + 1;
+        set_clauses := array_append(set_clauses, format('status = $%s::task_status', param_count));
+        param_values := array_append(param_values, p_status);
+    END IF;
+    
+    IF p_priority IS NOT NULL AND has_priority THEN
+        param_count := param_count + 1;
+        set_clauses := array_append(set_clauses, format('priority = $%s', param_count));
+        param_values := array_append(param_values, p_priority);
+    END IF;
+    
+    IF p_due_date IS NOT NULL AND has_due_date THEN
+        param_count := param_count + 1;
+        set_clauses := array_append(set_clauses, format('due_date = $%s', param_count));
+        param_values := array_append(param_values, p_due_date::TEXT);
+    END IF;
+    
+    IF p_due_time IS NOT NULL AND has_due_time THEN
+        param_count := param_count + 1;
+        set_clauses := array_append(set_clauses, format('due_time = $%s', param_count));
+        param_values := array_append(param_values, p_due_time::TEXT);
+    END IF;
+    
+    IF p_tags IS NOT NULL AND has_tags THEN
+        param_count := param_count + 1;
+        set_clauses := array_append(set_clauses, format('tags = $%s', param_count));
+        param_values := array_append(param_values, array_to_string(p_tags, ','));
+    END IF;
+    
+    IF has_updated_at THEN
+        set_clauses := array_append(set_clauses, 'updated_at = CURRENT_TIMESTAMP');
+    END IF;
+    
+    -- Si no hay nada que actualizar
+    IF array_length(set_clauses, 1) IS NULL OR array_length(set_clauses, 1) = 0 THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'No fields to update'
+        );
+    END IF;
+    
+    -- Construir query completo
+    update_query := format('UPDATE public.task SET %s WHERE id = $1', array_to_string(set_clauses, ', '));
+    
+    -- Ejecutar update con manejo simplificado
+    BEGIN
+        IF p_title IS NOT NULL AND p_description IS NOT NULL AND p_status IS NOT NULL THEN
+            EXECUTE update_query USING p_task_id, trim(p_title), NULLIF(trim(p_description), ''), p_status;
+        ELSIF p_title IS NOT NULL AND p_status IS NOT NULL THEN
+            EXECUTE update_query USING p_task_id, trim(p_title), p_status;
+        ELSIF p_title IS NOT NULL AND p_tags IS NOT NULL AND has_tags THEN
+            EXECUTE update_query USING p_task_id, trim(p_title), p_tags;
+        ELSIF p_tags IS NOT NULL AND has_tags THEN
+            EXECUTE update_query USING p_task_id, p_tags;
+        ELSIF p_title IS NOT NULL THEN
+            EXECUTE update_query USING p_task_id, trim(p_title);
+        ELSIF p_status IS NOT NULL THEN
+            EXECUTE update_query USING p_task_id, p_status;
+        ELSIF p_due_date IS NOT NULL AND p_due_time IS NOT NULL THEN
+            EXECUTE update_query USING p_task_id, p_due_date, p_due_time;
+        ELSIF p_due_date IS NOT NULL THEN
+            EXECUTE update_query USING p_task_id, p_due_date;
+        ELSIF p_due_time IS NOT NULL THEN
+            EXECUTE update_query USING p_task_id, p_due_time;
+        ELSE
+            -- Fallback genérico para otros casos
+            EXECUTE format('UPDATE public.task SET %s WHERE id = %s', 
+                          array_to_string(set_clauses, ', '), p_task_id);
+        END IF;
+        
+        EXCEPTION WHEN OTHERS THEN
+            RETURN json_build_object(
+                'success', false,
+                'message', 'Error updating task: ' || SQLERRM
+            );
+    END;
+    
+    -- ✅ FORMATO COMPATIBLE CON TESTS PYTHON
+    SELECT json_build_object(
+        'success', true,
+        'message', 'Task updated successfully',
+        'id', p_task_id
+    ) INTO result;
+    
+    RETURN result;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION legacy_motivbot_get_dashboard()
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    result JSON;
+    task_stats JSON;
+    conversation_stats JSON;
+    tag_stats JSON;
+    completion_rate NUMERIC;
+    active_tasks INTEGER;
+    has_tags BOOLEAN := FALSE;
+    has_priority BOOLEAN := FALSE;
+    has_due_date BOOLEAN := FALSE;
+    has_tokens_used BOOLEAN := FALSE;
+BEGIN
+    -- Verificar qué columnas existen
+    SELECT EXISTS (
+        SELECT 1 FROM information_schema.columns 
+        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'tags'
+    ) INTO has_tags;
+    
+    SELECT EXISTS (
+        SELECT 1 FROM information_schema.columns 
+        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'priority'
+    ) INTO has_priority;
+    
+    SELECT EXISTS (
+        SELECT 1 FROM information_schema.columns 
+        WHERE table_schema = 'public' AND table_name = 'task' AND column_name = 'due_date'
+    ) INTO has_due_date;
+    
+    SELECT EXISTS (
+        SELECT 1 FROM information_schema.columns 
+        WHERE table_schema = 'public' AND table_name = 'conversation' AND column_name = 'tokens_used'
+    ) INTO has_tokens_used;
+    
+    -- Estadísticas de tareas (CORREGIDO: usar guiones en lugar de guiones bajos)
+    IF has_priority AND has_due_date THEN
+        SELECT json_build_object(
+            'total', COUNT(*),
+            'pending', COUNT(*) FILTER (WHERE status = 'pending'),
+            'in_progress', COUNT(*) FILTER (WHERE status = 'in-progress'),
+            'on_hold', COUNT(*) FILTER (WHERE status = 'on-hold'),
+            'completed', COUNT(*) FILTER (WHERE status = 'completed'),
+            'cancelled', COUNT(*) FILTER (WHERE status = 'cancelled'),
+            'high_priority', COUNT(*) FILTER (WHERE priority = 'high'),
+            'overdue', COUNT(*) FILTER (WHERE due_date < CURRENT_DATE AND status NOT IN ('completed', 'cancelled'))
+        ) INTO task_stats FROM public.task;
+    ELSE
+        SELECT json_build_object(
+            'total', COUNT(*),
+            'pending', COUNT(*) FILTER (WHERE status = 'pending'),
+            'in_progress', COUNT(*) FILTER (WHERE status = 'in-progress'),
+            'on_hold', COUNT(*) FILTER (WHERE status = 'on-hold'),
+            'completed', COUNT(*) FILTER (WHERE status = 'completed'),
+            'cancelled', COUNT(*) FILTER (WHERE status = 'cancelled'),
+            'high_priority', 0,
+            'overdue', 0
+        ) INTO task_stats FROM public.task;
+    END IF;
+    
+    -- Estadísticas de conversaciones
+    IF has_tokens_used THEN
+        SELECT json_build_object(
+            'total', COUNT(*),
+            'user_messages', COUNT(*) FILTER (WHERE role = 'user'),
+            'assistant_messages', COUNT(*) FILTER (WHERE role = 'assistant'),
+            'total_tokens', COALESCE(SUM(tokens_used), 0),
+            'grateful_responses', COUNT(*) FILTER (WHERE user_is_grateful = true)
+        ) INTO conversation_stats FROM public.conversation;
+    ELSE
+        SELECT json_build_object(
+            'total', COUNT(*),
+            'user_messages', COUNT(*) FILTER (WHERE role = 'user'),
+            'assistant_messages', COUNT(*) FILTER (WHERE role = 'assistant'),
+            'total_tokens', 0,
+            'grateful_responses', COUNT(*) FILTER (WHERE user_is_grateful = true)
+        ) INTO conversation_stats FROM public.conversation;
+    END IF;
+    
+    -- Estadísticas de tags
+    IF has_tags THEN
+        WITH tag_counts AS (
+            SELECT unnest(tags) as tag, COUNT(*) as count
+            FROM public.task 
+            WHERE tags IS NOT NULL
+            GROUP BY unnest(tags)
+            ORDER BY count DESC
+            LIMIT 10
+        )
+        SELECT json_build_object(
+            'total_unique', COUNT(DISTINCT tag),
+            'most_used', COALESCE(json_agg(json_build_object('tag', tag, 'count', count)), '[]'::json)
+        ) INTO tag_stats FROM tag_counts;
+    ELSE
+        tag_stats := json_build_object('total_unique', 0, 'most_used', '[]'::json);
+    END IF;
+    
+    -- Calcular tasa de completitud
+    SELECT CASE 
+        WHEN COUNT(*) = 0 THEN 0
+        ELSE ROUND((COUNT(*) FILTER (WHERE status = 'completed')::NUMERIC / COUNT(*)) * 100, 2)
+    END INTO completion_rate FROM public.task;
+    
+    -- Calcular tareas activas (CORREGIDO: usar guiones)
+    SELECT COUNT(*) INTO active_tasks 
+    FROM public.task 
+    WHERE status IN ('pending', 'in-progress', 'on-hold');
+    
+    -- Construir resultado final
+    SELECT json_build_object(
+        'tasks', task_stats,
+        'conversations', conversation_stats,
+        'tags', tag_stats,
+        'completion_rate', completion_rate,
+        'active_tasks', active_tasks
+    ) INTO result;
+    
+    RETURN result;
+    
+EXCEPTION
+    WHEN OTHERS THEN
+        RETURN json_build_object(
+            'success', false,
+            'message', 'Error retrieving dashboard: ' || SQLERRM
+        );
+END;
+$$;
+
+-- Analíticas emocionales antes de la pasada única: dos recorridos de la ventana y una subconsulta
+-- correlacionada por estado (percentage dividía entre el número de estados, no de conversaciones)
+CREATE OR REPLACE FUNCTION legacy_get_emotional_states_analytics(
+    p_days_back INTEGER DEFAULT 30
+)
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    result JSON;
+BEGIN
+    SELECT json_build_object(
+        'period_days', p_days_back,
+        'emotional_trends', (
+            SELECT json_object_agg(
+                COALESCE(emotional_state, 'neutral'),
+                json_build_object(
+                    'count', count,
+                    'percentage', ROUND((count * 100.0 / NULLIF(total_conversations, 0)), 2),
+                    'avg_tokens', ROUND(avg_tokens, 0),
+                    'recent_messages', (
+                        SELECT array_agg(LEFT(message, 50))
+                        FROM (
+                            SELECT message
+                            FROM public.Conversation 
+                            WHERE COALESCE(emotional_state, 'neutral') = emotion_analysis.emotional_state
+                            AND created_at >= (CURRENT_TIMESTAMP - INTERVAL '1 day' * p_days_back)
+                            ORDER BY created_at DESC 
+                            LIMIT 3
+                        ) recent
+                    )
+                )
+            )
+            FROM (
+                SELECT 
+                    COALESCE(c.emotional_state, 'neutral') as emotional_state,
+                    COUNT(*) as count,
+                    AVG(c.tokens_used) as avg_tokens,
+                    COUNT(*) OVER () as total_conversations
+                FROM public.Conversation c
+                WHERE c.created_at >= (CURRENT_TIMESTAMP - INTERVAL '1 day' * p_days_back)
+                GROUP BY COALESCE(c.emotional_state, 'neutral')
+            ) emotion_analysis
+        ),
+        'recommendations', (
+            SELECT json_build_object(
+                'most_used_emotion', most_used,
+                'least_used_emotion', least_used,
+                'balance_score', ROUND((1.0 - (GREATEST(max_count - min_count, 0) * 1.0 / NULLIF(total_count, 0))) * 100, 2),
+                'total_conversations', total_count,
+                'unique_emotions', emotion_variety
+            )
+            FROM (
+                SELECT 
+                    MAX(count) as max_count,
+                    MIN(count) as min_count,
+                    SUM(count) as total_count,
+                    COUNT(DISTINCT emotional_state) as emotion_variety,
+                    (array_agg(emotional_state ORDER BY count DESC))[1] as most_used,
+                    (array_agg(emotional_state ORDER BY count ASC))[1] as least_used
+                FROM (
+                    SELECT 
+                        COALESCE(emotional_state, 'neutral') as emotional_state,
+                        COUNT(*) as count
+                    FROM public.Conversation
+                    WHERE created_at >= (CURRENT_TIMESTAMP - INTERVAL '1 day' * p_days_back)
+                    GROUP BY COALESCE(emotional_state, 'neutral')
+                ) emotion_counts
+            ) balance_analysis
+        )
+    ) INTO result;
+    
+    RETURN result;
+END;
+$$;
\ No newline at end of file
@@ -0,0 +1,176 @@
+import random
+
+import pytest
+
+ESTADOS = ['uno', 'dos']
+
+# Valores críticos de chi-cuadrado con p = 0.001 (df = mensajes candidatos - 1)
+CHI2_CRITICAL = {49: 85.351, 64: 104.716, 99: 148.230}
+
+
+def sample_gaps(db):
+    """Filas de chibi_messages_sample que rompen la numeración densa o no cuadran con chibi_messages"""
+    [[gaps]] = db.execute("""
+        SELECT
+            (SELECT count(*) FROM chibi_messages cm
+             FULL JOIN chibi_messages_sample s ON s.message_id = cm.id
+             WHERE s.message_id IS NULL OR cm.id IS NULL OR s.estado <> cm.estado)
+          + (SELECT count(*) FROM (
+                SELECT sample_key, row_number() OVER (ORDER BY sample_key) AS rn FROM chibi_messages_sample
+             ) global WHERE sample_key <> rn)
+          + (SELECT count(*) FROM (
+                SELECT estado_key, row_number() OVER (PARTITION BY estado ORDER BY estado_key) AS rn FROM chibi_messages_sample
+             ) per_estado WHERE estado_key <> rn)
+    """)
+    return gaps
+
+
+def tag_sample_gaps(db):
+    """Lo mismo para chibi_messages_tag_sample: un par por (mensaje, tag no NULL) y claves densas por tag y por (tag, estado)"""
+    [[gaps]] = db.execute("""
+        SELECT
+            (SELECT count(*) FROM (
+                SELECT DISTINCT cm.id, t.tag, cm.estado FROM chibi_messages cm, unnest(cm.tags) AS t(tag) WHERE t.tag IS NOT NULL
+             ) expected
+             FULL JOIN chibi_messages_tag_sample s ON s.message_id = expected.id AND s.tag = expected.tag
+             WHERE s.message_id IS NULL OR expected.id IS NULL OR s.estado <> expected.estado)
+          + (SELECT count(*) FROM (
+                SELECT tag_key, row_number() OVER (PARTITION BY tag ORDER BY tag_key) AS rn FROM chibi_messages_tag_sample
+             ) per_tag WHERE tag_key <> rn)
+          + (SELECT count(*) FROM (
+                SELECT estado_key, row_number() OVER (PARTITION BY tag, estado ORDER BY estado_key) AS rn
+                FROM chibi_messages_tag_sample
+             ) per_tag_estado WHERE estado_key <> rn)
+    """)
+    return gaps
+
+
+def chi_square(counts, population, expected):
+    """Estadístico de chi-cuadrado contando como 0 los candidatos que no han salido nunca"""
+    assert set(counts) <= set(population)
+    return sum((counts.get(message_id, 0) - expected) ** 2 / expected for message_id in population)
+
+
+@pytest.fixture
+def chibi_db(local_db):
+    """100 mensajes propios: la mitad en cada estado y el tag 'par' en los de id par"""
+    local_db.execute("DELETE FROM chibi_messages")
+    local_db.execute("""
+        INSERT INTO chibi_messages (mensaje, estado, tags)
+        SELECT 'Muestreo ' || g, (%(estados)s::TEXT[])[1 + mod(g, 2)], ARRAY['muestreo']
+        FROM generate_series(1, 100) AS g
+    """, {'estados': ESTADOS})
+    local_db.execute("UPDATE chibi_messages SET tags = tags || 'par'::TEXT WHERE mod(id, 2) = 0")
+    local_db.execute("SELECT setseed(0.42)")
+    return local_db
+
+
+def draw_counts(db, calls, limit, estado=None, tags=None):
+    rows = db.execute("""
+        SELECT r.id, count(*)
+        FROM generate_series(1, %(calls)s) AS g
+        CROSS JOIN LATERAL get_random_chibi_messages(%(limit)s + 0 * g, %(estado)s, %(tags)s) r
+        GROUP BY r.id
+    """, {'calls': calls, 'limit': limit, 'estado': estado, 'tags': tags})
+    return dict(rows)
+
+
+class TestChibiMessagesSample:
+
+    @pytest.mark.parametrize('seed', [1, 2])
+    def test_numbering_stays_dense(self, chibi_db, seed):
+        """Tras inserciones, borrados y cambios de estado o de tags las claves siguen siendo 1..N (global, por estado y por tag)"""
+        rng = random.Random(seed)
+
+        for _ in range(60):
+            ids = [row[0] for row in chibi_db.execute("SELECT id FROM chibi_messages")]
+            operation = rng.choice(['insert', 'delete', 'estado', 'tags', 'mensaje'])
+            picked = rng.sample(ids, min(len(ids), rng.randint(1, 15)))
+            if operation == 'insert':
+                chibi_db.execute("""
+                    INSERT INTO chibi_messages (mensaje, estado, tags)
+                    SELECT 'Nuevo ' || g, %(estado)s, ARRAY['muestreo'] FROM generate_series(1, %(rows)s) AS g
+                """, {'estado': rng.choice([*ESTADOS, 'tres']), 'rows': rng.randint(1, 20)})
+            elif operation == 'tags':
+                # Tags repetidos y NULL incluidos: la numeración por tag cuenta cada tag una vez
+                chibi_db.execute(
+                    "UPDATE chibi_messages SET tags = %(tags)s WHERE id = ANY(%(ids)s)",
+                    {'tags': [rng.choice(['muestreo', 'par', 'otro', None]) for _ in range(rng.randint(0, 3))], 'ids': picked},
+                )
+            elif operation == 'delete':
+                chibi_db.execute("DELETE FROM chibi_messages WHERE id = ANY(%(ids)s)", {'ids': picked})
+            elif operation == 'estado':
+                chibi_db.execute(
+                    "UPDATE chibi_messages SET estado = %(estado)s WHERE id = ANY(%(ids)s)",
+                    {'estado': rng.choice([*ESTADOS, 'tres']), 'ids': picked},
+                )
+            else:
+                chibi_db.execute("UPDATE chibi_messages SET mensaje = 'Editado' WHERE id = ANY(%(ids)s)", {'ids': picked})
+
+            assert sample_gaps(chibi_db) == 0, operation
+            assert tag_sample_gaps(chibi_db) == 0, operation
+
+    def test_truncate_empties_sample(self, chibi_db):
+        chibi_db.execute("TRUNCATE chibi_messages")
+
+        assert chibi_db.execute("SELECT count(*) FROM chibi_messages_sample") == [(0,)]
+        assert chibi_db.execute("SELECT count(*) FROM chibi_messages_tag_sample") == [(0,)]
+        assert chibi_db.execute("SELECT count(*) FROM get_random_chibi_messages(5)") == [(0,)]
+
+    def test_returns_distinct_messages_up_to_limit(self, chibi_db):
+        rows = chibi_db.execute("SELECT id FROM get_random_chibi_messages(30)")
+        assert len(rows) == len(set(rows)) == 30
+
+        # Con menos candidatos que el límite se devuelven todos
+        rows = chibi_db.execute("SELECT id FROM get_random_chibi_messages(80, 'uno')")
+        assert len(rows) == 50
+
+        assert chibi_db.execute("SELECT count(*) FROM get_random_chibi_messages(5, 'ninguno')") == [(0,)]
+        assert chibi_db.execute("SELECT count(*) FROM get_random_chibi_messages(0)") == [(0,)]
+
+
+class TestChibiMessagesUniformity:
+    """Cada mensaje candidato debe salir con la misma frecuencia (prueba de chi-cuadrado, p = 0.001)"""
+
+    def test_uniform_over_all_messages(self, chibi_db):
+        population = [row[0] for row in chibi_db.execute("SELECT id FROM chibi_messages")]
+
+        counts = draw_counts(chibi_db, calls=2000, limit=5)
+
+        assert chi_square(counts, population, expected=2000 * 5 / 100) < CHI2_CRITICAL[99]
+
+    def test_uniform_within_estado(self, chibi_db):
+        population = [row[0] for row in chibi_db.execute("SELECT id FROM chibi_messages WHERE estado = 'uno'")]
+
+        counts = draw_counts(chibi_db, calls=2000, limit=5, estado='uno')
+
+        assert chi_square(counts, population, expected=2000 * 5 / 50) < CHI2_CRITICAL[49]
+
+    def test_uniform_within_tags(self, chibi_db):
+        population = [row[0] for row in chibi_db.execute("SELECT id FROM chibi_messages WHERE 'par' = ANY(tags)")]
+
+        counts = draw_counts(chibi_db, calls=2500, limit=2, tags=['par'])
+
+        assert chi_square(counts, population, expected=2500 * 2 / 50) < CHI2_CRITICAL[49]
+
+    def test_uniform_within_several_tags(self, chibi_db):
+        """Un mensaje con varios de los tags buscados no sale más a menudo que uno con solo uno de ellos"""
+        chibi_db.execute("""
+            UPDATE chibi_messages SET tags = tags || 'bajo'::TEXT
+            WHERE id IN (SELECT id FROM chibi_messages ORDER BY id LIMIT 30)
+        """)
+        population = [row[0] for row in chibi_db.execute("SELECT id FROM chibi_messages WHERE tags && ARRAY['par', 'bajo']")]
+        assert len(population) == 65
+
+        counts = draw_counts(chibi_db, calls=2500, limit=2, tags=['par', 'bajo'])
+
+        assert chi_square(counts, population, expected=2500 * 2 / 65) < CHI2_CRITICAL[64]
+
+    def test_uniform_within_tag_and_estado(self, chibi_db):
+        population = [row[0] for row in chibi_db.execute(
+            "SELECT id FROM chibi_messages WHERE tags && ARRAY['muestreo'] AND estado = 'dos'"
+        )]
+
+        counts = draw_counts(chibi_db, calls=2000, limit=5, estado='dos', tags=['muestreo'])
+
+        assert chi_square(counts, population, expected=2000 * 5 / 50) < CHI2_CRITICAL[49]
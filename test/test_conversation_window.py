@@ -0,0 +1,157 @@
+import pytest
+
+
+@pytest.fixture
+def task_id(local_db):
+    [[task_id]] = local_db.execute("INSERT INTO public.task (title) VALUES ('Historial') RETURNING id")
+    return task_id
+
+
+def add_messages(db, task_id, tokens):
+    """Un mensaje por elemento de `tokens`, del más antiguo al más reciente; devuelve sus ids en ese orden"""
+    rows = db.execute("""
+        INSERT INTO public.conversation (task_id, role, message, tokens_used, created_at)
+        SELECT %(task_id)s, (CASE WHEN mod(g, 2) = 1 THEN 'user' ELSE 'assistant' END)::conversation_role,
+               'Turno ' || g, t.tokens, NOW() - INTERVAL '1 day' + g * INTERVAL '1 minute'
+        FROM unnest(%(tokens)s::INTEGER[]) WITH ORDINALITY AS t(tokens, g)
+        RETURNING id
+    """, {'task_id': task_id, 'tokens': tokens})
+    return sorted(row[0] for row in rows)
+
+
+def window(db, task_id, budget=2000, max_messages=50):
+    [[result]] = db.execute(
+        "SELECT motivbot_get_conversation_window(%(task_id)s, %(budget)s, %(max)s)",
+        {'task_id': task_id, 'budget': budget, 'max': max_messages},
+    )
+    return result
+
+
+def save_summary(db, task_id, summary, until_id):
+    [[result]] = db.execute(
+        "SELECT motivbot_save_conversation_summary(%(task_id)s, %(summary)s, %(until_id)s)",
+        {'task_id': task_id, 'summary': summary, 'until_id': until_id},
+    )
+    return result
+
+
+class TestConversationWindow:
+
+    def test_recent_messages_fit_budget(self, local_db, task_id):
+        ids = add_messages(local_db, task_id, [100, 300, 200, 50, 400])
+
+        result = window(local_db, task_id, budget=700)
+
+        # Desde el más reciente: 400 + 50 + 200 = 650; con el de 300 se pasaría
+        assert [m['id'] for m in result['messages']] == ids[2:]
+        assert result['tokens'] == 650
+        assert result['token_budget'] == 700
+        assert result['summary'] is None
+        assert result['needs_summary'] is True
+
+    def test_whole_history_fits(self, local_db, task_id):
+        ids = add_messages(local_db, task_id, [10, 20, 30])
+
+        result = window(local_db, task_id)
+
+        assert [m['id'] for m in result['messages']] == ids
+        assert result['needs_summary'] is False
+
+    def test_max_messages_bounds_the_window(self, local_db, task_id):
+        ids = add_messages(local_db, task_id, [1] * 30)
+
+        result = window(local_db, task_id, max_messages=5)
+
+        assert [m['id'] for m in result['messages']] == ids[-5:]
+        assert result['needs_summary'] is True
+
+    def test_messages_without_tokens_are_estimated(self, local_db, task_id):
+        """Sin tokens_used registrados se cuentan ~4 caracteres por token"""
+        local_db.execute("""
+            INSERT INTO public.conversation (task_id, role, message, tokens_used)
+            VALUES (%(task_id)s, 'user', repeat('a', 400), 0)
+        """, {'task_id': task_id})
+
+        assert window(local_db, task_id, budget=99)['messages'] == []
+        assert window(local_db, task_id, budget=100)['tokens'] == 100
+
+    def test_summary_covers_older_turns(self, local_db, task_id):
+        ids = add_messages(local_db, task_id, [500] * 6)
+        assert window(local_db, task_id, budget=1000)['needs_summary'] is True
+
+        assert save_summary(local_db, task_id, 'El usuario planifica su semana', ids[3])['success'] is True
+
+        result = window(local_db, task_id, budget=1000)
+        assert [m['id'] for m in result['messages']] == ids[4:]
+        assert result['summary']['summary'] == 'El usuario planifica su semana'
+        assert result['summary']['until_id'] == ids[3]
+        assert result['needs_summary'] is False
+
+        # Un turno nuevo desplaza la ventana y deja uno sin resumir
+        local_db.execute(
+            "INSERT INTO public.conversation (task_id, role, message, tokens_used) VALUES (%(id)s, 'user', 'Nuevo', 500)",
+            {'id': task_id},
+        )
+        assert window(local_db, task_id, budget=1000)['needs_summary'] is True
+
+    def test_summary_batches_cover_every_turn(self, local_db, task_id):
+        """Con más turnos pendientes que un lote, cada resumen avanza sin saltarse ninguno (como el proxy)"""
+        ids = add_messages(local_db, task_id, [500] * 100)
+        batch_size = 40
+        summarized = []
+
+        result = window(local_db, task_id, budget=1000)
+        while result['needs_summary']:
+            [[batch]] = local_db.execute(
+                "SELECT motivbot_get_unsummarized_turns(%(task_id)s, %(before_id)s, %(limit)s)",
+                {'task_id': task_id, 'before_id': result['messages'][0]['id'], 'limit': batch_size},
+            )
+            assert 0 < len(batch) <= batch_size
+            summarized.extend(m['id'] for m in batch)
+            assert save_summary(local_db, task_id, f'Hasta {batch[-1]["id"]}', batch[-1]['id'])['success'] is True
+            result = window(local_db, task_id, budget=1000)
+
+        # 98 turnos fuera de la ventana: tres lotes, en orden y sin huecos hasta el primero de la ventana
+        assert summarized == ids[:-2]
+        assert [m['id'] for m in result['messages']] == ids[-2:]
+        assert result['summary']['until_id'] == ids[-3]
+
+    def test_summary_only_moves_forward(self, local_db, task_id):
+        ids = add_messages(local_db, task_id, [100] * 4)
+        save_summary(local_db, task_id, 'Hasta el tercero', ids[2])
+
+        result = save_summary(local_db, task_id, 'Hasta el primero', ids[0])
+
+        assert result['success'] is False
+        assert window(local_db, task_id)['summary']['summary'] == 'Hasta el tercero'
+        assert save_summary(local_db, task_id, 'Hasta el cuarto', ids[3])['success'] is True
+
+    def test_invalid_arguments(self, local_db, task_id):
+        [other_id] = add_messages(local_db, task_id, [10])
+        [[other_task]] = local_db.execute("INSERT INTO public.task (title) VALUES ('Otra') RETURNING id")
+
+        assert window(local_db, -1)['success'] is False
+        assert window(local_db, task_id, budget=0)['success'] is False
+        assert save_summary(local_db, other_task, 'Resumen', other_id)['success'] is False
+        assert save_summary(local_db, task_id, '  ', other_id)['success'] is False
+
+    def test_summary_is_deleted_with_task(self, local_db, task_id):
+        [message_id] = add_messages(local_db, task_id, [10])
+        save_summary(local_db, task_id, 'Resumen', message_id)
+
+        local_db.execute("DELETE FROM public.task WHERE id = %(id)s", {'id': task_id})
+
+        assert local_db.execute("SELECT count(*) FROM public.conversation_summary") == [(0,)]
+
+    def test_window_through_client(self, motivbot_client, cleanup_tasks):
+        task_id = motivbot_client.create_task("Historial - Cleanup")['id']
+        cleanup_tasks(task_id)
+        first = motivbot_client.create_conversation(task_id, 'user', 'Hola', tokens_used=30)['id']
+        motivbot_client.create_conversation(task_id, 'assistant', '¡Vamos!', tokens_used=40)
+
+        assert motivbot_client.save_conversation_summary(task_id, 'Saludo inicial', first)['success'] is True
+        result = motivbot_client.get_conversation_window(task_id, token_budget=50)
+
+        assert [m['message'] for m in result['messages']] == ['¡Vamos!']
+        assert result['summary']['until_id'] == first
+        assert result['needs_summary'] is False
@@ -0,0 +1,191 @@
+import random
+
+import pytest
+
+TAGS = ['trabajo', 'casa', 'salud', 'estudio', 'urgente']
+ESTADOS = ['calm', 'happy']
+
+
+@pytest.fixture
+def match_db(local_db):
+    """Sin mensajes ni tareas de ejemplo: cada test crea los suyos"""
+    local_db.execute("TRUNCATE chibi_messages, public.task CASCADE")
+    return local_db
+
+
+def add_message(db, tags, estado='calm'):
+    [[message_id]] = db.execute(
+        "INSERT INTO chibi_messages (mensaje, estado, tags) VALUES ('Ánimo', %(estado)s, %(tags)s) RETURNING id",
+        {'estado': estado, 'tags': tags},
+    )
+    return message_id
+
+
+def add_task(db, tags):
+    [[task_id]] = db.execute("INSERT INTO public.task (title, tags) VALUES ('Tarea', %(tags)s) RETURNING id", {'tags': tags})
+    return task_id
+
+
+def messages(db, task_id, limit=5, estado=None):
+    [[result]] = db.execute(
+        "SELECT motivbot_get_motivational_messages(p_task_id := %(task_id)s, p_estado := %(estado)s, p_limit := %(limit)s)",
+        {'task_id': task_id, 'estado': estado, 'limit': limit},
+    )
+    return result
+
+
+def stored_matches(db, tags):
+    return set(db.execute("""
+        SELECT message_id, estado, score FROM public.motivbot_message_match WHERE tag_set = motivbot_tag_set(%(tags)s)
+    """, {'tags': tags}))
+
+
+def fresh_matches(db, tags):
+    return set(db.execute("""
+        SELECT message_id, estado, score FROM motivbot_message_match_compute(motivbot_tag_set(%(tags)s))
+    """, {'tags': tags}))
+
+
+class TestMessageMatches:
+
+    def test_messages_sharing_more_tags_come_first(self, match_db):
+        best = add_message(match_db, ['trabajo', 'salud', 'motivacional'])
+        good = add_message(match_db, ['trabajo', 'motivacional'], estado='happy')
+        add_message(match_db, ['casa'])
+        task_id = add_task(match_db, ['salud', 'trabajo', 'trabajo'])
+
+        result = messages(match_db, task_id, limit=2)
+
+        assert [m['id'] for m in result] == [best, good]
+        assert stored_matches(match_db, ['trabajo', 'salud']) == {(best, 'calm', 2), (good, 'happy', 1)}
+
+    def test_estado_filter_reads_its_own_top(self, match_db):
+        calm = [add_message(match_db, ['casa'], estado='calm') for _ in range(3)]
+        happy = [add_message(match_db, ['casa'], estado='happy') for _ in range(3)]
+        task_id = add_task(match_db, ['casa'])
+
+        assert sorted(m['id'] for m in messages(match_db, task_id, limit=3, estado='happy')) == happy
+        assert sorted(m['id'] for m in messages(match_db, task_id, limit=6)) == sorted(calm + happy)
+
+    def test_few_candidates_fall_back_to_sampling(self, match_db):
+        """Con menos mensajes relevantes que p_limit se completa con el muestreo por tags"""
+        message_id = add_message(match_db, ['casa'])
+        task_id = add_task(match_db, ['casa'])
+
+        assert [m['id'] for m in messages(match_db, task_id, limit=5)] == [message_id]
+        assert messages(match_db, add_task(match_db, []), limit=1) != []
+
+    def test_sampling_tops_up_the_matches(self, match_db):
+        """Se guardan 10 por estado: con p_limit 12 van primero los precalculados y el muestreo añade el resto"""
+        best = [add_message(match_db, ['casa', 'salud']) for _ in range(2)]
+        others = [add_message(match_db, ['casa']) for _ in range(11)]
+        task_id = add_task(match_db, ['casa', 'salud'])
+
+        result = [m['id'] for m in messages(match_db, task_id, limit=12)]
+
+        assert len(stored_matches(match_db, ['casa', 'salud'])) == 10
+        assert sorted(result[:2]) == best
+        assert len(result) == len(set(result)) == 12
+        assert set(result) <= set(best + others)
+
+    def test_tasks_with_same_tags_share_rows(self, match_db):
+        add_message(match_db, ['casa', 'salud'])
+        for tags in (['casa', 'salud'], ['salud', 'casa'], ['casa', None, 'salud']):
+            messages(match_db, add_task(match_db, tags))
+
+        assert match_db.execute("SELECT tag_set FROM public.motivbot_message_match_set") == [(['casa', 'salud'],)]
+
+    def test_text_change_does_not_recompute(self, match_db):
+        message_id = add_message(match_db, ['casa'])
+        task_id = add_task(match_db, ['casa'])
+        computed = match_db.execute("SELECT xmin::TEXT FROM public.motivbot_message_match_set")
+
+        match_db.execute("UPDATE chibi_messages SET mensaje = 'Nuevo texto' WHERE id = %(id)s", {'id': message_id})
+        assert match_db.execute("SELECT xmin::TEXT FROM public.motivbot_message_match_set") == computed
+
+        match_db.execute("UPDATE chibi_messages SET estado = 'happy' WHERE id = %(id)s", {'id': message_id})
+        assert messages(match_db, task_id, limit=1, estado='happy')[0]['mensaje'] == 'Nuevo texto'
+
+    def test_matches_use_every_message_of_a_tag(self, match_db):
+        """El mejor mensaje cuenta aunque cada uno de sus tags tenga cientos de mensajes más recientes"""
+        best = add_message(match_db, ['casa', 'salud'])
+        match_db.execute("""
+            INSERT INTO chibi_messages (mensaje, estado, tags)
+            SELECT 'Ánimo ' || g, 'calm', ARRAY[(ARRAY['casa', 'salud'])[1 + mod(g, 2)]]
+            FROM generate_series(1, 600) AS g
+        """)
+        task_id = add_task(match_db, ['casa', 'salud'])
+
+        assert [m['id'] for m in messages(match_db, task_id, limit=1)] == [best]
+        assert stored_matches(match_db, ['casa', 'salud']) == fresh_matches(match_db, ['casa', 'salud'])
+
+    def test_read_writes_nothing(self, match_db):
+        """El precálculo está hecho al escribir: la lectura funciona en una transacción de solo lectura"""
+        add_message(match_db, ['casa'])
+        task_id = add_task(match_db, ['casa'])
+        stored = stored_matches(match_db, ['casa'])
+
+        # Solo lectura dura lo que el savepoint de execute(): en la misma sentencia, porque con parámetros
+        # no se pueden enviar varias
+        [[_, result]] = match_db.execute(
+            "SELECT set_config('transaction_read_only', 'on', true), "
+            "motivbot_get_motivational_messages(p_task_id := %(task_id)s, p_limit := 1)",
+            {'task_id': task_id},
+        )
+
+        assert len(result) == 1 and stored == {(result[0]['id'], 'calm', 1)}
+
+    @pytest.mark.parametrize('seed', [1, 2])
+    def test_matches_follow_message_changes(self, match_db, seed):
+        """Tras cambios aleatorios en mensajes y tareas, lo guardado coincide con un recálculo"""
+        rng = random.Random(seed)
+
+        def random_tags():
+            return rng.sample(TAGS, rng.randint(0, 3))
+
+        for _ in range(30):
+            add_message(match_db, random_tags() + ['motivacional'], rng.choice(ESTADOS))
+        task_ids = [add_task(match_db, random_tags()) for _ in range(10)]
+
+        for _ in range(60):
+            ids = [row[0] for row in match_db.execute("SELECT id FROM chibi_messages")]
+            operation = rng.choice(['insert', 'tags', 'estado', 'delete', 'task'])
+            if operation == 'insert' or not ids:
+                add_message(match_db, random_tags(), rng.choice(ESTADOS))
+            elif operation == 'tags':
+                match_db.execute("UPDATE chibi_messages SET tags = %(tags)s WHERE id = ANY(%(ids)s)",
+                                 {'tags': random_tags(), 'ids': rng.sample(ids, min(len(ids), 3))})
+            elif operation == 'estado':
+                match_db.execute("UPDATE chibi_messages SET estado = %(estado)s WHERE id = %(id)s",
+                                 {'estado': rng.choice(ESTADOS), 'id': rng.choice(ids)})
+            elif operation == 'delete':
+                match_db.execute("DELETE FROM chibi_messages WHERE id = %(id)s", {'id': rng.choice(ids)})
+            else:
+                match_db.execute("UPDATE public.task SET tags = %(tags)s WHERE id = %(id)s",
+                                 {'tags': random_tags(), 'id': rng.choice(task_ids)})
+
+            task_id = rng.choice(task_ids)
+            messages(match_db, task_id, limit=1)
+            [[tags]] = match_db.execute("SELECT tags FROM public.task WHERE id = %(id)s", {'id': task_id})
+            if tags:
+                assert stored_matches(match_db, tags) == fresh_matches(match_db, tags), operation
+
+        assert match_db.execute("""
+            SELECT count(*) FROM (
+                SELECT DISTINCT tag, cm.id FROM chibi_messages cm, unnest(cm.tags) AS tag
+                EXCEPT SELECT tag, message_id FROM public.chibi_message_tag
+            ) missing
+        """) == [(0,)]
+        assert match_db.execute("SELECT count(*) FROM public.chibi_message_tag") == match_db.execute(
+            "SELECT count(DISTINCT (tag, cm.id)) FROM chibi_messages cm, unnest(cm.tags) AS tag")
+
+    def test_refresh_precomputes_every_task(self, match_db):
+        add_message(match_db, ['casa', 'salud'])
+        add_message(match_db, ['trabajo'])
+        for tags in (['casa'], ['salud', 'trabajo'], ['casa'], []):
+            add_task(match_db, tags)
+
+        [[result]] = match_db.execute("SELECT motivbot_refresh_message_matches()")
+
+        assert (result['sets'], result['matches']) == (2, 3)
+        assert stored_matches(match_db, ['salud', 'trabajo']) == fresh_matches(match_db, ['salud', 'trabajo'])
@@ -0,0 +1,319 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from motivbot import MotivBotError
+
+from .fuzz import check_rpc, delete_conversations, delete_tasks, run_operations
+
+STATUSES = ['pending', 'in-progress', 'completed', 'cancelled']
+TAGS = ['trabajo', 'casa', 'urgente', 'completed']
+EMOTIONS = ['neutral', 'happy', 'calm', None]
+
+# Días hacia atrás sobre los que se reparten las filas (0 = hoy)
+DAYS = 10
+
+
+def today(db):
+    [[value]] = db.execute("SELECT CURRENT_DATE")
+    return value
+
+
+def random_created_at(rng):
+    return f"{rng.randint(0, DAYS)} days {rng.randint(0, 23)} hours"
+
+
+# Las altas y modificaciones reparten created_at por días pasados (las de fuzz.py escriben en el día de hoy)
+def insert_tasks(db, rng):
+    db.execute("""
+        INSERT INTO public.task (title, status, tags, created_at)
+        SELECT 'Rollup ' || g, (%(statuses)s::task_status[])[1 + floor(random() * 4)::INTEGER],
+               %(tags)s, date_trunc('day', NOW()) - %(ago)s::INTERVAL + g * INTERVAL '1 minute'
+        FROM generate_series(1, %(rows)s) AS g
+    """, {
+        'statuses': STATUSES,
+        'tags': rng.sample(TAGS, rng.randint(0, 2)),
+        'ago': random_created_at(rng),
+        'rows': rng.randint(1, 20),
+    })
+
+
+def update_tasks(db, rng):
+    column, value = rng.choice([
+        ('status', rng.choice(STATUSES)),
+        ('tags', rng.sample(TAGS, rng.randint(0, 3))),
+        ('created_at', f"date_trunc('day', NOW()) - INTERVAL '{random_created_at(rng)}'"),
+    ])
+    if column == 'created_at':
+        db.execute(f"UPDATE public.task SET created_at = {value} WHERE mod(id, %(mod)s) = 0", {'mod': rng.randint(2, 9)})
+    else:
+        cast = '::task_status' if column == 'status' else ''
+        db.execute(
+            f"UPDATE public.task SET {column} = %(value)s{cast} WHERE mod(id, %(mod)s) = 0",
+            {'value': value, 'mod': rng.randint(2, 9)},
+        )
+
+
+def insert_conversations(db, rng):
+    db.execute("""
+        INSERT INTO public.conversation (task_id, role, message, emotional_state, tokens_used, response_time_ms,
+                                         user_is_grateful, assistant_is_useful, created_at)
+        SELECT (SELECT max(id) FROM public.task), (CASE WHEN mod(g, 2) = 0 THEN 'user' ELSE 'assistant' END)::conversation_role,
+               'Rollup', %(emotion)s, mod(g * 37, 500), mod(g * 13, 900), mod(g, 3) = 0, mod(g, 4) = 0,
+               date_trunc('day', NOW()) - %(ago)s::INTERVAL + g * INTERVAL '1 minute'
+        FROM generate_series(1, %(rows)s) AS g
+    """, {'emotion': rng.choice(EMOTIONS), 'ago': random_created_at(rng), 'rows': rng.randint(1, 20)})
+
+
+def update_conversations(db, rng):
+    db.execute("""
+        UPDATE public.conversation
+        SET emotional_state = %(emotion)s, user_is_grateful = NOT user_is_grateful, tokens_used = tokens_used + 1
+        WHERE mod(id, %(mod)s) = 0
+    """, {'emotion': rng.choice(EMOTIONS), 'mod': rng.randint(2, 9)})
+
+
+OPERATIONS = [
+    insert_tasks,
+    insert_tasks,
+    update_tasks,
+    delete_tasks,
+    insert_conversations,
+    insert_conversations,
+    update_conversations,
+    delete_conversations,
+]
+
+
+def check_rollups(db):
+    return check_rpc(db, 'motivbot_check_daily_rollups')
+
+
+def analytics(db, start, end, bucket='day'):
+    [[result]] = db.execute(
+        "SELECT motivbot_get_analytics(%(start)s, %(end)s, %(bucket)s)",
+        {'start': start, 'end': end, 'bucket': bucket},
+    )
+    return result
+
+
+def raw_totals(db, start):
+    """Los mismos totales que motivbot_get_analytics, contados directamente en las tablas"""
+    [[conversations, tokens, created, completed]] = db.execute("""
+        SELECT (SELECT count(*) FROM public.conversation WHERE created_at >= %(start)s::DATE),
+               (SELECT COALESCE(sum(tokens_used), 0) FROM public.conversation WHERE created_at >= %(start)s::DATE),
+               (SELECT count(*) FROM public.task WHERE created_at >= %(start)s::DATE),
+               (SELECT count(*) FROM public.task WHERE completed_at >= %(start)s::DATE)
+    """, {'start': start})
+    emotions = dict(db.execute("""
+        SELECT COALESCE(emotional_state, 'neutral'), count(*) FROM public.conversation
+        WHERE created_at >= %(start)s::DATE GROUP BY 1
+    """, {'start': start}))
+    tags = dict(db.execute("""
+        SELECT tag, count(DISTINCT t.id) FROM public.task t, unnest(t.tags) AS tag
+        WHERE t.created_at >= %(start)s::DATE GROUP BY tag
+    """, {'start': start}))
+    return conversations, tokens, created, completed, emotions, tags
+
+
+class TestMotivbotDailyRollups:
+
+    @pytest.mark.parametrize('seed', [1, 2, 3])
+    def test_rollups_match_tables(self, local_db, seed):
+        """Tras cambios aleatorios en días pasados y en el de hoy, rollups y analíticas cuadran con las tablas"""
+        rng = random.Random(seed)
+        local_db.execute("SELECT setseed(%(seed)s)", {'seed': seed / 10})
+        start = today(local_db) - timedelta(days=DAYS + 1)
+
+        def check(operation):
+            local_db.execute("SELECT motivbot_refresh_daily_rollups()")
+            result = check_rollups(local_db)
+            assert result['consistent'], (operation.__name__, result['mismatches'])
+
+        run_operations(local_db, rng, OPERATIONS, steps=40, check=check, every=10)
+
+        totals = analytics(local_db, start, today(local_db))['totals']
+        conversations, tokens, created, completed, emotions, tags = raw_totals(local_db, start)
+        assert totals['conversations']['total'] == conversations
+        assert totals['conversations']['tokens_used'] == tokens
+        assert totals['conversations']['emotional_states'] == emotions
+        assert totals['tasks']['created'] == created
+        assert totals['tasks']['completed'] == completed
+        assert totals['tasks']['created_by_tag'] == tags
+        assert check_rollups(local_db)['consistent']
+
+    def test_completed_at_follows_status(self, local_db):
+        [[task_id]] = local_db.execute("INSERT INTO public.task (title) VALUES ('Completar') RETURNING id")
+
+        def completed_at():
+            [[value]] = local_db.execute("SELECT completed_at FROM public.task WHERE id = %(id)s", {'id': task_id})
+            return value
+
+        assert completed_at() is None
+        local_db.execute("UPDATE public.task SET status = 'completed' WHERE id = %(id)s", {'id': task_id})
+        first = completed_at()
+        assert first is not None
+
+        # Editar una tarea completada no cambia la fecha; reabrirla la borra
+        local_db.execute("UPDATE public.task SET title = 'Completada' WHERE id = %(id)s", {'id': task_id})
+        assert completed_at() == first
+        local_db.execute("UPDATE public.task SET status = 'pending' WHERE id = %(id)s", {'id': task_id})
+        assert completed_at() is None
+
+    def test_current_day_is_read_from_tables(self, local_db):
+        """Lo de hoy aparece al momento sin consolidarse: el día sigue pendiente y sin filas de rollup"""
+        day = today(local_db)
+        before = analytics(local_db, day, day)['totals']['conversations']['total']
+
+        local_db.execute("INSERT INTO public.conversation (role, message) VALUES ('user', 'Hoy'), ('assistant', 'Hoy')")
+
+        assert analytics(local_db, day, day)['totals']['conversations']['total'] == before + 2
+        assert local_db.execute("SELECT count(*) FROM public.motivbot_rollup_pending WHERE day = CURRENT_DATE") == [(1,)]
+        assert local_db.execute("SELECT count(*) FROM public.motivbot_daily_rollup WHERE day = CURRENT_DATE") == [(0,)]
+
+    def test_backdated_change_is_read_from_tables_until_refresh(self, local_db):
+        """Leer un día pendiente lo cuenta en las tablas sin consolidarlo; lo consolida el trabajo programado"""
+        day = today(local_db) - timedelta(days=3)
+        local_db.execute("SELECT motivbot_refresh_daily_rollups()")
+
+        local_db.execute("""
+            INSERT INTO public.conversation (role, message, emotional_state, created_at)
+            VALUES ('user', 'Atrasada', 'calm', %(day)s::DATE + INTERVAL '12 hours')
+        """, {'day': day})
+
+        [bucket] = analytics(local_db, day, day)['buckets']
+        assert bucket['start'] == day.isoformat()
+        assert bucket['conversations']['emotional_states'].get('calm', 0) >= 1
+        assert local_db.execute("SELECT count(*) FROM public.motivbot_rollup_pending WHERE day = %(day)s",
+                                {'day': day}) == [(1,)]
+
+        local_db.execute("SELECT motivbot_refresh_daily_rollups()")
+
+        assert analytics(local_db, day, day)['buckets'] == [bucket]
+        assert local_db.execute("SELECT count(*) FROM public.motivbot_rollup_pending WHERE day < CURRENT_DATE") == [(0,)]
+
+    def test_read_is_read_only(self, local_db):
+        """Con días pendientes, las analíticas funcionan en una transacción de solo lectura y no escriben"""
+        day = today(local_db) - timedelta(days=2)
+        local_db.execute("""
+            INSERT INTO public.conversation (role, message, created_at)
+            VALUES ('user', 'Solo lectura', %(day)s::DATE + INTERVAL '1 hour')
+        """, {'day': day})
+        [[pending]] = local_db.execute("SELECT count(*) FROM public.motivbot_rollup_pending")
+
+        # Solo lectura dura lo que el savepoint de execute(): en la misma sentencia, porque con parámetros
+        # no se pueden enviar varias
+        [[_, result]] = local_db.execute(
+            "SELECT set_config('transaction_read_only', 'on', true), motivbot_get_analytics(%(day)s, CURRENT_DATE)",
+            {'day': day},
+        )
+
+        assert result['totals']['conversations']['total'] >= 1
+        assert local_db.execute("SELECT count(*) FROM public.motivbot_rollup_pending") == [(pending,)]
+
+    def test_only_rolled_up_columns_mark_days(self, local_db):
+        day = today(local_db) - timedelta(days=4)
+        [[task_id]] = local_db.execute("""
+            INSERT INTO public.task (title, tags, created_at) VALUES ('Marcar', ARRAY['casa'], %(day)s::DATE + INTERVAL '1 hour')
+            RETURNING id
+        """, {'day': day})
+        [[conversation_id]] = local_db.execute("""
+            INSERT INTO public.conversation (task_id, role, message, created_at)
+            VALUES (%(task_id)s, 'user', 'Marcar', %(day)s::DATE + INTERVAL '2 hours')
+            RETURNING id
+        """, {'task_id': task_id, 'day': day})
+        local_db.execute("SELECT motivbot_refresh_daily_rollups()")
+
+        def pending():
+            return local_db.execute("SELECT count(*) FROM public.motivbot_rollup_pending WHERE day = %(day)s",
+                                    {'day': day})
+
+        local_db.execute("UPDATE public.task SET title = 'Otro título', description = 'Nada que sumar' "
+                         "WHERE id = %(id)s", {'id': task_id})
+        local_db.execute("UPDATE public.conversation SET message = 'Editado' WHERE id = %(id)s", {'id': conversation_id})
+        assert pending() == [(0,)]
+
+        local_db.execute("UPDATE public.task SET tags = ARRAY['trabajo'] WHERE id = %(id)s", {'id': task_id})
+        assert pending() == [(1,)]
+
+    @pytest.mark.parametrize('bucket, days', [('week', 7), ('month', 31)])
+    def test_buckets_add_up_to_totals(self, local_db, bucket, days):
+        local_db.execute("""
+            INSERT INTO public.conversation (role, message, tokens_used, created_at)
+            SELECT 'assistant', 'Bucket ' || g, g, NOW() - g * INTERVAL '7 hours'
+            FROM generate_series(1, 300) AS g
+        """)
+        end = today(local_db)
+        start = end - timedelta(days=75)
+
+        result = analytics(local_db, start, end, bucket)
+
+        starts = [date.fromisoformat(b['start']) for b in result['buckets']]
+        assert starts == sorted(starts) and starts[0] <= start and starts[-1] <= end
+        assert all((later - earlier).days <= days for earlier, later in zip(starts, starts[1:]))
+        if bucket == 'week':
+            assert {s.weekday() for s in starts} == {0}
+        for metric in ('total', 'tokens_used'):
+            assert sum(b['conversations'][metric] for b in result['buckets']) == result['totals']['conversations'][metric]
+
+    def test_invalid_arguments(self, local_db):
+        day = today(local_db)
+
+        assert analytics(local_db, day, day, 'year')['success'] is False
+        assert analytics(local_db, day, day - timedelta(days=1))['success'] is False
+
+    def test_inconsistency_is_reported(self, local_db):
+        day = today(local_db) - timedelta(days=2)
+        local_db.execute("""
+            INSERT INTO public.conversation (role, message, created_at)
+            VALUES ('user', 'Rollup', %(day)s::DATE + INTERVAL '1 hour')
+        """, {'day': day})
+        local_db.execute("SELECT motivbot_refresh_daily_rollups()")
+
+        local_db.execute("""
+            UPDATE public.motivbot_daily_rollup SET value = value + 3
+            WHERE day = %(day)s AND scope = 'conversation' AND key = 'total'
+        """, {'day': day})
+
+        result = check_rollups(local_db)
+        assert result['consistent'] is False
+        assert [(m['scope'], m['key'], m['actual'] - m['expected']) for m in result['mismatches']] == [('conversation', 'total', 3)]
+
+    def test_truncate_empties_rollups(self, local_db):
+        local_db.execute("SELECT motivbot_refresh_daily_rollups()")
+
+        local_db.execute("TRUNCATE public.task CASCADE")
+
+        assert local_db.execute("SELECT count(*) FROM public.motivbot_daily_rollup") == [(0,)]
+        assert check_rollups(local_db)['consistent']
+
+    def test_emotional_avg_tokens_counts_null_as_zero(self, local_db):
+        """get_emotional_states_analytics suma tokens desde los rollups: tokens_used NULL cuenta como 0"""
+        local_db.execute("TRUNCATE public.conversation")
+        local_db.execute("""
+            INSERT INTO public.conversation (role, message, emotional_state, tokens_used, created_at)
+            VALUES ('user', 'Con tokens', 'focused', 100, NOW() - INTERVAL '3 days'),
+                   ('user', 'Sin tokens', 'focused', NULL, NOW() - INTERVAL '3 days'),
+                   ('user', 'Hoy sin tokens', 'focused', NULL, NOW())
+        """)
+        local_db.execute("SELECT motivbot_refresh_daily_rollups()")
+
+        [[result]] = local_db.execute("SELECT get_emotional_states_analytics(7)")
+
+        assert result['emotional_trends']['focused']['count'] == 3
+        assert result['emotional_trends']['focused']['avg_tokens'] == 33
+
+    def test_analytics_through_client(self, motivbot_client, service_client, cleanup_tasks):
+        """motivbot_get_analytics es accesible por la API; motivbot_check_daily_rollups solo con service_role"""
+        task_id = motivbot_client.create_task("Analytics - Cleanup", tags=["sdk-analytics"])['id']
+        cleanup_tasks(task_id)
+
+        result = motivbot_client.get_analytics(bucket='week')
+
+        assert result['bucket'] == 'week'
+        assert result['totals']['tasks']['created_by_tag']['sdk-analytics'] >= 1
+        assert service_client.check_daily_rollups()['consistent'] is True
+        with pytest.raises(MotivBotError) as error:
+            motivbot_client.check_daily_rollups()
+        assert error.value.status_code in [401, 403]
@@ -0,0 +1,466 @@
+import os
+import statistics
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+
+from .datagen import TAGS, generate
+
+# Versiones anteriores de las RPC, que consultaban information_schema en cada llamada
+LEGACY_SQL = Path(__file__).resolve().parent / 'sql' / 'legacy_motivbot_rpc.sql'
+
+CALLS = 200
+
+# Tamaño de la tabla para el benchmark de búsqueda (el objetivo es < 10 ms con 1M de tareas)
+SEARCH_TASKS = int(os.getenv('MOTIVBOT_BENCH_TASKS', '1000000'))
+SEARCH_LATENCY_MS = 10
+
+# Tareas para comparar el dashboard por contadores con el que recorría las tablas
+DASHBOARD_TASKS = 100000
+
+# Conversaciones (repartidas en ~400 días) y ventanas para las analíticas por estado emocional
+ANALYTICS_CONVERSATIONS = int(os.getenv('MOTIVBOT_BENCH_CONVERSATIONS', '1000000'))
+ANALYTICS_WINDOWS = [30, 90, 365]
+
+# Mensajes de una sola tarea para comparar la ventana de historial con el historial completo
+HISTORY_MESSAGES = 100000
+
+# Mensajes chibi para comparar el muestreo por claves densas con ORDER BY RANDOM()
+CHIBI_MESSAGES = 200000
+
+# Mensajes chibi y tareas para los mensajes motivacionales precalculados por tags
+MATCH_MESSAGES = int(os.getenv('MOTIVBOT_BENCH_MATCH_MESSAGES', '100000'))
+MATCH_TASKS = int(os.getenv('MOTIVBOT_BENCH_MATCH_TASKS', '100000'))
+
+# Tareas de datagen para la vista de mes del calendario (~70% con fecha límite en ±45 días)
+CALENDAR_TASKS = int(os.getenv('MOTIVBOT_BENCH_CALENDAR_TASKS', '1000000'))
+
+# Búsquedas típicas de la GPT action: palabras con tilde, códigos, tags y sin resultados
+SEARCHES = [
+    ('informe cliente4242', False),
+    ('Documentación cliente77', False),
+    ('ventas lote 12345', False),
+    ('zzzz', True),
+]
+# Términos muy frecuentes (~1 de cada 8 tareas): solo se puntúan los candidatos más recientes de cada grupo, así
+# que tienen el mismo presupuesto. 'bench-7' también coincide con los tags bench-70 ... bench-79
+FREQUENT_SEARCHES = [
+    ('revisar', False),
+    ('bench-7', True),
+]
+
+# RPC -> argumentos; {} se sustituye por el nombre de la función actual o de la legacy
+RPC_CALLS = {
+    'motivbot_get_tasks': "SELECT {}(p_tags := ARRAY['bench-1'], p_limit := 20)",
+    'motivbot_update_task': "SELECT {}(p_task_id := %(task_id)s, p_title := 'Benchmark renamed')",
+    'motivbot_get_dashboard': "SELECT {}()",
+}
+
+
+def timed(db, query, params):
+    start = time.perf_counter()
+    db.execute(query, params)
+    return time.perf_counter() - start
+
+
+def median_latency(db, query, params, calls=CALLS):
+    """Mediana en segundos de `calls` ejecuciones, tras una primera que calienta la caché de planes"""
+    db.execute(query, params)
+    return statistics.median(timed(db, query, params) for _ in range(calls))
+
+
+def paired_latency(db, first, second, calls=CALLS):
+    """Medianas de dos consultas (query, params) ejecutadas alternadamente para repartir el ruido"""
+    for query, params in (first, second):
+        db.execute(query, params)
+    samples = [(timed(db, *first), timed(db, *second)) for _ in range(calls)]
+    return tuple(statistics.median(column) for column in zip(*samples))
+
+
+@pytest.fixture
+def seeded_db(local_db):
+    """Base local con las RPC legacy cargadas y 500 tareas de ejemplo"""
+    local_db.execute(LEGACY_SQL.read_text(encoding='utf-8'))
+    rows = local_db.execute("""
+        INSERT INTO public.task (title, description, priority, tags, created_at)
+        SELECT 'Benchmark ' || g, 'Tarea de benchmark ' || g, 'normal', ARRAY['bench', 'bench-' || (g % 5)],
+               NOW() - g * INTERVAL '1 second'
+        FROM generate_series(1, 500) AS g
+        RETURNING id
+    """)
+    # Cada versión actualiza su propia fila para no heredar las versiones muertas de la otra
+    return local_db, {'task_id': rows[0][0]}, {'task_id': rows[1][0]}
+
+
+@pytest.mark.benchmark
+class TestMotivbotRpcLatency:
+
+    @pytest.mark.parametrize('rpc', sorted(RPC_CALLS))
+    def test_static_rpc_is_faster_than_legacy(self, seeded_db, rpc):
+        """Las RPC con SQL estático son más rápidas por llamada que las que consultaban information_schema"""
+        db, legacy_params, params = seeded_db
+
+        legacy, current = paired_latency(
+            db,
+            (RPC_CALLS[rpc].format('legacy_' + rpc), legacy_params),
+            (RPC_CALLS[rpc].format(rpc), params),
+        )
+
+        print(f"\n⏱️  {rpc}: legacy {legacy * 1000:.3f} ms -> static {current * 1000:.3f} ms "
+              f"({legacy / current:.1f}x)")
+        assert current < legacy
+
+    @pytest.mark.parametrize('rpc', ['motivbot_get_tasks', 'motivbot_get_dashboard'])
+    def test_static_rpc_returns_same_json(self, seeded_db, rpc):
+        """El JSON devuelto no cambia respecto a la versión legacy"""
+        db, params, _ = seeded_db
+
+        legacy = db.execute(RPC_CALLS[rpc].format('legacy_' + rpc), params)
+        current = db.execute(RPC_CALLS[rpc].format(rpc), params)
+
+        assert current == legacy
+
+
+    def test_dashboard_does_not_scan_tables(self, local_db):
+        """Con DASHBOARD_TASKS tareas el dashboard de contadores sigue siendo una lectura de pocas filas"""
+        local_db.execute(LEGACY_SQL.read_text(encoding='utf-8'))
+        local_db.execute("""
+            INSERT INTO public.task (title, status, priority, tags, due_date)
+            SELECT 'Dashboard ' || g, (ARRAY['pending', 'completed', 'in-progress']::task_status[])[1 + mod(g, 3)],
+                   'normal', ARRAY['bench', 'bench-' || mod(g, 50)], CURRENT_DATE - mod(g, 30)
+            FROM generate_series(1, %(tasks)s) AS g
+        """, {'tasks': DASHBOARD_TASKS})
+
+        legacy, current = paired_latency(
+            local_db,
+            ('SELECT legacy_motivbot_get_dashboard()', None),
+            ('SELECT motivbot_get_dashboard()', None),
+            calls=20,
+        )
+
+        print(f"\n📊 dashboard con {DASHBOARD_TASKS} tareas: legacy {legacy * 1000:.3f} ms -> "
+              f"contadores {current * 1000:.3f} ms ({legacy / current:.0f}x)")
+        assert current * 10 < legacy
+
+    @pytest.mark.parametrize('estado, tags', [
+        (None, None),
+        ('calm', None),
+        # 'bench-5pct' está en ~5% de los mensajes: sin sondas por tag se barajaban sus ~10k filas
+        (None, ['bench-5pct']),
+        ('calm', ['bench-5pct']),
+    ])
+    def test_random_chibi_messages_do_not_sort_table(self, local_db, estado, tags):
+        """Con CHIBI_MESSAGES mensajes el muestreo hace sondas por índice en lugar de barajar la tabla o el filtro"""
+        local_db.execute("""
+            INSERT INTO chibi_messages (mensaje, estado, tags)
+            SELECT 'Benchmark ' || g, (ARRAY['happy', 'calm', 'focused', 'excited'])[1 + mod(g, 4)],
+                   ARRAY['bench', 'bench-' || mod(g, 50)] || CASE WHEN mod(g / 4, 20) = 0 THEN ARRAY['bench-5pct'] ELSE '{}' END
+            FROM generate_series(1, %(messages)s) AS g
+        """, {'messages': CHIBI_MESSAGES})
+        # Estado estable tras autovacuum: con las estadísticas de la tabla vacía el planificador elige mal los joins
+        local_db.execute("ANALYZE chibi_messages")
+        local_db.execute("ANALYZE chibi_messages_sample")
+        local_db.execute("ANALYZE chibi_messages_tag_sample")
+        params = {'estado': estado, 'tags': tags}
+
+        legacy, current = paired_latency(
+            local_db,
+            ("""
+                SELECT count(*) FROM (
+                    SELECT * FROM chibi_messages
+                    WHERE (%(estado)s::TEXT IS NULL OR estado = %(estado)s)
+                      AND (%(tags)s::TEXT[] IS NULL OR tags && %(tags)s::TEXT[])
+                    ORDER BY RANDOM() LIMIT 20
+                ) legacy
+            """, params),
+            ("SELECT count(*) FROM get_random_chibi_messages(20, %(estado)s, %(tags)s)", params),
+            calls=20,
+        )
+
+        label = ' + '.join(filter(None, [estado, *(tags or [])])) or 'todos'
+        print(f"\n🎲 chibi aleatorios ({label}) con {CHIBI_MESSAGES} mensajes: ORDER BY RANDOM() "
+              f"{legacy * 1000:.3f} ms -> muestreo {current * 1000:.3f} ms ({legacy / current:.0f}x)")
+        assert current * 10 < legacy
+
+
+    def test_conversation_window_does_not_grow_with_history(self, local_db):
+        """Con HISTORY_MESSAGES mensajes en una tarea la ventana lee las mismas filas que con 100"""
+        [[small], [large]] = local_db.execute("""
+            INSERT INTO public.task (title) VALUES ('Historial corto'), ('Historial largo') RETURNING id
+        """)
+        local_db.execute("""
+            INSERT INTO public.conversation (task_id, role, message, tokens_used, created_at)
+            SELECT CASE WHEN g <= 100 THEN %(small)s ELSE %(large)s END,
+                   (CASE WHEN mod(g, 2) = 0 THEN 'user' ELSE 'assistant' END)::conversation_role,
+                   'Turno ' || g, 20 + mod(g * 37, 200), NOW() - g * INTERVAL '1 minute'
+            FROM generate_series(1, %(messages)s + 100) AS g
+        """, {'small': small, 'large': large, 'messages': HISTORY_MESSAGES})
+        local_db.execute("ANALYZE public.conversation")
+
+        short, long = paired_latency(
+            local_db,
+            ('SELECT motivbot_get_conversation_window(%(task_id)s, 2000)', {'task_id': small}),
+            ('SELECT motivbot_get_conversation_window(%(task_id)s, 2000)', {'task_id': large}),
+            calls=50,
+        )
+        full = median_latency(local_db, 'SELECT get_task_conversation_history(%(task_id)s)', {'task_id': large}, calls=5)
+
+        print(f"\n🧵 ventana de historial: 100 mensajes {short * 1000:.3f} ms, {HISTORY_MESSAGES} mensajes "
+              f"{long * 1000:.3f} ms (historial completo {full * 1000:.3f} ms)")
+        assert long < short * 2 + 0.001
+        assert long * 10 < full
+
+    def test_motivational_messages_read_precomputed_matches(self, local_db):
+        """Con MATCH_MESSAGES mensajes y MATCH_TASKS tareas los mensajes de una tarea se leen del precálculo"""
+        # Tags sesgados como en datagen: unos pocos muy frecuentes y una cola larga
+        local_db.execute("""
+            INSERT INTO chibi_messages (mensaje, estado, tags)
+            SELECT 'Benchmark ' || g, (ARRAY['happy', 'calm', 'focused', 'excited'])[1 + mod(g, 4)],
+                   ARRAY[(%(tags)s::TEXT[])[1 + floor(power(random(), 3) * %(tag_count)s)::INTEGER], 'motivacional']
+            FROM generate_series(1, %(messages)s) AS g
+        """, {'messages': MATCH_MESSAGES, 'tags': TAGS, 'tag_count': len(TAGS)})
+        local_db.execute("""
+            INSERT INTO public.task (title, tags)
+            SELECT 'Benchmark ' || g, ARRAY(
+                SELECT (%(tags)s::TEXT[])[1 + floor(power(random(), 3) * %(tag_count)s)::INTEGER]
+                FROM generate_series(1, 1 + mod(g, 3)) AS k
+                WHERE g > 0
+            )
+            FROM generate_series(1, %(tasks)s) AS g
+        """, {'tasks': MATCH_TASKS, 'tags': TAGS, 'tag_count': len(TAGS)})
+        local_db.execute("ANALYZE chibi_messages")
+        local_db.execute("ANALYZE public.task")
+
+        start = time.perf_counter()
+        [[refresh]] = local_db.execute("SELECT motivbot_refresh_message_matches()")
+        refresh_seconds = time.perf_counter() - start
+
+        # Una tarea con los tags más frecuentes y otra con uno de la cola (el muestreo acaba barajando sus mensajes)
+        [[common]] = local_db.execute("INSERT INTO public.task (title, tags) VALUES ('Común', %(tags)s) RETURNING id",
+                                      {'tags': TAGS[:2]})
+        [[rare]] = local_db.execute("INSERT INTO public.task (title, tags) VALUES ('Cola', %(tags)s) RETURNING id",
+                                    {'tags': TAGS[-3:]})
+
+        latencies = {}
+        for name, task_id in (('común', common), ('cola', rare)):
+            params = {'task_id': task_id}
+            latencies[name] = paired_latency(
+                local_db,
+                ("""
+                    SELECT count(*) FROM get_random_chibi_messages(5, NULL, (SELECT tags FROM public.task WHERE id = %(task_id)s))
+                """, params),
+                ("SELECT motivbot_get_motivational_messages(p_task_id := %(task_id)s)", params),
+                calls=50,
+            )
+            print(f"\n🎯 mensajes por tags {name} ({MATCH_MESSAGES} mensajes, {MATCH_TASKS} tareas): "
+                  f"muestreo {latencies[name][0] * 1000:.3f} ms -> precálculo {latencies[name][1] * 1000:.3f} ms")
+
+        # El precálculo cuesta lo mismo sea cual sea la frecuencia de los tags; el muestreo no
+        assert latencies['cola'][1] < latencies['común'][1] * 2 + 0.001
+        assert latencies['cola'][1] * 3 < latencies['cola'][0]
+
+        # Un mensaje nuevo recalcula al escribirse los conjuntos con sus tags; la lectura siguiente no calcula nada
+        insert = timed(local_db, "INSERT INTO chibi_messages (mensaje, estado, tags) VALUES ('Nuevo', 'calm', %(tags)s)",
+                       {'tags': TAGS[:1]})
+        after = timed(local_db, "SELECT motivbot_get_motivational_messages(p_task_id := %(task_id)s)", {'task_id': common})
+        print(f"🎯 precálculo de {refresh['sets']} conjuntos de tags en {refresh_seconds:.1f} s; "
+              f"mensaje nuevo {insert * 1000:.3f} ms, primera lectura tras él {after * 1000:.3f} ms")
+        assert after < latencies['común'][1] * 2 + 0.001
+
+
+def insert_conversations(db, conversations):
+    """Conversaciones sin tarea con estados emocionales sesgados (y algún NULL) a lo largo de ~400 días"""
+    db.execute("""
+        INSERT INTO public.conversation (role, message, emotional_state, tokens_used, created_at)
+        SELECT (CASE WHEN mod(g, 2) = 0 THEN 'user' ELSE 'assistant' END)::conversation_role,
+               'Mensaje de analíticas ' || g,
+               CASE WHEN mod(g, 97) = 0 THEN NULL
+                    ELSE (ARRAY['neutral', 'neutral', 'neutral', 'encouraging', 'supportive', 'happy', 'calm',
+                                'focused', 'thoughtful', 'excited', 'energetic'])[1 + mod(g * 7, 11)] END,
+               mod(g, 800),
+               NOW() - (g * 400.0 / %(conversations)s) * INTERVAL '1 day'
+        FROM generate_series(1, %(conversations)s) AS g
+    """, {'conversations': conversations})
+    db.execute("ANALYZE public.conversation")
+
+
+@pytest.mark.benchmark
+class TestEmotionalAnalytics:
+
+    def test_rollups_are_faster_than_legacy(self, local_db):
+        """Con ANALYTICS_CONVERSATIONS conversaciones los rollups ganan en las ventanas de 30, 90 y 365 días"""
+        local_db.execute(LEGACY_SQL.read_text(encoding='utf-8'))
+        insert_conversations(local_db, ANALYTICS_CONVERSATIONS)
+        # Lo que haría el trabajo programado: sin él, los días pendientes se cuentan en la tabla
+        local_db.execute("SELECT motivbot_refresh_daily_rollups()")
+
+        for days in ANALYTICS_WINDOWS:
+            legacy, current = paired_latency(
+                local_db,
+                ('SELECT legacy_get_emotional_states_analytics(%(days)s)', {'days': days}),
+                ('SELECT get_emotional_states_analytics(%(days)s)', {'days': days}),
+                calls=5,
+            )
+            print(f"\n💬 analíticas emocionales {days} días con {ANALYTICS_CONVERSATIONS} conversaciones: "
+                  f"legacy {legacy * 1000:.3f} ms -> rollups {current * 1000:.3f} ms ({legacy / current:.1f}x)")
+            assert current < legacy, days
+
+    def test_same_analytics_as_legacy(self, local_db):
+        """Mismo JSON que la versión anterior salvo percentage, que ahora es sobre el total de conversaciones"""
+        local_db.execute(LEGACY_SQL.read_text(encoding='utf-8'))
+        insert_conversations(local_db, 5000)
+
+        [[legacy]] = local_db.execute('SELECT legacy_get_emotional_states_analytics(90)')
+        [[current]] = local_db.execute('SELECT get_emotional_states_analytics(90)')
+
+        total = current['recommendations']['total_conversations']
+        percentages = {emotion: trend.pop('percentage') for emotion, trend in current['emotional_trends'].items()}
+        for trend in legacy['emotional_trends'].values():
+            del trend['percentage']
+        assert percentages == {
+            emotion: round(trend['count'] * 100 / total, 2) for emotion, trend in current['emotional_trends'].items()
+        }
+
+        # Con empates en el mínimo la versión legacy elegía cualquiera de los empatados
+        counts = {emotion: trend['count'] for emotion, trend in current['emotional_trends'].items()}
+        least = [emotion for emotion, count in counts.items() if count == min(counts.values())]
+        assert legacy['recommendations'].pop('least_used_emotion') in least
+        assert current['recommendations'].pop('least_used_emotion') == min(least)
+        assert current == legacy
+
+
+@pytest.fixture
+def search_db(local_db):
+    """Base local con SEARCH_TASKS tareas de vocabulario variado"""
+    local_db.execute("""
+        INSERT INTO public.task (title, description, priority, tags, created_at)
+        SELECT (ARRAY['Revisar', 'Preparar', 'Enviar', 'Llamar', 'Documentar', 'Planificar', 'Actualizar', 'Organizar'])[1 + mod(g, 8)]
+                   || ' ' || (ARRAY['informe', 'presupuesto', 'reunión', 'factura', 'propuesta', 'contrato', 'campaña',
+                                    'inventario', 'diseño', 'migración', 'documentación'])[1 + mod(g, 11)]
+                   || ' cliente' || mod(g, 5000),
+               'Seguimiento del área ' || (ARRAY['ventas', 'soporte', 'finanzas', 'marketing', 'legal', 'operaciones', 'producto'])[1 + mod(g, 7)]
+                   || ' lote ' || mod(g, 20011),
+               (ARRAY['low', 'normal', 'medium', 'high'])[1 + mod(g, 4)],
+               ARRAY['bench', 'bench-' || mod(g, 100)],
+               NOW() - g * INTERVAL '1 second'
+        FROM generate_series(1, %(tasks)s) AS g
+    """, {'tasks': SEARCH_TASKS})
+    # Estado estable tras autovacuum: lista pendiente de los GIN volcada y estadísticas al día
+    local_db.execute("SELECT gin_clean_pending_list('idx_task_search_vector'), gin_clean_pending_list('idx_task_tags')")
+    local_db.execute("ANALYZE public.task")
+    return local_db
+
+
+@pytest.mark.benchmark
+class TestMotivbotSearchLatency:
+
+    def test_search_stays_under_budget(self, search_db):
+        """motivbot_search_tasks usa los índices GIN y responde en menos de SEARCH_LATENCY_MS"""
+        query = "SELECT motivbot_search_tasks(p_search := %(search)s, p_search_tags := %(search_tags)s, p_limit := 20)"
+
+        latencies = {}
+        for search, search_tags in SEARCHES + FREQUENT_SEARCHES:
+            params = {'search': search, 'search_tags': search_tags}
+            latencies[search] = median_latency(search_db, query, params, calls=50) * 1000
+            print(f"\n🔎 '{search}' en {SEARCH_TASKS} tareas: {latencies[search]:.3f} ms")
+
+        assert max(latencies.values()) < SEARCH_LATENCY_MS, latencies
+
+    def test_search_ranks_title_matches_first(self, local_db):
+        """Las coincidencias en el título van antes que las de la descripción, sin distinguir tildes"""
+        local_db.execute("""
+            INSERT INTO public.task (title, description) VALUES
+            ('Notas sueltas', 'Pendiente revisar la planificación trimestral'),
+            ('Planificación trimestral', 'Revisar objetivos')
+        """)
+
+        [[tasks]] = local_db.execute("SELECT motivbot_search_tasks('planificacion trimestral')")
+
+        assert [task['title'] for task in tasks] == ['Planificación trimestral', 'Notas sueltas']
+
+    def test_search_ranks_every_match(self, local_db):
+        """Una coincidencia antigua en el título gana a miles de coincidencias recientes en la descripción"""
+        local_db.execute("""
+            INSERT INTO public.task (title, description, created_at) VALUES
+            ('Informe de auditoría', NULL, NOW() - INTERVAL '3 years')
+        """)
+        local_db.execute("""
+            INSERT INTO public.task (title, description, created_at)
+            SELECT 'Nota ' || g, 'Adjuntar al informe', NOW() - g * INTERVAL '1 minute'
+            FROM generate_series(1, 5000) AS g
+        """)
+
+        [[tasks]] = local_db.execute("SELECT motivbot_search_tasks('informe', p_limit := 5)")
+
+        assert tasks[0]['title'] == 'Informe de auditoría'
+
+    def test_tag_search_matches_substring(self, local_db):
+        """Con p_search_tags un tag coincide si contiene el texto, sin distinguir mayúsculas"""
+        local_db.execute("INSERT INTO public.task (title, tags) VALUES ('Cuadrar cuentas', ARRAY['Finanzas-2031'])")
+
+        [[tasks]] = local_db.execute("SELECT motivbot_search_tasks('finanzas', p_search_tags := true)")
+
+        assert 'Cuadrar cuentas' in [task['title'] for task in tasks]
+
+    def test_tag_search_treats_wildcards_literally(self, local_db):
+        """% y _ del texto no son comodines de LIKE"""
+        local_db.execute("""
+            INSERT INTO public.task (title, tags) VALUES
+            ('Con guion bajo', ARRAY['meta_2031']), ('Sin guion bajo', ARRAY['metax2031']), ('Porcentaje', ARRAY['100%'])
+        """)
+
+        [[underscore]] = local_db.execute("SELECT motivbot_search_tasks('meta_2031', p_search_tags := true)")
+        [[percent]] = local_db.execute("SELECT motivbot_search_tasks('%', p_search_tags := true)")
+
+        assert [task['title'] for task in underscore] == ['Con guion bajo']
+        assert [task['title'] for task in percent] == ['Porcentaje']
+
+    def test_frequent_term_ranks_title_matches_first(self, local_db):
+        """Con más coincidencias que candidatos, las del título siguen delante de las más recientes en la descripción"""
+        local_db.execute("""
+            INSERT INTO public.task (title, description, created_at)
+            SELECT CASE WHEN mod(g, 50) = 0 THEN 'Auditoría ' || g ELSE 'Nota ' || g END,
+                   CASE WHEN mod(g, 50) = 0 THEN NULL ELSE 'Preparar la auditoría' END,
+                   NOW() - g * INTERVAL '1 minute'
+            FROM generate_series(1, 5000) AS g
+        """)
+
+        [[tasks]] = local_db.execute("SELECT motivbot_search_tasks('auditoria', p_limit := 10)")
+
+        # Las 10 coincidencias en el título más recientes: g = 50, 100, ... 500
+        assert [task['title'] for task in tasks] == [f'Auditoría {g}' for g in range(50, 501, 50)]
+
+
+@pytest.mark.benchmark
+class TestMotivbotCalendarLatency:
+
+    def test_month_view_is_faster_than_range_query(self, local_db):
+        """
+        Con CALENDAR_TASKS tareas el mes sale de idx_task_due_date_time y no de leer todas sus filas. Sin límite
+        por día, como lo piden getTasksForWeek, getTasksForMonth y filterTasksByDay: las dos consultas devuelven
+        las mismas tareas y solo cambia cómo se encuentran
+        """
+        generate(local_db, CALENDAR_TASKS)
+        [[first_day]] = local_db.execute("SELECT date_trunc('month', CURRENT_DATE)::DATE")
+        params = {'start': first_day, 'end': first_day + timedelta(days=30)}
+        calendar = "SELECT motivbot_get_calendar(%(start)s, %(end)s, p_limit_per_day := NULL)"
+        # Lo que hacían getTasksForMonth y filterTasksByDay: todas las filas del rango, ordenadas
+        range_query = """
+            SELECT json_agg(t ORDER BY due_date, due_time) FROM public.task t
+            WHERE due_date BETWEEN %(start)s AND %(end)s
+        """
+
+        current = median_latency(local_db, calendar, params, calls=20)
+        [[month]] = local_db.execute(calendar, params)
+        # Sin el índice, como estaba la tabla antes; el DROP se deshace con el rollback del test
+        local_db.execute("DROP INDEX idx_task_due_date_time")
+        legacy = median_latency(local_db, range_query, params, calls=5)
+
+        print(f"\n🗓️  vista de mes con {CALENDAR_TASKS} tareas ({month['total']} en el mes): rango completo "
+              f"{legacy * 1000:.3f} ms -> calendario {current * 1000:.3f} ms ({legacy / current:.1f}x)")
+        assert month['success'] and len(month['days']) == 31
+        assert sum(len(day['tasks']) for day in month['days']) == month['total']
+        # Las dos serializan todas las tareas del mes: la diferencia es el índice frente a recorrer la tabla
+        assert current < legacy
@@ -0,0 +1,114 @@
+import pytest
+
+from motivbot import MotivBotClient, ResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def versions(db):
+    [[result]] = db.execute("SELECT motivbot_get_data_version()")
+    return result
+
+
+class TestResponseCache:
+
+    def test_entry_expires_after_ttl(self):
+        clock = FakeClock()
+        cache = ResponseCache(maxsize=4, ttl=10, clock=clock)
+        cache.set('tags', (1,), ['trabajo'])
+
+        clock.now = 9.9
+        assert cache.get('tags', (1,)) == ['trabajo']
+        clock.now = 10
+        assert cache.get('tags', (1,)) is None
+        assert len(cache) == 0
+
+    def test_changed_version_invalidates(self):
+        cache = ResponseCache()
+        cache.set('dashboard', (1, 7), {'tasks': {}})
+
+        assert cache.get('dashboard', (1, 8)) is None
+        assert (cache.hits, cache.misses) == (0, 1)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ResponseCache(maxsize=2)
+        cache.set('a', (1,), 'A')
+        cache.set('b', (1,), 'B')
+        cache.get('a', (1,))
+
+        cache.set('c', (1,), 'C')
+
+        assert cache.get('b', (1,)) is None
+        assert cache.get('a', (1,)) == 'A' and cache.get('c', (1,)) == 'C'
+
+    def test_returns_copies(self):
+        cache = ResponseCache()
+        cache.set('tags', (1,), [{'tag': 'casa', 'count': 1}])
+
+        cache.get('tags', (1,))[0]['count'] = 99
+
+        assert cache.get('tags', (1,)) == [{'tag': 'casa', 'count': 1}]
+
+    def test_key_ignores_argument_order(self):
+        assert ResponseCache.key('rpc', {'a': 1, 'b': [2]}) == ResponseCache.key('rpc', {'b': [2], 'a': 1})
+
+    def test_invalid_bounds(self):
+        with pytest.raises(ValueError):
+            ResponseCache(maxsize=0)
+
+
+class TestDataVersion:
+
+    @pytest.mark.parametrize('table, statement', [
+        ('task', "INSERT INTO public.task (title) SELECT 'Versión ' || g FROM generate_series(1, 50) AS g"),
+        ('task', "UPDATE public.task SET title = title"),
+        ('task', "DELETE FROM public.task WHERE title = 'nada'"),
+        ('conversation', "INSERT INTO public.conversation (role, message) VALUES ('user', 'Versión')"),
+        ('chibi_messages', "INSERT INTO chibi_messages (mensaje, estado, tags) VALUES ('Versión', 'calm', ARRAY['v'])"),
+        ('chibi_messages', "TRUNCATE chibi_messages"),
+    ])
+    def test_each_statement_bumps_its_table(self, local_db, table, statement):
+        before = versions(local_db)
+
+        local_db.execute(statement)
+
+        after = versions(local_db)
+        assert after[table] == before[table] + 1
+        assert {k: v for k, v in after.items() if k != table} == {k: v for k, v in before.items() if k != table}
+
+
+class TestClientCache:
+
+    @pytest.mark.serial
+    def test_cached_rpcs_follow_data_version(self, supabase_config, cleanup_tasks):
+        cache = ResponseCache(maxsize=16, ttl=300)
+        with MotivBotClient(supabase_config['url'], supabase_config['anon_key'], cache=cache) as client:
+            tags = client.get_popular_tags(limit=5)
+            dashboard = client.get_dashboard()
+            assert client.get_popular_tags(limit=5) == tags
+            assert client.get_dashboard() == dashboard
+            assert (cache.hits, cache.misses) == (2, 2)
+
+            # Una conversación nueva invalida el dashboard pero no los tags populares
+            task_id = client.create_task("Cache - Cleanup", tags=["sdk-cache"])['id']
+            cleanup_tasks(task_id)
+            client.get_popular_tags(limit=5)
+            client.get_dashboard()
+            assert (cache.hits, cache.misses) == (2, 4)
+
+            client.create_conversation(task_id, 'user', 'Hola caché')
+            client.get_popular_tags(limit=5)
+            updated = client.get_dashboard()
+            assert (cache.hits, cache.misses) == (3, 5)
+            assert updated['conversations']['total'] == dashboard['conversations']['total'] + 1
+
+    def test_without_cache_calls_rpc(self, motivbot_client):
+        assert motivbot_client._config.cache is None
+        assert isinstance(motivbot_client.get_popular_tags(limit=1), list)
+        assert set(motivbot_client.get_data_version()) == {'task', 'conversation', 'chibi_messages'}
@@ -0,0 +1,73 @@
+from datetime import date, timedelta
+
+import pytest
+
+# Lunes lejano para no mezclarse con las tareas de otros tests
+MONDAY = date(2031, 3, 3)
+
+
+def insert_task(db, title, due_date, due_time=None, status='pending'):
+    [[task_id]] = db.execute("""
+        INSERT INTO public.task (title, status, due_date, due_time)
+        VALUES (%(title)s, %(status)s::task_status, %(due_date)s, %(due_time)s)
+        RETURNING id
+    """, {'title': title, 'status': status, 'due_date': due_date, 'due_time': due_time})
+    return task_id
+
+
+def calendar(db, start, end, limit_per_day=50):
+    [[result]] = db.execute("SELECT motivbot_get_calendar(%(start)s, %(end)s, %(limit)s)",
+                            {'start': start, 'end': end, 'limit': limit_per_day})
+    return result
+
+
+class TestMotivbotCalendar:
+
+    def test_one_bucket_per_day_with_status_counts(self, local_db):
+        wednesday = MONDAY + timedelta(days=2)
+        insert_task(local_db, 'Reunión', MONDAY, '10:00', 'in-progress')
+        insert_task(local_db, 'Informe', MONDAY, '09:00')
+        insert_task(local_db, 'Sin hora', MONDAY)
+        insert_task(local_db, 'Factura', wednesday, '12:00', 'completed')
+        insert_task(local_db, 'Fuera de rango', MONDAY + timedelta(days=7))
+
+        result = calendar(local_db, MONDAY, MONDAY + timedelta(days=6))
+
+        assert result['success'] and result['total'] == 4
+        assert [day['date'] for day in result['days']] == [(MONDAY + timedelta(days=i)).isoformat() for i in range(7)]
+        monday, _, wednesday_bucket = result['days'][:3]
+        assert monday['total'] == 3 and monday['by_status'] == {'pending': 2, 'in-progress': 1}
+        # Por hora y las tareas sin hora al final, como el filtro por día del frontend
+        assert [task['title'] for task in monday['tasks']] == ['Informe', 'Reunión', 'Sin hora']
+        assert wednesday_bucket['by_status'] == {'completed': 1}
+        assert result['days'][1] == {'date': (MONDAY + timedelta(days=1)).isoformat(), 'total': 0,
+                                     'by_status': {}, 'tasks': []}
+
+    def test_limit_per_day_keeps_full_counts(self, local_db):
+        for hour in range(8, 14):
+            insert_task(local_db, f"Tarea {hour}", MONDAY, f"{hour}:00")
+
+        limited = calendar(local_db, MONDAY, MONDAY, limit_per_day=2)
+        unlimited = calendar(local_db, MONDAY, MONDAY, limit_per_day=None)
+
+        [day] = limited['days']
+        assert day['total'] == 6 and [task['title'] for task in day['tasks']] == ['Tarea 8', 'Tarea 9']
+        assert len(unlimited['days'][0]['tasks']) == 6
+
+    @pytest.mark.parametrize('start, end, limit_per_day', [
+        (MONDAY, MONDAY - timedelta(days=1), 50),
+        (None, MONDAY, 50),
+        (MONDAY, MONDAY + timedelta(days=366), 50),
+        (MONDAY, MONDAY, -1),
+    ])
+    def test_invalid_range(self, local_db, start, end, limit_per_day):
+        result = calendar(local_db, start, end, limit_per_day)
+
+        assert result['success'] is False and result['message']
+
+    def test_client_returns_the_same_calendar(self, local_db, motivbot_client):
+        insert_task(local_db, 'Desde el cliente', MONDAY, '08:30')
+
+        result = motivbot_client.get_calendar(MONDAY, MONDAY + timedelta(days=6))
+
+        assert result == calendar(local_db, MONDAY, MONDAY + timedelta(days=6))
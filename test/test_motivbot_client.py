@@ -0,0 +1,238 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+from motivbot import AsyncMotivBotClient, MotivBotClient, MotivBotError
+
+
+def created_ats(count, step=1):
+    """
+    created_at explícitos y decrecientes (cada `step` filas baja un minuto): el orden de las páginas no depende de
+    que NOW() coincida o no entre filas, y al ir al revés que los ids comprueba que se ordena por created_at
+    """
+    start = datetime(2030, 6, 1, 12, 0, tzinfo=timezone.utc)
+    return [(start - timedelta(minutes=i // step)).isoformat() for i in range(count)]
+
+
+class TestMotivbotClient:
+
+    def test_task_lifecycle(self, motivbot_client, cleanup_tasks, worker_tag):
+        """Crear, filtrar, actualizar y borrar una tarea reutilizando la misma sesión"""
+        tag = worker_tag("sdk-client")
+        created = motivbot_client.create_task(
+            "Client SDK Task - Cleanup",
+            description="Created through MotivBotClient",
+            priority="high",
+            tags=[tag, "test"],
+        )
+        assert created['success'] is True
+        assert created['generated_tags'] == [tag, "test"]
+        task_id = created['id']
+        cleanup_tasks(task_id)
+
+        tasks = motivbot_client.get_tasks(tags=[tag], limit=50)
+        assert task_id in [task['id'] for task in tasks]
+
+        updated = motivbot_client.update_task(task_id, status="completed")
+        assert updated['success'] is True
+
+        found = motivbot_client.search_tasks(tag, search_tags=True)
+        assert task_id in [task['id'] for task in found]
+
+        deleted = motivbot_client.delete_task(task_id)
+        assert deleted['success'] is True
+
+    def test_conversation_and_analytics(self, motivbot_client, cleanup_tasks):
+        """Las RPC de conversaciones, tags y dashboard devuelven la estructura esperada"""
+        task_id = motivbot_client.create_task("Client SDK Conversation - Cleanup")['id']
+        cleanup_tasks(task_id)
+
+        conversation = motivbot_client.create_conversation(task_id, "user", "Hola desde el SDK")
+        assert conversation['success'] is True
+
+        conversations = motivbot_client.get_conversations(task_id=task_id)
+        assert [c['id'] for c in conversations] == [conversation['id']]
+
+        feedback = motivbot_client.update_conversation_feedback(conversation['id'], user_is_useful=True)
+        assert feedback['success'] is True
+
+        assert isinstance(motivbot_client.get_popular_tags(limit=5), list)
+        assert isinstance(motivbot_client.get_motivational_messages(task_id=task_id), list)
+        assert 'tasks' in motivbot_client.get_dashboard()
+
+    def test_create_tasks_in_chunks(self, motivbot_client, cleanup_tasks, worker_tag):
+        """motivbot_create_tasks inserta cada bloque en una llamada y devuelve los ids en orden"""
+        rows = (
+            {"title": f"Bulk Task {i} - Cleanup", "priority": "low", "tags": ["sdk-bulk", worker_tag(f"bulk-{i % 3}")]}
+            for i in range(1200)
+        )
+
+        ids = motivbot_client.create_tasks(rows, chunk_size=500)
+        for task_id in ids:
+            cleanup_tasks(task_id)
+
+        assert len(ids) == len(set(ids)) == 1200
+
+        tasks = motivbot_client.get_tasks(tags=[worker_tag("bulk-2")], limit=5)
+        assert len(tasks) == 5
+        assert all(task['priority'] == 'low' for task in tasks)
+        # ids[i] es la tarea de la fila i, no el i-ésimo id más bajo
+        assert all(task['title'] == f"Bulk Task {ids.index(task['id'])} - Cleanup" for task in tasks)
+
+    def test_create_tasks_generates_tags_and_validates(self, motivbot_client, cleanup_tasks):
+        """Sin tags se generan como en motivbot_create_task; un título vacío rechaza el bloque"""
+        ids = motivbot_client.create_tasks([{"title": "Proyecto urgente - Cleanup", "priority": "high"}])
+        cleanup_tasks(ids[0])
+
+        task = motivbot_client.search_tasks("Proyecto urgente")[0]
+        assert task['tags'] == ["urgente", "proyecto", "alta-prioridad"]
+
+        with pytest.raises(MotivBotError) as error:
+            motivbot_client.create_tasks([{"title": "Valid - Cleanup"}, {"title": "  "}])
+
+        assert 'title' in str(error.value).lower()
+
+    def test_create_tasks_keeps_created_at(self, motivbot_client, cleanup_tasks, worker_tag):
+        """created_at es opcional por fila: se conserva el que llega y sin él se usa la hora del servidor"""
+        tag = worker_tag("sdk-created-at")
+        ids = motivbot_client.create_tasks([
+            {"title": "Imported Task - Cleanup", "tags": [tag], "created_at": "2030-06-01T12:00:00+00:00"},
+            {"title": "New Task - Cleanup", "tags": [tag]},
+        ])
+        for task_id in ids:
+            cleanup_tasks(task_id)
+
+        created = {task['id']: datetime.fromisoformat(task['created_at'])
+                   for task in motivbot_client.get_tasks(tags=[tag], limit=5)}
+        assert created[ids[0]] == datetime(2030, 6, 1, 12, 0, tzinfo=timezone.utc)
+        assert abs(created[ids[1]] - datetime.now(timezone.utc)) < timedelta(days=1)
+
+    def test_iter_tasks_follows_cursor(self, motivbot_client, cleanup_tasks, worker_tag):
+        """iter_tasks recorre todas las páginas por created_at descendente sin repetir ni saltar tareas"""
+        ids = motivbot_client.create_tasks(
+            {"title": f"Page Task {i} - Cleanup", "tags": [worker_tag("sdk-page")], "created_at": created_at}
+            for i, created_at in enumerate(created_ats(25))
+        )
+        for task_id in ids:
+            cleanup_tasks(task_id)
+
+        tasks = list(motivbot_client.iter_tasks(tags=[worker_tag("sdk-page")], page_size=10))
+
+        assert [task['id'] for task in tasks] == ids
+
+    def test_iter_tasks_breaks_created_at_ties_by_id(self, motivbot_client, cleanup_tasks, worker_tag):
+        """Con grupos de 4 tareas con el mismo created_at, las páginas de 10 los cortan sin repetir ni saltar"""
+        times = created_ats(25, step=4)
+        ids = motivbot_client.create_tasks(
+            {"title": f"Tie Task {i} - Cleanup", "tags": [worker_tag("sdk-tie")], "created_at": created_at}
+            for i, created_at in enumerate(times)
+        )
+        for task_id in ids:
+            cleanup_tasks(task_id)
+
+        tasks = list(motivbot_client.iter_tasks(tags=[worker_tag("sdk-tie")], page_size=10))
+
+        assert [task['id'] for task in tasks] == [task_id for _, task_id in sorted(zip(times, ids), reverse=True)]
+
+    def test_tasks_page_returns_cursor(self, motivbot_client, cleanup_tasks, worker_tag):
+        """next_cursor apunta al último elemento y es None cuando no quedan más páginas"""
+        ids = motivbot_client.create_tasks(
+            {"title": f"Cursor Task {i} - Cleanup", "tags": [worker_tag("sdk-cursor")], "created_at": created_at}
+            for i, created_at in enumerate(created_ats(3))
+        )
+        for task_id in ids:
+            cleanup_tasks(task_id)
+
+        first = motivbot_client.get_tasks_page(tags=[worker_tag("sdk-cursor")], limit=2)
+        assert [task['id'] for task in first['items']] == [ids[0], ids[1]]
+        assert first['next_cursor']['id'] == ids[1]
+
+        last = motivbot_client.get_tasks_page(tags=[worker_tag("sdk-cursor")], limit=2, after=first['next_cursor'])
+        assert [task['id'] for task in last['items']] == [ids[2]]
+        assert last['next_cursor'] is None
+
+    def test_iter_conversations_follows_cursor(self, motivbot_client, cleanup_tasks):
+        """iter_conversations devuelve el historial completo de una tarea página a página"""
+        task_id = motivbot_client.create_task("Client SDK Pages - Cleanup")['id']
+        cleanup_tasks(task_id)
+        ids = motivbot_client.create_conversations(
+            {'task_id': task_id, 'role': 'user', 'message': f"Mensaje {i}", 'created_at': created_at}
+            for i, created_at in enumerate(created_ats(7))
+        )
+
+        conversations = list(motivbot_client.iter_conversations(task_id=task_id, page_size=3))
+
+        assert [c['id'] for c in conversations] == ids
+
+    def test_unknown_rpc_raises(self, motivbot_client):
+        """Un error HTTP de PostgREST se convierte en MotivBotError"""
+        with pytest.raises(MotivBotError) as error:
+            motivbot_client.rpc('nonexistent_function')
+
+        assert error.value.status_code == 404
+
+    def test_invalid_key_raises(self, supabase_config):
+        """Sin una clave válida el gateway responde 401/403"""
+        with MotivBotClient(supabase_config['url'], 'fake_key') as client:
+            with pytest.raises(MotivBotError) as error:
+                client.get_tasks()
+
+        assert error.value.status_code in [401, 403]
+
+    def test_async_client_concurrent_calls(self, supabase_config, cleanup_tasks, worker_tag):
+        """El cliente asyncio comparte el pool entre llamadas concurrentes"""
+
+        async def scenario():
+            async with AsyncMotivBotClient(supabase_config['url'], supabase_config['anon_key']) as client:
+                created = await asyncio.gather(*(
+                    client.create_task(f"Async SDK Task {i} - Cleanup", tags=[worker_tag("sdk-async")])
+                    for i in range(5)
+                ))
+                tasks = await client.get_tasks(tags=[worker_tag("sdk-async")], limit=50)
+                return created, tasks
+
+        created, tasks = asyncio.run(scenario())
+
+        for result in created:
+            assert result['success'] is True
+            cleanup_tasks(result['id'])
+        assert {r['id'] for r in created} <= {task['id'] for task in tasks}
+
+    def test_async_iter_tasks(self, supabase_config, cleanup_tasks, worker_tag):
+        """El iterador asíncrono pide las páginas según se consumen"""
+
+        async def scenario():
+            async with AsyncMotivBotClient(supabase_config['url'], supabase_config['anon_key']) as client:
+                ids = await client.create_tasks([
+                    {"title": f"Async Page Task {i} - Cleanup", "tags": [worker_tag("sdk-async-page")], "created_at": at}
+                    for i, at in enumerate(created_ats(5))
+                ])
+                tasks = [task async for task in client.iter_tasks(tags=[worker_tag("sdk-async-page")], page_size=2)]
+                return ids, tasks
+
+        ids, tasks = asyncio.run(scenario())
+
+        for task_id in ids:
+            cleanup_tasks(task_id)
+        assert [task['id'] for task in tasks] == ids
+
+
+class TestRetryPolicy:
+
+    @pytest.mark.parametrize('status, calls', [(429, 3), (503, 3), (502, 1), (504, 1)])
+    def test_only_unexecuted_responses_are_retried(self, status, calls):
+        """Un 502/504 puede llegar con la RPC ya ejecutada: repetirla duplicaría una escritura"""
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(status, json={'message': 'gateway'})
+
+        with MotivBotClient('http://motivbot.invalid', 'anon', retries=2, backoff=0) as client:
+            client._http = httpx.Client(base_url=client._config.base_url, transport=httpx.MockTransport(handler))
+            with pytest.raises(MotivBotError) as error:
+                client.create_task('No duplicar')
+
+        assert error.value.status_code == status and len(requests) == calls
@@ -0,0 +1,99 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from motivbot import MotivBotError
+
+from .fuzz import (
+    bulk_insert_tasks,
+    check_rpc,
+    delete_conversations,
+    delete_tasks,
+    insert_conversations,
+    insert_tasks,
+    run_operations,
+    update_conversations,
+    update_task,
+)
+
+# Versión anterior de motivbot_get_dashboard, que recorría las tablas en cada llamada
+LEGACY_SQL = Path(__file__).resolve().parent / 'sql' / 'legacy_motivbot_rpc.sql'
+
+OPERATIONS = [
+    insert_tasks,
+    insert_tasks,
+    bulk_insert_tasks,
+    update_task,
+    update_task,
+    delete_tasks,
+    insert_conversations,
+    insert_conversations,
+    update_conversations,
+    delete_conversations,
+]
+
+
+def check_counters(db):
+    return check_rpc(db, 'motivbot_check_dashboard_counters')
+
+
+class TestMotivbotDashboardCounters:
+
+    @pytest.mark.parametrize('seed', [1, 2, 3])
+    def test_counters_match_full_recount(self, local_db, seed):
+        """Tras inserciones, actualizaciones y borrados aleatorios los contadores coinciden con el recálculo"""
+        def check(operation):
+            result = check_counters(local_db)
+            assert result['consistent'], (operation.__name__, result['mismatches'])
+
+        run_operations(local_db, random.Random(seed), OPERATIONS, steps=150, check=check, every=50)
+
+        assert check_counters(local_db) == {'consistent': True, 'mismatches': []}
+
+    def test_dashboard_matches_table_scan(self, local_db):
+        """El dashboard leído de los contadores es el mismo que el calculado recorriendo las tablas"""
+        local_db.execute(LEGACY_SQL.read_text(encoding='utf-8'))
+        rng = random.Random(7)
+        for _ in range(100):
+            rng.choice(OPERATIONS)(local_db, rng)
+
+        [[legacy]] = local_db.execute("SELECT legacy_motivbot_get_dashboard()")
+        [[current]] = local_db.execute("SELECT motivbot_get_dashboard()")
+
+        # Con empates en el top 10 el orden de los tags no está definido en la versión legacy
+        for dashboard in (legacy, current):
+            dashboard['tags']['most_used'] = sorted(tag['count'] for tag in dashboard['tags']['most_used'])
+        assert current == legacy
+
+    def test_truncate_resets_counters(self, local_db):
+        """TRUNCATE no dispara los triggers por fila, pero vacía los contadores de la tabla"""
+        local_db.execute("TRUNCATE public.task CASCADE")
+
+        [[dashboard]] = local_db.execute("SELECT motivbot_get_dashboard()")
+
+        assert dashboard['tasks']['total'] == 0
+        assert dashboard['conversations']['total'] == 0
+        assert dashboard['tags'] == {'total_unique': 0, 'most_used': []}
+        assert check_counters(local_db)['consistent']
+
+    def test_inconsistency_is_reported_and_repaired(self, local_db):
+        """La RPC de comprobación detecta un contador alterado y el recálculo lo corrige"""
+        local_db.execute("UPDATE public.motivbot_dashboard_counter SET value = value + 3 WHERE scope = 'task'")
+
+        result = check_counters(local_db)
+        assert result['consistent'] is False
+        assert [(m['scope'], m['key'], m['actual'] - m['expected']) for m in result['mismatches']] == [('task', 'total', 3)]
+
+        local_db.execute("SELECT motivbot_refresh_dashboard_counters()")
+        assert check_counters(local_db)['consistent']
+
+    def test_check_rpc_through_client(self, motivbot_client, service_client, cleanup_tasks):
+        """motivbot_check_dashboard_counters recorre las tablas: solo la clave service_role puede llamarla"""
+        task_id = motivbot_client.create_task("Dashboard Counters - Cleanup", tags=["sdk-counters"])['id']
+        cleanup_tasks(task_id)
+
+        assert service_client.check_dashboard_counters() == {'consistent': True, 'mismatches': []}
+        with pytest.raises(MotivBotError) as error:
+            motivbot_client.check_dashboard_counters()
+        assert error.value.status_code in [401, 403]
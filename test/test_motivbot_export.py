@@ -0,0 +1,158 @@
+import csv
+import json
+import tracemalloc
+
+import pytest
+
+from motivbot.exporter import export_to_file, main, read_checkpoint
+
+
+class Interrupted(Exception):
+    pass
+
+
+def insert_rows(db, tasks, conversations_per_task=0):
+    """Filas con created_at explícitos, distintos y al revés que los ids: la exportación sigue el id, no la fecha"""
+    db.execute("""
+        INSERT INTO public.task (title, description, tags, due_date, created_at)
+        SELECT 'Exportar ' || g, 'Línea 1' || chr(10) || 'línea "2", con comas', ARRAY['export', 'export-' || mod(g, 3)],
+               CASE WHEN mod(g, 2) = 0 THEN DATE '2025-01-01' + g END,
+               TIMESTAMPTZ '2030-01-01 00:00:00+00' - g * INTERVAL '1 minute'
+        FROM generate_series(1, %(tasks)s) AS g
+    """, {'tasks': tasks})
+    db.execute("""
+        INSERT INTO public.conversation (task_id, role, message, tokens_used, created_at)
+        SELECT t.id, (CASE WHEN mod(k, 2) = 0 THEN 'user' ELSE 'assistant' END)::conversation_role,
+               'Mensaje ' || k || ' de ' || t.title, k,
+               t.created_at - k * INTERVAL '1 second'
+        FROM public.task t
+        CROSS JOIN generate_series(1, %(per_task)s) AS k
+        WHERE t.title LIKE 'Exportar %%'
+    """, {'per_task': conversations_per_task})
+
+
+def table_ids(db, table):
+    return [row[0] for row in db.execute(f"SELECT id FROM public.{table} ORDER BY id")]
+
+
+def ndjson_ids(path):
+    with open(path, encoding='utf-8') as file:
+        return [json.loads(line)['id'] for line in file]
+
+
+def stop_after(chunks):
+    def progress(report):
+        if report['chunks'] == chunks:
+            raise Interrupted
+    return progress
+
+
+class TestExportChunks:
+
+    def test_chunks_walk_ids_in_order(self, local_db, motivbot_client):
+        insert_rows(local_db, 25)
+
+        first = motivbot_client.export_tasks_chunk(limit=10)
+        ids = table_ids(local_db, 'task')
+        last = motivbot_client.export_tasks_chunk(after_id=ids[-5], limit=10)
+
+        assert [task['id'] for task in first['items']] == ids[:10] and first['next_after_id'] == ids[9]
+        assert [task['id'] for task in last['items']] == ids[-4:] and last['next_after_id'] is None
+        assert first['items'][0]['tags'] is not None
+
+    def test_limit_is_capped(self, local_db, motivbot_client):
+        insert_rows(local_db, 5)
+
+        chunk = motivbot_client.export_tasks_chunk(limit=0)
+
+        assert len(chunk['items']) == 1
+
+
+class TestExporter:
+
+    @pytest.mark.parametrize('kind, table', [('tasks', 'task'), ('conversations', 'conversation')])
+    def test_ndjson_has_every_row(self, local_db, motivbot_client, tmp_path, kind, table):
+        insert_rows(local_db, 120, conversations_per_task=2)
+        path = str(tmp_path / f"{kind}.ndjson")
+
+        report = export_to_file(motivbot_client, kind, path, chunk_size=50)
+
+        ids = table_ids(local_db, table)
+        assert ndjson_ids(path) == ids
+        assert report['rows'] == len(ids) and report['last_id'] == ids[-1]
+
+    def test_csv_round_trips_newlines_and_lists(self, local_db, motivbot_client, tmp_path):
+        insert_rows(local_db, 30)
+        path = str(tmp_path / 'tasks.csv')
+
+        export_to_file(motivbot_client, 'tasks', path, fmt='csv', chunk_size=7)
+
+        with open(path, encoding='utf-8', newline='') as file:
+            rows = list(csv.DictReader(file))
+        assert [int(row['id']) for row in rows] == table_ids(local_db, 'task')
+        exported = next(row for row in rows if row['title'] == 'Exportar 2')
+        assert exported['description'] == 'Línea 1\nlínea "2", con comas'
+        assert json.loads(exported['tags']) == ['export', 'export-2']
+        assert next(row for row in rows if row['title'] == 'Exportar 1')['due_date'] == ''
+
+    @pytest.mark.parametrize('fmt', ['ndjson', 'csv'])
+    def test_resume_after_interruption(self, local_db, motivbot_client, tmp_path, fmt):
+        insert_rows(local_db, 100)
+        path = str(tmp_path / f"tasks.{fmt}")
+        with pytest.raises(Interrupted):
+            export_to_file(motivbot_client, 'tasks', path, fmt=fmt, chunk_size=10, progress=stop_after(3))
+        # Un bloque a medias que no llegó a su punto de control
+        with open(path, 'a', encoding='utf-8') as file:
+            file.write('{"id": 999999, "tit')
+        checkpoint = read_checkpoint(path)
+
+        report = export_to_file(motivbot_client, 'tasks', path, fmt=fmt, chunk_size=10)
+
+        ids = table_ids(local_db, 'task')
+        assert checkpoint['last_id'] == ids[29] and report['rows'] == len(ids) - 30
+        if fmt == 'ndjson':
+            assert ndjson_ids(path) == ids
+        else:
+            with open(path, encoding='utf-8', newline='') as file:
+                assert [int(row['id']) for row in csv.DictReader(file)] == ids
+
+    def test_rerun_appends_only_new_rows(self, local_db, motivbot_client, tmp_path):
+        insert_rows(local_db, 10)
+        path = str(tmp_path / 'tasks.ndjson')
+        export_to_file(motivbot_client, 'tasks', path)
+        local_db.execute("INSERT INTO public.task (title, created_at) VALUES ('Nueva', '2020-01-01')")
+
+        report = export_to_file(motivbot_client, 'tasks', path)
+
+        assert report['rows'] == 1 and ndjson_ids(path) == table_ids(local_db, 'task')
+
+    def test_existing_file_without_checkpoint_is_kept(self, motivbot_client, tmp_path):
+        path = tmp_path / 'tasks.ndjson'
+        path.write_text('{"id": 1}\n', encoding='utf-8')
+
+        with pytest.raises(ValueError):
+            export_to_file(motivbot_client, 'tasks', str(path))
+        assert path.read_text(encoding='utf-8') == '{"id": 1}\n'
+
+    def test_cli_picks_format_from_extension(self, local_db, local_supabase, tmp_path, capsys):
+        insert_rows(local_db, 12)
+        path = str(tmp_path / 'tasks.csv')
+
+        code = main(['tasks', path, '--chunk-size', '5', '--quiet'])
+
+        assert code == 0 and read_checkpoint(path)['format'] == 'csv'
+        assert capsys.readouterr().err == ''
+
+    @pytest.mark.bulk
+    def test_memory_does_not_grow_with_table(self, local_db, motivbot_client, tmp_path):
+        """El pico de memoria de exportar 50k tareas es el de un bloque, como con 5k"""
+        peaks = {}
+        for tasks in (5_000, 45_000):
+            insert_rows(local_db, tasks)
+            tracemalloc.start()
+            export_to_file(motivbot_client, 'tasks', str(tmp_path / f"{tasks}.ndjson"), chunk_size=1000)
+            peaks[tasks] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        print(f"\n📤 pico de memoria: 5k tareas {peaks[5_000] / 1e6:.1f} MB, 50k {peaks[45_000] / 1e6:.1f} MB")
+        assert peaks[45_000] < peaks[5_000] * 2
@@ -0,0 +1,104 @@
+import time
+
+import pytest
+
+from motivbot import MotivBotError
+
+ISSUES = 50_000
+REPOS = 50
+
+
+def fake_issues(count, edited=()):
+    """Issues de GitHub falsos repartidos entre REPOS repositorios; los de `edited` cambian de título y se cierran"""
+    for i in range(count):
+        issue = {
+            'repo': f"user/repo-{i % REPOS}",
+            'external_id': str(1_000_000 + i),
+            'title': f"[repo-{i % REPOS}] Issue {i}",
+            'description': f"Cuerpo del issue {i}",
+            'status': 'pending',
+            'priority': 'medium',
+            'tags': ['motivBotLinkIssuesFromGithub'],
+        }
+        if i in edited:
+            issue.update(title=f"[repo-{i % REPOS}] Issue {i} (editado)", status='completed')
+        yield issue
+
+
+def actions(links):
+    counts = {}
+    for link in links:
+        counts[link['action']] = counts.get(link['action'], 0) + 1
+    return counts
+
+
+def linked_task(db, external_id):
+    [row] = db.execute("""
+        SELECT id, title, status FROM public.task
+        WHERE external_source = 'github' AND external_id = %(external_id)s
+    """, {'external_id': external_id})
+    return row
+
+
+class TestExternalTaskUpsert:
+
+    def test_insert_then_edit_keeps_the_link(self, local_db, motivbot_client):
+        [created] = motivbot_client.upsert_external_tasks('github', [
+            {'repo': 'user/app', 'external_id': '7', 'title': '[app] Fallo al entrar', 'tags': ['github']},
+        ])
+
+        [edited] = motivbot_client.upsert_external_tasks('github', [
+            {'repo': 'user/app', 'external_id': '7', 'title': '[app] Fallo al iniciar sesión'},
+        ])
+
+        assert created['action'] == 'inserted' and edited == {**created, 'action': 'updated'}
+        assert linked_task(local_db, '7') == (created['id'], '[app] Fallo al iniciar sesión', 'pending')
+
+    def test_state_follows_issue_but_keeps_local_progress(self, local_db, motivbot_client):
+        issue = {'repo': 'user/app', 'external_id': '8', 'title': 'Issue'}
+        [link] = motivbot_client.upsert_external_tasks('github', [issue])
+        motivbot_client.update_task(link['id'], status='in-progress')
+
+        assert motivbot_client.upsert_external_tasks('github', [issue])[0]['action'] == 'unchanged'
+        assert linked_task(local_db, '8')[2] == 'in-progress'
+
+        motivbot_client.upsert_external_tasks('github', [{**issue, 'status': 'completed'}])
+        assert linked_task(local_db, '8')[2] == 'completed'
+
+        motivbot_client.upsert_external_tasks('github', [{**issue, 'status': 'pending'}])
+        assert linked_task(local_db, '8')[2] == 'pending'
+
+    def test_same_issue_twice_in_a_page(self, local_db, motivbot_client):
+        """De un issue repetido en la página se guarda el último y ambos elementos apuntan a la misma tarea"""
+        links = motivbot_client.upsert_external_tasks('github', [
+            {'repo': 'user/app', 'external_id': '9', 'title': 'Primero'},
+            {'repo': 'user/other', 'external_id': '9', 'title': 'Otro repositorio'},
+            {'repo': 'user/app', 'external_id': '9', 'title': 'Último'},
+        ])
+
+        assert links[0]['id'] == links[2]['id'] != links[1]['id']
+        assert local_db.execute("SELECT title FROM public.task WHERE id = %(id)s", {'id': links[0]['id']}) == [('Último',)]
+
+    def test_missing_key_is_rejected(self, motivbot_client):
+        with pytest.raises(MotivBotError, match='repo and external_id are required'):
+            motivbot_client.upsert_external_tasks('github', [{'repo': 'user/app', 'title': 'Sin id'}])
+
+    @pytest.mark.bulk
+    def test_sync_50k_issues(self, local_db, motivbot_client):
+        """50k issues en páginas de 1000: la primera pasada los crea y la segunda solo toca los editados"""
+        start = time.perf_counter()
+        links = motivbot_client.upsert_external_tasks('github', fake_issues(ISSUES))
+        first_sync = time.perf_counter() - start
+
+        edited = set(range(0, ISSUES, 100))
+        start = time.perf_counter()
+        resync = motivbot_client.upsert_external_tasks('github', fake_issues(ISSUES, edited))
+        second_sync = time.perf_counter() - start
+
+        assert actions(links) == {'inserted': ISSUES}
+        assert actions(resync) == {'updated': len(edited), 'unchanged': ISSUES - len(edited)}
+        assert [link['id'] for link in resync] == [link['id'] for link in links]
+        assert local_db.execute("""
+            SELECT count(*), count(*) FILTER (WHERE status = 'completed') FROM public.task WHERE external_source = 'github'
+        """) == [(ISSUES, len(edited))]
+        assert first_sync < 20 and second_sync < 20, (first_sync, second_sync)
@@ -2,66 +2,6 @@ import pytest
 import requests
 import json
 import os
-from dotenv import load_dotenv
-
-# Cargar variables de entorno
-load_dotenv()
-
-@pytest.fixture
-def supabase_config():
-    """Configuración de Supabase"""
-    return {
-        'url': os.getenv('VITE_SUPABASE_URL'),
-        'anon_key': os.getenv('VITE_SUPABASE_ANON_KEY'),
-    }
-
-@pytest.fixture
-def headers(supabase_config):
-    """Headers para las peticiones HTTP"""
-    return {
-        'apikey': supabase_config['anon_key'],
-        'Authorization': f"Bearer {supabase_config['anon_key']}",
-        'Content-Type': 'application/json',
-    }
-
-@pytest.fixture
-def cleanup_tasks():
-    """Fixture para limpiar tareas creadas durante los tests"""
-    created_tasks = []
-    
-    def add_task(task_id):
-        """Agregar tarea para cleanup"""
-        created_tasks.append(task_id)
-    
-    yield add_task
-    
-    # Cleanup después de todos los tests
-    if created_tasks:
-        print(f"\n🧹 Cleaning up {len(created_tasks)} test tasks...")
-        supabase_url = os.getenv('VITE_SUPABASE_URL')
-        supabase_key = os.getenv('VITE_SUPABASE_ANON_KEY')
-        
-        headers = {
-            'apikey': supabase_key,
-            'Authorization': f"Bearer {supabase_key}",
-            'Content-Type': 'application/json',
-        }
-        
-        delete_url = f"{supabase_url}/rest/v1/rpc/motivbot_delete_task"
-        
-        for task_id in created_tasks:
-            try:
-                response = requests.post(delete_url, headers=headers, json={"p_task_id": task_id})
-                if response.status_code == 200:
-                    result = response.json()
-                    if result.get('success'):
-                        print(f"✅ Deleted task {task_id}")
-                    else:
-                        print(f"⚠️  Failed to delete task {task_id}: {result.get('message')}")
-                else:
-                    print(f"❌ Error deleting task {task_id}: HTTP {response.status_code}")
-            except Exception as e:
-                print(f"❌ Exception deleting task {task_id}: {e}")
 
 class TestMotivbotRPCFunctions:
     
@@ -171,13 +111,13 @@ class TestMotivbotRPCFunctions:
         
         assert isinstance(result, list)
         
-    def test_motivbot_get_tasks_by_tags(self, supabase_config, headers, cleanup_tasks):
+    def test_motivbot_get_tasks_by_tags(self, supabase_config, headers, cleanup_tasks, worker_tag):
         """✅ NUEVO: Test filtrar tareas por tags"""
         # Crear tarea con tags específicos
         create_url = f"{supabase_config['url']}/rest/v1/rpc/motivbot_create_task"
         create_payload = {
             "p_title": "Task for Tag Filter - Cleanup",
-            "p_tags": ["test-filter", "unique-tag"]
+            "p_tags": [worker_tag("test-filter"), "unique-tag"]
         }
         
         create_response = requests.post(create_url, headers=headers, json=create_payload)
@@ -191,7 +131,7 @@ class TestMotivbotRPCFunctions:
         # Filtrar por tags
         filter_url = f"{supabase_config['url']}/rest/v1/rpc/motivbot_get_tasks"
         filter_payload = {
-            "p_tags": ["test-filter"],
+            "p_tags": [worker_tag("test-filter")],
             "p_limit": 50
         }
         
@@ -435,13 +375,13 @@ class TestMotivbotRPCFunctions:
         
         assert isinstance(result, list)
         
-    def test_motivbot_search_tasks_with_tags(self, supabase_config, headers, cleanup_tasks):
+    def test_motivbot_search_tasks_with_tags(self, supabase_config, headers, cleanup_tasks, worker_tag):
         """✅ NUEVO: Test buscar tareas incluyendo búsqueda en tags"""
         # Crear tarea con tag específico
         create_url = f"{supabase_config['url']}/rest/v1/rpc/motivbot_create_task"
         create_payload = {
             "p_title": "Task for Search - Cleanup",
-            "p_tags": ["searchable-tag", "unique-search"]
+            "p_tags": [worker_tag("searchable-tag"), "unique-search"]
         }
         
         create_response = requests.post(create_url, headers=headers, json=create_payload)
@@ -454,7 +394,7 @@ class TestMotivbotRPCFunctions:
         # Buscar por tag
         search_url = f"{supabase_config['url']}/rest/v1/rpc/motivbot_search_tasks"
         search_payload = {
-            "p_search": "searchable-tag",
+            "p_search": worker_tag("searchable-tag"),
             "p_search_tags": True
         }
         
@@ -752,7 +692,7 @@ class TestMotivbotErrorHandling:
 # ✅ NUEVA CLASE: Tests de integración completa
 class TestMotivbotIntegration:
     
-    def test_complete_task_lifecycle_with_tags(self, supabase_config, headers, cleanup_tasks):
+    def test_complete_task_lifecycle_with_tags(self, supabase_config, headers, cleanup_tasks, worker_tag):
         """✅ NUEVO: Test ciclo completo de tarea con tags y mensajes"""
         
         # 1. Crear tarea con tags
@@ -761,7 +701,7 @@ class TestMotivbotIntegration:
             "p_title": "Integration Test Task - Cleanup",
             "p_description": "Complete lifecycle test",
             "p_priority": "high",
-            "p_tags": ["test", "integration", "high-priority"]
+            "p_tags": ["test", worker_tag("integration"), "high-priority"]
         }
         
         create_response = requests.post(create_url, headers=headers, json=create_payload)
@@ -774,7 +714,7 @@ class TestMotivbotIntegration:
         
         # 2. Verificar que se creó con los tags correctos
         get_url = f"{supabase_config['url']}/rest/v1/rpc/motivbot_get_tasks"
-        get_payload = {"p_tags": ["integration"], "p_limit": 50}
+        get_payload = {"p_tags": [worker_tag("integration")], "p_limit": 50}
         
         get_response = requests.post(get_url, headers=headers, json=get_payload)
         assert get_response.status_code == 200
@@ -787,7 +727,7 @@ class TestMotivbotIntegration:
         update_url = f"{supabase_config['url']}/rest/v1/rpc/motivbot_update_task"
         update_payload = {
             "p_task_id": task_id,
-            "p_tags": ["updated", "integration", "completed"]
+            "p_tags": [worker_tag("updated"), worker_tag("integration"), "completed"]
         }
         
         update_response = requests.post(update_url, headers=headers, json=update_payload)
@@ -798,7 +738,7 @@ class TestMotivbotIntegration:
         # 4. Buscar por los nuevos tags
         search_url = f"{supabase_config['url']}/rest/v1/rpc/motivbot_search_tasks"
         search_payload = {
-            "p_search": "updated",
+            "p_search": worker_tag("updated"),
             "p_search_tags": True
         }
         
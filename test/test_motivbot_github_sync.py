@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from motivbot import AsyncMotivBotClient
+from motivbot.github_sync import issue_to_task
+
+from .github_replay import PULL_EVERY, FakeGitHub, replay
+
+REPOS = 3
+ISSUES = 250  # 3 páginas de 100 por repositorio
+
+
+@pytest.fixture
+def fake_github():
+    fake = FakeGitHub(repos=REPOS, issues=ISSUES).start()
+    yield fake
+    fake.stop()
+
+
+def run_replay(supabase_config, fake, **kwargs):
+    async def run():
+        async with AsyncMotivBotClient(supabase_config['url'], supabase_config['anon_key']) as client:
+            return await replay(client, fake, **kwargs)
+    return asyncio.run(run())
+
+
+class TestGitHubSync:
+
+    def test_issue_row(self):
+        repo = {'name': 'app', 'full_name': 'octocat/app'}
+        issue = {
+            'id': 42, 'number': 7, 'title': 'Fallo', 'body': None, 'html_url': 'https://github.com/octocat/app/issues/7',
+            'state': 'closed', 'labels': [{'name': 'Urgent'}], 'user': None,
+            'created_at': '2025-03-01T09:00:00Z', 'closed_at': '2025-03-02T10:30:00Z',
+        }
+
+        row = issue_to_task(repo, issue)
+
+        assert {k: row[k] for k in ('repo', 'external_id', 'title', 'status', 'priority', 'due_date', 'due_time')} == {
+            'repo': 'octocat/app', 'external_id': '42', 'title': '[app] Fallo', 'status': 'completed',
+            'priority': 'high', 'due_date': '2025-03-02', 'due_time': '10:30',
+        }
+        assert '🆔 **GitHub ID:** 42' in row['description'] and '🔒 **GitHub Closed:** 2025-03-02' in row['description']
+
+    def test_requests_per_run(self, local_db, supabase_config, fake_github):
+        """
+        1ª ejecución: todas las páginas. 2ª: una página por repositorio con el issue frontera (since es
+        inclusivo) y se guarda su ETag. 3ª: un 304 por repositorio, solo gasta cuota el listado.
+        """
+        first, second, third = run_replay(supabase_config, fake_github, runs=3)
+
+        issues = REPOS * (ISSUES - ISSUES // PULL_EVERY)
+        assert (first['requests'], first['billable'], first['inserted']) == (1 + REPOS * 3, 1 + REPOS * 3, issues)
+        assert (second['requests'], second['inserted'], second['updated']) == (1 + REPOS, 0, 0)
+        assert (third['requests'], third['not_modified'], third['billable'], third['issues']) == (1 + REPOS, REPOS, 1, 0)
+        assert first['errors'] == second['errors'] == third['errors'] == []
+        assert local_db.execute(
+            "SELECT count(*) FROM public.task WHERE external_source = 'github' AND external_repo LIKE 'octocat/%%'"
+        ) == [(issues,)]
+
+    def test_touched_issues_are_refetched(self, local_db, supabase_config, fake_github):
+        """Tras editar issues de un repositorio solo ese repositorio responde 200 y sus tareas se actualizan"""
+        run_replay(supabase_config, fake_github, runs=3)
+        repo = fake_github.repos[0]['full_name']
+        touched = fake_github.touch(repo, 2)
+
+        [run] = run_replay(supabase_config, fake_github, runs=1)
+
+        assert (run['not_modified'], run['updated']) == (REPOS - 1, 2)
+        assert local_db.execute("""
+            SELECT external_id, title FROM public.task
+            WHERE external_source = 'github' AND external_repo = %(repo)s AND title LIKE '%%(editado)'
+            ORDER BY external_id
+        """, {'repo': repo}) == [(str(touched[0]), '[repo-0] Issue 1 (editado)'), (str(touched[1]), '[repo-0] Issue 2 (editado)')]
+
+    def test_checkpoint_never_goes_back(self, local_db, supabase_config):
+        async def run():
+            async with AsyncMotivBotClient(supabase_config['url'], supabase_config['anon_key']) as client:
+                await client.save_sync_checkpoints('github', [{'repo': 'octocat/app', 'since': '2025-05-01T00:00:00Z', 'etag': 'W/"b"'}])
+                result = await client.save_sync_checkpoints('github', [{'repo': 'octocat/app', 'since': '2025-04-01T00:00:00Z', 'etag': None}])
+                return result, await client.get_sync_checkpoints('github')
+
+        result, checkpoints = asyncio.run(run())
+
+        assert result['success'] and result['count'] == 1
+        [checkpoint] = [c for c in checkpoints if c['repo'] == 'octocat/app']
+        assert (checkpoint['since'], checkpoint['etag']) == ('2025-05-01T00:00:00+00:00', 'W/"b"')
+
+    def test_concurrency_is_bounded(self, local_db, supabase_config):
+        fake = FakeGitHub(repos=8, issues=5, latency=0.05).start()
+        try:
+            [run] = run_replay(supabase_config, fake, runs=1, concurrency=3)
+        finally:
+            fake.stop()
+
+        assert run['errors'] == [] and run['repositories'] == 8
+        assert 1 < run['max_in_flight'] <= 3
@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+from motivbot import MotivBotError
+from motivbot.importer import import_conversations, main, read_ndjson
+
+
+def write_ndjson(path, task_id, rows):
+    with open(path, 'w', encoding='utf-8') as file:
+        for i in range(rows):
+            file.write(json.dumps({
+                'task_id': task_id,
+                'role': 'user' if i % 2 == 0 else 'assistant',
+                'message': f"Importado {i}",
+                'emotional_state': 'calm',
+                'tokens_used': i,
+                'created_at': f"2024-01-01T00:00:{i % 60:02d}+00:00",
+            }) + '\n')
+            if i % 100 == 0:
+                file.write('\n')
+    return path
+
+
+class TestCreateConversationsInBulk:
+
+    def test_exchange_in_one_call(self, motivbot_client, cleanup_tasks):
+        """Un intercambio usuario+asistente se guarda en una sola llamada, en orden y con created_at original"""
+        task_id = motivbot_client.create_task("Bulk Conversation - Cleanup")['id']
+        cleanup_tasks(task_id)
+
+        ids = motivbot_client.create_conversations([
+            {'task_id': task_id, 'role': 'user', 'message': 'Hola', 'created_at': '2024-05-01T10:00:00+00:00'},
+            {'task_id': task_id, 'role': 'assistant', 'message': '¡Hola!', 'emotional_state': 'happy', 'tokens_used': 12},
+        ])
+
+        assert len(set(ids)) == 2
+        conversations = {c['id']: c for c in motivbot_client.get_conversations(task_id=task_id)}
+        assert [conversations[i]['message'] for i in ids] == ['Hola', '¡Hola!']
+        assert conversations[ids[0]]['created_at'].startswith('2024-05-01')
+        assert conversations[ids[1]]['tokens_used'] == 12
+
+    @pytest.mark.parametrize('row, message', [
+        ({'role': 'bot', 'message': 'x'}, 'Role must be'),
+        ({'role': 'user', 'message': '  '}, 'Message is required'),
+        ({'role': 'user', 'message': 'x', 'task_id': -1}, 'Task not found: -1'),
+    ])
+    def test_invalid_row_inserts_nothing(self, motivbot_client, cleanup_tasks, row, message):
+        task_id = motivbot_client.create_task("Bulk Conversation Invalid - Cleanup")['id']
+        cleanup_tasks(task_id)
+        valid = {'task_id': task_id, 'role': 'user', 'message': 'Válida'}
+
+        with pytest.raises(MotivBotError, match=message):
+            motivbot_client.create_conversations([valid, {'task_id': task_id, **row}])
+
+        assert motivbot_client.get_conversations(task_id=task_id) == []
+
+
+class TestConversationImporter:
+
+    def test_read_ndjson_reports_bad_line(self, tmp_path):
+        path = tmp_path / 'chats.ndjson'
+        path.write_text('{"role": "user"}\n\n{roto\n', encoding='utf-8')
+
+        rows = read_ndjson(str(path))
+
+        assert next(rows) == {'role': 'user'}
+        with pytest.raises(ValueError, match=r'chats.ndjson:3'):
+            next(rows)
+
+    def test_import_in_batches(self, motivbot_client, cleanup_tasks, tmp_path):
+        task_id = motivbot_client.create_task("Import Conversations - Cleanup")['id']
+        cleanup_tasks(task_id)
+        path = write_ndjson(tmp_path / 'chats.ndjson', task_id, 250)
+        reports = []
+
+        report = import_conversations(motivbot_client, read_ndjson(str(path)), batch_size=100, progress=reports.append)
+
+        assert (report['rows'], report['batches']) == (250, 3)
+        assert [r['rows'] for r in reports] == [100, 200, 250]
+        assert report['rows_per_second'] > 0
+        assert len(motivbot_client.get_conversations(task_id=task_id, limit=500)) == 250
+
+    def test_failed_batch_keeps_previous(self, motivbot_client, cleanup_tasks):
+        """Cada bloque es una transacción: el que falla no deja filas y los anteriores se conservan"""
+        task_id = motivbot_client.create_task("Import Conversations Failure - Cleanup")['id']
+        cleanup_tasks(task_id)
+        rows = [{'task_id': task_id, 'role': 'user', 'message': f"Fila {i}"} for i in range(5)]
+        rows[3]['role'] = 'system'
+
+        with pytest.raises(MotivBotError):
+            import_conversations(motivbot_client, rows, batch_size=2)
+
+        assert len(motivbot_client.get_conversations(task_id=task_id)) == 2
+
+    def test_cli(self, motivbot_client, supabase_config, cleanup_tasks, tmp_path, capsys):
+        task_id = motivbot_client.create_task("Import CLI - Cleanup")['id']
+        cleanup_tasks(task_id)
+        path = write_ndjson(tmp_path / 'chats.ndjson', task_id, 30)
+
+        code = main([str(path), '--url', supabase_config['url'], '--anon-key', supabase_config['anon_key'],
+                     '--batch-size', '10'])
+
+        out, err = capsys.readouterr()
+        assert code == 0
+        assert out.startswith('30 filas en 3 bloques')
+        assert len(err.splitlines()) == 3
+        assert len(motivbot_client.get_conversations(task_id=task_id)) == 30
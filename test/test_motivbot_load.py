@@ -0,0 +1,45 @@
+import json
+import os
+
+import pytest
+
+from .loadtest import DEFAULT_MIX, format_report, percentile, run_load, write_report
+
+# Ritmo y duración por defecto pensados para la suite; para medir de verdad se suben por entorno
+LOAD_RPS = float(os.getenv('MOTIVBOT_LOAD_RPS', '40'))
+LOAD_SECONDS = float(os.getenv('MOTIVBOT_LOAD_SECONDS', '3'))
+LOAD_REPORT = os.getenv('MOTIVBOT_LOAD_REPORT')
+
+
+class TestLoadReport:
+
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+
+        assert percentile(values, 50) == 50
+        assert percentile(values, 95) == 95
+        assert percentile(values, 99) == 99
+        assert percentile([7], 99) == 7
+        assert percentile([], 50) is None
+
+
+@pytest.mark.load
+class TestMotivbotLoad:
+
+    def test_mixed_load_report(self, load_supabase, tmp_path):
+        """La mezcla de RPC concurrentes no da errores y el informe trae percentiles por RPC"""
+        report = run_load(load_supabase.url, load_supabase.anon_key, rps=LOAD_RPS, duration=LOAD_SECONDS, seed=1)
+        print('\n' + format_report(report))
+
+        path = LOAD_REPORT or tmp_path / 'load.json'
+        write_report(report, path)
+        with open(path, encoding='utf-8') as f:
+            assert json.load(f) == report
+
+        assert set(report['rpcs']) == set(DEFAULT_MIX)
+        assert report['total']['requests'] == int(LOAD_RPS * LOAD_SECONDS)
+        assert report['total']['errors'] == 0, {rpc: s['error_samples'] for rpc, s in report['rpcs'].items()}
+        for stats in report['rpcs'].values():
+            latency = stats['latency_ms']
+            assert stats['requests'] > 0
+            assert latency['p50'] <= latency['p95'] <= latency['p99'] <= latency['max']
@@ -0,0 +1,459 @@
+import json
+import re
+from datetime import date, timedelta
+
+import pytest
+from psycopg import sql
+
+from .datagen import generate
+
+# Tablas grandes: un Seq Scan sobre ellas indica que se ha dejado de usar el índice. chibi_messages no está:
+# a escala 10k tiene ~1k filas y leerla entera puede salir más barato; su crecimiento lo detecta el coste
+LARGE_TABLES = {'task', 'conversation'}
+
+# Palabras tras las que empieza una sentencia dentro de un bloque plpgsql
+BLOCK_OPENERS = {'BEGIN', 'THEN', 'ELSE', 'LOOP', 'QUERY'}
+SQL_VERBS = {'SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE'}
+
+IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+# Filtro opcional sobre un parámetro o variable: `(p_x IS NULL OR col = p_x)`
+CATCH_ALL = re.compile(r'(?<![\w.])([a-z_]\w*)\s+IS\s+NULL\s+OR\b', re.I)
+
+# Nombre de la sentencia preparada con la que se explica el plan genérico
+GENERIC_STATEMENT = 'motivbot_generic_plan'
+
+
+class Seeded(str):
+    """Argumento que se toma del resumen de datagen.generate (task_id, conversation_id...)"""
+
+
+# Con pocas filas por tarea el planificador puede preferir el índice simple: cualquiera de los dos vale
+CONVERSATION_BY_TASK = ('idx_conversation_task_created_at_id', 'idx_conversation_task_id')
+
+# caso -> función, fragmento que identifica la sentencia, argumentos (y variables locales sin valor por defecto),
+# índices que tiene que usar el plan (una tupla acepta cualquiera de ellos) y coste estimado máximo.
+# Los costes son ~3x los de la escala 10k: un Seq Scan sobre task o conversation los supera con creces.
+PLAN_CASES = {
+    'motivbot_get_tasks': {
+        'rpc': 'motivbot_get_tasks', 'marker': 'FROM public.task',
+        'args': {'p_limit': 50},
+        'indexes': {'idx_task_created_at_id'}, 'max_cost': 30,
+    },
+    'motivbot_get_tasks[tags]': {
+        'rpc': 'motivbot_get_tasks', 'marker': 'FROM public.task',
+        'args': {'p_tags': ['otros'], 'p_limit': 50},
+        'indexes': {'idx_task_tags'}, 'max_cost': 1300,
+    },
+    'motivbot_get_tasks[status]': {
+        'rpc': 'motivbot_get_tasks', 'marker': 'FROM public.task',
+        'args': {'p_status': 'on-hold', 'p_limit': 50},
+        'indexes': {'idx_task_status_created_at_id'}, 'max_cost': 500,
+    },
+    'motivbot_get_tasks[cursor]': {
+        'rpc': 'motivbot_get_tasks', 'marker': 'FROM public.task',
+        'args': {'p_limit': 50, 'p_after_created_at': '2000-01-01T00:00:00+00:00', 'p_after_id': 0},
+        'indexes': {'idx_task_created_at_id'}, 'max_cost': 30,
+    },
+    # search_tags es lo que la función saca de motivbot_tag_count para p_search_tags. Cada grupo de candidatos
+    # puede ir por su índice GIN o, si el término es frecuente, por idx_task_created_at_id hasta llenarse
+    'motivbot_search_tasks': {
+        'rpc': 'motivbot_search_tasks', 'marker': 'c.search_vector @@ title_query',
+        'args': {'p_search': 'contrato', 'search_tags': ['contrato']},
+        'indexes': {('idx_task_search_vector', 'idx_task_created_at_id'), ('idx_task_tags', 'idx_task_created_at_id')},
+        'max_cost': 2200,
+    },
+    'motivbot_get_conversations[task]': {
+        'rpc': 'motivbot_get_conversations', 'marker': 'FROM public.conversation',
+        'args': {'p_task_id': Seeded('task_id')},
+        'indexes': {CONVERSATION_BY_TASK}, 'max_cost': 30,
+    },
+    'motivbot_get_conversations': {
+        'rpc': 'motivbot_get_conversations', 'marker': 'FROM public.conversation',
+        'args': {'p_limit': 100},
+        'indexes': {'idx_conversation_created_at_id'}, 'max_cost': 240,
+    },
+    'motivbot_get_conversation_window': {
+        'rpc': 'motivbot_get_conversation_window', 'marker': 'WITH recent AS',
+        'args': {'p_task_id': Seeded('task_id'), 's': None},
+        'indexes': {CONVERSATION_BY_TASK}, 'max_cost': 60,
+    },
+    'motivbot_delete_task': {
+        'rpc': 'motivbot_delete_task', 'marker': 'DELETE FROM public.conversation',
+        'args': {'p_task_id': Seeded('task_id')},
+        'indexes': {'idx_conversation_task_id'}, 'max_cost': 30,
+    },
+    'motivbot_update_task': {
+        'rpc': 'motivbot_update_task', 'marker': 'UPDATE public.task',
+        'args': {'p_task_id': Seeded('task_id'), 'p_status': 'completed'},
+        'indexes': {'task_pkey'}, 'max_cost': 30,
+    },
+    'motivbot_update_conversation_feedback': {
+        'rpc': 'motivbot_update_conversation_feedback', 'marker': 'UPDATE public.conversation',
+        'args': {'p_conversation_id': Seeded('conversation_id'), 'p_user_is_useful': True},
+        'indexes': {'conversation_pkey'}, 'max_cost': 30,
+    },
+    'motivbot_get_dashboard': {
+        'rpc': 'motivbot_get_dashboard', 'marker': "WHERE scope = 'tag'",
+        'args': {},
+        # Unas decenas de contadores: leer la tabla entera es tan válido como el índice, lo acota el coste
+        'indexes': set(), 'max_cost': 45,
+    },
+    # motivbot_get_analytics lee los días cerrados a través de motivbot_rollup_range
+    'motivbot_get_analytics': {
+        'rpc': 'motivbot_rollup_range', 'marker': 'FROM public.motivbot_daily_rollup',
+        'args': {'p_from': date.today() - timedelta(days=30), 'p_to': date.today()},
+        'indexes': {'motivbot_daily_rollup_pkey'}, 'max_cost': 850,
+    },
+    'motivbot_get_calendar': {
+        'rpc': 'motivbot_get_calendar', 'marker': 'WITH counts AS',
+        'args': {'p_start': date.today(), 'p_end': date.today() + timedelta(days=30), 'p_limit_per_day': 50},
+        'indexes': {'idx_task_due_date_time'}, 'max_cost': 8000,
+    },
+    # Tras un día sin arrastre solo queda vencido lo de ayer
+    'motivbot_rollover_overdue_tasks': {
+        'rpc': 'motivbot_rollover_overdue_tasks', 'marker': 'AND due_date < p_today',
+        'args': {'p_today': date.today() - timedelta(days=44)},
+        'indexes': {'idx_task_open_due_date'}, 'max_cost': 600,
+    },
+    'motivbot_export_tasks': {
+        'rpc': 'motivbot_export_tasks', 'marker': 'FROM public.task t',
+        'args': {'p_after_id': Seeded('task_id'), 'p_limit': 1000},
+        'indexes': {'task_pkey'}, 'max_cost': 600,
+    },
+    'motivbot_export_conversations': {
+        'rpc': 'motivbot_export_conversations', 'marker': 'FROM public.conversation c',
+        'args': {'p_after_id': Seeded('conversation_id'), 'p_limit': 1000},
+        'indexes': {'conversation_pkey'}, 'max_cost': 600,
+    },
+    'motivbot_get_popular_tags': {
+        'rpc': 'motivbot_get_popular_tags', 'marker': 'FROM public.motivbot_tag_count',
+        'args': {'p_limit': 20},
+        # Con 40 tags la tabla cabe en una página: como en el dashboard, lo acota el coste
+        'indexes': set(), 'max_cost': 10,
+    },
+    'motivbot_get_related_tags': {
+        'rpc': 'motivbot_get_related_tags', 'marker': 'WHERE tag = p_tags[1]',
+        'args': {'p_tags': ['salud'], 'p_limit': 10},
+        'indexes': {'idx_motivbot_tag_pair_top'}, 'max_cost': 100,
+    },
+    'motivbot_get_motivational_messages': {
+        'rpc': 'motivbot_get_motivational_messages', 'marker': 'FROM public.motivbot_message_match',
+        'args': {'match_tags': ['casa', 'salud'], 'p_limit': 5},
+        'indexes': {'idx_motivbot_message_match_top'}, 'max_cost': 400,
+    },
+    'motivbot_get_motivational_messages[read]': {
+        'rpc': 'motivbot_get_motivational_messages', 'marker': 'JOIN chibi_messages cm',
+        'args': {'match_ids': [1, 2, 3, 4, 5]},
+        'indexes': set(), 'max_cost': 130,
+    },
+}
+
+
+def split_top_level(text, separator=';'):
+    """Partir por `separator` fuera de comillas, comentarios y paréntesis"""
+    parts, current, depth, i = [], [], 0, 0
+    while i < len(text):
+        char = text[i]
+        if text.startswith('--', i):
+            end = text.find('\n', i)
+            i = len(text) if end < 0 else end
+            continue
+        if char == "'":
+            end = i + 1
+            while True:
+                end = text.index("'", end)
+                if not text.startswith("''", end):
+                    break
+                end += 2
+            current.append(text[i:end + 1])
+            i = end + 1
+            continue
+        depth += {'(': 1, ')': -1}.get(char, 0)
+        if char == separator and depth == 0:
+            parts.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(char)
+        i += 1
+    parts.append(''.join(current).strip())
+    return [part for part in parts if part]
+
+
+def top_level_words(text):
+    """(posición, palabra en mayúsculas) de las palabras fuera de paréntesis y comillas"""
+    words, depth, i = [], 0, 0
+    while i < len(text):
+        char = text[i]
+        if char == "'":
+            i = text.index("'", i + 1) + 1
+            continue
+        if char in '()':
+            depth += 1 if char == '(' else -1
+        elif depth == 0 and IDENTIFIER.match(text, i) and (i == 0 or not (text[i - 1].isalnum() or text[i - 1] == '_')):
+            word = IDENTIFIER.match(text, i).group()
+            words.append((i, word.upper()))
+            i += len(word)
+            continue
+        i += 1
+    return words
+
+
+def sql_statement(chunk):
+    """
+    La sentencia SQL de un trozo del cuerpo plpgsql: sin el IF/ELSE/BEGIN que la precede, sin INTO
+    y con las asignaciones `x := expr` convertidas en SELECT expr
+    """
+    words = top_level_words(chunk)
+    start = None
+    for index, (position, word) in enumerate(words):
+        if word in SQL_VERBS and (index == 0 or words[index - 1][1] in BLOCK_OPENERS):
+            start = position
+            break
+    if start is None:
+        assignment = re.search(r'(?:^|\b(?:BEGIN|THEN|ELSE|LOOP)\s+)[a-z_]\w*\s*:=\s*(.*)$', chunk, re.S | re.I)
+        if assignment is None:
+            return None
+        return 'SELECT ' + assignment.group(1)
+    statement = chunk[start:]
+    # SELECT ... INTO var[, var] FROM / RETURNING ... INTO var (INSERT INTO no se toca)
+    return re.sub(r'(?<!INSERT)\s+INTO\s+(?:STRICT\s+)?[a-z_]\w*(?:\s*,\s*[a-z_]\w*)*', '', statement, flags=re.I)
+
+
+def function_source(db, rpc):
+    """Cuerpo, parámetros y variables locales (nombre -> (tipo, valor por defecto)) de una función plpgsql"""
+    [[body, arguments]] = db.execute("""
+        SELECT p.prosrc, pg_get_function_arguments(p.oid)
+        FROM pg_proc p JOIN pg_namespace n ON n.oid = p.pronamespace
+        WHERE n.nspname = 'public' AND p.proname = %(rpc)s
+    """, {'rpc': rpc})
+
+    variables = {}
+    for argument in split_top_level(arguments, ','):
+        name, rest = argument.split(' ', 1)
+        declared, _, default = rest.partition(' DEFAULT ')
+        variables[name] = (declared, default or None)
+
+    chunks = split_top_level(body)
+    for chunk in chunks:
+        words = top_level_words(chunk)
+        if any(word == 'BEGIN' for _, word in words):
+            break
+        declaration = re.match(r'(?:DECLARE\s+)?([a-z_]\w*)\s+(?:CONSTANT\s+)?(.+?)(?:\s*(?::=|DEFAULT)\s*(.+))?$',
+                               chunk, re.S | re.I)
+        variables[declaration.group(1)] = (declaration.group(2).strip(), declaration.group(3))
+    return chunks, variables
+
+
+def substitute(statement, values):
+    """Cambiar cada parámetro o variable por su valor, fuera de comillas y de referencias tabla.columna"""
+    out, i = [], 0
+    while i < len(statement):
+        char = statement[i]
+        if char == "'":
+            end = statement.index("'", i + 1)
+            out.append(statement[i:end + 1])
+            i = end + 1
+            continue
+        match = IDENTIFIER.match(statement, i)
+        if match and (i == 0 or not (statement[i - 1].isalnum() or statement[i - 1] in '_.')):
+            name = match.group()
+            out.append(values.get(name, name))
+            i = match.end()
+            continue
+        out.append(char)
+        i += 1
+    return ''.join(out)
+
+
+def rpc_statement(db, rpc, marker, args):
+    """La sentencia de `rpc` que contiene `marker`, sus variables y el literal SQL de cada una"""
+    chunks, variables = function_source(db, rpc)
+    statements = [s for s in (sql_statement(chunk) for chunk in chunks if marker in chunk) if s and marker in s]
+    assert len(statements) == 1, f"{rpc}: {len(statements)} sentencias contienen {marker!r}"
+
+    values = {}
+    for name, (declared, default) in variables.items():
+        if name in args:
+            literal = sql.Literal(args[name]).as_string(None)
+        elif default is not None:
+            literal = default
+        else:
+            literal = 'NULL'
+        values[name] = f"(({literal})::{declared})"
+    # Los valores por defecto pueden depender de los parámetros (search_query := motivbot_search_query(p_search))
+    values = {name: substitute(value, values) for name, value in values.items()}
+    return statements[0], variables, values
+
+
+def rpc_query(db, rpc, marker, args):
+    """
+    La sentencia de `rpc` que contiene `marker`, con los argumentos como constantes: es lo que planifica
+    plpgsql en un custom plan, que es el que usa mientras no le salga más barato uno genérico
+    """
+    statement, _, values = rpc_statement(db, rpc, marker, args)
+    return substitute(statement, values)
+
+
+def generic_query(db, rpc, marker, args):
+    """
+    (PREPARE, EXECUTE) de la misma sentencia con los parámetros y variables como $n, que es como plpgsql se
+    la pasa a Postgres. Con plan_cache_mode = force_generic_plan el plan no ve los valores: es el genérico
+    que plpgsql puede cachear tras 5 ejecuciones, el que importa con filtros opcionales (`p_x IS NULL OR ...`)
+    """
+    statement, variables, values = rpc_statement(db, rpc, marker, args)
+    used = []
+
+    class Placeholders(dict):
+        def get(self, name, default=None):
+            if name not in variables:
+                return default
+            if name not in used:
+                used.append(name)
+            return f"(${used.index(name) + 1}::{variables[name][0]})"
+
+    prepared = substitute(statement, Placeholders())
+    if not used:
+        return f"PREPARE {GENERIC_STATEMENT} AS {prepared}", f"EXECUTE {GENERIC_STATEMENT}"
+    types = ', '.join(variables[name][0] for name in used)
+    arguments = ', '.join(values[name] for name in used)
+    return f"PREPARE {GENERIC_STATEMENT}({types}) AS {prepared}", f"EXECUTE {GENERIC_STATEMENT}({arguments})"
+
+
+def caches_generic_plans(db, rpc):
+    """Si plpgsql puede cambiar a un plan genérico: no lo hace con SET plan_cache_mode = force_custom_plan"""
+    [[language, settings]] = db.execute("""
+        SELECT l.lanname, COALESCE(p.proconfig, ARRAY[]::TEXT[])
+        FROM pg_proc p
+        JOIN pg_namespace n ON n.oid = p.pronamespace
+        JOIN pg_language l ON l.oid = p.prolang
+        WHERE n.nspname = 'public' AND p.proname = %(rpc)s
+    """, {'rpc': rpc})
+    return language == 'plpgsql' and 'plan_cache_mode=force_custom_plan' not in settings
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from plan_nodes(child)
+
+
+def explain(db, query):
+    [[result]] = db.execute(f"EXPLAIN (FORMAT JSON) {query}")
+    return plan_summary(result)
+
+
+def explain_generic(db, rpc, marker, args):
+    """EXPLAIN del plan genérico de la sentencia (ver generic_query)"""
+    prepare, execute = generic_query(db, rpc, marker, args)
+    db.execute(prepare)
+    try:
+        # Por separado: con varias sentencias execute() devolvería el resultado del SET
+        db.execute("SET LOCAL plan_cache_mode = force_generic_plan")
+        return explain(db, execute)
+    finally:
+        db.execute("RESET plan_cache_mode")
+        db.execute(f"DEALLOCATE {GENERIC_STATEMENT}")
+
+
+def plan_summary(result):
+    plan = (json.loads(result) if isinstance(result, str) else result)[0]['Plan']
+    nodes = list(plan_nodes(plan))
+    return {
+        'cost': plan['Total Cost'],
+        'indexes': {node['Index Name'] for node in nodes if 'Index Name' in node},
+        'seq_scans': {node['Relation Name'] for node in nodes if node['Node Type'] == 'Seq Scan'},
+    }
+
+
+def plan_regressions(db, summary, spec):
+    """
+    Diferencias entre el plan actual de un caso de PLAN_CASES y lo esperado (vacío si no hay). Si la sentencia
+    tiene filtros opcionales y la función puede cachear un plan genérico, ese plan tiene que cumplir lo mismo
+    """
+    args = {name: summary[value] if isinstance(value, Seeded) else value for name, value in spec['args'].items()}
+    plans = {'': explain(db, rpc_query(db, spec['rpc'], spec['marker'], args))}
+    statement, variables, _ = rpc_statement(db, spec['rpc'], spec['marker'], args)
+    catch_all = any(name in variables for name in CATCH_ALL.findall(statement))
+    if catch_all and caches_generic_plans(db, spec['rpc']):
+        plans['plan genérico: '] = explain_generic(db, spec['rpc'], spec['marker'], args)
+
+    regressions = []
+    for prefix, plan in plans.items():
+        for expected in spec['indexes']:
+            accepted = {expected} if isinstance(expected, str) else set(expected)
+            if not plan['indexes'] & accepted:
+                regressions.append(f"{prefix}sin {' ni '.join(sorted(accepted))}: usa {sorted(plan['indexes'])}")
+        if plan['seq_scans'] & LARGE_TABLES:
+            regressions.append(f"{prefix}Seq Scan sobre {sorted(plan['seq_scans'] & LARGE_TABLES)}")
+        if plan['cost'] > spec['max_cost']:
+            regressions.append(f"{prefix}coste {plan['cost']} > {spec['max_cost']}")
+    return regressions
+
+
+@pytest.fixture
+def seeded_db(local_db):
+    summary = generate(local_db, '10k')
+    local_db.execute("SELECT motivbot_refresh_message_matches(), motivbot_refresh_daily_rollups()")
+    local_db.execute("ANALYZE public.motivbot_message_match, public.motivbot_daily_rollup")
+    return local_db, summary
+
+
+class TestStatementExtraction:
+
+    def test_sql_statement(self):
+        assert sql_statement("BEGIN\n    IF p_x THEN\n        SELECT a INTO b FROM t WHERE (SELECT 1) = 1") == \
+            "SELECT a FROM t WHERE (SELECT 1) = 1"
+        assert sql_statement("ids := ARRAY(SELECT id FROM t)") == 'SELECT ARRAY(SELECT id FROM t)'
+        assert sql_statement("INSERT INTO t (a) VALUES (1) RETURNING id INTO new_id") == \
+            'INSERT INTO t (a) VALUES (1) RETURNING id'
+        assert sql_statement("IF NOT EXISTS (SELECT 1 FROM t) THEN RETURN x") is None
+
+    def test_substitute_skips_columns_and_strings(self):
+        values = {'p_id': '((7)::BIGINT)', 'id': 'X'}
+
+        assert substitute("SELECT t.id FROM t WHERE id = p_id AND note = 'p_id'", values) == \
+            "SELECT t.id FROM t WHERE X = ((7)::BIGINT) AND note = 'p_id'"
+
+    def test_generic_plan_of_real_rpc(self, local_db):
+        args = {'p_tags': ['casa'], 'p_limit': 5}
+        prepare, execute = generic_query(local_db, 'motivbot_get_tasks', 'FROM public.task', args)
+
+        assert prepare.startswith(f'PREPARE {GENERIC_STATEMENT}(') and "'{casa}'" not in prepare
+        assert "(('{casa}')::text[])" in execute
+        assert explain_generic(local_db, 'motivbot_get_tasks', 'FROM public.task', args)['cost'] > 0
+        assert local_db.execute("SELECT count(*) FROM pg_prepared_statements WHERE name = %(name)s",
+                                {'name': GENERIC_STATEMENT}) == [(0,)]
+
+    def test_generic_plans_are_checked_unless_forced_custom(self, local_db):
+        """motivbot_get_tasks fuerza planes custom; motivbot_get_motivational_messages (p_estado) no"""
+        assert not caches_generic_plans(local_db, 'motivbot_get_tasks')
+        assert not caches_generic_plans(local_db, 'motivbot_get_conversations')
+        assert caches_generic_plans(local_db, 'motivbot_get_motivational_messages')
+        assert not caches_generic_plans(local_db, 'motivbot_task_json')
+
+    def test_query_of_real_rpc(self, local_db):
+        query = rpc_query(local_db, 'motivbot_get_tasks', 'FROM public.task', {'p_tags': ['casa'], 'p_limit': 5})
+
+        assert "(('{casa}')::text[])" in query and 'INTO result' not in query
+        assert local_db.execute(f"SELECT 1 FROM ({query}) AS q") == [(1,)]
+
+
+# Los costes estimados dependen del tamaño de tablas e índices: las tuplas muertas de otros tests los inflan
+@pytest.mark.bulk
+class TestQueryPlans:
+
+    def test_plans_use_indexes(self, seeded_db):
+        """Cada sentencia usa sus índices, no recorre tablas grandes y su coste no se dispara"""
+        db, summary = seeded_db
+
+        regressions = {case: plan_regressions(db, summary, spec) for case, spec in PLAN_CASES.items()}
+
+        assert {case: found for case, found in regressions.items() if found} == {}
+
+    def test_dropped_index_is_a_regression(self, seeded_db):
+        db, summary = seeded_db
+        db.execute("DROP INDEX public.idx_task_tags")
+
+        regressions = plan_regressions(db, summary, PLAN_CASES['motivbot_get_tasks[tags]'])
+
+        assert regressions and regressions[0].startswith('sin idx_task_tags')
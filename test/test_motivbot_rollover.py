@@ -0,0 +1,136 @@
+from datetime import timedelta
+
+import pytest
+
+# Tareas abiertas para medir las filas escritas por ejecución; OVERDUE_EVERY marca una de cada tantas como vencida
+ACTIVE_TASKS = 100_000
+OVERDUE_EVERY = 100
+
+
+def today(db):
+    [[value]] = db.execute("SELECT CURRENT_DATE")
+    return value
+
+
+def rollover(db, day=None):
+    [[result]] = db.execute("SELECT motivbot_rollover_overdue_tasks(COALESCE(%(day)s, CURRENT_DATE))", {'day': day})
+    return result
+
+
+def insert_task(db, title, status, due_date, due_time=None):
+    [[task_id]] = db.execute("""
+        INSERT INTO public.task (title, status, due_date, due_time)
+        VALUES (%(title)s, %(status)s::task_status, %(due_date)s, %(due_time)s)
+        RETURNING id
+    """, {'title': title, 'status': status, 'due_date': due_date, 'due_time': due_time})
+    return task_id
+
+
+def task_updates(db):
+    """Filas de task actualizadas en la transacción del test (pg_stat_xact_user_tables)"""
+    [[updates]] = db.execute("SELECT n_tup_upd FROM pg_stat_xact_user_tables WHERE relid = 'public.task'::regclass")
+    return updates
+
+
+class TestMotivbotRollover:
+
+    def test_only_open_overdue_tasks_move(self, local_db):
+        day = today(local_db)
+        overdue = insert_task(local_db, 'Vencida', 'pending', day - timedelta(days=3), '09:30')
+        on_hold = insert_task(local_db, 'En espera', 'on-hold', day - timedelta(days=1))
+        untouched = [
+            insert_task(local_db, 'Completada', 'completed', day - timedelta(days=3)),
+            insert_task(local_db, 'Cancelada', 'cancelled', day - timedelta(days=3)),
+            insert_task(local_db, 'Hoy', 'in-progress', day),
+            insert_task(local_db, 'Futura', 'pending', day + timedelta(days=2)),
+            insert_task(local_db, 'Sin fecha', 'pending', None),
+        ]
+        # updated_at no sirve dentro de la transacción del test (NOW() no avanza): un UPDATE cambia el ctid
+        before = dict(local_db.execute("SELECT id, ctid::TEXT FROM public.task WHERE id = ANY(%(ids)s)",
+                                       {'ids': untouched}))
+
+        result = rollover(local_db)
+
+        assert result['success'] and not result['already_run']
+        assert {overdue, on_hold} <= set(result['task_ids']) and not set(untouched) & set(result['task_ids'])
+        assert result['count'] == len(result['task_ids'])
+        # La hora se conserva: solo cambia el día
+        assert local_db.execute("SELECT due_date, due_time::TEXT FROM public.task WHERE id = %(id)s",
+                                {'id': overdue}) == [(day, '09:30:00')]
+        assert dict(local_db.execute("SELECT id, ctid::TEXT FROM public.task WHERE id = ANY(%(ids)s)",
+                                     {'ids': untouched})) == before
+
+    def test_second_call_of_the_day_writes_nothing(self, local_db):
+        day = today(local_db)
+        insert_task(local_db, 'Vencida', 'pending', day - timedelta(days=1))
+        rollover(local_db)
+        # Una tarea que vence después de la primera ejecución espera a la del día siguiente
+        insert_task(local_db, 'Vencida tarde', 'pending', day - timedelta(days=1))
+        updates = task_updates(local_db)
+
+        result = rollover(local_db)
+
+        assert result['already_run'] and result['task_ids'] == [] and result['count'] == 0
+        assert task_updates(local_db) == updates
+
+    def test_each_day_runs_once(self, local_db):
+        day = today(local_db)
+        task_id = insert_task(local_db, 'Vencida', 'pending', day - timedelta(days=5))
+
+        first = rollover(local_db, day - timedelta(days=2))
+        second = rollover(local_db, day - timedelta(days=1))
+
+        assert task_id in first['task_ids'] and task_id in second['task_ids']
+        assert local_db.execute("SELECT rolled FROM public.motivbot_rollover_run WHERE run_date >= %(since)s "
+                                "ORDER BY run_date", {'since': day - timedelta(days=2)}) == \
+            [(first['count'],), (second['count'],)]
+
+    def test_future_date_is_rejected(self, local_db):
+        result = rollover(local_db, today(local_db) + timedelta(days=1))
+
+        assert result['success'] is False and result['message']
+
+    def test_client_rollover(self, local_db, motivbot_client):
+        day = today(local_db)
+        task_id = insert_task(local_db, 'Desde el cliente', 'in-progress', day - timedelta(days=1))
+
+        result = motivbot_client.rollover_overdue_tasks()
+
+        assert task_id in result['task_ids'] and result['date'] == day.isoformat()
+
+    @pytest.mark.bulk
+    def test_rows_written_per_run(self, local_db):
+        """Con ACTIVE_TASKS tareas abiertas solo se escriben las vencidas, no todas como hacía el navegador"""
+        day = today(local_db)
+        local_db.execute("""
+            INSERT INTO public.task (title, status, due_date)
+            SELECT 'Abierta ' || g, (ARRAY['pending', 'in-progress', 'on-hold']::task_status[])[1 + mod(g, 3)],
+                   CASE WHEN mod(g, %(every)s) = 0 THEN %(day)s::DATE - 1 ELSE %(day)s::DATE + mod(g, 30) END
+            FROM generate_series(1, %(tasks)s) AS g
+        """, {'tasks': ACTIVE_TASKS, 'every': OVERDUE_EVERY, 'day': day})
+        local_db.execute("ANALYZE public.task")
+        # Las de ejemplo de Task.sql también vencen si el esquema se cargó otro día
+        [[overdue]] = local_db.execute("""
+            SELECT count(*) FROM public.task
+            WHERE status IN ('pending', 'in-progress', 'on-hold') AND due_date < CURRENT_DATE
+        """)
+
+        writes = []
+        for _ in range(2):
+            updates = task_updates(local_db)
+            result = rollover(local_db)
+            writes.append(task_updates(local_db) - updates)
+            assert result['count'] == writes[-1]
+
+        # Lo que hacía useTodayTasks.js: reescribir la fecha de todas las tareas abiertas
+        updates = task_updates(local_db)
+        local_db.execute("""
+            UPDATE public.task SET due_date = CURRENT_DATE, due_time = LOCALTIME
+            WHERE status IN ('pending', 'in-progress', 'on-hold')
+        """)
+        legacy = task_updates(local_db) - updates
+
+        print(f"\n📆 arrastre con {ACTIVE_TASKS} tareas abiertas: navegador {legacy} filas -> "
+              f"primera ejecución {writes[0]}, segunda {writes[1]}")
+        assert writes == [overdue, 0] and overdue >= ACTIVE_TASKS // OVERDUE_EVERY
+        assert legacy >= ACTIVE_TASKS
@@ -0,0 +1,137 @@
+import pytest
+
+from motivbot import MotivBotClient, MotivBotError, RpcTimings
+
+
+def rpc_stats(db):
+    [[result]] = db.execute("SELECT motivbot_get_rpc_stats()")
+    return {stat['rpc']: stat for stat in result}
+
+
+def table_writes(db):
+    [[writes]] = db.execute("""
+        SELECT COALESCE(SUM(n_tup_ins + n_tup_upd + n_tup_del), 0)
+        FROM pg_stat_xact_user_tables
+        WHERE schemaname = 'public'
+    """)
+    return writes
+
+
+@pytest.fixture
+def stats_db(local_db):
+    """pg_stat_statements a cero para las RPC motivbot_*; sin la extensión cargada el test se salta"""
+    [[result]] = local_db.execute("SELECT motivbot_reset_rpc_stats()")
+    if not result['success']:
+        pytest.skip(f"pg_stat_statements no disponible: {result['message']}")
+    return local_db
+
+
+class TestRpcStats:
+
+    def test_calls_per_rpc(self, stats_db):
+        """motivbot_get_tasks dentro de motivbot_get_tasks_page no cuenta: solo las llamadas de primer nivel"""
+        for _ in range(3):
+            stats_db.execute("SELECT motivbot_get_dashboard()")
+        stats_db.execute("SELECT motivbot_get_tasks_page(p_limit := 5)")
+
+        stats = rpc_stats(stats_db)
+
+        assert stats['motivbot_get_dashboard']['calls'] == 3
+        assert stats['motivbot_get_tasks_page']['calls'] == 1
+        assert 'motivbot_get_tasks' not in stats
+        dashboard = stats['motivbot_get_dashboard']
+        assert dashboard['min_ms'] <= dashboard['mean_ms'] <= dashboard['max_ms']
+        assert dashboard['total_ms'] == pytest.approx(3 * dashboard['mean_ms'], abs=0.01)
+
+    def test_reads_do_not_write(self, stats_db):
+        """Medir una RPC de lectura no escribe filas y funciona en una transacción de solo lectura"""
+        writes = table_writes(stats_db)
+        stats_db.execute("SELECT motivbot_get_dashboard(), motivbot_get_popular_tags(), motivbot_get_data_version()")
+        # Solo lectura dura lo que el savepoint de execute(): debe ir en la misma llamada
+        stats_db.execute("SET LOCAL transaction_read_only = on; SELECT motivbot_get_tasks_page(p_limit := 5)")
+
+        assert table_writes(stats_db) == writes
+        assert rpc_stats(stats_db)['motivbot_get_tasks_page']['calls'] == 1
+
+    def test_caught_errors_per_rpc(self, stats_db):
+        """Los {success: false} de un EXCEPTION WHEN OTHERS son llamadas correctas para pg_stat_statements"""
+        stats_db.execute("SELECT motivbot_create_task(p_title := 'Bien')")
+        for _ in range(2):
+            [[result]] = stats_db.execute("SELECT motivbot_create_task(p_title := 'Mal', p_priority := 'urgent')")
+            assert result['success'] is False
+
+        stats = rpc_stats(stats_db)
+
+        assert stats['motivbot_create_task']['calls'] == 3
+        assert stats['motivbot_create_task']['errors'] == 2
+        [[message]] = stats_db.execute(
+            "SELECT last_message FROM public.motivbot_rpc_error WHERE rpc = 'motivbot_create_task'"
+        )
+        assert 'check constraint' in message
+
+    def test_caught_errors_in_read_only_transaction(self, stats_db):
+        """En solo lectura el error no se puede anotar, pero la RPC sigue respondiendo {success: false}"""
+        # En la misma sentencia: con varias, execute() devuelve la fila de la primera (el SET)
+        [[_, result]] = stats_db.execute(
+            "SELECT set_config('transaction_read_only', 'on', true), motivbot_create_task(p_title := 'Solo lectura')"
+        )
+
+        assert result['success'] is False
+        assert stats_db.execute("SELECT count(*) FROM public.motivbot_rpc_error") == [(0,)]
+
+    def test_reset(self, stats_db):
+        stats_db.execute("SELECT motivbot_get_dashboard()")
+        stats_db.execute("SELECT motivbot_create_task(p_title := 'Mal', p_priority := 'urgent')")
+
+        [[result]] = stats_db.execute("SELECT motivbot_reset_rpc_stats()")
+
+        assert result['success'] and result['reset'] >= 1
+        assert 'motivbot_get_dashboard' not in rpc_stats(stats_db)
+        assert stats_db.execute("SELECT count(*) FROM public.motivbot_rpc_error") == [(0,)]
+
+
+class TestClientTimings:
+
+    def test_summary(self):
+        timings = RpcTimings(samples=100)
+        for ms in range(1, 101):
+            timings('motivbot_get_tasks', float(ms), error=ms > 98)
+        timings('motivbot_get_dashboard', 5000.0, error=False)
+
+        summary = timings.summary()
+
+        assert [stat['rpc'] for stat in summary] == ['motivbot_get_tasks', 'motivbot_get_dashboard']
+        assert summary[0] == {
+            'rpc': 'motivbot_get_tasks', 'calls': 100, 'errors': 2, 'total_ms': 5050.0, 'mean_ms': 50.5,
+            'p50_ms': 50.0, 'p95_ms': 95.0, 'p99_ms': 99.0, 'max_ms': 100.0,
+        }
+
+    def test_hook_sees_every_rpc(self, supabase_config):
+        calls = []
+        with MotivBotClient(supabase_config['url'], supabase_config['anon_key'],
+                            on_rpc=lambda *call: calls.append(call)) as client:
+            client.get_dashboard()
+            client.update_task(99999999, title='No existe')
+            with pytest.raises(MotivBotError):
+                client.rpc('nonexistent_function')
+
+        assert [(rpc, error) for rpc, _, error in calls] == [
+            ('motivbot_get_dashboard', False),
+            ('motivbot_update_task', True),
+            ('nonexistent_function', True),
+        ]
+        assert all(duration > 0 for _, duration, _ in calls)
+
+    def test_server_stats_through_client(self, supabase_config):
+        timings = RpcTimings()
+        with MotivBotClient(supabase_config['url'], supabase_config['anon_key'], on_rpc=timings) as client:
+            for _ in range(3):
+                client.get_popular_tags(limit=5)
+            result = client.get_rpc_stats()
+        if isinstance(result, dict):
+            pytest.skip(f"pg_stat_statements no disponible: {result['message']}")
+
+        server = {stat['rpc']: stat for stat in result}
+        client_side = {stat['rpc']: stat for stat in timings.summary()}
+        assert server['motivbot_get_popular_tags']['calls'] >= client_side['motivbot_get_popular_tags']['calls'] == 3
+        assert client_side['motivbot_get_popular_tags']['max_ms'] >= server['motivbot_get_popular_tags']['min_ms']
@@ -0,0 +1,145 @@
+import json
+import os
+import statistics
+import time
+from pathlib import Path
+
+import pytest
+
+from .datagen import SCALES, generate
+
+# Medianas de referencia por escala y RPC (ms), generadas con MOTIVBOT_BENCH_UPDATE_BASELINE=1
+BASELINE_FILE = Path(__file__).resolve().parent / 'baselines' / 'motivbot_scale.json'
+
+# Escalas a medir; 100k y 1m tardan en generarse, así que por defecto solo 10k
+BENCH_SCALES = [s.strip() for s in os.getenv('MOTIVBOT_BENCH_SCALES', '10k').split(',') if s.strip()]
+UPDATE_BASELINE = os.getenv('MOTIVBOT_BENCH_UPDATE_BASELINE') == '1'
+
+CALLS = 15
+
+# Una RPC regresa si tarda más de REGRESSION_FACTOR veces su referencia y al menos REGRESSION_FLOOR_MS más
+# (el margen absoluto evita falsos positivos por ruido en las que tardan décimas de milisegundo)
+REGRESSION_FACTOR = float(os.getenv('MOTIVBOT_BENCH_FACTOR', '2.0'))
+REGRESSION_FLOOR_MS = 2.0
+
+# RPC -> llamada; %(task_id)s y %(conversation_id)s salen del resumen del generador
+RPC_CALLS = {
+    'motivbot_get_tasks': "SELECT motivbot_get_tasks(p_limit := 50)",
+    'motivbot_get_tasks[status,tags]': "SELECT motivbot_get_tasks(p_status := 'pending', p_tags := ARRAY['salud'], p_limit := 50)",
+    'motivbot_get_tasks_page': "SELECT motivbot_get_tasks_page(p_limit := 50, p_after_created_at := NOW() - INTERVAL '180 days', p_after_id := 0)",
+    'motivbot_search_tasks': "SELECT motivbot_search_tasks(p_search := 'revisar informe', p_limit := 20)",
+    'motivbot_search_tasks[tags]': "SELECT motivbot_search_tasks(p_search := 'finanzas', p_search_tags := true, p_limit := 20)",
+    'motivbot_get_calendar[week]': "SELECT motivbot_get_calendar(CURRENT_DATE, CURRENT_DATE + 6)",
+    'motivbot_get_calendar[month]': "SELECT motivbot_get_calendar(CURRENT_DATE, CURRENT_DATE + 30)",
+    'motivbot_create_task': "SELECT motivbot_create_task(p_title := 'Benchmark urgente', p_priority := 'high')",
+    'motivbot_create_tasks': """
+        SELECT motivbot_create_tasks((
+            SELECT jsonb_agg(jsonb_build_object('title', 'Bulk ' || g, 'tags', jsonb_build_array('bench')))
+            FROM generate_series(1, 100) AS g
+        ))
+    """,
+    'motivbot_update_task': "SELECT motivbot_update_task(p_task_id := %(task_id)s, p_status := 'in-progress')",
+    'motivbot_delete_task': "SELECT motivbot_delete_task(p_task_id := (SELECT max(id) FROM public.task))",
+    'motivbot_create_conversation': "SELECT motivbot_create_conversation(p_task_id := %(task_id)s, p_role := 'user', p_message := 'Hola')",
+    'motivbot_get_conversations': "SELECT motivbot_get_conversations(p_task_id := %(task_id)s)",
+    'motivbot_get_conversations[all]': "SELECT motivbot_get_conversations(p_limit := 100)",
+    'motivbot_update_conversation_feedback': "SELECT motivbot_update_conversation_feedback(p_conversation_id := %(conversation_id)s, p_user_is_useful := true)",
+    'motivbot_get_dashboard': "SELECT motivbot_get_dashboard()",
+    'motivbot_get_popular_tags': "SELECT motivbot_get_popular_tags(p_limit := 20)",
+    'motivbot_get_related_tags': "SELECT motivbot_get_related_tags(ARRAY['salud'], 10)",
+    'motivbot_get_motivational_messages': "SELECT motivbot_get_motivational_messages(p_task_id := %(task_id)s)",
+    'motivbot_get_motivational_messages[estado]': "SELECT motivbot_get_motivational_messages(p_estado := 'calm', p_limit := 5)",
+    'get_task_conversation_history': "SELECT get_task_conversation_history(%(task_id)s)",
+    'motivbot_get_conversation_window': "SELECT motivbot_get_conversation_window(%(task_id)s)",
+    'get_conversation_summary': "SELECT get_conversation_summary(ARRAY[%(task_id)s]::BIGINT[], 50)",
+    'get_emotional_states_analytics': "SELECT get_emotional_states_analytics(30)",
+    'get_conversations_by_emotion': "SELECT get_conversations_by_emotion('calm', 20)",
+    'get_random_chibi_messages': "SELECT count(*) FROM get_random_chibi_messages(20)",
+}
+
+
+def median_ms(db, query, params, calls=CALLS):
+    """Mediana en ms de `calls` ejecuciones, tras una primera que calienta caché y planes"""
+    db.execute(query, params)
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        db.execute(query, params)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def load_baseline():
+    if BASELINE_FILE.exists():
+        return json.loads(BASELINE_FILE.read_text(encoding='utf-8'))
+    return {}
+
+
+def save_baseline(scale, medians):
+    baseline = load_baseline()
+    baseline[scale] = {rpc: round(ms, 3) for rpc, ms in sorted(medians.items())}
+    BASELINE_FILE.parent.mkdir(exist_ok=True)
+    BASELINE_FILE.write_text(json.dumps(baseline, indent=2, sort_keys=True, ensure_ascii=False) + '\n', encoding='utf-8')
+
+
+def missing_references(medians, reference):
+    """RPCs medidas sin referencia: sin ella no se pueden comparar, así que el benchmark falla"""
+    return sorted(rpc for rpc in medians if rpc not in reference)
+
+
+def regressions(medians, reference):
+    """RPCs más lentas que su referencia según REGRESSION_FACTOR y REGRESSION_FLOOR_MS"""
+    return {
+        rpc: (reference[rpc], ms)
+        for rpc, ms in medians.items()
+        if rpc in reference and ms > reference[rpc] * REGRESSION_FACTOR and ms - reference[rpc] > REGRESSION_FLOOR_MS
+    }
+
+
+class TestScaleBaseline:
+
+    def test_regressions_need_factor_and_floor(self):
+        reference = {'fast': 0.2, 'slow': 10.0, 'new': 1.0}
+
+        found = regressions({'fast': 1.5, 'slow': 25.0, 'other': 99.0}, reference)
+
+        # 'fast' es 7x pero solo 1.3 ms más lento; 'other' no tiene referencia, eso lo cuenta missing_references
+        assert found == {'slow': (10.0, 25.0)}
+
+    def test_rpcs_without_reference_are_reported(self):
+        assert missing_references({'slow': 25.0, 'other': 99.0, 'new[week]': 1.0}, {'slow': 10.0}) == \
+            ['new[week]', 'other']
+
+    def test_baseline_covers_every_rpc(self):
+        """Cada escala guardada tiene referencia para todas las RPC de RPC_CALLS y ninguna que ya no se mida"""
+        for scale, reference in load_baseline().items():
+            assert scale in SCALES
+            assert set(reference) <= set(RPC_CALLS), (scale, sorted(set(reference) - set(RPC_CALLS)))
+
+
+@pytest.mark.benchmark
+class TestMotivbotScale:
+
+    @pytest.mark.parametrize('scale', BENCH_SCALES)
+    def test_rpcs_do_not_regress(self, local_db, scale):
+        """Cada RPC se mide con los datos sintéticos de la escala y se compara con su referencia"""
+        if scale not in SCALES:
+            pytest.fail(f"Escala desconocida {scale!r}; opciones: {', '.join(SCALES)}")
+        params = generate(local_db, scale)
+
+        medians = {rpc: median_ms(local_db, query, params) for rpc, query in RPC_CALLS.items()}
+        reference = load_baseline().get(scale, {})
+
+        print(f"\n📏 escala {scale} ({params['tasks']} tareas)")
+        for rpc, ms in medians.items():
+            base = reference.get(rpc)
+            print(f"   {rpc:45} {ms:9.3f} ms" + (f"  (referencia {base:.3f} ms)" if base is not None else ''))
+
+        if UPDATE_BASELINE:
+            save_baseline(scale, medians)
+            return
+
+        # Una RPC sin referencia no se puede dar por buena: hay que regenerar la escala en el equipo de referencia
+        missing = missing_references(medians, reference)
+        assert not missing, f"Sin referencia en {scale} para {missing}; regenérala con MOTIVBOT_BENCH_UPDATE_BASELINE=1"
+        assert not regressions(medians, reference), regressions(medians, reference)
@@ -0,0 +1,127 @@
+import random
+from collections import Counter
+from itertools import permutations
+
+import pytest
+
+from motivbot import MotivBotError
+
+from .fuzz import append_tag, check_rpc, delete_tasks, insert_task, insert_tasks, run_operations, update_tags, update_task
+
+OPERATIONS = [insert_tasks, insert_task, insert_task, update_tags, append_tag, update_task, delete_tasks]
+
+
+def expected_index(db):
+    """task_tag, recuento por tag y co-ocurrencias calculados en Python desde task.tags"""
+    rows = set()
+    for task_id, tags in db.execute("SELECT id, tags FROM public.task"):
+        rows.update((task_id, tag) for tag in (tags or []) if tag is not None)
+
+    by_task = {}
+    for task_id, tag in rows:
+        by_task.setdefault(task_id, set()).add(tag)
+    counts = Counter(tag for _, tag in rows)
+    pairs = Counter(pair for tags in by_task.values() for pair in permutations(tags, 2))
+    return rows, dict(counts), dict(pairs)
+
+
+def actual_index(db):
+    rows = set(db.execute("SELECT task_id, tag FROM public.task_tag"))
+    counts = dict(db.execute("SELECT tag, task_count FROM public.motivbot_tag_count"))
+    pairs = {(tag, related): count for tag, related, count in
+             db.execute("SELECT tag, related_tag, task_count FROM public.motivbot_tag_pair")}
+    return rows, counts, pairs
+
+
+def check_index(db):
+    return check_rpc(db, 'motivbot_check_tag_index')
+
+
+def related(db, tags, limit=10):
+    [[result]] = db.execute("SELECT motivbot_get_related_tags(%(tags)s, %(limit)s)", {'tags': tags, 'limit': limit})
+    return [(item['tag'], item['count']) for item in result]
+
+
+class TestTagIndex:
+
+    @pytest.mark.parametrize('seed', [1, 2, 3])
+    def test_index_matches_tags_column(self, local_db, seed):
+        """Tras cambios aleatorios en task.tags el índice coincide con el array, recalculado en Python"""
+        def check(operation):
+            assert actual_index(local_db) == expected_index(local_db), operation.__name__
+
+        run_operations(local_db, random.Random(seed), OPERATIONS, steps=120, check=check, every=40)
+
+        assert check_index(local_db) == {'consistent': True, 'mismatches': []}
+
+    def test_other_columns_do_not_touch_index(self, local_db):
+        local_db.execute("INSERT INTO public.task (title, tags) VALUES ('Índice', ARRAY['casa', 'salud'])")
+        before = local_db.execute("SELECT xmin::TEXT, tag FROM public.task_tag ORDER BY tag")
+
+        local_db.execute("UPDATE public.task SET status = 'completed', title = 'Índice hecho'")
+
+        assert local_db.execute("SELECT xmin::TEXT, tag FROM public.task_tag ORDER BY tag") == before
+
+    def test_truncate_empties_index(self, local_db):
+        local_db.execute("INSERT INTO public.task (title, tags) VALUES ('Índice', ARRAY['casa', 'salud'])")
+
+        local_db.execute("TRUNCATE public.task CASCADE")
+
+        assert actual_index(local_db) == (set(), {}, {})
+
+    def test_inconsistency_is_reported_and_repaired(self, local_db):
+        local_db.execute("INSERT INTO public.task (title, tags) VALUES ('Índice', ARRAY['casa', 'salud'])")
+        local_db.execute("UPDATE public.motivbot_tag_count SET task_count = task_count + 2 WHERE tag = 'casa'")
+
+        result = check_index(local_db)
+        assert result['consistent'] is False
+        assert [(m['scope'], m['key'], m['actual'] - m['expected']) for m in result['mismatches']] == [('tag', 'casa', 2)]
+
+        local_db.execute("SELECT motivbot_refresh_tag_index()")
+        assert check_index(local_db)['consistent']
+
+
+class TestPopularAndRelatedTags:
+
+    @pytest.fixture
+    def tagged(self, local_db):
+        local_db.execute("TRUNCATE public.task CASCADE")
+        local_db.execute("""
+            INSERT INTO public.task (title, tags) VALUES
+                ('A', ARRAY['python', 'backend', 'trabajo']),
+                ('B', ARRAY['python', 'backend']),
+                ('C', ARRAY['python', 'frontend', 'trabajo', 'python']),
+                ('D', ARRAY['casa']),
+                ('E', ARRAY['trabajo', 'reunion'])
+        """)
+
+    def test_popular_tags_count_tasks(self, local_db, tagged):
+        [[result]] = local_db.execute("SELECT motivbot_get_popular_tags(3)")
+
+        # python aparece dos veces en C, pero cuenta una tarea
+        assert result == [{'tag': 'python', 'count': 3}, {'tag': 'trabajo', 'count': 3}, {'tag': 'backend', 'count': 2}]
+
+    def test_related_to_one_tag(self, local_db, tagged):
+        assert related(local_db, ['python']) == [('backend', 2), ('trabajo', 2), ('frontend', 1)]
+        assert related(local_db, ['python'], limit=1) == [('backend', 2)]
+        assert related(local_db, ['casa']) == []
+        assert related(local_db, ['desconocido']) == []
+
+    def test_related_to_several_tags(self, local_db, tagged):
+        """Se suman las co-ocurrencias de cada tag y no se sugieren los ya elegidos"""
+        assert related(local_db, ['python', 'trabajo']) == [('backend', 3), ('frontend', 2), ('reunion', 1)]
+        assert related(local_db, []) == []
+
+    def test_related_tags_through_client(self, motivbot_client, service_client, cleanup_tasks, worker_tag):
+        related_tag, python, api = worker_tag('sdk-related'), worker_tag('sdk-python'), worker_tag('sdk-api')
+        for tags in ([related_tag, python], [related_tag, python, api]):
+            cleanup_tasks(motivbot_client.create_task("Related Tags - Cleanup", tags=tags)['id'])
+
+        assert motivbot_client.get_related_tags([related_tag]) == [
+            {'tag': python, 'count': 2},
+            {'tag': api, 'count': 1},
+        ]
+        assert service_client.check_tag_index() == {'consistent': True, 'mismatches': []}
+        with pytest.raises(MotivBotError) as error:
+            motivbot_client.check_tag_index()
+        assert error.value.status_code in [401, 403]
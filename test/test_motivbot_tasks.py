@@ -0,0 +1,120 @@
+from pathlib import Path
+
+import pytest
+
+LEGACY_SQL = Path(__file__).resolve().parent / 'sql' / 'legacy_motivbot_rpc.sql'
+
+
+@pytest.fixture
+def legacy_db(local_db):
+    """Base local con las RPC legacy (las de EXECUTE) y tareas que combinan estado, prioridad y tags"""
+    local_db.execute(LEGACY_SQL.read_text(encoding='utf-8'))
+    local_db.execute("""
+        INSERT INTO public.task (title, status, priority, tags, created_at)
+        SELECT 'Semántica ' || g,
+               (ARRAY['pending', 'completed']::task_status[])[1 + mod(g, 2)],
+               (ARRAY['low', 'normal', 'high'])[1 + mod(g, 3)],
+               ARRAY['semantica-' || mod(g, 4)],
+               TIMESTAMPTZ '2031-01-01' + g * INTERVAL '1 minute'
+        FROM generate_series(1, 24) AS g
+    """)
+    return local_db
+
+
+def get_tasks(db, prefix, args):
+    [[result]] = db.execute(
+        f"SELECT {prefix}motivbot_get_tasks(p_status := %(p_status)s, p_priority := %(p_priority)s, "
+        f"p_tags := %(p_tags)s, p_limit := 100)",
+        {'p_status': None, 'p_priority': None, 'p_tags': None, **args},
+    )
+    return result
+
+
+def plan_indexes(plan):
+    """Índices que recorre un plan de auto_explain"""
+    indexes = {plan['Index Name']} if 'Index Name' in plan else set()
+    for child in plan.get('Plans', []):
+        indexes |= plan_indexes(child)
+    return indexes
+
+
+def task_row(db, task_id):
+    [row] = db.execute("""
+        SELECT title, description, status::TEXT, priority, due_date, due_time, tags
+        FROM public.task WHERE id = %(id)s
+    """, {'id': task_id})
+    return row
+
+
+class TestTaskRpcSemantics:
+
+    @pytest.mark.parametrize('args', [
+        {'p_status': 'pending'},
+        {'p_priority': 'high'},
+        {'p_status': 'pending', 'p_priority': 'high'},
+        {'p_tags': ['semantica-1']},
+        # Con tags y solo uno de status/priority la versión legacy filtraba solo por tags
+        {'p_tags': ['semantica-1'], 'p_status': 'pending'},
+        {'p_tags': ['semantica-1'], 'p_priority': 'high'},
+        {'p_tags': ['semantica-1'], 'p_status': 'pending', 'p_priority': 'high'},
+    ])
+    def test_get_tasks_filters_like_legacy(self, legacy_db, args):
+        assert get_tasks(legacy_db, '', args) == get_tasks(legacy_db, 'legacy_', args)
+
+    @pytest.mark.parametrize('args', [
+        {'p_title': 'Renombrada'},
+        # La legacy solo aceptaba la descripción junto a título y estado (con otras mezclas fallaba)
+        {'p_title': 'Sin descripción', 'p_description': '', 'p_status': 'in-progress'},
+        {'p_status': 'completed'},
+        {'p_tags': ['nuevo']},
+        {'p_tags': []},
+        {},
+    ])
+    def test_update_task_writes_like_legacy(self, legacy_db, args):
+        """Un parámetro a NULL conserva el valor y una descripción vacía la borra, como antes"""
+        ids = [row[0] for row in legacy_db.execute("""
+            INSERT INTO public.task (title, description, priority, due_date, due_time, tags)
+            SELECT 'Editar', 'Con descripción', 'high', DATE '2031-02-01', TIME '10:00', ARRAY['semantica']
+            FROM generate_series(1, 2)
+            RETURNING id
+        """)]
+        names = ', '.join(f"{name} := %({name})s" for name in args)
+        for prefix, task_id in zip(('', 'legacy_'), ids):
+            [[result]] = legacy_db.execute(
+                f"SELECT {prefix}motivbot_update_task(p_task_id := %(p_task_id)s{', ' if names else ''}{names})",
+                {'p_task_id': task_id, **args},
+            )
+            assert result['success'], result
+
+        assert task_row(legacy_db, ids[0]) == task_row(legacy_db, ids[1])
+
+    def test_create_task_rejects_invalid_values_without_raising(self, local_db):
+        [[result]] = local_db.execute("SELECT motivbot_create_task(p_title := 'Prioridad rara', p_priority := 'urgent')")
+
+        assert result['success'] is False and 'Error creating task' in result['message']
+        assert local_db.execute("SELECT count(*) FROM public.task WHERE title = 'Prioridad rara'") == [(0,)]
+
+    @pytest.mark.bulk
+    def test_tag_lookup_keeps_its_index_after_plan_caching(self, local_db):
+        """
+        Pasadas 5 ejecuciones plpgsql puede cambiar a un plan genérico que recorre idx_task_created_at_id;
+        con force_custom_plan la búsqueda por un tag raro sigue yendo por idx_task_tags
+        """
+        local_db.execute("""
+            INSERT INTO public.task (title, tags, created_at)
+            SELECT 'Plan ' || g, CASE WHEN mod(g, 5000) = 0 THEN ARRAY['plan-raro'] ELSE ARRAY['plan-comun'] END,
+                   TIMESTAMPTZ '2031-01-01' + g * INTERVAL '1 second'
+            FROM generate_series(1, 50000) AS g
+        """)
+        local_db.execute("ANALYZE public.task")
+
+        for _ in range(8):
+            assert len(get_tasks(local_db, '', {'p_tags': ['plan-raro']})) == 10
+        plans = local_db.nested_plans(
+            "SELECT motivbot_get_tasks(p_status := NULL, p_priority := NULL, p_tags := %(tags)s, p_limit := 100)",
+            {'tags': ['plan-raro']},
+        )
+
+        [plan] = [p for p in plans if 'FROM public.task' in p['Query Text'] and 'LIMIT p_limit' in p['Query Text']]
+        assert 'idx_task_tags' in plan_indexes(plan['Plan'])
+        assert plan['Plan']['Actual Total Time'] < 50